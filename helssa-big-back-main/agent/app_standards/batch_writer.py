@@ -0,0 +1,172 @@
+"""
+پایهٔ مشترک نویسنده‌های پس‌زمینهٔ دسته‌ای (write-behind)
+Shared base for per-process background batch writers
+
+مسیر درخواست فقط رکورد را به بافر محدود درون‌حافظه‌ای اضافه می‌کند؛ یک thread
+پس‌زمینه بافر را هر flush_interval ثانیه (یا با پر شدن یک دسته) در دیتابیس ذخیره
+می‌کند. ظرفیت بافر سقف رکوردهایی است که در صورت crash از دست می‌روند؛ رکوردهای
+کنارگذاشته‌شده شمرده و پس از هر flush یک بار گزارش می‌شوند.
+
+زیرکلاس‌ها بافرهای خود را در _reset می‌سازند و flush را پیاده‌سازی می‌کنند.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundBatchWriter:
+    """
+    بافر محدود هر پردازه با thread ذخیرهٔ پس‌زمینه
+
+    - پس از fork، بافر و thread در پردازهٔ فرزند از نو ساخته می‌شوند
+    - سرریز بافر قدیمی‌ترین رکورد را کنار می‌گذارد (بدون مسدود کردن درخواست)
+    - رکوردهای کنارگذاشته‌شده با extra={'dropped', 'dropped_total', 'capacity'} گزارش می‌شوند
+    """
+
+    # نام thread پس‌زمینه و پیام گزارش رکوردهای کنارگذاشته‌شده
+    thread_name = 'background-batch-writer'
+    drop_message = 'Background writer dropped entries'
+
+    def __init__(self, capacity: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        """
+        Args:
+            capacity: حداکثر رکوردهای در انتظار ذخیره در هر پردازه
+            batch_size: اندازهٔ هر دستهٔ ذخیره
+            flush_interval: فاصلهٔ ذخیرهٔ دوره‌ای (ثانیه)
+        """
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reset()
+
+        if hasattr(os, 'register_at_fork'):
+            # رکوردهای پردازهٔ والد متعلق به همان پردازه‌اند و در فرزند تکرار نمی‌شوند
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._thread: Optional[threading.Thread] = None
+        self._written = 0
+        self._dropped = 0
+        self._reported_dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def flush(self) -> int:
+        """ذخیرهٔ رکوردهای در انتظار؛ تعداد رکوردهای ذخیره‌شده را برمی‌گرداند"""
+        raise NotImplementedError
+
+    def close(self):
+        """ذخیرهٔ رکوردهای باقی‌مانده هنگام خروج عادی پردازه"""
+        self.flush()
+        self._report_drops()
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار نویسنده برای health check"""
+        return {
+            'capacity': self.capacity,
+            'written': self._written,
+            'dropped': self._dropped,
+        }
+
+    @property
+    def dropped(self) -> int:
+        """تعداد کل رکوردهای کنارگذاشته‌شده در این پردازه"""
+        return self._dropped
+
+    def _append(self, buffer: deque, entry) -> int:
+        """
+        افزودن رکورد به بافر (فراخواننده قفل _lock را در دست دارد)
+
+        Returns:
+            int: تعداد رکوردهای در انتظار این بافر
+        """
+        if len(buffer) >= self.capacity:
+            # بافر حلقوی: قدیمی‌ترین رکورد کنار گذاشته می‌شود تا حافظه محدود بماند
+            buffer.popleft()
+            self._dropped += 1
+        buffer.append(entry)
+        return len(buffer)
+
+    def _count_dropped(self, count: int):
+        """ثبت رکوردهایی که ذخیره نشدند (مثلاً رکورد خراب در دسته)"""
+        if count:
+            with self._lock:
+                self._dropped += count
+
+    def _submitted(self, pending: int):
+        """بیدار کردن thread با پر شدن یک دسته و اطمینان از اجرای آن"""
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_worker()
+
+    def _report_drops(self):
+        dropped = self._dropped
+        if dropped > self._reported_dropped:
+            logger.warning(
+                self.drop_message,
+                extra={
+                    'dropped': dropped - self._reported_dropped,
+                    'dropped_total': dropped,
+                    'capacity': self.capacity,
+                }
+            )
+            self._reported_dropped = dropped
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"{self.thread_name} worker error: {str(e)}")
+
+    def _tick(self):
+        """کار دوره‌ای thread پس‌زمینه"""
+        self.flush()
+        self._report_drops()
+
+
+WriterT = TypeVar('WriterT', bound=BackgroundBatchWriter)
+
+
+class ProcessWriter(Generic[WriterT]):
+    """
+    نمونهٔ مشترک یک نویسنده در هر پردازه
+
+    نویسنده در اولین استفاده ساخته می‌شود (پس از بارگذاری تنظیمات) و هنگام
+    خروج عادی پردازه رکوردهای باقی‌مانده‌اش ذخیره می‌شوند.
+    """
+
+    def __init__(self, factory: Callable[[], WriterT]):
+        self._factory = factory
+        self._writer: Optional[WriterT] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> WriterT:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    writer = self._factory()
+                    atexit.register(writer.close)
+                    self._writer = writer
+        return self._writer
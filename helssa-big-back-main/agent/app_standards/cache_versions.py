@@ -0,0 +1,41 @@
+"""
+شماره نسخه کلیدهای کش (version stamp)
+Cache version stamps
+
+مقادیر کش‌شده با شماره نسخه در کلیدشان ذخیره می‌شوند؛ باطل کردن یعنی افزایش
+نسخه، بنابراین مقادیر قدیمی بدون حذف تک‌تک کلیدها نامعتبر می‌شوند و تا پایان
+TTL خود از کش خارج می‌شوند.
+"""
+
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+
+
+def init_version(key: str) -> int:
+    """
+    مقدار اولیه نسخه؛ بر پایه زمان تا پس از حذف کلید نسخه از کش، نسخه‌ای تکراری
+    (و مقداری قدیمی) دوباره معتبر نشود
+    """
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key, 0)
+
+
+def get_versions(keys: Iterable[str]) -> Dict[str, int]:
+    """نسخه فعلی چند کلید با یک دسترسی به کش (کلیدهای نبود مقداردهی می‌شوند)"""
+    keys = list(keys)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if not versions.get(key):
+            versions[key] = init_version(key)
+    return versions
+
+
+def bump_version(key: str):
+    """افزایش نسخه و باطل کردن همه مقادیر کش‌شده با نسخه قبلی"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # کلید وجود ندارد؛ مقدار اولیه جدید خود نسخه‌های قبلی را باطل می‌کند
+        init_version(key)
@@ -7,11 +7,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.cache import cache
 import logging
 import time
 from typing import Tuple, Dict, Any
 
+from ..rate_limiting import get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,14 +57,12 @@ class APIIngressCore:
         Returns:
             True if allowed, False if rate limited
         """
-        cache_key = f"rate_limit:{user_id}:{endpoint}"
-        current_count = cache.get(cache_key, 0)
+        result = get_rate_limiter().check(f"rate_limit:{user_id}:{endpoint}", limit, window)
         
-        if current_count >= limit:
+        if not result.allowed:
             self.logger.warning(f"Rate limit exceeded for user {user_id} on {endpoint}")
             return False
         
-        cache.set(cache_key, current_count + 1, window)
         return True
     
     def log_request(self, request, response_status: int, 
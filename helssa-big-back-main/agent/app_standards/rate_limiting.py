@@ -0,0 +1,222 @@
+"""
+موتور مشترک محدودسازی نرخ درخواست (GCRA)
+Shared rate limiter engine (Generic Cell Rate Algorithm)
+
+برای هر کلید فقط یک مقدار (زمان نظری ورود بعدی، TAT) نگهداری می‌شود و هر بررسی
+یک عملیات اتمیک است؛ هزینهٔ بررسی به سقف تعریف‌شده بستگی ندارد.
+
+Backend ها:
+    - RedisBackend: مشترک بین پردازه‌ها و سرورها با اسکریپت Lua (پیش‌فرض)
+    - LocalMemoryBackend: درون پردازه (فقط توسعه و تک‌پردازه؛ هر worker سهمیهٔ
+      جداگانه دارد)
+
+تنظیمات Django:
+    RATE_LIMIT_BACKEND: 'redis' (پیش‌فرض) یا 'local'
+    RATE_LIMIT_REDIS_URL: آدرس Redis (پیش‌فرض CELERY_BROKER_URL)
+    RATE_LIMIT_FAIL_OPEN: در صورت خطای backend درخواست مجاز شود (پیش‌فرض True)
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MICROSECONDS = 1_000_000
+
+# خروجی backend: (مجاز، میکروثانیه تا مجاز شدن، میکروثانیه تا خالی شدن کامل سهمیه)
+GCRAState = Tuple[bool, int, int]
+
+
+@dataclass
+class RateLimitResult:
+    """نتیجهٔ یک بررسی محدودیت نرخ"""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # ثانیه تا مجاز شدن درخواست بعدی (برای درخواست رد شده)
+    reset_after: float  # ثانیه تا بازگشت کامل سهمیه
+
+    @property
+    def retry_after_seconds(self) -> int:
+        """retry_after گرد شده به بالا برای هدر Retry-After"""
+        return int(math.ceil(self.retry_after))
+
+
+class LocalMemoryBackend:
+    """
+    نگهداری TAT در حافظهٔ پردازه
+
+    کلیدهای منقضی هنگام رسیدن به max_keys پاکسازی می‌شوند.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tats: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def gcra(self, key: str, emission_us: int, period_us: int, cost: int) -> GCRAState:
+        now = int(time.monotonic() * MICROSECONDS)
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + emission_us * cost
+            allow_at = new_tat - period_us
+            if now < allow_at:
+                return False, allow_at - now, tat - now
+            if key not in self._tats and len(self._tats) >= self.max_keys:
+                self._evict_expired(now)
+            self._tats[key] = new_tat
+            return True, 0, new_tat - now
+
+    def reset(self, key: str):
+        with self._lock:
+            self._tats.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+    def _evict_expired(self, now: int):
+        expired = [key for key, tat in self._tats.items() if tat <= now]
+        for key in expired:
+            del self._tats[key]
+        if len(self._tats) >= self.max_keys:
+            # همه کلیدها فعال‌اند؛ قدیمی‌ترین درج‌ها کنار گذاشته می‌شوند
+            for key in list(self._tats)[:len(self._tats) - self.max_keys + 1]:
+                del self._tats[key]
+
+
+class RedisBackend:
+    """
+    نگهداری TAT در Redis؛ کل بررسی در یک اسکریپت Lua و با ساعت خود Redis انجام
+    می‌شود تا بین سرورها اتمیک و مستقل از اختلاف ساعت باشد.
+    """
+
+    GCRA_SCRIPT = """
+    local emission = tonumber(ARGV[1])
+    local period = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+    local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + emission * cost
+    local allow_at = new_tat - period
+    if now < allow_at then
+        return {0, allow_at - now, tat - now}
+    end
+    redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+    return {1, 0, new_tat - now}
+    """
+
+    def __init__(self, url: str, key_prefix: str = 'rl:'):
+        import redis
+
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.GCRA_SCRIPT)
+
+    def gcra(self, key: str, emission_us: int, period_us: int, cost: int) -> GCRAState:
+        allowed, retry_after, reset_after = self._script(
+            keys=[self.key_prefix + key], args=[emission_us, period_us, cost]
+        )
+        return bool(allowed), int(retry_after), int(reset_after)
+
+    def reset(self, key: str):
+        self._client.delete(self.key_prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(match=f'{self.key_prefix}*'):
+            self._client.delete(key)
+
+
+class RateLimiter:
+    """
+    محدودکنندهٔ نرخ با الگوریتم GCRA
+
+    سقف limit درخواست در period ثانیه: حداکثر limit درخواست پشت‌سرهم مجاز است و
+    سهمیه با نرخ ثابت limit/period دوباره پر می‌شود (بدون جهش در مرز پنجره).
+    """
+
+    def __init__(self, backend=None, fail_open: bool = True):
+        self.backend = backend or LocalMemoryBackend()
+        self.fail_open = fail_open
+
+    def check(self, key: str, limit: int, period: float, cost: int = 1) -> RateLimitResult:
+        """
+        بررسی و ثبت یک درخواست
+
+        Args:
+            key: کلید یکتا (مثلاً کاربر + endpoint)
+            limit: حداکثر تعداد درخواست در بازه
+            period: طول بازه (ثانیه)
+            cost: وزن درخواست
+
+        Returns:
+            RateLimitResult
+        """
+        if limit <= 0:
+            return RateLimitResult(
+                allowed=False, limit=limit, remaining=0, retry_after=period, reset_after=period,
+            )
+
+        period_us = int(period * MICROSECONDS)
+        emission_us = max(period_us // limit, 1)
+        try:
+            allowed, retry_after_us, reset_after_us = self.backend.gcra(
+                key, emission_us, period_us, cost
+            )
+        except Exception as e:
+            logger.error(f"Rate limiter backend error for {key}: {str(e)}")
+            return RateLimitResult(
+                allowed=self.fail_open, limit=limit, remaining=0,
+                retry_after=0 if self.fail_open else period, reset_after=0,
+            )
+
+        remaining = max(int((period_us - reset_after_us) // emission_us), 0)
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=min(remaining, limit),
+            retry_after=retry_after_us / MICROSECONDS,
+            reset_after=reset_after_us / MICROSECONDS,
+        )
+
+    def reset(self, key: str):
+        """پاک کردن وضعیت یک کلید"""
+        self.backend.reset(key)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """محدودکنندهٔ مشترک پروژه بر اساس تنظیمات"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                fail_open = getattr(settings, 'RATE_LIMIT_FAIL_OPEN', True)
+                backend = None
+                if getattr(settings, 'RATE_LIMIT_BACKEND', 'redis') == 'redis':
+                    url = getattr(
+                        settings, 'RATE_LIMIT_REDIS_URL',
+                        getattr(settings, 'CELERY_BROKER_URL', 'redis://localhost:6379/0')
+                    )
+                    try:
+                        backend = RedisBackend(url)
+                    except ImportError:
+                        logger.warning(
+                            "redis package is not installed; rate limits are enforced per process"
+                        )
+                _limiter = RateLimiter(backend, fail_open=fail_open)
+    return _limiter
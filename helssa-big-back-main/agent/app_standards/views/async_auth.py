@@ -0,0 +1,56 @@
+"""
+احراز هویت مشترک view های async (ASGI)
+Shared authentication for async views
+
+view های async از APIView عبور نمی‌کنند، پس authenticator های پیش‌فرض DRF
+(JWT یا session) اینجا مستقیماً و خارج از event loop اجرا می‌شوند.
+"""
+
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def authenticate_request(request, allow_query_token: bool = False):
+    """
+    احراز هویت درخواست با authenticator های پیش‌فرض DRF
+
+    Args:
+        request: درخواست Django
+        allow_query_token: پذیرش توکن JWT از پارامتر token (برای EventSource
+            مرورگر که هدر دلخواه نمی‌فرستد)
+
+    Returns:
+        کاربر احراز هویت‌شده یا None
+    """
+    token = request.GET.get('token') if allow_query_token else None
+    if token and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user if user and user.is_authenticated else None
+
+
+async def aauthenticate_request(request, allow_query_token: bool = False) -> Optional[object]:
+    """نسخه async authenticate_request (دسترسی به دیتابیس در thread جدا)"""
+    return await sync_to_async(authenticate_request)(request, allow_query_token)
+
+
+def unauthenticated_response() -> JsonResponse:
+    """پاسخ استاندارد ۴۰۱ برای view های async"""
+    return JsonResponse({
+        'success': False,
+        'error': 'not_authenticated',
+        'message': 'احراز هویت انجام نشده است'
+    }, status=status.HTTP_401_UNAUTHORIZED)
@@ -3,7 +3,7 @@
 """
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Metric, UserActivity, PerformanceMetric, BusinessMetric, AlertRule, Alert
+from .models import Metric, UserActivity, PerformanceMetric, LatencySketch, MetricRollup, RollupCheckpoint, BusinessMetric, AlertRule, Alert
 
 
 @admin.register(Metric)
@@ -99,6 +99,40 @@ class PerformanceMetricAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(LatencySketch)
+class LatencySketchAdmin(admin.ModelAdmin):
+    """
+    تنظیمات پنل ادمین برای مدل LatencySketch
+    """
+    list_display = ['endpoint', 'method', 'bucket_start', 'bucket_seconds', 'count', 'error_count']
+    list_filter = ['method', 'bucket_seconds', 'bucket_start']
+    search_fields = ['endpoint']
+    readonly_fields = ['sketch', 'created_at']
+    ordering = ['-bucket_start']
+
+
+@admin.register(MetricRollup)
+class MetricRollupAdmin(admin.ModelAdmin):
+    """
+    تنظیمات پنل ادمین برای مدل MetricRollup
+    """
+    list_display = ['source', 'granularity', 'name', 'bucket_start', 'count', 'error_count', 'sum']
+    list_filter = ['source', 'granularity', 'bucket_start']
+    search_fields = ['name']
+    readonly_fields = ['sketch', 'user_sketch', 'updated_at']
+    ordering = ['-bucket_start']
+
+
+@admin.register(RollupCheckpoint)
+class RollupCheckpointAdmin(admin.ModelAdmin):
+    """
+    تنظیمات پنل ادمین برای مدل RollupCheckpoint
+    """
+    list_display = ['source', 'granularity', 'built_from', 'built_until', 'updated_at']
+    list_filter = ['source', 'granularity']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(BusinessMetric)
 class BusinessMetricAdmin(admin.ModelAdmin):
     """
@@ -0,0 +1,302 @@
+"""
+تجمیع‌کننده درون‌پردازه‌ای متریک‌های عملکرد و فعالیت‌های کاربران
+"""
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from app_standards.batch_writer import BackgroundBatchWriter, ProcessWriter
+
+from .alerting import get_alert_evaluator
+from .models import LatencySketch, Metric, PerformanceMetric, UserActivity
+from .rollups import performance_name
+from .settings import ANALYTICS_SETTINGS
+from .sketches import DDSketch
+
+logger = logging.getLogger(__name__)
+
+
+def interval_metric_name(name: str, method: str, endpoint: str) -> str:
+    """
+    نام متریک بازه‌ای یک endpoint، مثلاً «api.response_time_ms GET /api/users/»
+
+    قوانین هشدار و تجمیع‌ها متریک‌ها را با نام از هم جدا می‌کنند، پس هر endpoint نام خود را دارد.
+    """
+    return f"{name} {performance_name(method, endpoint)}"[:255]
+
+
+class EndpointStats:
+    """شمارنده‌ها و خلاصه صدک زمان پاسخ یک endpoint در یک بازه"""
+
+    __slots__ = ('count', 'errors', 'total_ms', 'sketch')
+
+    def __init__(self, relative_accuracy: float):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0
+        self.sketch = DDSketch(relative_accuracy)
+
+    def add(self, response_time_ms: int, is_error: bool):
+        self.count += 1
+        self.errors += is_error
+        self.total_ms += response_time_ms
+        self.sketch.add(response_time_ms)
+
+
+class MetricsAggregator(BackgroundBatchWriter):
+    """
+    تجمیع متریک‌ها در حافظه هر worker و ذخیره دسته‌ای در دیتابیس
+
+    مسیر درخواست فقط شمارنده‌ها را به‌روزرسانی و رکورد خام را به بافر اضافه
+    می‌کند؛ یک thread پس‌زمینه رکوردها را با bulk_create ذخیره می‌کند. شمارنده‌ها
+    و هیستوگرام زمان پاسخ هر endpoint در بازه‌های interval_seconds تجمیع و پس از
+    بسته شدن بازه به صورت متریک‌های api.* ذخیره می‌شوند؛ خلاصه DDSketch هر بازه
+    نیز در LatencySketch ذخیره می‌شود تا صدک هر بازه زمانی با ادغام خلاصه‌ها محاسبه شود.
+    همین thread قوانین هشدار را هر EVALUATION_INTERVAL ثانیه با ارزیاب درون‌حافظه‌ای بررسی می‌کند.
+    """
+
+    thread_name = 'analytics-aggregator'
+    drop_message = 'Analytics aggregator dropped entries'
+
+    def __init__(self, capacity: int = 10000, batch_size: int = 500, flush_interval: float = 2.0,
+                 interval_seconds: int = 60, record_raw_metrics: bool = True,
+                 sketch_relative_accuracy: float = 0.01):
+        """
+        Args:
+            capacity: حداکثر رکوردهای خام در انتظار ذخیره (به ازای هر نوع)
+            batch_size: اندازه هر دسته bulk_create
+            flush_interval: فاصله ذخیره دوره‌ای (ثانیه)
+            interval_seconds: طول بازه تجمیع شمارنده‌ها
+            record_raw_metrics: ذخیره رکورد PerformanceMetric برای هر درخواست
+            sketch_relative_accuracy: خطای نسبی صدک‌های خلاصه زمان پاسخ
+        """
+        self.interval_seconds = interval_seconds
+        self.record_raw_metrics = record_raw_metrics
+        self.sketch_relative_accuracy = sketch_relative_accuracy
+        super().__init__(capacity, batch_size, flush_interval)
+
+    def _reset(self):
+        super()._reset()
+        self._performance: deque = deque()
+        self._activities: deque = deque()
+        self._intervals: Dict[Tuple[int, str, str], EndpointStats] = {}
+
+    def record_request(self, endpoint: str, method: str, status_code: int, response_time_ms: int,
+                       user_id: Optional[int] = None, error_message: str = '',
+                       metadata: Optional[Dict[str, Any]] = None):
+        """ثبت یک درخواست API (بدون دسترسی به دیتابیس)"""
+        # ساخت نمونه مدل به thread پس‌زمینه موکول می‌شود تا مسیر درخواست سبک بماند
+        if self.record_raw_metrics:
+            entry = (endpoint, method, response_time_ms, status_code, user_id, error_message,
+                     metadata, time.time())
+            with self._lock:
+                pending = self._append(self._performance, entry)
+            self._submitted(pending)
+
+        self.observe(endpoint, method, status_code, response_time_ms)
+
+    def observe(self, endpoint: str, method: str, status_code: int, response_time_ms: int):
+        """
+        به‌روزرسانی شمارنده‌ها و خلاصه صدک بازه جاری بدون ثبت رکورد خام
+
+        برای مسیرهایی که رکورد PerformanceMetric را خودشان ذخیره می‌کنند.
+        """
+        interval_start = int(time.time()) // self.interval_seconds * self.interval_seconds
+        key = (interval_start, endpoint, method)
+        with self._lock:
+            stats = self._intervals.get(key)
+            if stats is None:
+                stats = self._intervals[key] = EndpointStats(self.sketch_relative_accuracy)
+            stats.add(response_time_ms, status_code >= 400)
+
+        self._ensure_worker()
+
+    def record_activity(self, user_id: int, action: str, resource: str = '',
+                        resource_id: Optional[int] = None, ip_address: Optional[str] = None,
+                        user_agent: str = '', session_id: str = '',
+                        metadata: Optional[Dict[str, Any]] = None):
+        """ثبت فعالیت کاربر (بدون دسترسی به دیتابیس)"""
+        entry = (user_id, action, resource, resource_id, ip_address, user_agent, session_id,
+                 metadata, time.time())
+        with self._lock:
+            pending = self._append(self._activities, entry)
+        self._submitted(pending)
+
+    def flush(self, force: bool = False) -> int:
+        """
+        ذخیره رکوردهای در انتظار و بازه‌های بسته‌شده
+
+        Args:
+            force: ذخیره بازه جاری نیز (هنگام خروج پردازه)
+
+        Returns:
+            int: تعداد رکوردهای ذخیره‌شده
+        """
+        with self._flush_lock:
+            with self._lock:
+                performance, self._performance = list(self._performance), deque()
+                activities, self._activities = list(self._activities), deque()
+                intervals = self._take_closed_intervals(force)
+
+            written = self._save(PerformanceMetric, [self._performance_metric(*entry) for entry in performance])
+            written += self._save(UserActivity, [self._user_activity(*entry) for entry in activities])
+            interval_metrics = self._interval_metrics(intervals)
+            written += self._save(Metric, interval_metrics)
+            written += self._save(LatencySketch, self._interval_sketches(intervals))
+            self._written += written
+
+        return written
+
+    def close(self):
+        """ذخیره بازه جاری نیز هنگام خروج عادی پردازه"""
+        self.flush(force=True)
+        self._report_drops()
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار تجمیع‌کننده"""
+        with self._lock:
+            return {
+                **super().stats(),
+                'pending_performance_metrics': len(self._performance),
+                'pending_activities': len(self._activities),
+                'open_intervals': len(self._intervals),
+            }
+
+    @staticmethod
+    def _performance_metric(endpoint, method, response_time_ms, status_code, user_id,
+                            error_message, metadata, recorded_at) -> PerformanceMetric:
+        return PerformanceMetric(
+            endpoint=endpoint[:255],
+            method=method,
+            response_time_ms=response_time_ms,
+            status_code=status_code,
+            user_id=user_id,
+            error_message=error_message,
+            metadata=metadata or {},
+            timestamp=datetime.fromtimestamp(recorded_at, tz=dt_timezone.utc),
+        )
+
+    @staticmethod
+    def _user_activity(user_id, action, resource, resource_id, ip_address, user_agent,
+                       session_id, metadata, recorded_at) -> UserActivity:
+        return UserActivity(
+            user_id=user_id,
+            action=action,
+            resource=resource,
+            resource_id=resource_id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            session_id=session_id,
+            metadata=metadata or {},
+            timestamp=datetime.fromtimestamp(recorded_at, tz=dt_timezone.utc),
+        )
+
+    def _take_closed_intervals(self, force: bool) -> Dict[Tuple[int, str, str], EndpointStats]:
+        current = int(time.time()) // self.interval_seconds * self.interval_seconds
+        closed = {key: stats for key, stats in self._intervals.items() if force or key[0] < current}
+        for key in closed:
+            del self._intervals[key]
+        return closed
+
+    def _interval_metrics(self, intervals: Dict[Tuple[int, str, str], EndpointStats]) -> List[Metric]:
+        """تبدیل شمارنده‌های هر بازه به متریک‌های api.requests، api.errors و api.response_time_ms هر endpoint"""
+        metrics = []
+        for (interval_start, endpoint, method), stats in intervals.items():
+            timestamp = datetime.fromtimestamp(interval_start, tz=dt_timezone.utc)
+            tags = {
+                'endpoint': endpoint,
+                'method': method,
+                'interval_seconds': self.interval_seconds,
+            }
+            metrics.append(Metric(
+                name=interval_metric_name('api.requests', method, endpoint),
+                metric_type='counter', value=stats.count,
+                tags=tags, timestamp=timestamp,
+            ))
+            if stats.errors:
+                metrics.append(Metric(
+                    name=interval_metric_name('api.errors', method, endpoint),
+                    metric_type='counter', value=stats.errors,
+                    tags=tags, timestamp=timestamp,
+                ))
+            metrics.append(Metric(
+                name=interval_metric_name('api.response_time_ms', method, endpoint),
+                metric_type='histogram',
+                value=round(stats.total_ms / stats.count, 2),
+                tags={
+                    **tags,
+                    'count': stats.count,
+                    'sum': stats.total_ms,
+                    'max': stats.sketch.max,
+                    'p50': round(stats.sketch.quantile(0.5), 2),
+                    'p95': round(stats.sketch.quantile(0.95), 2),
+                    'p99': round(stats.sketch.quantile(0.99), 2),
+                },
+                timestamp=timestamp,
+            ))
+        return metrics
+
+    def _interval_sketches(self, intervals: Dict[Tuple[int, str, str], EndpointStats]) -> List[LatencySketch]:
+        """خلاصه صدک هر endpoint در هر بازه بسته‌شده"""
+        return [
+            LatencySketch(
+                endpoint=endpoint[:255],
+                method=method,
+                bucket_start=datetime.fromtimestamp(interval_start, tz=dt_timezone.utc),
+                bucket_seconds=self.interval_seconds,
+                count=stats.count,
+                error_count=stats.errors,
+                sketch=stats.sketch.to_dict(),
+            )
+            for (interval_start, endpoint, method), stats in intervals.items()
+        ]
+
+    def _save(self, model, entries: list) -> int:
+        if not entries:
+            return 0
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(entries, batch_size=self.batch_size)
+            return len(entries)
+        except Exception as e:
+            logger.error(f"خطا در ذخیره دسته‌ای {model.__name__}: {str(e)}")
+
+        # جداسازی رکوردهای نامعتبر (مثلاً کاربر حذف‌شده)؛ رکوردهای خراب کنار گذاشته می‌شوند
+        saved = 0
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([entry])
+                saved += 1
+            except Exception:
+                self._count_dropped(1)
+        return saved
+
+    def _tick(self):
+        super()._tick()
+        if ANALYTICS_SETTINGS['ALERTS']['ENABLED']:
+            get_alert_evaluator().evaluate_if_due()
+
+
+def _create_aggregator() -> MetricsAggregator:
+    config = ANALYTICS_SETTINGS['AGGREGATOR']
+    return MetricsAggregator(
+        capacity=config['CAPACITY'],
+        batch_size=config['BATCH_SIZE'],
+        flush_interval=config['FLUSH_INTERVAL'],
+        interval_seconds=config['INTERVAL_SECONDS'],
+        record_raw_metrics=config['RECORD_RAW_METRICS'],
+        sketch_relative_accuracy=config['SKETCH_RELATIVE_ACCURACY'],
+    )
+
+
+_aggregator = ProcessWriter(_create_aggregator)
+
+
+def get_metrics_aggregator() -> MetricsAggregator:
+    """تجمیع‌کننده مشترک این پردازه"""
+    return _aggregator.get()
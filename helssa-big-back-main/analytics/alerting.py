@@ -0,0 +1,202 @@
+"""
+ارزیاب قوانین هشدار روی وضعیت مشترک متریک‌ها
+"""
+import logging
+import operator
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Alert, AlertRule
+from .rollups import RollupQuery
+from .settings import ANALYTICS_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'eq': operator.eq,
+    'ne': operator.ne,
+}
+
+
+class RuleState:
+    """قانون هشدار آماده مقایسه"""
+
+    __slots__ = ('rule', 'compare')
+
+    def __init__(self, rule: AlertRule):
+        self.rule = rule
+        self.compare = OPERATORS[rule.operator]
+
+
+class AlertEvaluator:
+    """
+    ارزیابی قوانین هشدار از وضعیت مشترک همه پردازه‌ها
+
+    آخرین مقدار متریک‌های دارای قانون در پنجره window_seconds با یک پرس‌وجو از
+    تجمیع‌ها (و داده خام دقایق اخیر) و هشدارهای در حال اجرا با یک پرس‌وجو از
+    دیتابیس خوانده می‌شوند، بنابراین همه پردازه‌ها یک وضعیت را می‌بینند و هشدار
+    بین آن‌ها نوسان نمی‌کند. همه قوانین یک متریک در یک گذر مقایسه و فقط تغییر
+    وضعیت‌ها ثبت می‌شوند؛ هر بار حداکثر یک پردازه ارزیابی دوره‌ای را انجام می‌دهد.
+    """
+
+    LOCK_KEY = 'analytics:alerts:evaluation'
+
+    def __init__(self, window_seconds: int = 300, evaluation_interval: float = 5.0,
+                 rules_refresh_seconds: float = 30.0):
+        """
+        Args:
+            window_seconds: طول پنجره لغزان؛ مقدار قدیمی‌تر از آن نادیده گرفته می‌شود
+            evaluation_interval: فاصله ارزیابی‌های دوره‌ای (ثانیه)
+            rules_refresh_seconds: فاصله بارگذاری دوباره قوانین از دیتابیس
+        """
+        self.window_seconds = window_seconds
+        self.evaluation_interval = evaluation_interval
+        self.rules_refresh_seconds = rules_refresh_seconds
+        self._reset()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._rules: Dict[str, List[RuleState]] = {}
+        self._rules_loaded_at: Optional[float] = None
+        self._last_evaluation = 0.0
+
+    def load_rules(self):
+        """بارگذاری قوانین فعال (یک پرس‌وجو برای همه قوانین)"""
+        rules: Dict[str, List[RuleState]] = {}
+        for rule in AlertRule.objects.filter(is_active=True):
+            if rule.operator not in OPERATORS:
+                logger.error(f"عملگر نامعتبر در قانون هشدار {rule.name}: {rule.operator}")
+                continue
+            rules.setdefault(rule.metric_name, []).append(RuleState(rule))
+
+        with self._lock:
+            self._rules = rules
+            self._rules_loaded_at = time.monotonic()
+
+    def latest_values(self, names: List[str], now: datetime) -> Dict[str, Tuple[datetime, float]]:
+        """آخرین مقدار هر متریک در پنجره از داده مشترک (تجمیع‌ها و داده خام اخیر)"""
+        summaries = RollupQuery().summarize_by_name(
+            'metric', now - timedelta(seconds=self.window_seconds), now, names=names
+        )
+        return {
+            name: (summary.last_timestamp, summary.last_value)
+            for name, summary in summaries.items()
+            if summary.last_timestamp is not None
+        }
+
+    def evaluate(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        ارزیابی همه قوانین و ثبت تغییر وضعیت‌ها
+
+        Returns:
+            لیست هشدارهای تولید شده در این ارزیابی
+        """
+        if self._rules_loaded_at is None or \
+                time.monotonic() - self._rules_loaded_at >= self.rules_refresh_seconds:
+            self.load_rules()
+
+        with self._lock:
+            self._last_evaluation = time.monotonic()
+            rules = self._rules
+        if not rules:
+            return []
+
+        now = now or timezone.now()
+        samples = self.latest_values(list(rules), now)
+        firing = set(Alert.objects.filter(status='firing').values_list('rule_id', flat=True))
+
+        triggered_alerts = []
+        for metric_name, sample in samples.items():
+            timestamp, value = sample
+            for state in rules.get(metric_name, ()):
+                try:
+                    should_fire = state.compare(value, state.rule.threshold)
+                    if should_fire and state.rule.id not in firing:
+                        alert = self._fire(state, value, timestamp)
+                        if alert is not None:
+                            triggered_alerts.append(alert)
+                    elif not should_fire and state.rule.id in firing:
+                        self._resolve(state, now)
+                except Exception as e:
+                    logger.error(f"خطا در بررسی قانون هشدار {state.rule.name}: {str(e)}")
+
+        return triggered_alerts
+
+    def evaluate_if_due(self) -> List[Dict[str, Any]]:
+        """
+        ارزیابی در صورت گذشتن evaluation_interval از ارزیابی قبلی
+
+        قفل کش مشترک تضمین می‌کند در هر بازه فقط یک پردازه ارزیابی کند.
+        """
+        if time.monotonic() - self._last_evaluation < self.evaluation_interval:
+            return []
+        self._last_evaluation = time.monotonic()
+        if not cache.add(self.LOCK_KEY, os.getpid(), timeout=max(1, int(self.evaluation_interval))):
+            return []
+        return self.evaluate()
+
+    def _fire(self, state: RuleState, value: float, timestamp: datetime) -> Optional[Dict[str, Any]]:
+        rule = state.rule
+        # قید یکتایی هشدار در حال اجرای هر قانون ثبت هم‌زمان توسط پردازه دیگر را رد می‌کند
+        alert, created = Alert.objects.get_or_create(
+            rule=rule,
+            status='firing',
+            defaults={
+                'metric_value': value,
+                'message': f"{rule.name}: {rule.metric_name} برابر {value} است (آستانه: {rule.threshold})",
+                'metadata': {
+                    'metric_timestamp': timestamp.isoformat()
+                },
+            }
+        )
+        if not created:
+            return None
+        return {
+            'alert_id': alert.id,
+            'rule_name': rule.name,
+            'severity': rule.severity,
+            'message': alert.message,
+            'metric_value': value,
+            'threshold': rule.threshold
+        }
+
+    def _resolve(self, state: RuleState, now: datetime):
+        Alert.objects.filter(
+            rule=state.rule,
+            status='firing'
+        ).update(
+            status='resolved',
+            resolved_at=now
+        )
+
+
+_evaluator: Optional[AlertEvaluator] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_alert_evaluator() -> AlertEvaluator:
+    """ارزیاب مشترک قوانین هشدار در این پردازه"""
+    global _evaluator
+    if _evaluator is None:
+        with _evaluator_lock:
+            if _evaluator is None:
+                config = ANALYTICS_SETTINGS['ALERTS']
+                _evaluator = AlertEvaluator(
+                    window_seconds=config['WINDOW_SECONDS'],
+                    evaluation_interval=config['EVALUATION_INTERVAL'],
+                    rules_refresh_seconds=config['RULES_REFRESH_SECONDS'],
+                )
+    return _evaluator
@@ -4,7 +4,6 @@ Middleware برای ردیابی عملکرد درخواست‌های API
 import time
 import logging
 from django.utils.deprecation import MiddlewareMixin
-from django.urls import resolve
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
@@ -40,24 +39,17 @@ class PerformanceTrackingMiddleware(MiddlewareMixin):
         else:
             response_time_ms = 0
         
-        # ثبت متریک عملکرد به صورت async
+        # ثبت متریک در تجمیع‌کننده درون‌پردازه‌ای (بدون ارسال به broker)
         try:
-            from ..tasks import record_performance_metric_async
+            from ..aggregator import get_metrics_aggregator
             
-            # دریافت اطلاعات endpoint
-            try:
-                url_name = resolve(request.path_info).url_name or 'unknown'
-                endpoint = f"{resolve(request.path_info).namespace}:{url_name}" if resolve(request.path_info).namespace else url_name
-            except:
-                endpoint = request.path_info
-            
-            # ثبت متریک به صورت async
-            record_performance_metric_async.delay(
-                endpoint=endpoint,
+            user = getattr(request, 'user', None)
+            get_metrics_aggregator().record_request(
+                endpoint=self._get_endpoint(request),
                 method=request.method,
-                response_time_ms=response_time_ms,
                 status_code=response.status_code,
-                user_id=request.user.id if request.user.is_authenticated else None,
+                response_time_ms=response_time_ms,
+                user_id=user.id if user is not None and user.is_authenticated else None,
                 error_message=getattr(response, 'reason_phrase', '') if response.status_code >= 400 else '',
                 metadata={
                     'path': request.path_info,
@@ -71,4 +63,15 @@ class PerformanceTrackingMiddleware(MiddlewareMixin):
             # در صورت خطا در ثبت متریک، لاگ کنیم اما response را متوقف نکنیم
             logger.error(f"خطا در ثبت متریک عملکرد: {str(e)}")
         
-        return response
\ No newline at end of file
+        return response
+    
+    def _get_endpoint(self, request):
+        """
+        نام endpoint از نتیجه مسیریابی همین درخواست (بدون resolve مجدد)
+        """
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return request.path_info
+        
+        url_name = resolver_match.url_name or 'unknown'
+        return f"{resolver_match.namespace}:{url_name}" if resolver_match.namespace else url_name
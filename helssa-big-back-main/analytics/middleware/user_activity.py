@@ -4,7 +4,6 @@ Middleware برای ردیابی فعالیت‌های کاربران
 import logging
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
-from django.urls import resolve
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +38,7 @@ class UserActivityTrackingMiddleware(MiddlewareMixin):
             return response
         
         try:
-            from ..tasks import record_user_activity_async
+            from ..aggregator import get_metrics_aggregator
             
             # تعیین نوع عمل بر اساس متد HTTP
             action_map = {
@@ -51,11 +50,11 @@ class UserActivityTrackingMiddleware(MiddlewareMixin):
             }
             action = action_map.get(request.method, 'unknown')
             
-            # دریافت اطلاعات resource
-            try:
-                resolved = resolve(request.path_info)
+            # دریافت اطلاعات resource از نتیجه مسیریابی همین درخواست
+            resolved = getattr(request, 'resolver_match', None)
+            if resolved is not None:
                 resource = resolved.namespace or resolved.url_name or 'unknown'
-            except:
+            else:
                 resource = request.path_info.split('/')[1] if len(request.path_info.split('/')) > 1 else 'unknown'
             
             # استخراج resource_id از path (در صورت وجود)
@@ -70,15 +69,16 @@ class UserActivityTrackingMiddleware(MiddlewareMixin):
             except:
                 pass
             
-            # ثبت فعالیت به صورت async
-            record_user_activity_async.delay(
+            # ثبت فعالیت در تجمیع‌کننده درون‌پردازه‌ای (ذخیره دسته‌ای)
+            session = getattr(request, 'session', None)
+            get_metrics_aggregator().record_activity(
                 user_id=request.user.id,
                 action=action,
                 resource=resource,
                 resource_id=resource_id,
                 ip_address=self._get_client_ip(request),
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                session_id=request.session.session_key or '',
+                session_id=(session.session_key if session is not None else '') or '',
                 metadata={
                     'path': request.path_info,
                     'method': request.method,
@@ -181,6 +181,190 @@ class PerformanceMetric(models.Model):
         return f"{self.method} {self.endpoint}: {self.response_time_ms}ms ({self.status_code})"
 
 
+class LatencySketch(models.Model):
+    """
+    خلاصه قابل ادغام زمان پاسخ یک endpoint در یک بازه زمانی
+
+    هنگام ثبت متریک‌ها به‌روزرسانی می‌شود؛ صدک‌های هر بازه دلخواه از ادغام
+    خلاصه‌های بازه‌ها به دست می‌آید و نیازی به خواندن رکوردهای خام نیست.
+    """
+    endpoint = models.CharField(
+        max_length=255,
+        verbose_name='نقطه انتهایی'
+    )
+    method = models.CharField(
+        max_length=10,
+        verbose_name='متد HTTP'
+    )
+    bucket_start = models.DateTimeField(
+        verbose_name='شروع بازه'
+    )
+    bucket_seconds = models.PositiveIntegerField(
+        verbose_name='طول بازه (ثانیه)'
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد درخواست'
+    )
+    error_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد خطا'
+    )
+    sketch = models.JSONField(
+        verbose_name='خلاصه DDSketch'
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='زمان ایجاد'
+    )
+    
+    class Meta:
+        verbose_name = 'خلاصه زمان پاسخ'
+        verbose_name_plural = 'خلاصه‌های زمان پاسخ'
+        ordering = ['-bucket_start']
+        indexes = [
+            models.Index(fields=['bucket_start']),
+            models.Index(fields=['endpoint', 'bucket_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.method} {self.endpoint}: {self.count} ({self.bucket_start})"
+
+
+class MetricRollup(models.Model):
+    """
+    تجمیع زمانی (rollup) داده‌های خام در سطل‌های دقیقه‌ای، ساعتی و روزانه
+
+    سطل‌های دقیقه‌ای از جداول خام، ساعتی از دقیقه‌ای و روزانه از ساعتی ساخته
+    می‌شوند؛ پرس‌وجوهای داشبورد و قوانین هشدار از درشت‌ترین سطل معتبر پاسخ داده می‌شوند.
+    """
+    SOURCE_CHOICES = [
+        ('performance', 'عملکرد API'),
+        ('activity', 'فعالیت کاربر'),
+        ('metric', 'متریک'),
+    ]
+
+    GRANULARITY_CHOICES = [
+        ('minute', 'دقیقه‌ای'),
+        ('hour', 'ساعتی'),
+        ('day', 'روزانه'),
+    ]
+
+    source = models.CharField(
+        max_length=20,
+        choices=SOURCE_CHOICES,
+        verbose_name='منبع'
+    )
+    name = models.CharField(
+        max_length=255,
+        verbose_name='نام',
+        help_text='برای عملکرد «METHOD endpoint»، برای فعالیت نام عمل و برای متریک نام متریک'
+    )
+    granularity = models.CharField(
+        max_length=10,
+        choices=GRANULARITY_CHOICES,
+        verbose_name='دانه‌بندی'
+    )
+    bucket_start = models.DateTimeField(
+        verbose_name='شروع سطل'
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد'
+    )
+    error_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد خطا'
+    )
+    sum = models.FloatField(
+        default=0,
+        verbose_name='مجموع مقادیر'
+    )
+    min_value = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='کمینه'
+    )
+    max_value = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='بیشینه'
+    )
+    last_value = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='آخرین مقدار'
+    )
+    last_timestamp = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='زمان آخرین مقدار'
+    )
+    sketch = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='خلاصه DDSketch'
+    )
+    user_sketch = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='خلاصه HyperLogLog کاربران یکتا'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='زمان به‌روزرسانی'
+    )
+
+    class Meta:
+        verbose_name = 'تجمیع زمانی'
+        verbose_name_plural = 'تجمیع‌های زمانی'
+        ordering = ['-bucket_start']
+        unique_together = ['source', 'name', 'granularity', 'bucket_start']
+        indexes = [
+            models.Index(fields=['source', 'granularity', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.source}/{self.granularity} {self.name}: {self.count} ({self.bucket_start})"
+
+
+class RollupCheckpoint(models.Model):
+    """
+    بازه معتبر تجمیع‌های هر منبع و دانه‌بندی
+
+    سطل‌های [built_from, built_until) کامل ساخته شده‌اند و پرس‌وجوها فقط در این
+    بازه از تجمیع‌ها استفاده می‌کنند؛ بیرون از آن به سطح ریزتر یا داده خام می‌روند.
+    """
+    source = models.CharField(
+        max_length=20,
+        choices=MetricRollup.SOURCE_CHOICES,
+        verbose_name='منبع'
+    )
+    granularity = models.CharField(
+        max_length=10,
+        choices=MetricRollup.GRANULARITY_CHOICES,
+        verbose_name='دانه‌بندی'
+    )
+    built_from = models.DateTimeField(
+        verbose_name='ابتدای بازه ساخته‌شده'
+    )
+    built_until = models.DateTimeField(
+        verbose_name='انتهای بازه ساخته‌شده'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='زمان به‌روزرسانی'
+    )
+
+    class Meta:
+        verbose_name = 'وضعیت تجمیع'
+        verbose_name_plural = 'وضعیت‌های تجمیع'
+        unique_together = ['source', 'granularity']
+
+    def __str__(self):
+        return f"{self.source}/{self.granularity}: {self.built_from} - {self.built_until}"
+
+
 class BusinessMetric(models.Model):
     """
     مدل برای متریک‌های کسب و کار
@@ -343,6 +527,14 @@ class Alert(models.Model):
             models.Index(fields=['rule', 'status']),
             models.Index(fields=['status', 'fired_at']),
         ]
+        constraints = [
+            # حداکثر یک هشدار در حال اجرا برای هر قانون (ثبت هم‌زمان از چند پردازه)
+            models.UniqueConstraint(
+                fields=['rule'],
+                condition=models.Q(status='firing'),
+                name='unique_firing_alert_per_rule'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.rule.name}: {self.status} ({self.fired_at})"
\ No newline at end of file
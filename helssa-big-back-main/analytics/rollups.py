@@ -0,0 +1,497 @@
+"""
+تجمیع‌های زمانی (rollup) متریک‌ها و لایه پرس‌وجو روی آن‌ها
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+
+from .models import LatencySketch, Metric, MetricRollup, PerformanceMetric, RollupCheckpoint, UserActivity
+from .settings import ANALYTICS_SETTINGS
+from .sketches import DDSketch, HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('performance', 'activity', 'metric')
+
+# دانه‌بندی‌ها از ریز به درشت؛ هر سطح از سطح قبلی ساخته می‌شود
+GRANULARITY_SECONDS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+GRANULARITIES = tuple(GRANULARITY_SECONDS)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+Key = Tuple[str, datetime]
+
+
+def floor_time(value: datetime, seconds: int) -> datetime:
+    """گرد کردن زمان به ابتدای سطل seconds ثانیه‌ای (UTC)"""
+    offset = int((value - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def ceil_time(value: datetime, seconds: int) -> datetime:
+    """گرد کردن زمان به ابتدای سطل بعدی در صورت نبودن روی مرز سطل"""
+    floored = floor_time(value, seconds)
+    return floored if floored == value else floored + timedelta(seconds=seconds)
+
+
+def performance_name(method: str, endpoint: str) -> str:
+    return f"{method} {endpoint}"
+
+
+class RollupSummary:
+    """
+    خلاصه قابل ادغام یک سطل یا بازه زمانی
+
+    شمارنده‌ها جمع می‌شوند، کمینه/بیشینه و آخرین مقدار مقایسه می‌شوند، خلاصه‌های
+    DDSketch (صدک‌ها) و HyperLogLog (کاربران یکتا) با حجم ثابت ادغام می‌شوند.
+    """
+
+    __slots__ = ('count', 'error_count', 'sum', 'min_value', 'max_value',
+                 'last_value', 'last_timestamp', 'sketch', 'users')
+
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.sum = 0.0
+        self.min_value: Optional[float] = None
+        self.max_value: Optional[float] = None
+        self.last_value: Optional[float] = None
+        self.last_timestamp: Optional[datetime] = None
+        self.sketch: Optional[DDSketch] = None
+        self.users: Optional[HyperLogLog] = None
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def unique_users(self) -> int:
+        """تعداد تخمینی کاربران یکتا"""
+        return self.users.count() if self.users is not None else 0
+
+    def add_user(self, user_id):
+        if user_id is None:
+            return
+        if self.users is None:
+            self.users = HyperLogLog()
+        self.users.add(user_id)
+
+    def add_users(self, users: Optional[HyperLogLog]):
+        if users is None:
+            return
+        if self.users is None:
+            self.users = HyperLogLog(users.precision)
+        self.users.merge(users)
+
+    def add(self, count: int = 0, error_count: int = 0, total: float = 0.0,
+            min_value: Optional[float] = None, max_value: Optional[float] = None):
+        self.count += count
+        self.error_count += error_count
+        self.sum += total or 0.0
+        if min_value is not None and (self.min_value is None or min_value < self.min_value):
+            self.min_value = min_value
+        if max_value is not None and (self.max_value is None or max_value > self.max_value):
+            self.max_value = max_value
+
+    def add_last(self, value: Optional[float], timestamp: Optional[datetime]):
+        if timestamp is not None and (self.last_timestamp is None or timestamp >= self.last_timestamp):
+            self.last_value = value
+            self.last_timestamp = timestamp
+
+    def add_sketch(self, data: Optional[dict]):
+        if not data:
+            return
+        sketch = DDSketch.from_dict(data)
+        if self.sketch is None:
+            self.sketch = sketch
+        else:
+            self.sketch.merge(sketch)
+
+    def add_rollup(self, row: MetricRollup):
+        self.add(row.count, row.error_count, row.sum, row.min_value, row.max_value)
+        self.add_last(row.last_value, row.last_timestamp)
+        self.add_sketch(row.sketch)
+        if row.user_sketch:
+            self.add_users(HyperLogLog.from_dict(row.user_sketch))
+
+    def merge(self, other: 'RollupSummary'):
+        self.add(other.count, other.error_count, other.sum, other.min_value, other.max_value)
+        self.add_last(other.last_value, other.last_timestamp)
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = DDSketch.from_dict(other.sketch.to_dict())
+            else:
+                self.sketch.merge(other.sketch)
+        self.add_users(other.users)
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q) if self.sketch is not None else 0.0
+
+    def to_rollup(self, source: str, name: str, granularity: str, bucket_start: datetime) -> MetricRollup:
+        return MetricRollup(
+            source=source,
+            name=name,
+            granularity=granularity,
+            bucket_start=bucket_start,
+            count=self.count,
+            error_count=self.error_count,
+            sum=self.sum,
+            min_value=self.min_value,
+            max_value=self.max_value,
+            last_value=self.last_value,
+            last_timestamp=self.last_timestamp,
+            sketch=self.sketch.to_dict() if self.sketch is not None else None,
+            user_sketch=self.users.to_dict() if self.users is not None else None,
+        )
+
+
+# --- خواندن داده خام به تفکیک (نام، دقیقه) ---
+
+def _read_performance(start: datetime, end: datetime, names: Optional[Iterable[str]] = None,
+                      endpoint: Optional[str] = None) -> Dict[Key, RollupSummary]:
+    """
+    شمارنده‌ها از PerformanceMetric و صدک‌ها از LatencySketch خوانده می‌شوند؛ اگر
+    رکورد خام یک سطل ذخیره نشده باشد (RECORD_RAW_METRICS غیرفعال) شمارنده‌ها از خود خلاصه‌ها می‌آیند.
+    """
+    raw = PerformanceMetric.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    sketches = LatencySketch.objects.filter(bucket_start__gte=start, bucket_start__lt=end)
+    if endpoint:
+        raw = raw.filter(endpoint=endpoint)
+        sketches = sketches.filter(endpoint=endpoint)
+    if names is not None:
+        pairs = Q(pk__in=[])
+        for name in names:
+            method, _, name_endpoint = name.partition(' ')
+            pairs |= Q(method=method, endpoint=name_endpoint)
+        raw = raw.filter(pairs)
+        sketches = sketches.filter(pairs)
+
+    summaries: Dict[Key, RollupSummary] = defaultdict(RollupSummary)
+    for endpoint_name, method, bucket_start, count, error_count, sketch in sketches.values_list(
+            'endpoint', 'method', 'bucket_start', 'count', 'error_count', 'sketch').iterator():
+        summary = summaries[(performance_name(method, endpoint_name), floor_time(bucket_start, 60))]
+        summary.add_sketch(sketch)
+        summary.add(count, error_count, sketch.get('sum', 0.0), sketch.get('min'), sketch.get('max'))
+
+    bucket = TruncMinute('timestamp', tzinfo=dt_timezone.utc)
+    rows = raw.annotate(bucket=bucket).values('bucket', 'endpoint', 'method').annotate(
+        total_count=Count('id'),
+        errors=Count('id', filter=Q(status_code__gte=400)),
+        total=Sum('response_time_ms'),
+        low=Min('response_time_ms'),
+        high=Max('response_time_ms'),
+    )
+    for row in rows:
+        # رکوردهای خام منبع شمارنده‌ها هستند؛ خلاصه‌ها فقط صدک را فراهم می‌کنند
+        summary = summaries[(performance_name(row['method'], row['endpoint']), row['bucket'])]
+        summary.count = row['total_count']
+        summary.error_count = row['errors']
+        summary.sum = float(row['total'] or 0)
+        summary.min_value = row['low']
+        summary.max_value = row['high']
+
+    return summaries
+
+
+def _read_activity(start: datetime, end: datetime, names: Optional[Iterable[str]] = None,
+                   endpoint: Optional[str] = None) -> Dict[Key, RollupSummary]:
+    activities = UserActivity.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if names is not None:
+        activities = activities.filter(action__in=list(names))
+
+    summaries: Dict[Key, RollupSummary] = defaultdict(RollupSummary)
+    bucket = TruncMinute('timestamp', tzinfo=dt_timezone.utc)
+    rows = activities.annotate(bucket=bucket).values_list('bucket', 'action', 'user_id')
+    for bucket_start, action, user_id in rows.iterator():
+        summary = summaries[(action, bucket_start)]
+        summary.count += 1
+        summary.add_user(user_id)
+    return summaries
+
+
+def _read_metric(start: datetime, end: datetime, names: Optional[Iterable[str]] = None,
+                 endpoint: Optional[str] = None) -> Dict[Key, RollupSummary]:
+    metrics = Metric.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if names is not None:
+        metrics = metrics.filter(name__in=list(names))
+
+    summaries: Dict[Key, RollupSummary] = defaultdict(RollupSummary)
+    for name, value, timestamp in metrics.values_list('name', 'value', 'timestamp').iterator():
+        summary = summaries[(name, floor_time(timestamp, 60))]
+        summary.add(1, 0, value, value, value)
+        summary.add_last(value, timestamp)
+    return summaries
+
+
+RAW_READERS = {
+    'performance': _read_performance,
+    'activity': _read_activity,
+    'metric': _read_metric,
+}
+
+
+class RollupBuilder:
+    """
+    ساخت افزایشی تجمیع‌ها از آخرین نقطه ساخته‌شده (RollupCheckpoint)
+
+    هر بار فقط سطل‌های بسته‌شده بعد از built_until ساخته می‌شوند؛ ساخت هر بازه
+    idempotent است (سطل‌های آن بازه حذف و دوباره درج می‌شوند). lag_seconds فرصت
+    ذخیره شدن داده‌های بافرشده تجمیع‌کننده را پیش از بستن سطل‌ها می‌دهد.
+    """
+
+    def __init__(self, now: Optional[datetime] = None, lag_seconds: Optional[int] = None,
+                 max_backfill_days: Optional[int] = None):
+        config = ANALYTICS_SETTINGS['ROLLUPS']
+        self.now = now or timezone.now()
+        self.lag_seconds = config['LAG_SECONDS'] if lag_seconds is None else lag_seconds
+        self.max_backfill_days = config['MAX_BACKFILL_DAYS'] if max_backfill_days is None else max_backfill_days
+
+    def update(self, granularities: Iterable[str] = GRANULARITIES) -> Dict[str, int]:
+        """
+        به‌روزرسانی تجمیع‌های همه منابع در دانه‌بندی‌های داده‌شده
+
+        Returns:
+            تعداد سطل‌های نوشته‌شده به تفکیک «منبع/دانه‌بندی»
+        """
+        written = {}
+        for source in SOURCES:
+            for granularity in GRANULARITIES:
+                if granularity in granularities:
+                    written[f'{source}/{granularity}'] = self.build(source, granularity)
+        return written
+
+    def build(self, source: str, granularity: str) -> int:
+        size = GRANULARITY_SECONDS[granularity]
+        until = floor_time(self.now - timedelta(seconds=self.lag_seconds), size)
+
+        finer = self._finer(granularity)
+        if finer is not None:
+            # سطل درشت فقط وقتی ساخته می‌شود که همه سطل‌های ریز آن ساخته شده باشند
+            finer_checkpoint = RollupCheckpoint.objects.filter(source=source, granularity=finer).first()
+            if finer_checkpoint is None:
+                return 0
+            until = min(until, floor_time(finer_checkpoint.built_until, size))
+            backfill_start = ceil_time(finer_checkpoint.built_from, size)
+        else:
+            backfill_start = floor_time(self.now - timedelta(days=self.max_backfill_days), size)
+
+        checkpoint = RollupCheckpoint.objects.filter(source=source, granularity=granularity).first()
+        since = checkpoint.built_until if checkpoint else backfill_start
+        if since >= until:
+            return 0
+
+        # داده‌های خام در بازه‌های یک‌روزه خوانده می‌شوند تا حافظه محدود بماند
+        written = 0
+        chunk = timedelta(seconds=max(size, 86400))
+        chunk_start = since
+        while chunk_start < until:
+            chunk_end = min(chunk_start + chunk, until)
+            if finer is None:
+                summaries = RAW_READERS[source](chunk_start, chunk_end)
+            else:
+                summaries = self._read_rollups(source, finer, size, chunk_start, chunk_end)
+
+            rollups = [summary.to_rollup(source, name, granularity, bucket_start)
+                       for (name, bucket_start), summary in summaries.items()]
+            with transaction.atomic():
+                MetricRollup.objects.filter(
+                    source=source, granularity=granularity,
+                    bucket_start__gte=chunk_start, bucket_start__lt=chunk_end,
+                ).delete()
+                MetricRollup.objects.bulk_create(rollups, batch_size=500)
+                RollupCheckpoint.objects.update_or_create(
+                    source=source, granularity=granularity,
+                    defaults={
+                        'built_from': checkpoint.built_from if checkpoint else since,
+                        'built_until': chunk_end,
+                    }
+                )
+            written += len(rollups)
+            chunk_start = chunk_end
+
+        logger.debug(f"تجمیع {source}/{granularity} تا {until} ساخته شد: {written} سطل")
+        return written
+
+    def apply_retention(self) -> Dict[str, int]:
+        """
+        کاهش تفکیک (downsampling) و نگهداری داده‌ها
+
+        داده خام و تجمیع‌های ریز پس از دوره نگهداری خود حذف می‌شوند، ولی هرگز
+        پیش از آنکه در سطح درشت‌تر تجمیع شده باشند. ابتدای بازه معتبر هر سطح
+        (built_from) همراه با حذف جلو می‌رود تا پرس‌وجوها به سطل حذف‌شده تکیه نکنند.
+        """
+        retention = ANALYTICS_SETTINGS['DATA_RETENTION']
+        config = ANALYTICS_SETTINGS['ROLLUPS']
+        checkpoints = {(c.source, c.granularity): c for c in RollupCheckpoint.objects.all()}
+        deleted = {}
+
+        def covered_cutoff(days: int, source: str, granularity: str) -> Optional[datetime]:
+            checkpoint = checkpoints.get((source, granularity))
+            if checkpoint is None:
+                return None
+            return min(self.now - timedelta(days=days), checkpoint.built_until)
+
+        raw_tables = {
+            'performance': (
+                (PerformanceMetric.objects, 'timestamp', retention['PERFORMANCE_METRICS_DAYS']),
+                (LatencySketch.objects, 'bucket_start', retention['PERFORMANCE_METRICS_DAYS']),
+            ),
+            'activity': ((UserActivity.objects, 'timestamp', retention['USER_ACTIVITY_DAYS']),),
+            'metric': ((Metric.objects, 'timestamp', retention['METRICS_DAYS']),),
+        }
+        for source, tables in raw_tables.items():
+            for manager, field, days in tables:
+                cutoff = covered_cutoff(days, source, 'minute')
+                if cutoff is None:
+                    continue
+                count, _ = manager.filter(**{f'{field}__lt': cutoff}).delete()
+                deleted[manager.model.__name__] = deleted.get(manager.model.__name__, 0) + count
+
+        for granularity, days_key in (('minute', 'MINUTE_RETENTION_DAYS'), ('hour', 'HOUR_RETENTION_DAYS'),
+                                      ('day', 'DAY_RETENTION_DAYS')):
+            coarser = self._coarser(granularity)
+            count = 0
+            for source in SOURCES:
+                checkpoint = checkpoints.get((source, granularity))
+                if checkpoint is None:
+                    continue
+                cutoff = self.now - timedelta(days=config[days_key])
+                if coarser is not None:
+                    # فقط سطل‌هایی که در سطح درشت‌تر پوشش داده شده‌اند حذف می‌شوند
+                    coarser_checkpoint = checkpoints.get((source, coarser))
+                    if coarser_checkpoint is None:
+                        continue
+                    cutoff = min(cutoff, coarser_checkpoint.built_until)
+                cutoff = floor_time(cutoff, GRANULARITY_SECONDS[granularity])
+                if cutoff <= checkpoint.built_from:
+                    continue
+
+                with transaction.atomic():
+                    removed, _ = MetricRollup.objects.filter(
+                        source=source, granularity=granularity, bucket_start__lt=cutoff
+                    ).delete()
+                    checkpoint.built_from = min(cutoff, checkpoint.built_until)
+                    checkpoint.save(update_fields=['built_from', 'updated_at'])
+                count += removed
+            deleted[f'rollup/{granularity}'] = count
+
+        return deleted
+
+    @staticmethod
+    def _finer(granularity: str) -> Optional[str]:
+        index = GRANULARITIES.index(granularity)
+        return GRANULARITIES[index - 1] if index else None
+
+    @staticmethod
+    def _coarser(granularity: str) -> Optional[str]:
+        index = GRANULARITIES.index(granularity)
+        return GRANULARITIES[index + 1] if index + 1 < len(GRANULARITIES) else None
+
+    @staticmethod
+    def _read_rollups(source: str, granularity: str, size: int,
+                      start: datetime, end: datetime) -> Dict[Key, RollupSummary]:
+        summaries: Dict[Key, RollupSummary] = defaultdict(RollupSummary)
+        rows = MetricRollup.objects.filter(
+            source=source, granularity=granularity, bucket_start__gte=start, bucket_start__lt=end
+        )
+        for row in rows.iterator():
+            summaries[(row.name, floor_time(row.bucket_start, size))].add_rollup(row)
+        return summaries
+
+
+class RollupQuery:
+    """
+    پاسخ به پرس‌وجوهای بازه‌ای از درشت‌ترین تجمیع معتبر
+
+    بازه [start, end) به بخش‌هایی تقسیم می‌شود: میانه از سطل‌های روزانه، حاشیه‌ها
+    از سطل‌های ساعتی و دقیقه‌ای و بخش ساخته‌نشده (معمولاً دقایق اخیر) از جداول خام.
+    بنابراین هزینه هر پرس‌وجو به تعداد سطل‌ها وابسته است نه به حجم داده خام.
+    """
+
+    def __init__(self):
+        self.checkpoints = {
+            (checkpoint.source, checkpoint.granularity): checkpoint
+            for checkpoint in RollupCheckpoint.objects.all()
+        }
+
+    def plan(self, source: str, start: datetime, end: datetime,
+             levels: Tuple[str, ...] = tuple(reversed(GRANULARITIES))) -> List[Tuple[str, datetime, datetime]]:
+        """
+        تقسیم بازه به بخش‌های (سطح، شروع، پایان)؛ سطح 'raw' یعنی خواندن داده خام
+        """
+        if start >= end:
+            return []
+        if not levels:
+            return [('raw', start, end)]
+
+        level, finer = levels[0], levels[1:]
+        size = GRANULARITY_SECONDS[level]
+        checkpoint = self.checkpoints.get((source, level))
+        if checkpoint is None:
+            return self.plan(source, start, end, finer)
+
+        segment_start = max(ceil_time(start, size), checkpoint.built_from)
+        segment_end = min(floor_time(end, size), checkpoint.built_until)
+        if segment_start >= segment_end:
+            return self.plan(source, start, end, finer)
+
+        return (
+            self.plan(source, start, segment_start, finer)
+            + [(level, segment_start, segment_end)]
+            + self.plan(source, segment_end, end, finer)
+        )
+
+    def summarize_by_name(self, source: str, start: datetime, end: Optional[datetime] = None,
+                          names: Optional[Iterable[str]] = None,
+                          endpoint: Optional[str] = None) -> Dict[str, RollupSummary]:
+        """
+        خلاصه بازه به تفکیک نام (endpoint، عمل یا نام متریک)
+
+        Args:
+            source: منبع داده (performance، activity یا metric)
+            start: شروع بازه
+            end: پایان بازه (پیش‌فرض اکنون)
+            names: محدود کردن به نام‌های مشخص
+            endpoint: محدود کردن به یک endpoint (فقط برای performance)
+        """
+        end = end or timezone.now()
+        names = list(names) if names is not None else None
+        summaries: Dict[str, RollupSummary] = defaultdict(RollupSummary)
+
+        for level, segment_start, segment_end in self.plan(source, start, end):
+            if level == 'raw':
+                raw = RAW_READERS[source](segment_start, segment_end, names=names, endpoint=endpoint)
+                for (name, _), summary in raw.items():
+                    summaries[name].merge(summary)
+                continue
+
+            rows = MetricRollup.objects.filter(
+                source=source, granularity=level,
+                bucket_start__gte=segment_start, bucket_start__lt=segment_end,
+            )
+            if names is not None:
+                rows = rows.filter(name__in=names)
+            if endpoint:
+                rows = rows.filter(name__endswith=f' {endpoint}')
+            for row in rows.iterator():
+                summaries[row.name].add_rollup(row)
+
+        return dict(summaries)
+
+    def summarize(self, source: str, start: datetime, end: Optional[datetime] = None,
+                  names: Optional[Iterable[str]] = None, endpoint: Optional[str] = None) -> RollupSummary:
+        """خلاصه کل بازه (ادغام همه نام‌ها)"""
+        total = RollupSummary()
+        for summary in self.summarize_by_name(source, start, end, names=names, endpoint=endpoint).values():
+            total.merge(summary)
+        return total
@@ -4,11 +4,14 @@
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from django.db.models import Count, Avg, Sum, Q
+from django.db.models import Count
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
-from .models import Metric, UserActivity, PerformanceMetric, BusinessMetric, AlertRule, Alert
+from .models import Metric, UserActivity, PerformanceMetric, BusinessMetric, Alert
+from .alerting import get_alert_evaluator
+from .rollups import RollupQuery, RollupSummary
+from .sketches import DDSketch
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -92,7 +95,7 @@ class AnalyticsService:
         Returns:
             شیء PerformanceMetric
         """
-        return PerformanceMetric.objects.create(
+        metric = PerformanceMetric.objects.create(
             endpoint=endpoint,
             method=method,
             response_time_ms=response_time_ms,
@@ -101,6 +104,12 @@ class AnalyticsService:
             error_message=error_message,
             metadata=metadata or {}
         )
+        
+        # به‌روزرسانی خلاصه صدک endpoint در زمان ثبت
+        from .aggregator import get_metrics_aggregator
+        get_metrics_aggregator().observe(endpoint, method, status_code, response_time_ms)
+        
+        return metric
     
     def calculate_business_metrics(self, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
         """
@@ -128,24 +137,14 @@ class AnalyticsService:
             total_encounters = 0
             completed_encounters = 0
         
-        # متریک‌های فعالیت کاربر
-        active_users = UserActivity.objects.filter(
-            timestamp__range=[period_start, period_end]
-        ).values('user').distinct().count()
-        
-        # متریک‌های عملکرد
-        avg_response_time = PerformanceMetric.objects.filter(
-            timestamp__range=[period_start, period_end]
-        ).aggregate(avg_time=Avg('response_time_ms'))['avg_time'] or 0
+        # متریک‌های فعالیت کاربر و عملکرد از تجمیع‌های زمانی (یک پرس‌وجو به ازای هر منبع)
+        rollups = RollupQuery()
+        active_users = rollups.summarize('activity', period_start, period_end).unique_users
         
-        error_rate = PerformanceMetric.objects.filter(
-            timestamp__range=[period_start, period_end],
-            status_code__gte=400
-        ).count()
-        
-        total_requests = PerformanceMetric.objects.filter(
-            timestamp__range=[period_start, period_end]
-        ).count()
+        performance = rollups.summarize('performance', period_start, period_end)
+        avg_response_time = performance.avg
+        error_rate = performance.error_count
+        total_requests = performance.count
         
         error_rate_percent = (error_rate / total_requests * 100) if total_requests > 0 else 0
         
@@ -233,11 +232,13 @@ class AnalyticsService:
         
         metrics = PerformanceMetric.objects.filter(timestamp__gte=cutoff_date)
         
-        # آمار کلی
-        total_requests = metrics.count()
-        avg_response_time = metrics.aggregate(
-            avg_time=Avg('response_time_ms')
-        )['avg_time'] or 0
+        # آمار کلی و صدک‌ها از تجمیع‌های زمانی (ادغام خلاصه‌های DDSketch، بدون خواندن رکوردهای خام)
+        by_endpoint = RollupQuery().summarize_by_name('performance', cutoff_date)
+        latency = RollupSummary()
+        for summary in by_endpoint.values():
+            latency.merge(summary)
+        total_requests = latency.count
+        avg_response_time = latency.avg
         
         # تفکیک کد وضعیت
         status_breakdown = metrics.values('status_code').annotate(
@@ -245,10 +246,16 @@ class AnalyticsService:
         ).order_by('status_code')
         
         # کندترین endpoints
-        slowest_endpoints = metrics.values('endpoint', 'method').annotate(
-            avg_time=Avg('response_time_ms'),
-            request_count=Count('id')
-        ).order_by('-avg_time')[:10]
+        slowest_endpoints = []
+        for name, summary in by_endpoint.items():
+            method, _, endpoint = name.partition(' ')
+            slowest_endpoints.append({
+                'endpoint': endpoint,
+                'method': method,
+                'avg_time': summary.avg,
+                'request_count': summary.count,
+            })
+        slowest_endpoints.sort(key=lambda item: item['avg_time'], reverse=True)
         
         # تحلیل خطاها
         errors = metrics.filter(status_code__gte=400)
@@ -256,29 +263,35 @@ class AnalyticsService:
             count=Count('id')
         ).order_by('-count')[:10]
         
-        # محاسبه percentile (ساده شده)
-        response_times = list(metrics.values_list('response_time_ms', flat=True))
-        response_times.sort()
-        
-        def percentile(data, p):
-            if not data:
-                return 0
-            index = int(len(data) * p / 100)
-            return data[min(index, len(data) - 1)]
-        
         return {
             'period_days': days,
             'total_requests': total_requests,
             'avg_response_time_ms': round(avg_response_time, 2),
-            'p50_response_time_ms': percentile(response_times, 50),
-            'p95_response_time_ms': percentile(response_times, 95),
-            'p99_response_time_ms': percentile(response_times, 99),
+            'p50_response_time_ms': round(latency.quantile(0.50), 2),
+            'p95_response_time_ms': round(latency.quantile(0.95), 2),
+            'p99_response_time_ms': round(latency.quantile(0.99), 2),
             'status_breakdown': list(status_breakdown),
-            'slowest_endpoints': list(slowest_endpoints),
+            'slowest_endpoints': slowest_endpoints[:10],
             'error_breakdown': list(error_breakdown),
-            'error_rate_percent': round((errors.count() / total_requests * 100) if total_requests > 0 else 0, 2)
+            'error_rate_percent': round((latency.error_count / total_requests * 100) if total_requests > 0 else 0, 2)
         }
     
+    def get_latency_sketch(self, start: datetime, end: Optional[datetime] = None,
+                           endpoint: Optional[str] = None) -> DDSketch:
+        """
+        خلاصه صدک زمان پاسخ برای یک بازه زمانی از ادغام خلاصه‌های تجمیع‌شده
+        
+        Args:
+            start: شروع بازه
+            end: پایان بازه (اختیاری)
+            endpoint: محدود کردن به یک endpoint (اختیاری)
+        
+        Returns:
+            شیء DDSketch ادغام‌شده
+        """
+        summary = RollupQuery().summarize('performance', start, end, endpoint=endpoint)
+        return summary.sketch or DDSketch()
+    
     def check_alert_rules(self) -> List[Dict[str, Any]]:
         """
         بررسی قوانین هشدار در برابر متریک‌های فعلی
@@ -286,82 +299,11 @@ class AnalyticsService:
         Returns:
             لیست هشدارهای تولید شده
         """
-        triggered_alerts = []
-        
-        for rule in AlertRule.objects.filter(is_active=True):
-            try:
-                # دریافت مقادیر متریک اخیر
-                recent_metrics = Metric.objects.filter(
-                    name=rule.metric_name,
-                    timestamp__gte=timezone.now() - timedelta(minutes=5)
-                )
-                
-                if not recent_metrics.exists():
-                    continue
-                
-                # دریافت آخرین مقدار
-                latest_metric = recent_metrics.latest('timestamp')
-                metric_value = latest_metric.value
-                
-                # بررسی آستانه
-                should_fire = False
-                if rule.operator == 'gt' and metric_value > rule.threshold:
-                    should_fire = True
-                elif rule.operator == 'gte' and metric_value >= rule.threshold:
-                    should_fire = True
-                elif rule.operator == 'lt' and metric_value < rule.threshold:
-                    should_fire = True
-                elif rule.operator == 'lte' and metric_value <= rule.threshold:
-                    should_fire = True
-                elif rule.operator == 'eq' and metric_value == rule.threshold:
-                    should_fire = True
-                elif rule.operator == 'ne' and metric_value != rule.threshold:
-                    should_fire = True
-                
-                if should_fire:
-                    # بررسی اینکه آیا هشدار از قبل وجود دارد و در حال اجرا است
-                    existing_alert = Alert.objects.filter(
-                        rule=rule,
-                        status='firing'
-                    ).first()
-                    
-                    if not existing_alert:
-                        # ایجاد هشدار جدید
-                        alert = Alert.objects.create(
-                            rule=rule,
-                            status='firing',
-                            metric_value=metric_value,
-                            message=f"{rule.name}: {rule.metric_name} برابر {metric_value} است (آستانه: {rule.threshold})",
-                            metadata={
-                                'metric_timestamp': latest_metric.timestamp.isoformat(),
-                                'tags': latest_metric.tags
-                            }
-                        )
-                        
-                        triggered_alerts.append({
-                            'alert_id': alert.id,
-                            'rule_name': rule.name,
-                            'severity': rule.severity,
-                            'message': alert.message,
-                            'metric_value': metric_value,
-                            'threshold': rule.threshold
-                        })
-                
-                else:
-                    # حل هشدارهای در حال اجرا برای این قانون
-                    Alert.objects.filter(
-                        rule=rule,
-                        status='firing'
-                    ).update(
-                        status='resolved',
-                        resolved_at=timezone.now()
-                    )
-            
-            except Exception as e:
-                logger.error(f"خطا در بررسی قانون هشدار {rule.name}: {str(e)}")
-                continue
-        
-        return triggered_alerts
+        # قوانین از نو بارگذاری و با وضعیت مشترک (چند پرس‌وجو برای همه قوانین) ارزیابی
+        # می‌شوند؛ فقط تغییر وضعیت‌ها ثبت می‌شوند
+        evaluator = get_alert_evaluator()
+        evaluator.load_rules()
+        return evaluator.evaluate()
     
     def get_system_overview(self) -> Dict[str, Any]:
         """
@@ -383,24 +325,14 @@ class AnalyticsService:
             encounters_24h = 0
             encounters_7d = 0
         
-        # فعالیت کاربر
-        active_users_24h = UserActivity.objects.filter(
-            timestamp__gte=last_24h
-        ).values('user').distinct().count()
-        
-        # متریک‌های عملکرد
-        avg_response_time_24h = PerformanceMetric.objects.filter(
-            timestamp__gte=last_24h
-        ).aggregate(avg_time=Avg('response_time_ms'))['avg_time'] or 0
-        
-        error_rate_24h = PerformanceMetric.objects.filter(
-            timestamp__gte=last_24h,
-            status_code__gte=400
-        ).count()
+        # فعالیت کاربر و متریک‌های عملکرد از تجمیع‌های زمانی
+        rollups = RollupQuery()
+        active_users_24h = rollups.summarize('activity', last_24h, now).unique_users
         
-        total_requests_24h = PerformanceMetric.objects.filter(
-            timestamp__gte=last_24h
-        ).count()
+        performance = rollups.summarize('performance', last_24h, now)
+        avg_response_time_24h = performance.avg
+        error_rate_24h = performance.error_count
+        total_requests_24h = performance.count
         
         error_rate_percent = (error_rate_24h / total_requests_24h * 100) if total_requests_24h > 0 else 0
         
@@ -35,10 +35,23 @@ ANALYTICS_SETTINGS = {
         'TRACK_ANONYMOUS_USERS': getattr(settings, 'ANALYTICS_TRACK_ANONYMOUS_USERS', False),
     },
     
+    # تجمیع درون‌پردازه‌ای متریک‌ها (جایگزین ارسال یک تسک Celery به ازای هر درخواست)
+    'AGGREGATOR': {
+        'CAPACITY': getattr(settings, 'ANALYTICS_AGGREGATOR_CAPACITY', 10000),  # سقف رکوردهای در انتظار هر worker
+        'BATCH_SIZE': getattr(settings, 'ANALYTICS_AGGREGATOR_BATCH_SIZE', 500),
+        'FLUSH_INTERVAL': getattr(settings, 'ANALYTICS_AGGREGATOR_FLUSH_INTERVAL', 2.0),  # ثانیه
+        'INTERVAL_SECONDS': getattr(settings, 'ANALYTICS_AGGREGATOR_INTERVAL_SECONDS', 60),  # بازه شمارنده‌ها
+        'RECORD_RAW_METRICS': getattr(settings, 'ANALYTICS_RECORD_RAW_PERFORMANCE_METRICS', True),
+        'SKETCH_RELATIVE_ACCURACY': getattr(settings, 'ANALYTICS_SKETCH_RELATIVE_ACCURACY', 0.01),  # خطای نسبی صدک‌ها
+    },
+    
     # تنظیمات هشدارها
     'ALERTS': {
         'ENABLED': getattr(settings, 'ANALYTICS_ALERTS_ENABLED', True),
         'CHECK_INTERVAL_MINUTES': getattr(settings, 'ANALYTICS_ALERT_CHECK_INTERVAL', 5),
+        'WINDOW_SECONDS': getattr(settings, 'ANALYTICS_ALERT_WINDOW_SECONDS', 300),  # پنجره مقدار متریک‌ها
+        'EVALUATION_INTERVAL': getattr(settings, 'ANALYTICS_ALERT_EVALUATION_INTERVAL', 5.0),  # ثانیه
+        'RULES_REFRESH_SECONDS': getattr(settings, 'ANALYTICS_ALERT_RULES_REFRESH_SECONDS', 30.0),
         'EMAIL_NOTIFICATIONS': getattr(settings, 'ANALYTICS_EMAIL_NOTIFICATIONS', False),
         'WEBHOOK_NOTIFICATIONS': getattr(settings, 'ANALYTICS_WEBHOOK_NOTIFICATIONS', False),
     },
@@ -52,6 +65,15 @@ ANALYTICS_SETTINGS = {
         'ALERTS_DAYS': getattr(settings, 'ANALYTICS_ALERTS_RETENTION_DAYS', 90),
     },
     
+    # تجمیع‌های زمانی (rollup) و کاهش تفکیک داده‌ها
+    'ROLLUPS': {
+        'LAG_SECONDS': getattr(settings, 'ANALYTICS_ROLLUP_LAG_SECONDS', 120),  # فرصت ذخیره بافر تجمیع‌کننده
+        'MAX_BACKFILL_DAYS': getattr(settings, 'ANALYTICS_ROLLUP_MAX_BACKFILL_DAYS', 7),
+        'MINUTE_RETENTION_DAYS': getattr(settings, 'ANALYTICS_ROLLUP_MINUTE_RETENTION_DAYS', 2),
+        'HOUR_RETENTION_DAYS': getattr(settings, 'ANALYTICS_ROLLUP_HOUR_RETENTION_DAYS', 90),
+        'DAY_RETENTION_DAYS': getattr(settings, 'ANALYTICS_ROLLUP_DAY_RETENTION_DAYS', 730),
+    },
+    
     # تنظیمات گزارش‌گیری
     'REPORTING': {
         'DAILY_REPORTS': getattr(settings, 'ANALYTICS_DAILY_REPORTS', True),
@@ -0,0 +1,203 @@
+"""
+خلاصه‌های قابل ادغام برای محاسبه صدک‌ها (DDSketch) و شمارش یکتا (HyperLogLog)
+"""
+import hashlib
+import math
+from typing import Any, Dict, Iterable, Optional
+
+
+class DDSketch:
+    """
+    خلاصه صدک با خطای نسبی تضمین‌شده (DDSketch)
+
+    هر مقدار در سطلی لگاریتمی با پایه gamma شمرده می‌شود؛ صدک برگردانده‌شده حداکثر
+    relative_accuracy با مقدار واقعی فاصله نسبی دارد. دو خلاصه با دقت یکسان با جمع
+    شمارنده‌های سطل‌ها ادغام می‌شوند، بنابراین صدک هر بازه زمانی از ادغام خلاصه‌های
+    ذخیره‌شده به دست می‌آید. حافظه به تعداد سطل‌ها (حداکثر max_bins) محدود است.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy باید بین ۰ و ۱ باشد')
+
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        """افزودن یک مقدار (غیرمنفی)"""
+        if value > 0:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += count
+
+        self.count += count
+        self.sum += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'DDSketch'):
+        """ادغام خلاصه دیگری با همین دقت در این خلاصه"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('ادغام خلاصه‌ها با دقت متفاوت ممکن نیست')
+        if not other.count:
+            return
+
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        مقدار صدک q (بین ۰ و ۱)؛ برای خلاصه خالی ۰ برگردانده می‌شود
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        running = self.zero_count
+        if rank < running:
+            return 0.0
+
+        for key in sorted(self.bins):
+            running += self.bins[key]
+            if running > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    @property
+    def avg(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """نمایش قابل ذخیره در JSONField"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'bins': {str(key): count for key, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_bins: int = 2048) -> 'DDSketch':
+        sketch = cls(relative_accuracy=data['relative_accuracy'], max_bins=max_bins)
+        sketch.bins = {int(key): count for key, count in data.get('bins', {}).items()}
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.sum = data.get('sum', 0.0)
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: Iterable[Dict[str, Any]],
+               relative_accuracy: Optional[float] = None) -> 'DDSketch':
+        """ادغام مجموعه‌ای از خلاصه‌های ذخیره‌شده (dict) در یک خلاصه"""
+        result = None
+        for data in sketches:
+            sketch = cls.from_dict(data)
+            if result is None:
+                result = sketch
+            else:
+                result.merge(sketch)
+
+        if result is None:
+            result = cls(relative_accuracy or 0.01)
+        return result
+
+    def _collapse(self):
+        """ادغام پایین‌ترین سطل‌ها تا تعداد سطل‌ها به max_bins برسد (دقت صدک‌های بالا حفظ می‌شود)"""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins + 1
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+
+class HyperLogLog:
+    """
+    تخمین تعداد مقادیر یکتا با حافظه ثابت (HyperLogLog)
+
+    هر مقدار با hash پایدار (یکسان در همه پردازه‌ها) به یکی از 2^precision ثبات
+    نگاشت می‌شود و ثبات بیشترین رتبه دیده‌شده را نگه می‌دارد. خطای نسبی حدود
+    1.04/sqrt(2^precision) است و برای تعداد کم (تصحیح linear counting) عملاً
+    دقیق است. دو خلاصه با بیشینه‌گیری ثبات‌ها ادغام می‌شوند.
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision باید بین ۴ و ۱۶ باشد')
+
+        self.precision = precision
+        self.size = 1 << precision
+        # ثبات‌های غیرصفر؛ برای بازه‌های کم‌ترافیک حافظه و حجم ذخیره کوچک می‌ماند
+        self.registers: Dict[int, int] = {}
+
+    def add(self, value: Any):
+        """افزودن یک مقدار (بر اساس str(value)، مثلاً UUID کاربر)"""
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        width = 64 - self.precision
+        index = hashed >> width
+        rank = width - (hashed & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        """ادغام خلاصه دیگری با همین precision در این خلاصه"""
+        if other.precision != self.precision:
+            raise ValueError('ادغام خلاصه‌ها با precision متفاوت ممکن نیست')
+        for index, rank in other.registers.items():
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+
+    def count(self) -> int:
+        """تعداد تخمینی مقادیر یکتا"""
+        if not self.registers:
+            return 0
+
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        empty = self.size - len(self.registers)
+        harmonic = empty + sum(2.0 ** -rank for rank in self.registers.values())
+        estimate = alpha * self.size * self.size / harmonic
+        if estimate <= 2.5 * self.size and empty:
+            estimate = self.size * math.log(self.size / empty)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """نمایش قابل ذخیره در JSONField"""
+        return {
+            'precision': self.precision,
+            'registers': {str(index): rank for index, rank in self.registers.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(precision=data['precision'])
+        sketch.registers = {int(index): rank for index, rank in data.get('registers', {}).items()}
+        return sketch
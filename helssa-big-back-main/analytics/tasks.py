@@ -40,10 +40,15 @@ def check_alert_rules():
 def calculate_hourly_metrics():
     """
     محاسبه متریک‌های کسب و کار ساعتی
+    
+    پیش از محاسبه، تجمیع‌های دقیقه‌ای و ساعتی به صورت افزایشی به‌روزرسانی می‌شوند.
     """
     try:
+        from .rollups import RollupBuilder
         from .services import AnalyticsService
         
+        rollups = RollupBuilder().update(granularities=('minute', 'hour'))
+        
         # محاسبه متریک‌ها برای ساعت گذشته
         now = timezone.now()
         hour_start = now.replace(minute=0, second=0, microsecond=0)
@@ -58,6 +63,7 @@ def calculate_hourly_metrics():
             'status': 'success',
             'period_start': hour_start.isoformat(),
             'period_end': hour_end.isoformat(),
+            'rollups': rollups,
             'metrics': metrics
         }
         
@@ -73,11 +79,16 @@ def calculate_hourly_metrics():
 def calculate_daily_metrics():
     """
     محاسبه متریک‌های کسب و کار روزانه
+    
+    پیش از محاسبه، تجمیع‌ها تا سطح روزانه به‌روزرسانی می‌شوند.
     """
     try:
+        from .rollups import RollupBuilder
         from .services import AnalyticsService
         from datetime import date
         
+        rollups = RollupBuilder().update()
+        
         # محاسبه متریک‌ها برای دیروز
         yesterday = date.today() - timedelta(days=1)
         period_start = timezone.make_aware(datetime.combine(yesterday, datetime.min.time()))
@@ -91,6 +102,7 @@ def calculate_daily_metrics():
         return {
             'status': 'success',
             'date': yesterday.isoformat(),
+            'rollups': rollups,
             'metrics': metrics
         }
         
@@ -106,30 +118,26 @@ def calculate_daily_metrics():
 def cleanup_old_metrics():
     """
     پاک‌سازی متریک‌های قدیمی
+    
+    داده‌های خام پس از دوره نگهداری (DATA_RETENTION) و تجمیع‌های دقیقه‌ای/ساعتی پس از
+    دوره نگهداری خود (ROLLUPS) حذف می‌شوند؛ هیچ داده‌ای پیش از تجمیع در سطح
+    درشت‌تر حذف نمی‌شود.
     """
     try:
-        from .models import Metric, UserActivity, PerformanceMetric
-        
-        # پاک‌سازی داده‌های قدیمی‌تر از 30 روز
-        cutoff_date = timezone.now() - timedelta(days=30)
-        
-        # حذف متریک‌های قدیمی
-        deleted_metrics = Metric.objects.filter(timestamp__lt=cutoff_date).delete()
-        
-        # حذف فعالیت‌های قدیمی
-        deleted_activities = UserActivity.objects.filter(timestamp__lt=cutoff_date).delete()
+        from .rollups import RollupBuilder
         
-        # حذف متریک‌های عملکرد قدیمی
-        deleted_performance = PerformanceMetric.objects.filter(timestamp__lt=cutoff_date).delete()
+        builder = RollupBuilder()
+        builder.update()
+        deleted = builder.apply_retention()
         
-        logger.info(f"پاک‌سازی داده‌های قدیمی کامل شد. حذف شده: {deleted_metrics[0]} متریک، {deleted_activities[0]} فعالیت، {deleted_performance[0]} متریک عملکرد")
+        logger.info(f"پاک‌سازی داده‌های قدیمی کامل شد. حذف شده: {deleted}")
         
         return {
             'status': 'success',
-            'cutoff_date': cutoff_date.isoformat(),
-            'deleted_metrics': deleted_metrics[0],
-            'deleted_activities': deleted_activities[0],
-            'deleted_performance_metrics': deleted_performance[0]
+            'deleted_metrics': deleted.get('Metric', 0),
+            'deleted_activities': deleted.get('UserActivity', 0),
+            'deleted_performance_metrics': deleted.get('PerformanceMetric', 0),
+            'deleted': deleted
         }
         
     except Exception as e:
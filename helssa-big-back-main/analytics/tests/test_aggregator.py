@@ -0,0 +1,129 @@
+"""
+تست‌های مربوط به تجمیع‌کننده درون‌پردازه‌ای متریک‌ها
+"""
+from django.test import TestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from unittest.mock import patch
+
+from ..aggregator import MetricsAggregator
+from ..middleware.performance_tracking import PerformanceTrackingMiddleware
+from ..models import Metric, UserActivity, PerformanceMetric, LatencySketch
+
+User = get_user_model()
+
+
+class MetricsAggregatorTest(TestCase):
+    """
+    تست‌های مربوط به کلاس MetricsAggregator
+    """
+
+    def setUp(self):
+        """
+        تنظیمات اولیه برای تست‌ها
+        """
+        self.aggregator = MetricsAggregator(capacity=100, batch_size=10, interval_seconds=60)
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+
+    def test_record_request_does_not_touch_database(self):
+        """
+        تست عدم دسترسی به دیتابیس در مسیر ثبت درخواست
+        """
+        with patch.object(self.aggregator, '_ensure_worker'):
+            with self.assertNumQueries(0):
+                for response_time in (20, 40, 900):
+                    self.aggregator.record_request('api:users', 'GET', 200, response_time, user_id=self.user.id)
+
+        stats = self.aggregator.stats()
+        self.assertEqual(stats['pending_performance_metrics'], 3)
+        self.assertEqual(stats['open_intervals'], 1)
+
+    def test_flush_writes_raw_rows_and_interval_metrics(self):
+        """
+        تست ذخیره دسته‌ای رکوردهای خام و شمارنده‌های هر بازه
+        """
+        with patch.object(self.aggregator, '_ensure_worker'):
+            self.aggregator.record_request('api:users', 'GET', 200, 20, user_id=self.user.id)
+            self.aggregator.record_request('api:users', 'GET', 500, 900)
+            self.aggregator.record_activity(self.user.id, 'create', resource='users', ip_address='127.0.0.1')
+
+        # بازه جاری تا بسته شدن ذخیره نمی‌شود
+        self.aggregator.flush()
+        self.assertEqual(PerformanceMetric.objects.count(), 2)
+        self.assertEqual(UserActivity.objects.get().user, self.user)
+        self.assertFalse(Metric.objects.exists())
+
+        self.aggregator.flush(force=True)
+        # هر endpoint متریک‌های جداگانه خود را دارد
+        requests = Metric.objects.get(name='api.requests GET api:users')
+        self.assertEqual(requests.value, 2)
+        self.assertEqual(requests.tags['endpoint'], 'api:users')
+        self.assertEqual(Metric.objects.get(name='api.errors GET api:users').value, 1)
+
+        latency = Metric.objects.get(name='api.response_time_ms GET api:users')
+        self.assertEqual(latency.value, 460)
+        self.assertEqual(latency.tags['max'], 900)
+        self.assertAlmostEqual(latency.tags['p50'], 20, delta=1)
+
+        sketch = LatencySketch.objects.get()
+        self.assertEqual((sketch.endpoint, sketch.count, sketch.error_count), ('api:users', 2, 1))
+        self.assertEqual(sketch.sketch['count'], 2)
+
+    def test_invalid_entry_does_not_block_batch(self):
+        """
+        تست کنار گذاشتن رکورد نامعتبر بدون از دست رفتن بقیه دسته
+        """
+        with patch.object(self.aggregator, '_ensure_worker'):
+            self.aggregator.record_activity(self.user.id, 'create')
+            self.aggregator.record_activity(self.user.id, 'create', metadata={'invalid': object()})
+
+        self.aggregator.flush()
+
+        self.assertEqual(UserActivity.objects.count(), 1)
+        self.assertEqual(self.aggregator.stats()['dropped'], 1)
+
+    def test_capacity_drops_oldest_entries(self):
+        """
+        تست محدود ماندن بافر با کنار گذاشتن قدیمی‌ترین رکوردها
+        """
+        aggregator = MetricsAggregator(capacity=2)
+        with patch.object(aggregator, '_ensure_worker'):
+            for index in range(3):
+                aggregator.record_request(f'endpoint-{index}', 'GET', 200, 10)
+
+        aggregator.flush()
+
+        self.assertEqual(
+            list(PerformanceMetric.objects.order_by('id').values_list('endpoint', flat=True)),
+            ['endpoint-1', 'endpoint-2']
+        )
+        self.assertEqual(aggregator.stats()['dropped'], 1)
+
+
+class PerformanceTrackingMiddlewareTest(TestCase):
+    """
+    تست‌های مربوط به middleware ردیابی عملکرد
+    """
+
+    def test_records_into_aggregator_without_celery(self):
+        """
+        تست ثبت متریک در تجمیع‌کننده به جای ارسال تسک Celery
+        """
+        request = RequestFactory().get('/api/users/')
+        request.user = AnonymousUser()
+        middleware = PerformanceTrackingMiddleware(lambda r: HttpResponse(status=201))
+
+        with patch('analytics.aggregator.get_metrics_aggregator') as get_aggregator, \
+                patch('analytics.tasks.record_performance_metric_async.delay') as delay:
+            middleware.process_request(request)
+            middleware.process_response(request, HttpResponse(status=201))
+
+        delay.assert_not_called()
+        kwargs = get_aggregator.return_value.record_request.call_args.kwargs
+        self.assertEqual(kwargs['endpoint'], '/api/users/')
+        self.assertEqual(kwargs['status_code'], 201)
+        self.assertIsNone(kwargs['user_id'])
@@ -0,0 +1,98 @@
+"""
+تست‌های مربوط به ارزیاب قوانین هشدار
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from ..alerting import AlertEvaluator
+from ..models import Alert, AlertRule, Metric
+
+
+class AlertEvaluatorTest(TestCase):
+    """
+    تست‌های مربوط به کلاس AlertEvaluator
+    """
+
+    def setUp(self):
+        """
+        تنظیمات اولیه برای تست‌ها
+        """
+        self.evaluator = AlertEvaluator(window_seconds=300, rules_refresh_seconds=3600)
+        self.high = AlertRule.objects.create(name='High CPU', metric_name='cpu', operator='gt', threshold=80)
+        self.low = AlertRule.objects.create(name='Low CPU', metric_name='cpu', operator='lt', threshold=10)
+        self.evaluator.load_rules()
+        cache.delete(AlertEvaluator.LOCK_KEY)
+
+    def _record(self, name, value, ago=timedelta(0)):
+        Metric.objects.create(name=name, value=value, timestamp=timezone.now() - ago)
+
+    def test_persists_only_state_transitions(self):
+        """
+        تست ثبت هشدار فقط هنگام تغییر وضعیت
+        """
+        self._record('cpu', 95, timedelta(seconds=2))
+        triggered = self.evaluator.evaluate()
+        self.assertEqual([alert['rule_name'] for alert in triggered], ['High CPU'])
+
+        self._record('cpu', 90, timedelta(seconds=1))
+        self.assertEqual(self.evaluator.evaluate(), [])
+        self.assertEqual(Alert.objects.filter(status='firing').count(), 1)
+
+        self._record('cpu', 50)
+        self.evaluator.evaluate()
+        alert = Alert.objects.get(rule=self.high)
+        self.assertEqual(alert.status, 'resolved')
+        self.assertIsNotNone(alert.resolved_at)
+        self.assertFalse(Alert.objects.filter(rule=self.low).exists())
+
+    def test_ignores_unwatched_and_expired_metrics(self):
+        """
+        تست نادیده گرفتن متریک‌های بدون قانون و مقادیر خارج از پنجره
+        """
+        self._record('memory', 99)
+        self._record('cpu', 95, timedelta(minutes=10))
+
+        self.assertEqual(self.evaluator.evaluate(), [])
+        self.assertFalse(Alert.objects.exists())
+
+    def test_processes_share_state(self):
+        """
+        تست دیدن وضعیت یکسان در همه پردازه‌ها (بدون نوسان هشدار)
+        """
+        other = AlertEvaluator(window_seconds=300, rules_refresh_seconds=3600)
+        self._record('cpu', 95)
+
+        self.assertEqual(len(self.evaluator.evaluate()), 1)
+        # پردازه دیگری که خودش متریکی ثبت نکرده هشدار را حل یا تکرار نمی‌کند
+        self.assertEqual(other.evaluate(), [])
+        self.assertEqual(Alert.objects.filter(rule=self.high, status='firing').count(), 1)
+
+    def test_concurrent_fire_creates_single_alert(self):
+        """
+        تست ثبت تنها یک هشدار در حال اجرا برای هر قانون
+        """
+        self._record('cpu', 95)
+        stale = AlertEvaluator(window_seconds=300, rules_refresh_seconds=3600)
+        stale.load_rules()
+        self.assertEqual(len(self.evaluator.evaluate()), 1)
+
+        state = next(state for state in stale._rules['cpu'] if state.rule == self.high)
+        self.assertIsNone(stale._fire(state, 95, timezone.now()))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Alert.objects.create(rule=self.high, status='firing', metric_value=95, message='High CPU')
+        self.assertEqual(Alert.objects.filter(rule=self.high, status='firing').count(), 1)
+
+    def test_periodic_evaluation_runs_in_one_process(self):
+        """
+        تست اجرای ارزیابی دوره‌ای در هر بازه فقط توسط یک پردازه
+        """
+        self._record('cpu', 95)
+        other = AlertEvaluator(window_seconds=300, rules_refresh_seconds=3600)
+
+        self.assertEqual(len(self.evaluator.evaluate_if_due()), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(other.evaluate_if_due(), [])
@@ -0,0 +1,114 @@
+"""
+تست‌های مربوط به تجمیع‌های زمانی (rollup)
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from ..models import Metric, MetricRollup, PerformanceMetric, RollupCheckpoint, UserActivity
+from ..rollups import RollupBuilder, RollupQuery
+
+User = get_user_model()
+
+NOW = datetime(2024, 3, 10, 12, 30, 15, tzinfo=dt_timezone.utc)
+
+
+class RollupBuilderTest(TestCase):
+    """
+    تست‌های مربوط به ساخت تجمیع‌ها و پرس‌وجو روی آن‌ها
+    """
+
+    def setUp(self):
+        """
+        تنظیمات اولیه برای تست‌ها
+        """
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+
+        for minutes_ago, response_time, status_code in ((150, 100, 200), (90, 300, 500), (30, 200, 200), (1, 50, 200)):
+            PerformanceMetric.objects.create(
+                endpoint='api:users', method='GET', response_time_ms=response_time,
+                status_code=status_code, timestamp=NOW - timedelta(minutes=minutes_ago),
+            )
+        for user, minutes_ago in ((self.user1, 150), (self.user1, 90), (self.user2, 1)):
+            UserActivity.objects.create(user=user, action='login', timestamp=NOW - timedelta(minutes=minutes_ago))
+
+    def build(self, now=NOW, **kwargs):
+        return RollupBuilder(now=now, lag_seconds=120, max_backfill_days=1).update(**kwargs)
+
+    def test_builds_minute_and_hour_buckets(self):
+        """
+        تست ساخت سطل‌های دقیقه‌ای از داده خام و ساعتی از دقیقه‌ای
+        """
+        self.build(granularities=('minute', 'hour'))
+
+        minute = RollupCheckpoint.objects.get(source='performance', granularity='minute')
+        self.assertEqual(minute.built_until, datetime(2024, 3, 10, 12, 28, tzinfo=dt_timezone.utc))
+        hour = RollupCheckpoint.objects.get(source='performance', granularity='hour')
+        self.assertEqual(hour.built_until, datetime(2024, 3, 10, 12, 0, tzinfo=dt_timezone.utc))
+
+        rows = MetricRollup.objects.filter(source='performance', granularity='hour').order_by('bucket_start')
+        self.assertEqual([(row.count, row.error_count, row.sum) for row in rows], [(1, 0, 100), (1, 1, 300)])
+        self.assertEqual(rows[0].name, 'GET api:users')
+
+        # ساخت دوباره تغییری ایجاد نمی‌کند
+        self.build(granularities=('minute', 'hour'))
+        self.assertEqual(MetricRollup.objects.filter(source='performance', granularity='hour').count(), 2)
+
+    def test_query_combines_rollups_and_raw_tail(self):
+        """
+        تست برابری نتیجه پرس‌وجو با داده خام و استفاده از سطل‌های درشت
+        """
+        self.build(granularities=('minute', 'hour'))
+        query = RollupQuery()
+
+        start = NOW - timedelta(hours=3)
+        plan = query.plan('performance', start, NOW)
+        self.assertIn(('hour', datetime(2024, 3, 10, 10, tzinfo=dt_timezone.utc),
+                       datetime(2024, 3, 10, 12, tzinfo=dt_timezone.utc)), plan)
+        self.assertEqual(plan[-1][0], 'raw')
+
+        performance = query.summarize('performance', start, NOW)
+        self.assertEqual((performance.count, performance.error_count, performance.sum), (4, 1, 650))
+        self.assertEqual(query.summarize('activity', start, NOW).unique_users, 2)
+
+    def test_retention_keeps_unrolled_raw_data(self):
+        """
+        تست حذف داده خام و سطل‌های دقیقه‌ای فقط پس از تجمیع در سطح درشت‌تر
+        """
+        self.build(granularities=('minute',))
+        later = NOW + timedelta(days=40)
+
+        deleted = RollupBuilder(now=later).apply_retention()
+
+        # داده خام فقط تا انتهای بازه تجمیع‌شده حذف می‌شود
+        self.assertEqual(deleted['PerformanceMetric'], 3)
+        self.assertEqual(PerformanceMetric.objects.count(), 1)
+        # سطل‌های دقیقه‌ای تا وقتی تجمیع ساعتی ساخته نشده باقی می‌مانند
+        self.assertEqual(deleted['rollup/minute'], 0)
+
+        self.build(granularities=('hour',))
+        RollupBuilder(now=later).apply_retention()
+        checkpoint = RollupCheckpoint.objects.get(source='performance', granularity='minute')
+        self.assertEqual(checkpoint.built_from, datetime(2024, 3, 10, 12, tzinfo=dt_timezone.utc))
+        self.assertFalse(MetricRollup.objects.filter(
+            granularity='minute', bucket_start__lt=checkpoint.built_from
+        ).exists())
+
+        performance = RollupQuery().summarize('performance', NOW - timedelta(hours=3), NOW)
+        self.assertEqual((performance.count, performance.error_count), (4, 1))
+
+    def test_metric_last_value(self):
+        """
+        تست آخرین مقدار متریک از ترکیب سطل‌ها و داده خام
+        """
+        Metric.objects.create(name='cpu', value=50, timestamp=NOW - timedelta(minutes=10))
+        Metric.objects.create(name='cpu', value=90, timestamp=NOW - timedelta(minutes=1))
+        self.build(granularities=('minute',))
+
+        summary = RollupQuery().summarize_by_name('metric', NOW - timedelta(minutes=30), NOW, names=['cpu'])['cpu']
+
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(summary.last_value, 90)
+        self.assertEqual(summary.max_value, 90)
@@ -0,0 +1,147 @@
+"""
+تست‌های مربوط به خلاصه‌های صدک
+"""
+import json
+import random
+import uuid
+from datetime import timedelta
+
+from django.test import TestCase, SimpleTestCase
+from django.utils import timezone
+
+from ..models import LatencySketch
+from ..services import AnalyticsService
+from ..sketches import DDSketch, HyperLogLog
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class DDSketchTest(SimpleTestCase):
+    """
+    تست‌های مربوط به کلاس DDSketch
+    """
+
+    def setUp(self):
+        """
+        تنظیمات اولیه برای تست‌ها
+        """
+        rng = random.Random(42)
+        self.values = [int(rng.lognormvariate(4, 1)) + 1 for _ in range(5000)]
+
+    def test_quantiles_within_relative_accuracy(self):
+        """
+        تست خطای نسبی صدک‌ها نسبت به مقدار دقیق
+        """
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in self.values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            expected = exact_quantile(self.values, q)
+            self.assertLessEqual(abs(sketch.quantile(q) - expected) / expected, 0.01)
+
+    def test_merge_matches_single_sketch(self):
+        """
+        تست برابری ادغام خلاصه‌ها با خلاصه کل داده
+        """
+        single = DDSketch()
+        parts = [DDSketch() for _ in range(4)]
+        for index, value in enumerate(self.values):
+            single.add(value)
+            parts[index % 4].add(value)
+
+        merged = DDSketch.merged(part.to_dict() for part in parts)
+
+        self.assertEqual(merged.count, single.count)
+        for q in (0.5, 0.95, 0.99):
+            self.assertEqual(merged.quantile(q), single.quantile(q))
+
+    def test_empty_and_zero_values(self):
+        """
+        تست خلاصه خالی و مقادیر صفر
+        """
+        sketch = DDSketch()
+        self.assertEqual(sketch.quantile(0.5), 0)
+
+        sketch.add(0, count=3)
+        sketch.add(100)
+        self.assertEqual(sketch.quantile(0.5), 0)
+        self.assertEqual(sketch.quantile(1), 100)
+
+    def test_bins_are_bounded(self):
+        """
+        تست محدود ماندن تعداد سطل‌ها
+        """
+        sketch = DDSketch(max_bins=64)
+        for value in range(1, 100000, 7):
+            sketch.add(value)
+
+        self.assertLessEqual(len(sketch.bins), 64)
+        self.assertAlmostEqual(sketch.quantile(0.99), 99000, delta=990)
+
+
+class PerformancePercentilesTest(TestCase):
+    """
+    تست محاسبه صدک‌های داشبورد از خلاصه‌های ذخیره‌شده
+    """
+
+    def test_percentiles_from_stored_sketches(self):
+        """
+        تست ادغام خلاصه‌های بازه‌ها در get_performance_analytics
+        """
+        now = timezone.now()
+        for minute, values in enumerate([range(1, 51), range(51, 101)]):
+            sketch = DDSketch()
+            for value in values:
+                sketch.add(value)
+            LatencySketch.objects.create(
+                endpoint='api:users', method='GET', bucket_start=now - timedelta(minutes=minute),
+                bucket_seconds=60, count=sketch.count, sketch=sketch.to_dict(),
+            )
+
+        analytics = AnalyticsService().get_performance_analytics(days=1)
+
+        self.assertAlmostEqual(analytics['p50_response_time_ms'], 50, delta=1)
+        self.assertAlmostEqual(analytics['p99_response_time_ms'], 99, delta=1)
+
+
+class HyperLogLogTest(SimpleTestCase):
+    """
+    تست‌های مربوط به کلاس HyperLogLog
+    """
+
+    def test_small_counts_exact(self):
+        """تعداد کم (از جمله شناسه UUID) دقیق شمرده و تکرارها نادیده گرفته می‌شوند"""
+        sketch = HyperLogLog()
+        users = [uuid.uuid4() for _ in range(20)]
+        for user_id in users + users[:5]:
+            sketch.add(user_id)
+
+        self.assertEqual(sketch.count(), 20)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_large_count_within_error(self):
+        """خطای نسبی تخمین برای تعداد زیاد در حد انتظار است"""
+        sketch = HyperLogLog()
+        for user_id in range(50000):
+            sketch.add(user_id)
+
+        self.assertLess(abs(sketch.count() - 50000) / 50000, 0.05)
+
+    def test_merge_and_round_trip(self):
+        """ادغام خلاصه‌های ذخیره‌شده برابر با شمارش اجتماع است"""
+        first, second = HyperLogLog(), HyperLogLog()
+        for user_id in range(0, 3000):
+            first.add(user_id)
+        for user_id in range(2000, 5000):
+            second.add(user_id)
+
+        restored = HyperLogLog.from_dict(json.loads(json.dumps(first.to_dict())))
+        restored.merge(HyperLogLog.from_dict(second.to_dict()))
+
+        self.assertLess(abs(restored.count() - 5000) / 5000, 0.05)
+        with self.assertRaises(ValueError):
+            restored.merge(HyperLogLog(precision=10))
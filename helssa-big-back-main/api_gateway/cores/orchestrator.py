@@ -4,61 +4,162 @@
 import logging
 import asyncio
 import json
+import os
+import threading
+import time
 from typing import Dict, List, Tuple, Any, Optional, Callable
 from datetime import datetime, timedelta
 from django.conf import settings
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..models import Workflow
 
 
 logger = logging.getLogger(__name__)
 
 
+class _WorkflowRun:
+    """
+    وضعیت اجرای یک workflow در پردازه جاری
+
+    وضعیت ماندگار در مدل Workflow نگهداری می‌شود؛ این شیء فقط رویداد لغو و
+    نتایج لازم برای ارسال به مراحل وابسته را نگه می‌دارد.
+    """
+
+    def __init__(self, workflow_id: str, record=None):
+        self.workflow_id = workflow_id
+        self.record = record
+        self.status = 'running'
+        self.start_time = datetime.now()
+        self.end_time: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.step_events: Dict[str, threading.Event] = {}
+        self.running_steps: List[str] = []
+        self.completed_steps: List[str] = []
+        self.results: List[Dict[str, Any]] = []
+        self.results_by_step: Dict[str, Dict[str, Any]] = {}
+
+    def cancel(self):
+        """درخواست توقف همکارانه همه مراحل در حال اجرا"""
+        self.cancel_event.set()
+        for event in self.step_events.values():
+            event.set()
+
+
+_shared_executors: Dict[str, ThreadPoolExecutor] = {}
+_shared_executors_lock = threading.Lock()
+
+
+def _reset_shared_executors():
+    global _shared_executors, _shared_executors_lock
+    _shared_executors = {}
+    _shared_executors_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    # threadهای pool والد در پردازه فرزند وجود ندارند
+    os.register_at_fork(after_in_child=_reset_shared_executors)
+
+
+def get_shared_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """pool محدود و ماندگار با نام مشخص که بین همه درخواست‌های این پردازه مشترک است"""
+    executor = _shared_executors.get(name)
+    if executor is None:
+        with _shared_executors_lock:
+            executor = _shared_executors.get(name)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix=f'api-gateway-{name}',
+                )
+                _shared_executors[name] = executor
+    return executor
+
+
+def get_step_executor() -> ThreadPoolExecutor:
+    """pool محدود و مشترک اجرای مراحل workflow در این پردازه"""
+    return get_shared_executor('workflow', getattr(settings, 'MAX_CONCURRENT_TASKS', 10))
+
+
+def get_task_executor() -> ThreadPoolExecutor:
+    """pool محدود و مشترک اجرای موازی تسک‌ها (جدا از مراحل workflow)"""
+    return get_shared_executor('tasks', getattr(settings, 'MAX_CONCURRENT_TASKS', 10))
+
+
+def _is_positive_number(value) -> bool:
+    """عدد مثبت (مقادیر bool پذیرفته نمی‌شوند)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
 class OrchestratorCore:
     """
     هسته هماهنگی و کنترل workflow
     
-    این کلاس مسئول هماهنگی بین سرویس‌های مختلف، مدیریت workflow و monitoring است
+    این کلاس مسئول هماهنگی بین سرویس‌های مختلف، مدیریت workflow و monitoring است.
+    مراحل workflow با depends_on وابستگی‌های خود را اعلام می‌کنند و به صورت DAG روی
+    pool محدود مشترک اجرا می‌شوند؛ وضعیت اجرا در مدل Workflow ذخیره می‌شود تا از
+    هر سرور قابل مشاهده و لغو باشد.
     """
     
+    FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+    # وضعیت‌های ماندگاری که اجرای workflow در آن‌ها ادامه می‌یابد
+    ACTIVE_STATUSES = ('running', 'paused')
+    
     def __init__(self):
         """مقداردهی اولیه هسته Orchestrator"""
         self.logger = logging.getLogger(__name__)
         self.max_concurrent_tasks = getattr(settings, 'MAX_CONCURRENT_TASKS', 10)
         self.task_timeout = getattr(settings, 'TASK_TIMEOUT', 300)  # 5 minutes
-        self.active_workflows = {}
-        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_tasks)
+        # سقف مهلت (و مدت) هر تسک و سقف کل اجرای موازی؛ مقادیر ورودی کاربر به آن محدود می‌شوند
+        self.max_task_timeout = getattr(settings, 'PARALLEL_MAX_TASK_TIMEOUT', 60)
+        self.parallel_timeout = getattr(settings, 'PARALLEL_EXECUTION_TIMEOUT', 120)
+        # فاصله بررسی وضعیت ماندگار workflow برای تشخیص لغو از سرورهای دیگر
+        self.state_poll_interval = getattr(settings, 'WORKFLOW_STATE_POLL_INTERVAL', 1.0)
+        self.active_workflows: Dict[str, _WorkflowRun] = {}
+        self.executor = get_step_executor()
         
-    def execute_workflow(self, workflow_config: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
+    def execute_workflow(self, workflow_config: Dict[str, Any], context: Optional[Dict[str, Any]] = None,
+                         workflow=None) -> Tuple[bool, Dict[str, Any]]:
         """
         اجرای یک workflow کامل
         
         Args:
             workflow_config: تنظیمات workflow
             context: context اضافی برای اجرا
+            workflow: رکورد Workflow برای ذخیره وضعیت اجرا (اختیاری)
             
         Returns:
             Tuple[bool, Dict[str, Any]]: (موفقیت، نتیجه/خطا)
         """
+        workflow_id = str(workflow.id) if workflow is not None else self._generate_workflow_id()
+        run = None
         try:
-            workflow_id = self._generate_workflow_id()
             context = context or {}
             
             # validation تنظیمات workflow
             if not self._validate_workflow_config(workflow_config):
+                self._finish_run_record(workflow, 'failed', error_message='تنظیمات workflow نامعتبر است')
                 return False, {
                     'error': 'Invalid workflow config',
                     'message': 'تنظیمات workflow نامعتبر است'
                 }
             
-            # ثبت workflow در لیست فعال
-            self.active_workflows[workflow_id] = {
-                'config': workflow_config,
-                'context': context,
-                'status': 'running',
-                'start_time': datetime.now(),
-                'steps_completed': [],
-                'current_step': None
-            }
+            if workflow is not None:
+                if workflow.status == 'pending':
+                    workflow.start()
+                elif workflow.status in self.FINISHED_STATUSES:
+                    return False, {
+                        'error': 'Workflow already finished',
+                        'message': 'workflow قبلاً به پایان رسیده است',
+                        'current_status': workflow.status
+                    }
+            
+            # ثبت workflow در لیست فعال این پردازه
+            run = _WorkflowRun(workflow_id, workflow)
+            self.active_workflows[workflow_id] = run
             
             self.logger.info(
                 'Workflow execution started',
@@ -69,29 +170,39 @@ class OrchestratorCore:
             )
             
             # اجرای مراحل workflow
-            result = self._run_workflow_steps(workflow_id, workflow_config, context)
+            result = self._run_workflow_steps(run, workflow_config, context)
+            self._persist_progress(run)
             
             # بروزرسانی وضعیت نهایی
-            if workflow_id in self.active_workflows:
-                self.active_workflows[workflow_id]['status'] = 'completed' if result[0] else 'failed'
-                self.active_workflows[workflow_id]['end_time'] = datetime.now()
-                
-                # حذف از لیست فعال پس از مدتی
-                self._schedule_workflow_cleanup(workflow_id)
+            if result[0]:
+                run.status = 'completed'
+                self._finish_run_record(workflow, 'completed', results=result[1])
+            elif run.status != 'cancelled':
+                run.status = 'failed'
+                self._finish_run_record(
+                    workflow, 'failed',
+                    error_message=str(result[1].get('step_error') or result[1].get('error', 'Workflow failed')),
+                    results={'results': run.results}
+                )
+            run.end_time = datetime.now()
             
             return result
             
         except Exception as e:
             self.logger.error(f"Workflow execution error: {str(e)}")
-            if workflow_id in self.active_workflows:
-                self.active_workflows[workflow_id]['status'] = 'error'
-                self.active_workflows[workflow_id]['error'] = str(e)
+            if run is not None:
+                run.status = 'error'
+                run.error = str(e)
+                run.cancel()
+            self._finish_run_record(workflow, 'failed', error_message=str(e))
             
             return False, {
                 'error': 'Workflow execution failed',
                 'message': 'خطا در اجرای workflow',
                 'details': str(e)
             }
+        finally:
+            self.active_workflows.pop(workflow_id, None)
     
     def parallel_execute(self, tasks: List[Dict[str, Any]], max_workers: Optional[int] = None) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -99,7 +210,7 @@ class OrchestratorCore:
         
         Args:
             tasks: لیست تسک‌ها برای اجرا
-            max_workers: حداکثر تعداد worker موازی
+            max_workers: حداکثر تعداد تسک هم‌زمان این فراخوانی
             
         Returns:
             Tuple[bool, Dict[str, Any]]: (موفقیت، نتایج/خطا)
@@ -108,8 +219,6 @@ class OrchestratorCore:
             if not tasks:
                 return True, {'results': []}
             
-            max_workers = max_workers or min(len(tasks), self.max_concurrent_tasks)
-            
             self.logger.info(
                 'Parallel execution started',
                 extra={
@@ -118,62 +227,8 @@ class OrchestratorCore:
                 }
             )
             
-            results = []
-            failed_tasks = []
-            
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # ارسال همه تسک‌ها برای اجرا
-                future_to_task = {
-                    executor.submit(self._execute_single_task, task): task 
-                    for task in tasks
-                }
-                
-                # جمع‌آوری نتایج
-                for future in as_completed(future_to_task, timeout=self.task_timeout):
-                    task = future_to_task[future]
-                    try:
-                        success, result = future.result()
-                        if success:
-                            results.append({
-                                'task_id': task.get('id', len(results)),
-                                'status': 'success',
-                                'result': result
-                            })
-                        else:
-                            failed_tasks.append({
-                                'task_id': task.get('id', len(results)),
-                                'status': 'failed',
-                                'error': result
-                            })
-                    except Exception as e:
-                        failed_tasks.append({
-                            'task_id': task.get('id', len(results)),
-                            'status': 'error',
-                            'error': str(e)
-                        })
-            
-            success = len(failed_tasks) == 0
-            
-            final_result = {
-                'total_tasks': len(tasks),
-                'successful_tasks': len(results),
-                'failed_tasks': len(failed_tasks),
-                'results': results
-            }
-            
-            if failed_tasks:
-                final_result['failures'] = failed_tasks
-            
-            self.logger.info(
-                'Parallel execution completed',
-                extra={
-                    'total_tasks': len(tasks),
-                    'successful': len(results),
-                    'failed': len(failed_tasks)
-                }
-            )
-            
-            return success, final_result
+            outcomes = list(self.iter_parallel_results(tasks, max_workers))
+            return self.summarize_parallel_results(tasks, outcomes)
             
         except Exception as e:
             self.logger.error(f"Parallel execution error: {str(e)}")
@@ -183,10 +238,214 @@ class OrchestratorCore:
                 'details': str(e)
             }
     
+    def iter_parallel_results(self, tasks: List[Dict[str, Any]], max_workers: Optional[int] = None):
+        """
+        اجرای موازی تسک‌ها روی pool مشترک و بازگرداندن نتیجه هر تسک به محض تکمیل
+        
+        حداکثر max_workers تسک هم‌زمان در جریان است و تسک بعدی فقط وقتی ارسال
+        می‌شود که مصرف‌کننده نتیجه قبلی را دریافت کرده باشد (back-pressure). مهلت هر
+        تسک (کلید timeout، حداکثر PARALLEL_MAX_TASK_TIMEOUT) از ارسال به pool حساب
+        می‌شود، پس تسکی که در صف pool مانده نیز منقضی می‌شود. پس از
+        PARALLEL_EXECUTION_TIMEOUT همه تسک‌های باقی‌مانده با وضعیت timeout گزارش
+        می‌شوند؛ تسک‌های منقضی لغو می‌شوند و thread خود را آزاد می‌کنند.
+        
+        Yields:
+            Dict[str, Any]: نتیجه یک تسک
+        """
+        window = max(1, max_workers or min(len(tasks), self.max_concurrent_tasks))
+        executor = get_task_executor()
+        queued = iter(enumerate(tasks))
+        in_flight = {}  # future -> (index, task, cancel_event)
+        submitted_at: Dict[int, float] = {}
+        started_at: Dict[int, float] = {}
+        run_deadline = time.monotonic() + self.parallel_timeout
+        
+        def submit_next() -> bool:
+            item = next(queued, None)
+            if item is None:
+                return False
+            index, task = item
+            cancel_event = threading.Event()
+            
+            def execute():
+                if cancel_event.is_set():
+                    return False, {'error': 'Task cancelled'}
+                started_at[index] = time.monotonic()
+                return self._execute_single_task(task, cancel_event)
+            
+            submitted_at[index] = time.monotonic()
+            in_flight[executor.submit(execute)] = (index, task, cancel_event)
+            return True
+        
+        def deadline(index: int, task: Dict[str, Any]) -> float:
+            return min(submitted_at[index] + self._task_deadline(task), run_deadline)
+        
+        while len(in_flight) < window and submit_next():
+            pass
+        
+        while in_flight:
+            wait_timeout = max(
+                min(deadline(index, task) for index, task, _ in in_flight.values()) - time.monotonic(), 0
+            )
+            done, _ = wait(list(in_flight), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            
+            outcomes = []
+            for future in done:
+                index, task, _ = in_flight.pop(future)
+                try:
+                    success, result = future.result()
+                except Exception as e:
+                    outcomes.append(self._task_outcome(index, task, 'error', str(e), started_at))
+                    continue
+                outcomes.append(self._task_outcome(
+                    index, task, 'success' if success else 'failed', result, started_at
+                ))
+            
+            # تسک‌های منقضی لغو می‌شوند و جای آن‌ها آزاد می‌شود
+            now = time.monotonic()
+            expired = now >= run_deadline
+            for future, (index, task, cancel_event) in list(in_flight.items()):
+                if now >= deadline(index, task):
+                    in_flight.pop(future)
+                    cancel_event.set()
+                    future.cancel()
+                    outcomes.append(self._task_outcome(
+                        index, task, 'timeout', self._timeout_error(task, expired), started_at
+                    ))
+            if expired:
+                # تسک‌های ارسال‌نشده دیگر شروع نمی‌شوند
+                outcomes.extend(
+                    self._task_outcome(index, task, 'timeout', self._timeout_error(task, True), started_at)
+                    for index, task in queued
+                )
+            
+            for outcome in outcomes:
+                yield outcome
+                submit_next()
+    
+    async def aiter_parallel_results(self, tasks: List[Dict[str, Any]], max_concurrency: Optional[int] = None):
+        """
+        نسخه asyncio اجرای موازی برای view های async (ASGI)
+        
+        تسک‌ها روی event loop اجرا می‌شوند و فقط کارهای blocking به pool مشترک
+        می‌روند، بنابراین هیچ threadی برای کندترین تسک نگه داشته نمی‌شود. تعداد
+        تسک‌های در حال اجرا یا منتظر مصرف حداکثر max_concurrency است؛ اگر کلاینت
+        کند بخواند، تسک جدیدی شروع نمی‌شود. مهلت‌ها مانند iter_parallel_results
+        محدود می‌شوند و تسکی که پس از پایان مهلت کل برسد بدون اجرا timeout می‌شود.
+        
+        Yields:
+            Dict[str, Any]: نتیجه یک تسک به ترتیب تکمیل
+        """
+        window = max(1, max_concurrency or min(len(tasks), self.max_concurrent_tasks))
+        slots = asyncio.Semaphore(window)
+        completed: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        run_deadline = loop.time() + self.parallel_timeout
+        
+        async def run(index: int, task: Dict[str, Any]):
+            started_at = {index: time.monotonic()}
+            timeout = min(self._task_deadline(task), run_deadline - loop.time())
+            try:
+                if timeout <= 0:
+                    raise asyncio.TimeoutError
+                success, result = await asyncio.wait_for(self._aexecute_single_task(task), timeout=timeout)
+                outcome = self._task_outcome(
+                    index, task, 'success' if success else 'failed', result, started_at
+                )
+            except asyncio.TimeoutError:
+                expired = timeout < self._task_deadline(task)
+                outcome = self._task_outcome(index, task, 'timeout', self._timeout_error(task, expired), started_at)
+            except Exception as e:
+                outcome = self._task_outcome(index, task, 'error', str(e), started_at)
+            await completed.put(outcome)
+        
+        async def launch():
+            for index, task in enumerate(tasks):
+                # جای خالی فقط پس از مصرف یک نتیجه آزاد می‌شود
+                await slots.acquire()
+                running.append(asyncio.ensure_future(run(index, task)))
+        
+        running: List[asyncio.Future] = []
+        launcher = asyncio.ensure_future(launch())
+        try:
+            for _ in range(len(tasks)):
+                outcome = await completed.get()
+                yield outcome
+                slots.release()
+        finally:
+            # قطع اتصال کلاینت: تسک‌های باقی‌مانده لغو می‌شوند
+            launcher.cancel()
+            for future in running:
+                future.cancel()
+    
+    def summarize_parallel_results(self, tasks: List[Dict[str, Any]], outcomes: List[Dict[str, Any]]) -> Tuple[bool, Dict[str, Any]]:
+        """تجمیع نتایج تسک‌ها در قالب پاسخ parallel_execute"""
+        results = [outcome for outcome in outcomes if outcome['status'] == 'success']
+        failed_tasks = [outcome for outcome in outcomes if outcome['status'] != 'success']
+        
+        final_result = {
+            'total_tasks': len(tasks),
+            'successful_tasks': len(results),
+            'failed_tasks': len(failed_tasks),
+            'results': results
+        }
+        
+        if failed_tasks:
+            final_result['failures'] = failed_tasks
+        
+        self.logger.info(
+            'Parallel execution completed',
+            extra={
+                'total_tasks': len(tasks),
+                'successful': len(results),
+                'failed': len(failed_tasks)
+            }
+        )
+        
+        return len(failed_tasks) == 0, final_result
+    
+    def _task_deadline(self, task: Dict[str, Any]) -> float:
+        """مهلت اجرای یک تسک (ثانیه)، محدود به PARALLEL_MAX_TASK_TIMEOUT"""
+        timeout = task.get('timeout')
+        if not _is_positive_number(timeout):
+            timeout = self.task_timeout
+        return min(timeout, self.max_task_timeout)
+    
+    def _task_duration(self, task: Dict[str, Any]) -> float:
+        """مدت شبیه‌سازی تسک compute (ثانیه)، محدود به PARALLEL_MAX_TASK_TIMEOUT"""
+        params = task.get('params')
+        duration = params.get('duration', 1) if isinstance(params, dict) else 1
+        if not _is_positive_number(duration):
+            duration = 0
+        return min(duration, self.max_task_timeout)
+    
+    def _timeout_error(self, task: Dict[str, Any], execution_expired: bool) -> Dict[str, Any]:
+        """جزئیات timeout یک تسک (مهلت خود تسک یا مهلت کل اجرا)"""
+        if execution_expired:
+            return {'timeout_seconds': self.parallel_timeout, 'execution_timeout': True}
+        return {'timeout_seconds': self._task_deadline(task)}
+    
+    def _task_outcome(self, index: int, task: Dict[str, Any], status: str, payload: Any,
+                      started_at: Dict[int, float]) -> Dict[str, Any]:
+        """ساخت نتیجه یک تسک"""
+        outcome = {
+            'task_id': task.get('id', index),
+            'status': status
+        }
+        if status == 'success':
+            outcome['result'] = payload
+        else:
+            outcome['error'] = payload
+        if index in started_at:
+            outcome['duration_seconds'] = round(time.monotonic() - started_at[index], 3)
+        return outcome
+    
     def monitor_workflow(self, workflow_id: str) -> Dict[str, Any]:
         """
         نظارت بر وضعیت workflow
         
+        وضعیت از مدل Workflow خوانده می‌شود و روی هر سروری قابل مشاهده است.
+        
         Args:
             workflow_id: شناسه workflow
             
@@ -194,36 +453,18 @@ class OrchestratorCore:
             Dict[str, Any]: وضعیت فعلی workflow
         """
         try:
-            if workflow_id not in self.active_workflows:
+            record = self._get_workflow_record(workflow_id)
+            if record is not None:
+                return self._describe_record(record)
+            
+            run = self.active_workflows.get(workflow_id)
+            if run is None:
                 return {
                     'status': 'not_found',
                     'message': 'workflow یافت نشد'
                 }
             
-            workflow = self.active_workflows[workflow_id]
-            
-            # محاسبه مدت زمان اجرا
-            start_time = workflow['start_time']
-            current_time = datetime.now()
-            duration = (current_time - start_time).total_seconds()
-            
-            status = {
-                'workflow_id': workflow_id,
-                'status': workflow['status'],
-                'start_time': start_time.isoformat(),
-                'duration_seconds': duration,
-                'steps_completed': len(workflow['steps_completed']),
-                'current_step': workflow['current_step']
-            }
-            
-            if 'end_time' in workflow:
-                status['end_time'] = workflow['end_time'].isoformat()
-                status['total_duration'] = (workflow['end_time'] - start_time).total_seconds()
-            
-            if 'error' in workflow:
-                status['error'] = workflow['error']
-            
-            return status
+            return self._describe_run(run)
             
         except Exception as e:
             self.logger.error(f"Workflow monitoring error: {str(e)}")
@@ -237,6 +478,9 @@ class OrchestratorCore:
         """
         لغو workflow در حال اجرا
         
+        وضعیت ماندگار به cancelled تغییر می‌کند؛ سروری که workflow را اجرا می‌کند
+        در بررسی دوره‌ای بعدی مراحل در حال اجرا را متوقف کرده و مرحله جدیدی شروع نمی‌کند.
+        
         Args:
             workflow_id: شناسه workflow
             
@@ -244,24 +488,37 @@ class OrchestratorCore:
             Tuple[bool, Dict[str, Any]]: (موفقیت، نتیجه)
         """
         try:
-            if workflow_id not in self.active_workflows:
+            run = self.active_workflows.get(workflow_id)
+            record = self._get_workflow_record(workflow_id)
+            
+            if record is None and run is None:
                 return False, {
                     'error': 'Workflow not found',
                     'message': 'workflow یافت نشد'
                 }
             
-            workflow = self.active_workflows[workflow_id]
+            if record is not None:
+                now = timezone.now()
+                cancelled = Workflow.objects.filter(
+                    pk=record.pk, status__in=['pending', 'running', 'paused']
+                ).update(status='cancelled', completed_at=now, updated_at=now)
+                current_status = record.status
+            else:
+                cancelled = run.status == 'running'
+                current_status = run.status
             
-            if workflow['status'] in ['completed', 'failed', 'cancelled']:
+            if not cancelled:
                 return False, {
                     'error': 'Workflow already finished',
                     'message': 'workflow قبلاً به پایان رسیده است',
-                    'current_status': workflow['status']
+                    'current_status': current_status
                 }
             
-            # تغییر وضعیت به cancelled
-            workflow['status'] = 'cancelled'
-            workflow['end_time'] = datetime.now()
+            # توقف فوری در صورتی که workflow روی همین پردازه اجرا می‌شود
+            if run is not None:
+                run.status = 'cancelled'
+                run.end_time = datetime.now()
+                run.cancel()
             
             self.logger.info(
                 'Workflow cancelled',
@@ -290,21 +547,15 @@ class OrchestratorCore:
             List[Dict[str, Any]]: لیست workflow های فعال
         """
         try:
-            active_list = []
-            
-            for workflow_id, workflow in self.active_workflows.items():
-                if workflow['status'] in ['running', 'paused']:
-                    start_time = workflow['start_time']
-                    duration = (datetime.now() - start_time).total_seconds()
-                    
-                    active_list.append({
-                        'workflow_id': workflow_id,
-                        'status': workflow['status'],
-                        'start_time': start_time.isoformat(),
-                        'duration_seconds': duration,
-                        'steps_completed': len(workflow['steps_completed']),
-                        'current_step': workflow['current_step']
-                    })
+            active_list = [
+                self._describe_record(record)
+                for record in Workflow.objects.filter(status__in=['running', 'paused'])
+            ]
+            
+            # workflow های بدون رکورد فقط روی همین پردازه قابل مشاهده‌اند
+            for run in list(self.active_workflows.values()):
+                if run.record is None and run.status in ['running', 'paused']:
+                    active_list.append(self._describe_run(run))
             
             return active_list
             
@@ -315,6 +566,9 @@ class OrchestratorCore:
     def _validate_workflow_config(self, config: Dict[str, Any]) -> bool:
         """
         اعتبارسنجی تنظیمات workflow
+        
+        نام مراحل باید یکتا باشد، depends_on فقط به مراحل موجود اشاره کند و
+        وابستگی‌ها حلقه نداشته باشند.
         """
         try:
             required_fields = ['steps']
@@ -335,105 +589,387 @@ class OrchestratorCore:
                 for field in required_step_fields:
                     if field not in step:
                         return False
+                
+                depends_on = step.get('depends_on', [])
+                if not isinstance(depends_on, list):
+                    return False
+                
+                timeout = step.get('timeout')
+                if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+                    return False
             
-            return True
+            names = [step['name'] for step in steps]
+            if len(set(names)) != len(names):
+                return False
+            
+            return self._topological_order(self._resolve_dependencies(steps)) is not None
             
         except Exception:
             return False
     
-    def _run_workflow_steps(self, workflow_id: str, config: Dict[str, Any], context: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    def _resolve_dependencies(self, steps: List[Dict[str, Any]]) -> Dict[str, List[str]]:
         """
-        اجرای مراحل workflow
+        استخراج وابستگی‌های هر مرحله
+        
+        اگر هیچ مرحله‌ای depends_on نداشته باشد، مراحل مانند قبل به ترتیب
+        (هر مرحله وابسته به مرحله قبلی) اجرا می‌شوند.
+        """
+        if not any('depends_on' in step for step in steps):
+            return {
+                step['name']: [steps[i - 1]['name']] if i else []
+                for i, step in enumerate(steps)
+            }
+        
+        return {step['name']: list(step.get('depends_on', [])) for step in steps}
+    
+    def _topological_order(self, dependencies: Dict[str, List[str]]) -> Optional[List[str]]:
+        """ترتیب توپولوژیک مراحل؛ در صورت وجود حلقه یا وابستگی ناشناخته None"""
+        remaining = {name: set(deps) for name, deps in dependencies.items()}
+        if any(dep not in remaining for deps in remaining.values() for dep in deps):
+            return None
+        
+        order = []
+        ready = [name for name, deps in remaining.items() if not deps]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, deps in remaining.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps:
+                        ready.append(other)
+        
+        return order if len(order) == len(remaining) else None
+    
+    def _collect_ancestors(self, dependencies: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """همه مراحل پیش‌نیاز (مستقیم و غیرمستقیم) هر مرحله به ترتیب توپولوژیک"""
+        order = self._topological_order(dependencies)
+        ancestors: Dict[str, set] = {}
+        for name in order:
+            collected = set(dependencies[name])
+            for dep in dependencies[name]:
+                collected |= ancestors[dep]
+            ancestors[name] = collected
+        
+        return {
+            name: [other for other in order if other in collected]
+            for name, collected in ancestors.items()
+        }
+    
+    def _run_workflow_steps(self, run: _WorkflowRun, config: Dict[str, Any], context: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """
+        اجرای مراحل workflow به صورت DAG
+        
+        هر مرحله به محض تکمیل پیش‌نیازهایش روی pool مشترک ارسال می‌شود، بنابراین
+        زمان کل برابر مسیر بحرانی است. هر مرحله timeout خود را دارد (پیش‌فرض
+        TASK_TIMEOUT) و در صورت خطا، timeout یا لغو، مراحل در حال اجرا از طریق
+        رویداد لغو به توقف همکارانه فراخوانده می‌شوند.
         """
         try:
-            steps = config['steps']
-            workflow = self.active_workflows[workflow_id]
-            results = []
+            steps = {step['name']: step for step in config['steps']}
+            dependencies = self._resolve_dependencies(config['steps'])
+            ancestors = self._collect_ancestors(dependencies)
             
-            for i, step in enumerate(steps):
-                if workflow['status'] == 'cancelled':
-                    break
-                
-                workflow['current_step'] = step['name']
+            pending = [step['name'] for step in config['steps']]
+            finished = set()
+            running = {}  # future -> نام مرحله
+            submitted_at: Dict[str, float] = {}
+            started_at: Dict[str, float] = {}
+            failure = None
+            next_poll = time.monotonic() + self.state_poll_interval
+            
+            while pending or running:
+                if failure is None and not run.cancel_event.is_set():
+                    for name in [n for n in pending if all(d in finished for d in dependencies[n])]:
+                        pending.remove(name)
+                        submitted_at[name] = time.monotonic()
+                        running[self._submit_step(run, steps[name], context, ancestors[name], started_at)] = name
+                        run.running_steps.append(name)
+                    self._persist_progress(run)
                 
-                self.logger.info(
-                    'Executing workflow step',
-                    extra={
-                        'workflow_id': workflow_id,
-                        'step_name': step['name'],
-                        'step_index': i
-                    }
-                )
+                if failure is not None or run.cancel_event.is_set() or not running:
+                    break
                 
-                # اجرای مرحله
-                step_success, step_result = self._execute_workflow_step(step, context, results)
+                # مرحله‌ای که هنوز شروع نشده زودتر از زمان ارسال + timeout منقضی نمی‌شود
+                now = time.monotonic()
+                deadlines = [
+                    started_at.get(name, submitted_at[name]) + steps[name].get('timeout', self.task_timeout)
+                    for name in running.values()
+                ]
+                wait_timeout = max(min(deadlines + [next_poll]) - now, 0)
+                done, _ = wait(list(running), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                if run.cancel_event.is_set():
+                    # نتیجه مراحلی که با رویداد لغو متوقف شده‌اند خطای مرحله نیست
+                    break
                 
-                results.append({
-                    'step_name': step['name'],
-                    'success': step_success,
-                    'result': step_result
-                })
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        step_success, step_result = future.result()
+                    except Exception as e:
+                        step_success, step_result = False, {'error': 'Step execution error', 'details': str(e)}
+                    failure = self._record_step_result(run, steps[name], step_success, step_result, started_at) or failure
+                    finished.add(name)
                 
-                workflow['steps_completed'].append(step['name'])
+                # مراحلی که از timeout خود گذشته‌اند متوقف و ناموفق ثبت می‌شوند
+                now = time.monotonic()
+                for future, name in list(running.items()):
+                    timeout = steps[name].get('timeout', self.task_timeout)
+                    if name in started_at and now - started_at[name] >= timeout:
+                        running.pop(future)
+                        run.step_events[name].set()
+                        step_result = {'error': 'Step timed out', 'timeout_seconds': timeout}
+                        failure = self._record_step_result(run, steps[name], False, step_result, started_at) or failure
+                        finished.add(name)
                 
-                if not step_success:
-                    # در صورت خطا، بررسی کنید که آیا workflow باید ادامه یابد یا نه
-                    if step.get('continue_on_error', False):
-                        self.logger.warning(
-                            'Step failed but continuing workflow',
-                            extra={
-                                'workflow_id': workflow_id,
-                                'step_name': step['name'],
-                                'error': step_result
-                            }
-                        )
-                        continue
-                    else:
-                        return False, {
-                            'error': 'Workflow step failed',
-                            'step_name': step['name'],
-                            'step_error': step_result,
-                            'completed_steps': results
-                        }
+                if now >= next_poll:
+                    next_poll = now + self.state_poll_interval
+                    if self._is_cancelled(run):
+                        run.status = 'cancelled'
+                        run.cancel()
+            
+            # توقف همکارانه مراحلی که هنوز در حال اجرا یا در صف هستند
+            for future, name in running.items():
+                future.cancel()
+                run.step_events[name].set()
+            run.running_steps = []
+            
+            if run.cancel_event.is_set() and failure is None:
+                run.status = 'cancelled'
+                self.logger.info(
+                    'Workflow stopped after cancellation',
+                    extra={'workflow_id': run.workflow_id, 'completed_steps': len(run.results)}
+                )
+                return False, {
+                    'error': 'Workflow cancelled',
+                    'message': 'workflow لغو شد',
+                    'status': 'cancelled',
+                    'completed_steps': run.results
+                }
+            
+            if failure is not None:
+                return False, {
+                    'error': 'Workflow step failed',
+                    'step_name': failure['step_name'],
+                    'step_error': failure['result'],
+                    'completed_steps': run.results
+                }
             
             # workflow با موفقیت تکمیل شد
             return True, {
-                'workflow_id': workflow_id,
+                'workflow_id': run.workflow_id,
                 'status': 'completed',
-                'steps_executed': len(results),
-                'results': results
+                'steps_executed': len(run.results),
+                'results': run.results
             }
             
         except Exception as e:
+            run.cancel()
             return False, {
                 'error': 'Workflow execution error',
                 'details': str(e)
             }
     
-    def _execute_workflow_step(self, step: Dict[str, Any], context: Dict[str, Any], previous_results: List[Dict]) -> Tuple[bool, Dict[str, Any]]:
+    def _submit_step(self, run: _WorkflowRun, step: Dict[str, Any], context: Dict[str, Any],
+                     ancestors: List[str], started_at: Dict[str, float]):
+        """ارسال یک مرحله به pool مشترک"""
+        name = step['name']
+        cancel_event = threading.Event()
+        run.step_events[name] = cancel_event
+        previous_results = [run.results_by_step[a] for a in ancestors if a in run.results_by_step]
+        
+        self.logger.info(
+            'Executing workflow step',
+            extra={
+                'workflow_id': run.workflow_id,
+                'step_name': name,
+                'depends_on': ancestors
+            }
+        )
+        
+        def execute():
+            # timeout از شروع واقعی اجرا حساب می‌شود، نه از زمان انتظار در صف pool
+            started_at[name] = time.monotonic()
+            if cancel_event.is_set():
+                return False, {'error': 'Step cancelled'}
+            return self._execute_workflow_step(step, context, previous_results, cancel_event)
+        
+        return self.executor.submit(execute)
+    
+    def _record_step_result(self, run: _WorkflowRun, step: Dict[str, Any], step_success: bool,
+                            step_result: Dict[str, Any], started_at: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """
+        ثبت نتیجه یک مرحله؛ اگر خطای مرحله باید workflow را متوقف کند، نتیجه برگردانده می‌شود
+        """
+        name = step['name']
+        entry = {
+            'step_name': name,
+            'success': step_success,
+            'result': step_result,
+        }
+        if name in started_at:
+            entry['duration_seconds'] = round(time.monotonic() - started_at[name], 3)
+        
+        run.results.append(entry)
+        run.results_by_step[name] = entry
+        run.completed_steps.append(name)
+        if name in run.running_steps:
+            run.running_steps.remove(name)
+        
+        if step_success:
+            return None
+        
+        # در صورت خطا، بررسی کنید که آیا workflow باید ادامه یابد یا نه
+        if step.get('continue_on_error', False):
+            self.logger.warning(
+                'Step failed but continuing workflow',
+                extra={
+                    'workflow_id': run.workflow_id,
+                    'step_name': name,
+                    'error': step_result
+                }
+            )
+            return None
+        
+        return entry
+    
+    def _persist_progress(self, run: _WorkflowRun):
+        """ذخیره پیشرفت اجرا در مدل Workflow؛ خروج از وضعیت running/paused به معنی لغو است"""
+        if run.record is None:
+            return
+        
+        try:
+            updated = Workflow.objects.filter(pk=run.record.pk, status__in=self.ACTIVE_STATUSES).update(
+                current_step=', '.join(run.running_steps)[:200],
+                completed_steps=list(run.completed_steps),
+                results={'results': run.results},
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                run.status = 'cancelled'
+                run.cancel()
+        except Exception as e:
+            self.logger.error(f"Workflow progress persistence error: {str(e)}")
+    
+    def _is_cancelled(self, run: _WorkflowRun) -> bool:
+        """بررسی لغو workflow (محلی یا از طریق وضعیت ذخیره‌شده توسط سرور دیگر)"""
+        if run.cancel_event.is_set():
+            return True
+        if run.record is None:
+            return False
+        
+        try:
+            status = Workflow.objects.filter(pk=run.record.pk).values_list('status', flat=True).first()
+        except Exception as e:
+            self.logger.error(f"Workflow status check error: {str(e)}")
+            return False
+        
+        return status not in self.ACTIVE_STATUSES
+    
+    def _finish_run_record(self, workflow, status: str, results: Optional[Dict[str, Any]] = None,
+                           error_message: str = ''):
+        """ذخیره وضعیت نهایی؛ workflow لغو شده بازنویسی نمی‌شود"""
+        if workflow is None:
+            return
+        
+        try:
+            now = timezone.now()
+            fields = {
+                'status': status,
+                'current_step': '',
+                'completed_at': now,
+                'updated_at': now,
+            }
+            if results is not None:
+                fields['results'] = results
+            if error_message:
+                fields['error_message'] = error_message
+            
+            Workflow.objects.filter(pk=workflow.pk, status__in=['pending', *self.ACTIVE_STATUSES]).update(**fields)
+        except Exception as e:
+            self.logger.error(f"Workflow state persistence error: {str(e)}")
+    
+    def _get_workflow_record(self, workflow_id: str):
+        """یافتن رکورد Workflow؛ شناسه‌های غیر UUID رکورد ندارند"""
+        try:
+            return Workflow.objects.filter(pk=workflow_id).first()
+        except (ValidationError, ValueError):
+            return None
+    
+    def _describe_record(self, record) -> Dict[str, Any]:
+        """خلاصه وضعیت یک رکورد Workflow"""
+        status = {
+            'workflow_id': str(record.id),
+            'status': record.status,
+            'start_time': record.started_at.isoformat() if record.started_at else None,
+            'duration_seconds': record.get_duration(),
+            'steps_completed': len(record.completed_steps or []),
+            'current_step': record.current_step or None
+        }
+        
+        if record.completed_at:
+            status['end_time'] = record.completed_at.isoformat()
+            status['total_duration'] = record.get_duration()
+        
+        if record.error_message:
+            status['error'] = record.error_message
+        
+        return status
+    
+    def _describe_run(self, run: _WorkflowRun) -> Dict[str, Any]:
+        """خلاصه وضعیت یک اجرای بدون رکورد در این پردازه"""
+        current_time = run.end_time or datetime.now()
+        status = {
+            'workflow_id': run.workflow_id,
+            'status': run.status,
+            'start_time': run.start_time.isoformat(),
+            'duration_seconds': (current_time - run.start_time).total_seconds(),
+            'steps_completed': len(run.completed_steps),
+            'current_step': ', '.join(run.running_steps) or None
+        }
+        
+        if run.end_time:
+            status['end_time'] = run.end_time.isoformat()
+            status['total_duration'] = status['duration_seconds']
+        
+        if run.error:
+            status['error'] = run.error
+        
+        return status
+    
+    def _execute_workflow_step(self, step: Dict[str, Any], context: Dict[str, Any], previous_results: List[Dict],
+                               cancel_event: Optional[threading.Event] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         اجرای یک مرحله از workflow
+        
+        previous_results نتایج مراحل پیش‌نیاز است و cancel_event برای توقف همکارانه
+        مراحل طولانی استفاده می‌شود. همه انواع مرحله رویداد لغو را دریافت می‌کنند تا
+        مرحله‌ای که از timeout خود گذشته یا لغو شده thread مشترک را آزاد کند.
         """
         try:
             step_type = step['type']
             step_params = step.get('params', {})
+            cancel_event = cancel_event or threading.Event()
             
-            # شبیه‌سازی اجرای انواع مختلف step
-            if step_type == 'text_processing':
-                return self._execute_text_processing_step(step_params, context)
-            elif step_type == 'speech_processing':
-                return self._execute_speech_processing_step(step_params, context)
-            elif step_type == 'api_call':
-                return self._execute_api_call_step(step_params, context)
-            elif step_type == 'data_validation':
-                return self._execute_validation_step(step_params, context)
-            elif step_type == 'delay':
-                return self._execute_delay_step(step_params)
-            else:
+            handlers = {
+                'text_processing': self._execute_text_processing_step,
+                'speech_processing': self._execute_speech_processing_step,
+                'api_call': self._execute_api_call_step,
+                'data_validation': self._execute_validation_step,
+                'delay': self._execute_delay_step,
+            }
+            handler = handlers.get(step_type)
+            if handler is None:
                 return False, {
                     'error': 'Unknown step type',
                     'step_type': step_type
                 }
+            
+            success, result = handler(step_params, context, cancel_event)
+            if cancel_event.is_set() and success:
+                # نتیجه پس از timeout یا لغو دیگر استفاده نمی‌شود
+                return False, {'error': 'Step cancelled'}
+            return success, result
                 
         except Exception as e:
             return False, {
@@ -441,18 +977,21 @@ class OrchestratorCore:
                 'details': str(e)
             }
     
-    def _execute_single_task(self, task: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    def _execute_single_task(self, task: Dict[str, Any],
+                             cancel_event: Optional[threading.Event] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         اجرای یک تسک منفرد
+        
+        با set شدن cancel_event (انقضای مهلت) انتظار تسک قطع و thread آزاد می‌شود.
         """
         try:
             task_type = task.get('type', 'unknown')
-            task_params = task.get('params', {})
             
             # شبیه‌سازی اجرای تسک
             if task_type == 'compute':
-                import time
-                time.sleep(task_params.get('duration', 1))  # شبیه‌سازی محاسبات
+                # شبیه‌سازی محاسبات
+                if (cancel_event or threading.Event()).wait(self._task_duration(task)):
+                    return False, {'error': 'Task cancelled'}
                 return True, {'computed_value': 42}
             elif task_type == 'fetch_data':
                 return True, {'data': f"fetched_data_{task.get('id', 'unknown')}"}
@@ -462,35 +1001,50 @@ class OrchestratorCore:
         except Exception as e:
             return False, {'error': str(e)}
     
-    def _execute_text_processing_step(self, params: Dict, context: Dict) -> Tuple[bool, Dict[str, Any]]:
+    async def _aexecute_single_task(self, task: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """
+        اجرای یک تسک منفرد روی event loop
+        
+        انتظارها با asyncio انجام می‌شوند و سایر کارها در pool مشترک اجرا می‌شوند.
+        """
+        task_type = task.get('type', 'unknown')
+        
+        if task_type == 'compute':
+            await asyncio.sleep(self._task_duration(task))  # شبیه‌سازی محاسبات
+            return True, {'computed_value': 42}
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_task_executor(), self._execute_single_task, task)
+    
+    def _execute_text_processing_step(self, params: Dict, context: Dict,
+                                      cancel_event: threading.Event) -> Tuple[bool, Dict[str, Any]]:
         """اجرای مرحله پردازش متن"""
         return True, {'text_processed': True, 'word_count': 100}
     
-    def _execute_speech_processing_step(self, params: Dict, context: Dict) -> Tuple[bool, Dict[str, Any]]:
+    def _execute_speech_processing_step(self, params: Dict, context: Dict,
+                                        cancel_event: threading.Event) -> Tuple[bool, Dict[str, Any]]:
         """اجرای مرحله پردازش صدا"""
         return True, {'audio_processed': True, 'duration': 30}
     
-    def _execute_api_call_step(self, params: Dict, context: Dict) -> Tuple[bool, Dict[str, Any]]:
+    def _execute_api_call_step(self, params: Dict, context: Dict,
+                               cancel_event: threading.Event) -> Tuple[bool, Dict[str, Any]]:
         """اجرای مرحله فراخوانی API"""
         return True, {'api_response': {'status': 'success'}}
     
-    def _execute_validation_step(self, params: Dict, context: Dict) -> Tuple[bool, Dict[str, Any]]:
+    def _execute_validation_step(self, params: Dict, context: Dict,
+                                 cancel_event: threading.Event) -> Tuple[bool, Dict[str, Any]]:
         """اجرای مرحله اعتبارسنجی"""
         return True, {'validation_passed': True}
     
-    def _execute_delay_step(self, params: Dict) -> Tuple[bool, Dict[str, Any]]:
+    def _execute_delay_step(self, params: Dict, context: Dict,
+                            cancel_event: threading.Event) -> Tuple[bool, Dict[str, Any]]:
         """اجرای مرحله تاخیر"""
-        import time
         delay_seconds = params.get('seconds', 1)
-        time.sleep(delay_seconds)
+        if cancel_event.wait(delay_seconds):
+            return False, {'error': 'Step cancelled', 'delayed_seconds': delay_seconds}
         return True, {'delayed_seconds': delay_seconds}
     
     def _generate_workflow_id(self) -> str:
         """تولید شناسه یکتا برای workflow"""
         import uuid
         return f"wf_{uuid.uuid4().hex[:8]}"
-    
-    def _schedule_workflow_cleanup(self, workflow_id: str, delay_minutes: int = 60):
-        """زمان‌بندی پاکسازی workflow"""
-        # در عمل باید با Celery یا سیستم queue مناسب پیاده‌سازی شود
-        pass
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+بنچمارک موتور مشترک محدودیت نرخ
+Microbenchmark of the shared GCRA rate limiter against the timestamp-list limiter
+"""
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from app_standards.rate_limiting import LocalMemoryBackend, RateLimiter, RedisBackend
+
+
+def legacy_sliding_window(cache, key: str, limit: int, window: int) -> bool:
+    """پیاده‌سازی قبلی میان‌افزار چت‌بات (بازنویسی کل فهرست timestampها در هر درخواست)"""
+    current_time = int(time.time())
+    window_start = current_time - window
+    recent_requests = [t for t in cache.get(key, []) if t > window_start]
+    if len(recent_requests) >= limit:
+        return False
+    recent_requests.append(current_time)
+    cache.set(key, recent_requests, window + 60)
+    return True
+
+
+class Command(BaseCommand):
+    """
+    اندازه‌گیری هزینهٔ هر بررسی برای سقف‌های مختلف؛ هزینهٔ GCRA باید ثابت بماند
+    """
+    help = 'بنچمارک هزینهٔ هر بررسی محدودیت نرخ به ازای سقف‌های مختلف'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limits',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='سقف‌های مورد آزمایش',
+        )
+        parser.add_argument(
+            '--checks',
+            type=int,
+            default=20000,
+            help='تعداد بررسی برای هر سقف',
+        )
+        parser.add_argument(
+            '--redis-url',
+            default='',
+            help='اجرای بنچمارک روی backend Redis نیز',
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='اجرا نکردن پیاده‌سازی قبلی',
+        )
+
+    def handle(self, *args, **options):
+        checks = options['checks']
+        backends = [('gcra/local', RateLimiter(LocalMemoryBackend()))]
+        if options['redis_url']:
+            backends.append(('gcra/redis', RateLimiter(RedisBackend(options['redis_url']))))
+
+        for limit in options['limits']:
+            # پنجره طولانی تا سهمیه در طول اجرا پر بماند (بدترین حالت برای فهرست timestampها)
+            window = 86400
+            for name, limiter in backends:
+                key = f'benchmark:{limit}'
+                limiter.reset(key)
+                started = time.perf_counter()
+                for _ in range(checks):
+                    limiter.check(key, limit, window)
+                elapsed = time.perf_counter() - started
+                self._write(name, limit, elapsed, checks)
+
+            if options['skip_legacy']:
+                continue
+
+            cache = caches['default']
+            key = f'benchmark:legacy:{limit}'
+            cache.delete(key)
+            started = time.perf_counter()
+            for _ in range(checks):
+                legacy_sliding_window(cache, key, limit, window)
+            elapsed = time.perf_counter() - started
+            self._write('legacy/list', limit, elapsed, checks)
+
+    def _write(self, name: str, limit: int, elapsed: float, checks: int):
+        self.stdout.write(
+            f'{name:<12} limit={limit:<7} {elapsed / checks * 1e6:8.2f} µs/check'
+        )
@@ -185,8 +185,10 @@ class APIRequest(models.Model):
         verbose_name='پیام خطا'
     )
     
+    # زمان دریافت هنگام ساخت نمونه ثبت می‌شود، نه هنگام ذخیرهٔ تأخیری در ژورنال
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name='زمان دریافت'
     )
     
@@ -210,8 +212,8 @@ class APIRequest(models.Model):
     def __str__(self):
         return f"{self.method} {self.path} - {self.status}"
     
-    def mark_completed(self, response_status: int, response_body: dict = None):
-        """نشان‌گذاری درخواست به عنوان تکمیل شده"""
+    def mark_completed(self, response_status: int, response_body: dict = None, commit: bool = True):
+        """نشان‌گذاری درخواست به عنوان تکمیل شده (commit=False برای ثبت از طریق ژورنال)"""
         self.status = 'completed'
         self.response_status = response_status
         self.response_body = response_body or {}
@@ -220,10 +222,11 @@ class APIRequest(models.Model):
         if self.created_at:
             self.processing_time = (self.completed_at - self.created_at).total_seconds()
         
-        self.save()
+        if commit:
+            self.save()
     
-    def mark_failed(self, error_message: str, response_status: int = 500):
-        """نشان‌گذاری درخواست به عنوان ناموفق"""
+    def mark_failed(self, error_message: str, response_status: int = 500, commit: bool = True):
+        """نشان‌گذاری درخواست به عنوان ناموفق (commit=False برای ثبت از طریق ژورنال)"""
         self.status = 'failed'
         self.error_message = error_message
         self.response_status = response_status
@@ -232,7 +235,8 @@ class APIRequest(models.Model):
         if self.created_at:
             self.processing_time = (self.completed_at - self.created_at).total_seconds()
         
-        self.save()
+        if commit:
+            self.save()
 
 
 class Workflow(models.Model):
@@ -6,8 +6,11 @@
 
 from .core_service import APIGatewayService
 from .helpers import GatewayHelpers
+from .request_journal import RequestJournal, get_request_journal
 
 __all__ = [
     'APIGatewayService',
-    'GatewayHelpers'
+    'GatewayHelpers',
+    'RequestJournal',
+    'get_request_journal'
 ]
\ No newline at end of file
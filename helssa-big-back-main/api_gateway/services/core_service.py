@@ -6,11 +6,14 @@ from typing import Dict, Tuple, Any, Optional
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
 from rest_framework.request import Request
 
 from ..cores import APIIngressCore, TextProcessorCore, SpeechProcessorCore, OrchestratorCore
 from ..models import APIRequest, Workflow, RateLimitTracker
 from .helpers import GatewayHelpers
+from .request_journal import get_request_journal
 
 
 User = get_user_model()
@@ -32,6 +35,7 @@ class APIGatewayService:
         self.speech_processor = SpeechProcessorCore()
         self.orchestrator = OrchestratorCore()
         self.helpers = GatewayHelpers()
+        self.request_journal = get_request_journal()
         
         # تنظیمات rate limiting
         self.rate_limit_enabled = getattr(settings, 'API_GATEWAY_RATE_LIMIT_ENABLED', True)
@@ -41,6 +45,9 @@ class APIGatewayService:
         """
         پردازش کامل یک درخواست API
         
+        لاگ درخواست فقط در حافظه به‌روزرسانی و پس از پایان پردازش یک بار به
+        ژورنال تأخیری سپرده می‌شود؛ هیچ نوشتنی در دیتابیس در مسیر درخواست نیست.
+        
         Args:
             request: درخواست HTTP ورودی
             
@@ -58,7 +65,8 @@ class APIGatewayService:
             if not valid:
                 api_request.mark_failed(
                     error_message=ingress_result.get('message', 'Validation failed'),
-                    response_status=400
+                    response_status=400,
+                    commit=False
                 )
                 return False, ingress_result
             
@@ -68,7 +76,8 @@ class APIGatewayService:
                 if not rate_check[0]:
                     api_request.mark_failed(
                         error_message='Rate limit exceeded',
-                        response_status=429
+                        response_status=429,
+                        commit=False
                     )
                     return False, rate_check[1]
             
@@ -79,7 +88,6 @@ class APIGatewayService:
             processor_type, routing_config = self.ingress_core.route_request(request, metadata)
             api_request.processor_type = processor_type
             api_request.status = 'processing'
-            api_request.save()
             
             # مرحله 5: انجام پردازش اصلی
             processing_result = self._execute_processing(
@@ -90,7 +98,8 @@ class APIGatewayService:
                 # موفق
                 api_request.mark_completed(
                     response_status=200,
-                    response_body=processing_result[1]
+                    response_body=processing_result[1],
+                    commit=False
                 )
                 
                 self.logger.info(
@@ -107,7 +116,8 @@ class APIGatewayService:
                 # ناموفق
                 api_request.mark_failed(
                     error_message=processing_result[1].get('message', 'Processing failed'),
-                    response_status=processing_result[1].get('status_code', 500)
+                    response_status=processing_result[1].get('status_code', 500),
+                    commit=False
                 )
                 return False, processing_result[1]
                 
@@ -117,7 +127,8 @@ class APIGatewayService:
             if api_request:
                 api_request.mark_failed(
                     error_message=str(e),
-                    response_status=500
+                    response_status=500,
+                    commit=False
                 )
             
             return False, {
@@ -125,6 +136,10 @@ class APIGatewayService:
                 'message': 'خطای داخلی سرور',
                 'details': str(e) if settings.DEBUG else None
             }
+        
+        finally:
+            if api_request is not None:
+                self._journal_api_request(request, api_request)
     
     def process_text(self, text: str, options: Optional[Dict[str, Any]] = None, user=None) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -306,25 +321,34 @@ class APIGatewayService:
                 }
             )
             
-            # اجرای workflow توسط Orchestrator Core
-            result = self.orchestrator.execute_workflow(workflow_config, context)
+            # اجرای workflow توسط Orchestrator Core؛ وضعیت اجرا در همین رکورد ذخیره می‌شود
+            result = self.orchestrator.execute_workflow(workflow_config, context, workflow=workflow)
+            
+            workflow.refresh_from_db()
+            if workflow.status == 'running':
+                # orchestrator وضعیت نهایی را ثبت نکرده است
+                if result[0]:
+                    workflow.complete(result[1])
+                else:
+                    workflow.fail(result[1].get('message', 'Workflow failed'))
             
             if result[0]:
-                workflow.complete(result[1])
                 self.logger.info(
                     'Workflow completed successfully',
                     extra={'workflow_id': str(workflow.id)}
                 )
             else:
-                workflow.fail(result[1].get('message', 'Workflow failed'))
                 self.logger.error(
                     'Workflow failed',
-                    extra={'workflow_id': str(workflow.id), 'error': result[1]}
+                    extra={
+                        'workflow_id': str(workflow.id),
+                        'status': workflow.status,
+                        'error': result[1]
+                    }
                 )
             
             # اضافه کردن workflow_id به نتیجه
-            if result[0]:
-                result[1]['workflow_id'] = str(workflow.id)
+            result[1]['workflow_id'] = str(workflow.id)
             
             return result
             
@@ -375,6 +399,41 @@ class APIGatewayService:
                 'details': str(e)
             }
     
+    async def stream_parallel_execute(self, tasks: list, max_concurrency: Optional[int] = None, user=None):
+        """
+        اجرای موازی تسک‌ها با ارسال نتیجه هر تسک به محض تکمیل
+        
+        Args:
+            tasks: لیست تسک‌ها
+            max_concurrency: حداکثر تسک‌های هم‌زمان (و نتایج منتظر ارسال)
+            user: کاربر درخواست‌کننده
+            
+        Yields:
+            Dict[str, Any]: نتیجه هر تسک و در پایان خلاصه اجرا با type=summary
+        """
+        self.logger.info(
+            'Streaming parallel execution started',
+            extra={
+                'tasks_count': len(tasks),
+                'max_concurrency': max_concurrency,
+                'user_id': str(user.id) if user else None
+            }
+        )
+        
+        outcomes = []
+        async for outcome in self.orchestrator.aiter_parallel_results(tasks, max_concurrency):
+            outcomes.append(outcome)
+            yield {'type': 'result', **outcome}
+        
+        success, summary = self.orchestrator.summarize_parallel_results(tasks, outcomes)
+        yield {
+            'type': 'summary',
+            'success': success,
+            'total_tasks': summary['total_tasks'],
+            'successful_tasks': summary['successful_tasks'],
+            'failed_tasks': summary['failed_tasks']
+        }
+    
     def get_health_status(self, detailed: bool = False) -> Dict[str, Any]:
         """
         دریافت وضعیت سلامت سیستم
@@ -414,7 +473,8 @@ class APIGatewayService:
                     status['stats'] = {
                         'active_workflows': len(self.orchestrator.get_active_workflows()),
                         'total_requests_today': self._get_requests_count_today(),
-                        'average_response_time': self._get_average_response_time()
+                        'average_response_time': self._get_average_response_time(),
+                        'request_journal': self.request_journal.stats()
                     }
                 except Exception as e:
                     status['stats_error'] = str(e)
@@ -429,33 +489,57 @@ class APIGatewayService:
             }
     
     def _create_api_request_log(self, request: Request) -> APIRequest:
-        """ایجاد لاگ درخواست API"""
+        """ایجاد لاگ درخواست API (فقط در حافظه؛ ذخیره توسط ژورنال انجام می‌شود)"""
         try:
             # استخراج IP
             ip_address = self.helpers.get_client_ip(request)
             
             # ایجاد رکورد
-            api_request = APIRequest.objects.create(
+            return APIRequest(
                 user=request.user if request.user.is_authenticated else None,
                 method=request.method,
                 path=request.path,
                 ip_address=ip_address,
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                request_headers=self._extract_safe_headers(request),
-                request_body=self._extract_safe_body(request)
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
             )
             
-            return api_request
-            
         except Exception as e:
             self.logger.error(f"Failed to create API request log: {str(e)}")
-            # در صورت خطا، یک instance ساختگی برمی‌گردانیم
             return APIRequest(
                 method=request.method,
                 path=request.path,
                 ip_address='unknown'
             )
     
+    def _journal_api_request(self, request: Request, api_request: APIRequest):
+        """
+        سپردن لاگ نهایی درخواست به ژورنال
+        
+        headers و بدنه‌ها فقط برای نمونه‌ای از درخواست‌ها ذخیره می‌شوند؛ برای
+        درخواست‌های ناموفق headers و بدنهٔ درخواست همیشه نگه داشته می‌شوند.
+        """
+        try:
+            try:
+                validate_ipv46_address(api_request.ip_address)
+            except ValidationError:
+                # رکورد بدون IP معتبر قابل ذخیره نیست و دستهٔ ژورنال را خراب می‌کند
+                self.logger.warning(
+                    f"Skipping request log with invalid IP: {api_request.ip_address}"
+                )
+                return
+            
+            sampled = self.request_journal.should_capture_payload()
+            if sampled or api_request.status == 'failed':
+                api_request.request_headers = self._extract_safe_headers(request)
+                api_request.request_body = self._extract_safe_body(request)
+            if not sampled:
+                api_request.response_body = {}
+            
+            self.request_journal.record(api_request)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to journal API request: {str(e)}")
+    
     def _check_rate_limit(self, request: Request, api_request: APIRequest) -> Tuple[bool, Dict[str, Any]]:
         """بررسی محدودیت نرخ درخواست"""
         try:
@@ -0,0 +1,134 @@
+"""
+ژورنال تأخیری (write-behind) لاگ درخواست‌های API Gateway
+"""
+import logging
+import random
+from collections import deque
+from typing import Any, Dict, List
+
+from django.db import transaction
+
+from app_standards.batch_writer import BackgroundBatchWriter, ProcessWriter
+
+from ..models import APIRequest
+from ..settings import API_GATEWAY_SETTINGS
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestJournal(BackgroundBatchWriter):
+    """
+    بافر حلقوی درون‌حافظه‌ای برای لاگ درخواست‌ها
+
+    مسیر درخواست فقط رکورد را به بافر اضافه می‌کند و هیچ پرس‌وجوی دیتابیسی
+    انجام نمی‌دهد؛ یک thread پس‌زمینه رکوردها را دسته‌ای با bulk_create ذخیره
+    می‌کند. ظرفیت بافر سقف رکوردهایی است که در صورت crash از دست می‌روند؛
+    رکوردهای کنارگذاشته‌شده در زمان سرریز شمرده و گزارش می‌شوند.
+    """
+
+    thread_name = 'api-gateway-request-journal'
+    drop_message = 'Request journal dropped entries'
+
+    def __init__(self, capacity: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, payload_sample_rate: float = 0.01):
+        """
+        Args:
+            capacity: حداکثر رکوردهای در انتظار ذخیره در هر پردازه
+            batch_size: اندازهٔ هر دستهٔ bulk_create
+            flush_interval: فاصلهٔ ذخیرهٔ دوره‌ای (ثانیه)
+            payload_sample_rate: نسبت درخواست‌هایی که headers و بدنه‌شان ذخیره می‌شود
+        """
+        self.payload_sample_rate = payload_sample_rate
+        super().__init__(capacity, batch_size, flush_interval)
+
+    def _reset(self):
+        super()._reset()
+        self._buffer: deque = deque()
+        self._failed_flushes = 0
+
+    def should_capture_payload(self) -> bool:
+        """آیا headers و بدنهٔ این درخواست ذخیره شود؟ (نمونه‌برداری)"""
+        return random.random() < self.payload_sample_rate
+
+    def record(self, entry: APIRequest):
+        """افزودن رکورد به بافر (بدون دسترسی به دیتابیس)"""
+        with self._lock:
+            pending = self._append(self._buffer, entry)
+        self._submitted(pending)
+
+    def flush(self) -> int:
+        """ذخیرهٔ همهٔ رکوردهای در انتظار؛ تعداد رکوردهای ذخیره‌شده را برمی‌گرداند"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                try:
+                    with transaction.atomic():
+                        APIRequest.objects.bulk_create(batch, batch_size=self.batch_size)
+                    written += len(batch)
+                except Exception as e:
+                    self._failed_flushes += 1
+                    logger.error(f"Request journal flush failed: {str(e)}")
+                    saved = self._write_individually(batch)
+                    written += saved
+                    if not saved:
+                        # دیتابیس در دسترس نیست؛ تلاش مجدد در دور بعد
+                        self._requeue(batch)
+                        break
+            self._written += written
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار ژورنال برای health check"""
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            **super().stats(),
+            'pending': pending,
+            'failed_flushes': self._failed_flushes,
+            'payload_sample_rate': self.payload_sample_rate,
+        }
+
+    def _take_batch(self) -> List[APIRequest]:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _write_individually(self, batch: List[APIRequest]) -> int:
+        """جداسازی رکوردهای نامعتبر پس از شکست دسته؛ رکوردهای خراب کنار گذاشته می‌شوند"""
+        saved = 0
+        rejected = 0
+        for entry in batch:
+            try:
+                with transaction.atomic():
+                    APIRequest.objects.bulk_create([entry])
+                saved += 1
+            except Exception:
+                rejected += 1
+        if saved:
+            self._count_dropped(rejected)
+        return saved
+
+    def _requeue(self, batch: List[APIRequest]):
+        """بازگرداندن دستهٔ ناموفق به ابتدای بافر تا سقف ظرفیت"""
+        with self._lock:
+            room = self.capacity - len(self._buffer)
+            keep = batch[len(batch) - room:] if room < len(batch) else batch
+            self._dropped += len(batch) - len(keep)
+            self._buffer.extendleft(reversed(keep))
+
+
+_journal = ProcessWriter(lambda: RequestJournal(
+    capacity=API_GATEWAY_SETTINGS['JOURNAL_CAPACITY'],
+    batch_size=API_GATEWAY_SETTINGS['JOURNAL_BATCH_SIZE'],
+    flush_interval=API_GATEWAY_SETTINGS['JOURNAL_FLUSH_INTERVAL'],
+    payload_sample_rate=API_GATEWAY_SETTINGS['JOURNAL_PAYLOAD_SAMPLE_RATE'],
+))
+
+
+def get_request_journal() -> RequestJournal:
+    """ژورنال مشترک درخواست‌های این پردازه"""
+    return _journal.get()
@@ -42,6 +42,12 @@ API_GATEWAY_SETTINGS = {
     'LOG_SENSITIVE_DATA': False,
     'LOG_RETENTION_DAYS': 30,
     
+    # ژورنال تأخیری لاگ درخواست‌ها (هر پردازه)
+    'JOURNAL_CAPACITY': 10000,  # سقف رکوردهای در انتظار (حداکثر از دست رفته در crash)
+    'JOURNAL_BATCH_SIZE': 500,
+    'JOURNAL_FLUSH_INTERVAL': 1.0,  # ثانیه
+    'JOURNAL_PAYLOAD_SAMPLE_RATE': 0.01,  # نسبت درخواست‌های با headers و بدنهٔ کامل
+    
     # تنظیمات امنیتی
     'ENABLE_REQUEST_VALIDATION': True,
     'ENABLE_RESPONSE_SANITIZATION': True,
@@ -0,0 +1,142 @@
+"""
+تست‌های اجرای DAG مراحل workflow در OrchestratorCore
+"""
+import threading
+import time
+
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..cores.orchestrator import OrchestratorCore
+from ..models import UnifiedUser, Workflow
+
+
+def delay(name, seconds, **extra):
+    return {'name': name, 'type': 'delay', 'params': {'seconds': seconds}, **extra}
+
+
+class WorkflowGraphTest(SimpleTestCase):
+    """تست ترتیب اجرا و اعتبارسنجی وابستگی‌ها"""
+
+    def setUp(self):
+        self.orchestrator = OrchestratorCore()
+
+    def _order(self, result):
+        return [entry['step_name'] for entry in result['results']]
+
+    def test_independent_steps_run_concurrently(self):
+        """مراحل مستقل هم‌زمان و مرحله وابسته پس از همه پیش‌نیازها اجرا می‌شود"""
+        config = {'steps': [
+            delay('a', 0.3, depends_on=[]),
+            delay('b', 0.3, depends_on=[]),
+            {'name': 'c', 'type': 'data_validation', 'depends_on': ['a', 'b']},
+        ]}
+
+        started = time.monotonic()
+        success, result = self.orchestrator.execute_workflow(config)
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(success)
+        self.assertEqual(sorted(self._order(result)[:2]), ['a', 'b'])
+        self.assertEqual(self._order(result)[2], 'c')
+        self.assertLess(elapsed, 0.55)
+
+    def test_sequential_without_depends_on(self):
+        """بدون depends_on مراحل به ترتیب تعریف اجرا می‌شوند"""
+        config = {'steps': [delay('a', 0.05), delay('b', 0), {'name': 'c', 'type': 'api_call'}]}
+
+        success, result = self.orchestrator.execute_workflow(config)
+
+        self.assertTrue(success)
+        self.assertEqual(self._order(result), ['a', 'b', 'c'])
+
+    def test_invalid_graphs_rejected(self):
+        """حلقه، وابستگی ناشناخته و نام تکراری رد می‌شوند"""
+        invalid = [
+            [delay('a', 0, depends_on=['b']), delay('b', 0, depends_on=['a'])],
+            [delay('a', 0, depends_on=['a'])],
+            [delay('a', 0, depends_on=['missing'])],
+            [delay('a', 0), delay('a', 0)],
+        ]
+        for steps in invalid:
+            with self.subTest(steps=steps):
+                self.assertFalse(self.orchestrator._validate_workflow_config({'steps': steps}))
+
+        success, result = self.orchestrator.execute_workflow({'steps': invalid[0]})
+        self.assertFalse(success)
+        self.assertEqual(result['error'], 'Invalid workflow config')
+
+    def test_step_timeout_releases_thread(self):
+        """مرحله‌ای که از timeout خود می‌گذرد ناموفق ثبت و thread آن آزاد می‌شود"""
+        released = threading.Event()
+
+        def slow_api_call(params, context, cancel_event):
+            cancel_event.wait(5)
+            released.set()
+            return True, {'api_response': {}}
+
+        self.orchestrator._execute_api_call_step = slow_api_call
+        config = {'steps': [{'name': 'slow', 'type': 'api_call', 'timeout': 0.2}]}
+
+        started = time.monotonic()
+        success, result = self.orchestrator.execute_workflow(config)
+
+        self.assertFalse(success)
+        self.assertEqual(result['step_error']['error'], 'Step timed out')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(released.wait(1))
+
+    def test_continue_on_error(self):
+        """خطای مرحله با continue_on_error اجرای مراحل بعدی را متوقف نمی‌کند"""
+        config = {'steps': [
+            {'name': 'bad', 'type': 'unknown', 'continue_on_error': True},
+            {'name': 'next', 'type': 'text_processing'},
+        ]}
+
+        success, result = self.orchestrator.execute_workflow(config)
+
+        self.assertTrue(success)
+        self.assertEqual([entry['success'] for entry in result['results']], [False, True])
+
+
+class WorkflowStateTest(TransactionTestCase):
+    """تست لغو و توقف موقت از طریق وضعیت ماندگار Workflow"""
+
+    def setUp(self):
+        self.user = UnifiedUser.objects.create(username='09120000000')
+        self.orchestrator = OrchestratorCore()
+        self.orchestrator.state_poll_interval = 0.05
+
+    def _workflow(self, steps):
+        return Workflow.objects.create(name='test', user=self.user, config={'steps': steps})
+
+    def _later(self, seconds, action):
+        timer = threading.Timer(seconds, action)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_cancel_from_another_server(self):
+        """لغو از پردازهٔ دیگر مرحله در حال اجرا را متوقف می‌کند"""
+        workflow = self._workflow([delay('a', 5), delay('b', 0)])
+        self._later(0.2, lambda: OrchestratorCore().cancel_workflow(str(workflow.id)))
+
+        started = time.monotonic()
+        success, result = self.orchestrator.execute_workflow(workflow.config, workflow=workflow)
+
+        self.assertFalse(success)
+        self.assertEqual(result['status'], 'cancelled')
+        self.assertLess(time.monotonic() - started, 2)
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.status, 'cancelled')
+        self.assertEqual(workflow.completed_steps, [])
+
+    def test_paused_is_not_cancelled(self):
+        """وضعیت paused به معنی لغو نیست و workflow تکمیل می‌شود"""
+        workflow = self._workflow([delay('a', 0.3), delay('b', 0.1)])
+        self._later(0.1, lambda: Workflow.objects.filter(pk=workflow.pk).update(status='paused'))
+
+        success, result = self.orchestrator.execute_workflow(workflow.config, workflow=workflow)
+
+        self.assertTrue(success, result)
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.status, 'completed')
+        self.assertEqual(workflow.completed_steps, ['a', 'b'])
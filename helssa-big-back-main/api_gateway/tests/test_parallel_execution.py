@@ -0,0 +1,137 @@
+"""
+تست‌های اجرای موازی تسک‌ها: سقف مهلت‌ها، مهلت کل و view جریانی
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import views
+from ..cores import orchestrator as orchestrator_module
+from ..cores.orchestrator import OrchestratorCore
+
+
+def compute(task_id, duration, **extra):
+    return {'id': task_id, 'type': 'compute', 'params': {'duration': duration}, **extra}
+
+
+async def _collect(results):
+    return [item async for item in results]
+
+
+class ParallelIteratorTest(SimpleTestCase):
+    """تست iter_parallel_results روی pool اختصاصی"""
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown, wait=False)
+        patcher = mock.patch.object(orchestrator_module, 'get_task_executor', return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(PARALLEL_MAX_TASK_TIMEOUT=0.2)
+    def test_timeout_and_duration_clamped(self):
+        """timeout و duration کاربر به سقف تنظیمات محدود می‌شوند"""
+        orchestrator = OrchestratorCore()
+        self.assertEqual(orchestrator._task_deadline({'timeout': 1000}), 0.2)
+        self.assertEqual(orchestrator._task_deadline({'timeout': 'x'}), 0.2)
+        self.assertEqual(orchestrator._task_duration({'params': {'duration': 1000}}), 0.2)
+        self.assertEqual(orchestrator._task_duration({'params': {'duration': -5}}), 0)
+
+        started = time.monotonic()
+        outcomes = list(orchestrator.iter_parallel_results([compute(1, 30, timeout=1000)]))
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(outcomes), 1)
+
+    def test_timed_out_task_releases_thread(self):
+        """تسک منقضی لغو می‌شود و thread آن برای تسک بعدی آزاد است"""
+        orchestrator = OrchestratorCore()
+
+        outcomes = list(orchestrator.iter_parallel_results([compute(1, 30, timeout=0.2)]))
+
+        self.assertEqual(outcomes[0]['status'], 'timeout')
+        self.assertEqual(outcomes[0]['error'], {'timeout_seconds': 0.2})
+        self.assertEqual(self.executor.submit(lambda: 'free').result(timeout=1), 'free')
+
+    def test_queued_task_times_out(self):
+        """تسکی که در صف pool مانده و شروع نشده iterator را معطل نمی‌کند"""
+        blocker = threading.Event()
+        self.addCleanup(blocker.set)
+        self.executor.submit(blocker.wait, 5)
+        orchestrator = OrchestratorCore()
+
+        started = time.monotonic()
+        outcomes = list(orchestrator.iter_parallel_results([compute(1, 0, timeout=0.2)]))
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(outcomes[0]['status'], 'timeout')
+        self.assertNotIn('duration_seconds', outcomes[0])
+
+    @override_settings(PARALLEL_EXECUTION_TIMEOUT=0.3)
+    def test_execution_deadline_reports_remaining_tasks(self):
+        """پس از مهلت کل، تسک‌های در جریان و ارسال‌نشده همگی timeout می‌شوند"""
+        orchestrator = OrchestratorCore()
+        tasks = [compute(index, 30) for index in range(4)]
+
+        started = time.monotonic()
+        outcomes = list(orchestrator.iter_parallel_results(tasks, max_workers=1))
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(sorted(outcome['task_id'] for outcome in outcomes), [0, 1, 2, 3])
+        for outcome in outcomes:
+            self.assertEqual(outcome['status'], 'timeout')
+            self.assertTrue(outcome['error']['execution_timeout'])
+
+    @override_settings(PARALLEL_EXECUTION_TIMEOUT=0.3)
+    def test_async_execution_deadline(self):
+        """نسخه async نیز پس از مهلت کل همه تسک‌ها را گزارش می‌کند"""
+        orchestrator = OrchestratorCore()
+        tasks = [compute(index, 30) for index in range(4)]
+
+        started = time.monotonic()
+        outcomes = async_to_sync(_collect)(orchestrator.aiter_parallel_results(tasks, max_concurrency=2))
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(len(outcomes), 4)
+        self.assertTrue(all(outcome['status'] == 'timeout' for outcome in outcomes))
+
+
+class ParallelStreamViewTest(SimpleTestCase):
+    """تست view جریانی parallel_execute_stream"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _post(self, payload):
+        request = self.factory.post(
+            '/api/gateway/workflow/parallel/stream/', json.dumps(payload), content_type='application/json'
+        )
+        return async_to_sync(views.parallel_execute_stream)(request)
+
+    def test_unauthenticated_rejected(self):
+        """درخواست بدون احراز هویت ۴۰۱ می‌گیرد"""
+        response = self._post({'tasks': [compute(1, 0)]})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content)['error'], 'not_authenticated')
+
+    @override_settings(PARALLEL_MAX_TASK_TIMEOUT=0.2)
+    def test_stream_clamps_task_duration(self):
+        """مدت درخواستی بزرگ به سقف محدود و نتیجه و خلاصه جریان می‌شوند"""
+        user = mock.Mock(id=1, is_authenticated=True)
+        with mock.patch.object(views, 'aauthenticate_request', mock.AsyncMock(return_value=user)):
+            response = self._post({'tasks': [compute(1, 3600, timeout=3600)]})
+
+            started = time.monotonic()
+            lines = [
+                json.loads(line)
+                for line in b''.join(async_to_sync(_collect)(response.streaming_content)).splitlines()
+            ]
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([line['type'] for line in lines], ['result', 'summary'])
+        self.assertEqual(lines[-1]['total_tasks'], 1)
@@ -0,0 +1,156 @@
+"""
+تست‌های موتور مشترک محدودسازی نرخ (GCRA)
+"""
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase, override_settings
+
+from app_standards import rate_limiting
+from app_standards.rate_limiting import (
+    LocalMemoryBackend, RateLimiter, RedisBackend, get_rate_limiter,
+)
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401  (اجرای Lua در fakeredis)
+except ImportError:
+    fakeredis = None
+
+
+class FakeClock:
+    """ساعت قابل کنترل برای time.monotonic"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class GCRATest(SimpleTestCase):
+    """تست رفتار burst و پر شدن دوبارهٔ سهمیه"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limiting.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = RateLimiter(LocalMemoryBackend())
+
+    def test_burst_up_to_limit(self):
+        """تا سقف limit درخواست پشت‌سرهم مجاز و بعدی رد می‌شود"""
+        results = [self.limiter.check('user-1', limit=5, period=10) for _ in range(6)]
+
+        self.assertEqual([r.allowed for r in results], [True] * 5 + [False])
+        self.assertEqual([r.remaining for r in results[:5]], [4, 3, 2, 1, 0])
+        self.assertAlmostEqual(results[-1].retry_after, 2.0)
+        self.assertEqual(results[-1].retry_after_seconds, 2)
+        self.assertAlmostEqual(results[-1].reset_after, 10.0)
+
+    def test_refill_at_constant_rate(self):
+        """سهمیه با نرخ limit/period پر می‌شود، نه یکجا در مرز پنجره"""
+        for _ in range(5):
+            self.limiter.check('user-1', limit=5, period=10)
+
+        self.clock.now += 1.9
+        self.assertFalse(self.limiter.check('user-1', limit=5, period=10).allowed)
+        self.clock.now += 0.1
+        self.assertTrue(self.limiter.check('user-1', limit=5, period=10).allowed)
+        self.assertFalse(self.limiter.check('user-1', limit=5, period=10).allowed)
+
+        self.clock.now += 60
+        results = [self.limiter.check('user-1', limit=5, period=10) for _ in range(6)]
+        self.assertEqual(sum(r.allowed for r in results), 5)
+
+    def test_keys_and_cost(self):
+        """کلیدها مستقل‌اند و cost چند واحد سهمیه مصرف می‌کند"""
+        self.assertTrue(self.limiter.check('user-1', limit=4, period=4, cost=3).allowed)
+        self.assertFalse(self.limiter.check('user-1', limit=4, period=4, cost=2).allowed)
+        self.assertTrue(self.limiter.check('user-2', limit=4, period=4, cost=4).allowed)
+
+    def test_zero_limit_denied(self):
+        """limit صفر همیشه رد می‌شود"""
+        result = self.limiter.check('user-1', limit=0, period=30)
+
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.retry_after, 30)
+
+    def test_backend_error_fail_open_or_closed(self):
+        """خطای backend بر اساس fail_open درخواست را مجاز یا رد می‌کند"""
+        backend = mock.Mock(gcra=mock.Mock(side_effect=ConnectionError('redis down')))
+
+        self.assertTrue(RateLimiter(backend, fail_open=True).check('k', 5, 10).allowed)
+        self.assertFalse(RateLimiter(backend, fail_open=False).check('k', 5, 10).allowed)
+
+
+class FakeRedisClient:
+    """کلاینت ساختگی Redis که فراخوانی اسکریپت را ثبت می‌کند"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def register_script(self, script):
+        self.script = script
+
+        def run(keys, args):
+            self.calls.append((keys, args))
+            return self.reply
+        return run
+
+
+class RedisBackendTest(SimpleTestCase):
+    """تست مسیر Lua در RedisBackend"""
+
+    def _backend(self, client):
+        with mock.patch('redis.Redis.from_url', return_value=client):
+            return RedisBackend('redis://test/0')
+
+    def test_script_arguments_and_reply(self):
+        """کلید با پیشوند و پارامترها به میکروثانیه به اسکریپت داده می‌شوند"""
+        client = FakeRedisClient([0, 2000000, 9000000])
+        limiter = RateLimiter(self._backend(client))
+
+        result = limiter.check('user-1', limit=5, period=10, cost=1)
+
+        self.assertEqual(client.calls, [(['rl:user-1'], [2000000, 10000000, 1])])
+        self.assertIn("redis.call('TIME')", client.script)
+        self.assertFalse(result.allowed)
+        self.assertAlmostEqual(result.retry_after, 2.0)
+        self.assertEqual(result.remaining, 0)
+
+    @skipUnless(fakeredis, 'fakeredis و lupa برای اجرای Lua لازم است')
+    def test_lua_burst_and_reset(self):
+        """اجرای واقعی اسکریپت Lua روی fakeredis"""
+        server = fakeredis.FakeRedis()
+        limiter = RateLimiter(self._backend(server))
+
+        results = [limiter.check('user-1', limit=3, period=60) for _ in range(4)]
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertGreater(server.pttl('rl:user-1'), 0)
+
+        limiter.reset('user-1')
+        self.assertTrue(limiter.check('user-1', limit=3, period=60).allowed)
+
+
+class GetRateLimiterTest(SimpleTestCase):
+    """تست انتخاب backend پیش‌فرض"""
+
+    def setUp(self):
+        patcher = mock.patch.object(rate_limiting, '_limiter', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(RATE_LIMIT_REDIS_URL='redis://shared:6379/2')
+    def test_redis_is_default(self):
+        """بدون تنظیم صریح، سهمیه بین workerها در Redis مشترک است"""
+        with mock.patch('redis.Redis.from_url', return_value=FakeRedisClient([1, 0, 0])) as from_url:
+            limiter = get_rate_limiter()
+
+        self.assertIsInstance(limiter.backend, RedisBackend)
+        from_url.assert_called_once_with('redis://shared:6379/2')
+
+    @override_settings(RATE_LIMIT_BACKEND='local')
+    def test_local_backend_opt_in(self):
+        """backend درون‌پردازه فقط با تنظیم صریح"""
+        self.assertIsInstance(get_rate_limiter().backend, LocalMemoryBackend)
@@ -0,0 +1,74 @@
+"""
+تست‌های ژورنال تأخیری لاگ درخواست‌ها
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from ..models import APIRequest
+from ..services.request_journal import RequestJournal
+
+
+class RequestJournalTest(TestCase):
+    """تست بافر محدود، ذخیرهٔ دسته‌ای و جداسازی رکوردهای خراب"""
+
+    def setUp(self):
+        self.journal = RequestJournal(capacity=3, batch_size=2, flush_interval=60)
+        # ذخیره فقط با flush صریح (بدون thread پس‌زمینه)
+        patcher = mock.patch.object(self.journal, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _entry(self, path, ip_address='10.0.0.1'):
+        return APIRequest(method='GET', path=path, ip_address=ip_address)
+
+    def test_loss_bounded_by_capacity(self):
+        """سرریز بافر قدیمی‌ترین رکوردها را کنار می‌گذارد و شمرده می‌شود"""
+        for i in range(5):
+            self.journal.record(self._entry(f'/r/{i}'))
+
+        self.assertEqual(self.journal.stats()['pending'], 3)
+        self.assertEqual(self.journal.stats()['dropped'], 2)
+        self.assertEqual(self.journal.flush(), 3)
+        self.assertEqual(
+            sorted(APIRequest.objects.values_list('path', flat=True)),
+            ['/r/2', '/r/3', '/r/4']
+        )
+
+    def test_requeue_on_failure(self):
+        """در دسترس نبودن دیتابیس رکوردها را به بافر برمی‌گرداند"""
+        for i in range(3):
+            self.journal.record(self._entry(f'/r/{i}'))
+
+        with mock.patch.object(APIRequest.objects, 'bulk_create', side_effect=Exception('db down')):
+            self.assertEqual(self.journal.flush(), 0)
+
+        stats = self.journal.stats()
+        self.assertEqual((stats['pending'], stats['dropped'], stats['failed_flushes']), (3, 0, 1))
+        self.assertEqual(self.journal.flush(), 3)
+        self.assertEqual(
+            list(APIRequest.objects.order_by('path').values_list('path', flat=True)),
+            ['/r/0', '/r/1', '/r/2']
+        )
+
+    def test_bad_row_isolated(self):
+        """رکورد نامعتبر فقط خودش را کنار می‌گذارد، نه کل دسته را"""
+        self.journal.record(self._entry('/ok/1'))
+        self.journal.record(self._entry('/bad', ip_address=None))
+
+        with self.assertLogs('app_standards.batch_writer', 'WARNING') as logs:
+            self.assertEqual(self.journal.flush(), 1)
+            self.journal.close()
+
+        self.assertEqual(list(APIRequest.objects.values_list('path', flat=True)), ['/ok/1'])
+        self.assertEqual(self.journal.stats()['dropped'], 1)
+        self.assertEqual(logs.records[0].dropped, 1)
+        self.assertEqual(logs.records[0].capacity, 3)
+
+    def test_batch_size_wakes_worker(self):
+        """پر شدن یک دسته thread ذخیره را بیدار می‌کند"""
+        self.journal.record(self._entry('/r/0'))
+        self.assertFalse(self.journal._wakeup.is_set())
+
+        self.journal.record(self._entry('/r/1'))
+        self.assertTrue(self.journal._wakeup.is_set())
@@ -11,4 +11,7 @@ urlpatterns = [
     # Health check
     path('health/', views.health_check, name='health_check'),
     path('test/', views.test_endpoint, name='test_endpoint'),
+    
+    # اجرای موازی با ارسال تدریجی نتایج
+    path('workflow/parallel/stream/', views.parallel_execute_stream, name='parallel_execute_stream'),
 ]
\ No newline at end of file
@@ -1,13 +1,21 @@
 """
 Views ساده برای تست API Gateway
 """
+import json
 import logging
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from app_standards.views.async_auth import aauthenticate_request, unauthenticated_response
+
+from .services import APIGatewayService
 
 
 logger = logging.getLogger(__name__)
@@ -53,3 +61,59 @@ def test_endpoint(request):
         },
         status=status.HTTP_200_OK
     )
+
+
+async def _ndjson_stream(results):
+    """تبدیل نتایج به خطوط JSON (هر نتیجه یک خط)"""
+    async for item in results:
+        yield json.dumps(item, ensure_ascii=False, default=str) + '\n'
+
+
+@csrf_exempt
+@require_POST
+async def parallel_execute_stream(request):
+    """
+    اجرای موازی تسک‌ها با ارسال نتیجه هر تسک به محض تکمیل (NDJSON)
+    
+    بدنه: {"tasks": [...], "max_concurrency": 5}
+    هر تسک می‌تواند مهلت خود را با کلید timeout (ثانیه) تعیین کند؛ مهلت و مدت تسک‌ها
+    به PARALLEL_MAX_TASK_TIMEOUT و کل اجرا به PARALLEL_EXECUTION_TIMEOUT محدود است.
+    """
+    user = await aauthenticate_request(request)
+    if user is None:
+        return unauthenticated_response()
+    
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        payload = None
+    
+    tasks = payload.get('tasks') if isinstance(payload, dict) else None
+    max_tasks = getattr(settings, 'API_GATEWAY_MAX_PARALLEL_TASKS', 100)
+    if (
+        not isinstance(tasks, list) or not tasks or len(tasks) > max_tasks
+        or not all(isinstance(task, dict) for task in tasks)
+    ):
+        return JsonResponse({
+            'success': False,
+            'error': 'invalid_tasks',
+            'message': f'لیست تسک‌ها باید بین ۱ و {max_tasks} تسک باشد'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    max_concurrency = payload.get('max_concurrency')
+    if max_concurrency is not None and (not isinstance(max_concurrency, int) or max_concurrency < 1):
+        return JsonResponse({
+            'success': False,
+            'error': 'invalid_max_concurrency',
+            'message': 'max_concurrency باید عدد صحیح مثبت باشد'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    max_concurrency = min(max_concurrency or len(tasks), getattr(settings, 'MAX_CONCURRENT_TASKS', 10))
+    
+    service = APIGatewayService()
+    response = StreamingHttpResponse(
+        _ndjson_stream(service.stream_parallel_execute(tasks, max_concurrency, user=user)),
+        content_type='application/x-ndjson; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -25,6 +25,7 @@ from .models.subscription import (
     BillingCycle, 
     PaymentMethod
 )
+from .models.usage import UsageCounter
 from .models.invoice import (
     Invoice, 
     InvoiceItem, 
@@ -62,6 +63,7 @@ __all__ = [
     'SubscriptionStatus',
     'BillingCycle',
     'PaymentMethod',
+    'UsageCounter',
     
     # Invoice
     'Invoice',
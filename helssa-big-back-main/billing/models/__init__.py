@@ -8,6 +8,7 @@ from .wallet import Wallet
 from .transaction import Transaction, TransactionType, TransactionStatus
 from .plan import SubscriptionPlan
 from .subscription import Subscription
+from .usage import UsageCounter
 from .invoice import Invoice
 from .commission import Commission
 
@@ -19,6 +20,7 @@ __all__ = [
     'TransactionStatus',
     'SubscriptionPlan',
     'Subscription',
+    'UsageCounter',
     'Invoice',
     'Commission',
 ]
\ No newline at end of file
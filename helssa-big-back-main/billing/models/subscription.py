@@ -117,7 +117,14 @@ class Subscription(BaseModel):
     usage_data = models.JSONField(
         default=dict,
         verbose_name='داده‌های استفاده',
-        help_text='آمار استفاده از ویژگی‌های پلن'
+        help_text='آمار استفاده از ویژگی‌های پلن (قدیمی؛ مقدار اولیه شمارنده‌های مصرف)'
+    )
+    
+    usage_period_start = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='شروع دوره مصرف',
+        help_text='شمارنده‌های مصرف (UsageCounter) به این دوره تعلق دارند'
     )
     
     # تخفیفات
@@ -226,9 +233,15 @@ class Subscription(BaseModel):
         
         return base_price
         
+    @property
+    def current_usage_period(self):
+        """شروع دوره مصرف فعلی"""
+        return self.usage_period_start or self.start_date
+        
     def get_usage(self, feature: str) -> int:
         """دریافت میزان استفاده از یک ویژگی"""
-        return self.usage_data.get(feature, 0)
+        from ..services.usage_service import get_usage_meter
+        return get_usage_meter().get_usage(self, feature)
         
     def get_limit(self, feature: str) -> int:
         """دریافت محدودیت یک ویژگی"""
@@ -252,18 +265,18 @@ class Subscription(BaseModel):
         return current_usage + amount <= limit
         
     def use_feature(self, feature: str, amount: int = 1) -> bool:
-        """استفاده از ویژگی و به‌روزرسانی آمار"""
-        if not self.can_use_feature(feature, amount):
+        """استفاده از ویژگی و به‌روزرسانی آمار (بررسی و افزایش اتمیک شمارنده)"""
+        if not self.is_active:
             return False
             
-        current_usage = self.get_usage(feature)
-        self.usage_data[feature] = current_usage + amount
-        self.save()
-        return True
+        from ..services.usage_service import get_usage_meter
+        return get_usage_meter().consume_subscription(self, feature, amount).allowed
         
     def reset_usage(self):
         """ریست کردن آمار استفاده (معمولاً در شروع دوره جدید)"""
+        # شمارنده‌های دوره قبل دست‌نخورده می‌مانند؛ دوره جدید از صفر شروع می‌شود
         self.usage_data = {}
+        self.usage_period_start = timezone.now()
         self.save()
         
     def extend_subscription(self, days: int):
@@ -0,0 +1,57 @@
+"""
+مدل شمارنده‌های مصرف اشتراک
+Subscription Usage Counters Model
+"""
+
+from django.db import models
+from .subscription import Subscription
+
+
+class UsageCounter(models.Model):
+    """
+    شمارنده مصرف یک ویژگی در یک دوره اشتراک
+
+    هر ردیف مصرف یک (اشتراک، ویژگی، دوره) است و فقط با UPDATE اتمیک
+    (used = used + n) تغییر می‌کند؛ شروع دوره جدید به جای پاک کردن شمارنده‌ها
+    ردیف‌های تازه می‌سازد و ردیف‌های قبلی به عنوان سابقه باقی می‌مانند.
+    """
+
+    subscription = models.ForeignKey(
+        Subscription,
+        on_delete=models.CASCADE,
+        related_name='usage_counters',
+        verbose_name='اشتراک'
+    )
+
+    feature = models.CharField(
+        max_length=50,
+        verbose_name='ویژگی'
+    )
+
+    period_start = models.DateTimeField(
+        verbose_name='شروع دوره'
+    )
+
+    used = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='میزان استفاده'
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='زمان آخرین به‌روزرسانی'
+    )
+
+    class Meta:
+        db_table = 'billing_usage_counters'
+        verbose_name = 'شمارنده مصرف'
+        verbose_name_plural = 'شمارنده‌های مصرف'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'feature', 'period_start'],
+                name='unique_usage_counter_per_period'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_id} - {self.feature}: {self.used}"
@@ -12,6 +12,7 @@ from .commission_service import CommissionService
 from .invoice_service import InvoiceService
 from .notification_service import NotificationService
 from .security_service import SecurityService
+from .usage_service import UsageMeter
 
 __all__ = [
     'BaseService',
@@ -23,4 +24,5 @@ __all__ = [
     'InvoiceService',
     'NotificationService',
     'SecurityService',
+    'UsageMeter',
 ]
\ No newline at end of file
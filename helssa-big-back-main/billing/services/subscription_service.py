@@ -12,6 +12,7 @@ from django.contrib.auth import get_user_model
 from celery import shared_task
 
 from .base_service import BaseService
+from .usage_service import get_usage_meter
 from ..models import (
     Subscription, SubscriptionPlan, SubscriptionStatus,
     BillingCycle, PaymentMethod
@@ -316,39 +317,32 @@ class SubscriptionService(BaseService):
             Tuple[bool, Dict]: نتیجه بررسی
         """
         try:
-            user = User.objects.get(id=user_id)
-            subscription = self._get_active_subscription(user)
+            # بررسی و ثبت مصرف در یک UPDATE اتمیک روی شمارنده دوره فعلی
+            result = get_usage_meter().consume(user_id, resource, amount)
             
-            if not subscription:
+            if result is None:
+                if not User.objects.filter(id=user_id).exists():
+                    return self.error_response('user_not_found', 'کاربر یافت نشد')
                 return self.error_response(
                     'no_active_subscription',
                     'اشتراک فعالی یافت نشد'
                 )
             
-            # بررسی محدودیت
-            can_use = subscription.can_use_feature(resource, amount)
-            
-            if can_use:
-                # استفاده از منبع
-                subscription.use_feature(resource, amount)
-                
+            if result.allowed:
                 return self.success_response({
                     'allowed': True,
-                    'current_usage': subscription.get_usage(resource),
-                    'limit': subscription.get_limit(resource),
-                    'remaining': subscription.get_limit(resource) - subscription.get_usage(resource)
+                    'current_usage': result.used,
+                    'limit': result.limit,
+                    'remaining': result.remaining
                 }, 'استفاده مجاز است')
             else:
-                limit = subscription.get_limit(resource)
-                current_usage = subscription.get_usage(resource)
-                
                 return self.error_response(
                     'usage_limit_exceeded',
-                    f'از محدودیت {resource} تجاوز کرده‌اید. محدودیت: {limit}, استفاده فعلی: {current_usage}',
+                    f'از محدودیت {resource} تجاوز کرده‌اید. محدودیت: {result.limit}, استفاده فعلی: {result.used}',
                     {
                         'resource': resource,
-                        'limit': limit,
-                        'current_usage': current_usage,
+                        'limit': result.limit,
+                        'current_usage': result.used,
                         'requested_amount': amount
                     }
                 )
@@ -382,6 +376,9 @@ class SubscriptionService(BaseService):
                     'اشتراک فعالی یافت نشد'
                 )
             
+            # مصرف همه ویژگی‌ها در دوره فعلی
+            usage = get_usage_meter().get_usage_map(subscription)
+            
             # اطلاعات اشتراک
             subscription_info = {
                 'subscription_id': str(subscription.id),
@@ -402,7 +399,7 @@ class SubscriptionService(BaseService):
                 'days_remaining': subscription.days_remaining,
                 'is_in_trial': subscription.is_in_trial,
                 'trial_end_date': subscription.trial_end_date,
-                'usage_data': subscription.usage_data,
+                'usage_data': usage,
                 'effective_price': subscription.effective_price,
                 'discount_percent': subscription.discount_percent,
                 'discount_amount': subscription.discount_amount,
@@ -412,7 +409,7 @@ class SubscriptionService(BaseService):
             # محاسبه آمار استفاده
             usage_stats = {}
             for feature, limit in subscription.plan.limits.items():
-                current_usage = subscription.get_usage(feature)
+                current_usage = usage.get(feature, 0)
                 usage_stats[feature] = {
                     'current': current_usage,
                     'limit': limit,
@@ -0,0 +1,250 @@
+"""
+سرویس سنجش مصرف اشتراک‌ها
+Subscription Usage Metering Service
+
+مصرف هر (اشتراک، ویژگی، دوره) در یک ردیف UsageCounter نگه داشته می‌شود و
+بررسی محدودیت و افزایش مصرف در یک دستور UPDATE شرطی و اتمیک انجام می‌شود:
+
+    UPDATE ... SET used = used + n WHERE ... AND used + n <= limit RETURNING used
+
+بنابراین درخواست‌های هم‌زمان هیچ افزایشی را گم نمی‌کنند و از محدودیت عبور
+نمی‌کنند. اطلاعات اشتراک فعال کاربر (دوره و محدودیت‌ها) در کش Django نگه
+داشته می‌شود تا مسیر گرم فقط همین یک دستور دیتابیس باشد.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, router
+from django.db.models import F
+from django.utils import timezone
+
+from app_standards.cache_versions import bump_version, get_versions
+
+from ..models import Subscription, UsageCounter
+from ..models.subscription import SubscriptionStatus
+
+logger = logging.getLogger(__name__)
+
+ENTITLEMENT_CACHE_TTL = getattr(settings, 'BILLING_ENTITLEMENT_CACHE_TTL', 60)
+
+PLANS_VERSION_KEY = 'billing:usage:version:plans'
+USER_VERSION_KEY = 'billing:usage:version:user:{user_id}'
+ENTITLEMENT_KEY = 'billing:usage:entitlement:{user_id}:{plans_version}:{user_version}'
+
+# -1 یعنی نامحدود (همانند Subscription.get_limit)
+UNLIMITED = -1
+
+
+class Entitlement(NamedTuple):
+    """اطلاعات لازم برای سنجش مصرف اشتراک فعال یک کاربر"""
+    subscription_id: Any
+    period_start: datetime
+    limits: Dict[str, int]
+    initial_usage: Dict[str, int]
+
+    def get_limit(self, feature: str) -> int:
+        return self.limits.get(feature, UNLIMITED)
+
+
+class UsageResult(NamedTuple):
+    """نتیجه بررسی و ثبت مصرف"""
+    allowed: bool
+    used: int
+    limit: int
+
+    @property
+    def remaining(self) -> int:
+        if self.limit == UNLIMITED:
+            return UNLIMITED
+        return max(0, self.limit - self.used)
+
+
+class UsageMeter:
+    """
+    سنجش اتمیک مصرف ویژگی‌های اشتراک
+    """
+
+    def __init__(self, entitlement_ttl: Optional[int] = None):
+        """
+        Args:
+            entitlement_ttl: مدت نگهداری اطلاعات اشتراک فعال در کش (ثانیه)
+        """
+        self.entitlement_ttl = ENTITLEMENT_CACHE_TTL if entitlement_ttl is None else entitlement_ttl
+
+    def consume(self, user_id, feature: str, amount: int = 1) -> Optional[UsageResult]:
+        """
+        بررسی محدودیت و ثبت مصرف ویژگی برای اشتراک فعال کاربر
+
+        Returns:
+            UsageResult یا None در صورت نبود اشتراک فعال
+        """
+        entitlement = self.get_entitlement(user_id)
+        if entitlement is None:
+            return None
+        return self._consume(entitlement, feature, amount)
+
+    def consume_subscription(self, subscription: Subscription, feature: str,
+                             amount: int = 1) -> UsageResult:
+        """بررسی محدودیت و ثبت مصرف برای یک اشتراک مشخص"""
+        return self._consume(self._build_entitlement(subscription), feature, amount)
+
+    def get_usage(self, subscription: Subscription, feature: str) -> int:
+        """میزان مصرف یک ویژگی در دوره فعلی اشتراک"""
+        used = UsageCounter.objects.filter(
+            subscription_id=subscription.pk,
+            feature=feature,
+            period_start=subscription.current_usage_period,
+        ).values_list('used', flat=True).first()
+        if used is None:
+            return subscription.usage_data.get(feature, 0)
+        return used
+
+    def get_usage_map(self, subscription: Subscription) -> Dict[str, int]:
+        """مصرف همه ویژگی‌ها در دوره فعلی اشتراک (یک پرس‌وجو)"""
+        usage = dict(subscription.usage_data)
+        usage.update(UsageCounter.objects.filter(
+            subscription_id=subscription.pk,
+            period_start=subscription.current_usage_period,
+        ).values_list('feature', 'used'))
+        return usage
+
+    def get_entitlement(self, user_id) -> Optional[Entitlement]:
+        """اطلاعات اشتراک فعال کاربر (از کش یا با یک پرس‌وجو)"""
+        user_key = USER_VERSION_KEY.format(user_id=user_id)
+        versions = get_versions([PLANS_VERSION_KEY, user_key])
+
+        key = ENTITLEMENT_KEY.format(
+            user_id=user_id, plans_version=versions[PLANS_VERSION_KEY], user_version=versions[user_key]
+        )
+        entitlement = cache.get(key)
+        if entitlement is not None:
+            return Entitlement(*entitlement)
+
+        subscription = Subscription.objects.select_related('plan').filter(
+            user_id=user_id,
+            status__in=[SubscriptionStatus.TRIAL, SubscriptionStatus.ACTIVE]
+        ).first()
+        if subscription is None:
+            return None
+
+        entitlement = self._build_entitlement(subscription)
+        cache.set(key, tuple(entitlement), self.entitlement_ttl)
+        return entitlement
+
+    def invalidate_user(self, user_id):
+        """باطل کردن اطلاعات کش‌شده اشتراک کاربر (پس از تغییر اشتراک)"""
+        bump_version(USER_VERSION_KEY.format(user_id=user_id))
+
+    def invalidate_plans(self):
+        """باطل کردن اطلاعات کش‌شده همه کاربران (پس از تغییر محدودیت‌های پلن‌ها)"""
+        bump_version(PLANS_VERSION_KEY)
+
+    def _build_entitlement(self, subscription: Subscription) -> Entitlement:
+        limits = dict(subscription.plan.limits or {})
+        limits.update(subscription.custom_limits or {})
+        return Entitlement(
+            subscription_id=subscription.pk,
+            period_start=subscription.current_usage_period,
+            limits=limits,
+            initial_usage=dict(subscription.usage_data or {}),
+        )
+
+    def _consume(self, entitlement: Entitlement, feature: str, amount: int) -> UsageResult:
+        limit = entitlement.get_limit(feature)
+
+        used = self._increment(entitlement, feature, amount, limit)
+        if used is None:
+            # ردیف این دوره هنوز ساخته نشده یا محدودیت پر شده است
+            counter = self._get_or_create_counter(entitlement, feature)
+            used = self._increment(entitlement, feature, amount, limit)
+            if used is None:
+                return UsageResult(False, counter.used, limit)
+
+        return UsageResult(True, used, limit)
+
+    def _counters(self, entitlement: Entitlement, feature: str):
+        return UsageCounter.objects.filter(
+            subscription_id=entitlement.subscription_id,
+            feature=feature,
+            period_start=entitlement.period_start,
+        )
+
+    def _increment(self, entitlement: Entitlement, feature: str, amount: int,
+                   limit: int) -> Optional[int]:
+        """
+        افزایش اتمیک شمارنده در صورت عدم عبور از محدودیت
+
+        Returns:
+            مقدار جدید شمارنده یا None اگر ردیفی به‌روزرسانی نشد
+        """
+        alias = router.db_for_write(UsageCounter)
+        connection = connections[alias]
+
+        if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert:
+            meta = UsageCounter._meta
+            sql = (
+                f"UPDATE {connection.ops.quote_name(meta.db_table)} "
+                f"SET used = used + %s, updated_at = %s "
+                f"WHERE subscription_id = %s AND feature = %s AND period_start = %s"
+            )
+            params = [
+                amount,
+                meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection),
+                meta.get_field('subscription').get_db_prep_value(entitlement.subscription_id, connection),
+                feature,
+                meta.get_field('period_start').get_db_prep_value(entitlement.period_start, connection),
+            ]
+            if limit != UNLIMITED:
+                sql += " AND used + %s <= %s"
+                params += [amount, limit]
+            sql += " RETURNING used"
+
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        # پایگاه‌داده بدون UPDATE ... RETURNING: به‌روزرسانی شرطی اتمیک و سپس خواندن
+        counters = self._counters(entitlement, feature).using(alias)
+        if limit != UNLIMITED:
+            counters = counters.filter(used__lte=limit - amount)
+        if not counters.update(used=F('used') + amount, updated_at=timezone.now()):
+            return None
+        return self._read(entitlement, feature)
+
+    def _read(self, entitlement: Entitlement, feature: str) -> int:
+        used = self._counters(entitlement, feature).values_list('used', flat=True).first()
+        return used or 0
+
+    def _get_or_create_counter(self, entitlement: Entitlement, feature: str):
+        defaults = {'used': entitlement.initial_usage.get(feature, 0)}
+        try:
+            counter, _ = UsageCounter.objects.get_or_create(
+                subscription_id=entitlement.subscription_id,
+                feature=feature,
+                period_start=entitlement.period_start,
+                defaults=defaults,
+            )
+            return counter
+        except IntegrityError:
+            # ساخت هم‌زمان توسط درخواست دیگر
+            return self._counters(entitlement, feature).get()
+
+
+_meter: Optional[UsageMeter] = None
+_meter_lock = threading.Lock()
+
+
+def get_usage_meter() -> UsageMeter:
+    """سرویس مشترک سنجش مصرف در این پردازه"""
+    global _meter
+    if _meter is None:
+        with _meter_lock:
+            if _meter is None:
+                _meter = UsageMeter()
+    return _meter
@@ -0,0 +1,25 @@
+"""
+سیگنال‌های سیستم مالی
+Financial System Signals
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subscription, SubscriptionPlan
+from .services.usage_service import get_usage_meter
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def invalidate_subscription_usage(sender, instance, **kwargs):
+    """تغییر اشتراک (وضعیت، پلن، دوره مصرف) اطلاعات کش‌شده همان کاربر را باطل می‌کند"""
+    user_id = instance.user_id
+    # پس از commit تا درخواست هم‌زمان اطلاعات پیش از commit را با نسخه جدید کش نکند
+    transaction.on_commit(lambda: get_usage_meter().invalidate_user(user_id))
+
+
+@receiver([post_save, post_delete], sender=SubscriptionPlan)
+def invalidate_plan_usage(sender, **kwargs):
+    """تغییر محدودیت‌های پلن روی همه مشترکان آن اثر دارد"""
+    transaction.on_commit(lambda: get_usage_meter().invalidate_plans())
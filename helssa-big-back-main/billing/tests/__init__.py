@@ -7,10 +7,12 @@ from .test_models import *
 from .test_services import *
 from .test_views import *
 from .test_gateways import *
+from .test_usage import *
 
 __all__ = [
     'test_models',
     'test_services', 
     'test_views',
-    'test_gateways'
+    'test_gateways',
+    'test_usage'
 ]
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+تست‌های سنجش مصرف اشتراک‌ها
+Subscription Usage Metering Tests
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from ..models import SubscriptionPlan, Subscription, UsageCounter
+from ..models.plan import PlanType
+from ..models.subscription import SubscriptionStatus
+from ..services.usage_service import get_usage_meter
+
+User = get_user_model()
+
+
+class UsageMeterTest(TestCase):
+    """تست شمارنده‌های اتمیک مصرف"""
+
+    def setUp(self):
+        """آماده‌سازی تست"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            phone_number='09123456789',
+            user_type='patient'
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name='پلن تست',
+            type=PlanType.PATIENT_BASIC,
+            monthly_price=Decimal('50000'),
+            yearly_price=Decimal('500000'),
+            limits={'chat_with_ai': 3}
+        )
+        now = timezone.now()
+        self.subscription = Subscription.objects.create(
+            user=self.user,
+            plan=self.plan,
+            status=SubscriptionStatus.ACTIVE,
+            start_date=now,
+            end_date=now + timedelta(days=30),
+            next_billing_date=now + timedelta(days=30),
+            usage_data={'chat_with_ai': 1}
+        )
+        self.meter = get_usage_meter()
+
+    def test_consume_until_limit(self):
+        """تست افزایش شمارنده تا محدودیت (با مقدار اولیه از usage_data)"""
+        result = self.meter.consume(self.user.id, 'chat_with_ai')
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.used, 2)
+        self.assertEqual(result.remaining, 1)
+
+        self.assertTrue(self.meter.consume(self.user.id, 'chat_with_ai').allowed)
+
+        denied = self.meter.consume(self.user.id, 'chat_with_ai')
+        self.assertFalse(denied.allowed)
+        self.assertEqual(denied.used, 3)
+        self.assertEqual(self.subscription.get_usage('chat_with_ai'), 3)
+
+    def test_unlimited_feature(self):
+        """تست ویژگی بدون محدودیت"""
+        for _ in range(5):
+            result = self.meter.consume(self.user.id, 'voice_to_text', amount=2)
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.used, 10)
+        self.assertEqual(result.remaining, -1)
+
+    def test_reset_starts_new_period(self):
+        """تست شروع دوره جدید مصرف و باطل شدن اطلاعات کش‌شده"""
+        self.meter.consume(self.user.id, 'chat_with_ai', amount=2)
+        self.assertFalse(self.meter.consume(self.user.id, 'chat_with_ai').allowed)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.reset_usage()
+
+        result = self.meter.consume(self.user.id, 'chat_with_ai')
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.used, 1)
+        self.assertEqual(UsageCounter.objects.filter(subscription=self.subscription).count(), 2)
+
+    def test_custom_limit_change_applies(self):
+        """تست اعمال تغییر محدودیت سفارشی بدون انتظار برای انقضای کش"""
+        self.meter.consume(self.user.id, 'chat_with_ai', amount=2)
+        self.assertFalse(self.meter.consume(self.user.id, 'chat_with_ai').allowed)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.custom_limits = {'chat_with_ai': 10}
+            self.subscription.save()
+
+        self.assertTrue(self.meter.consume(self.user.id, 'chat_with_ai').allowed)
+
+    def test_no_active_subscription(self):
+        """تست کاربر بدون اشتراک فعال"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.cancel(immediate=True)
+        self.assertIsNone(self.meter.consume(self.user.id, 'chat_with_ai'))
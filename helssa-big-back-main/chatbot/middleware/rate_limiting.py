@@ -3,15 +3,15 @@
 Rate Limiting Middleware for Chatbot
 """
 
-import time
 from typing import Dict, Optional
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth import get_user_model
 import logging
 
+from app_standards.rate_limiting import RateLimitResult, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -172,63 +172,47 @@ class ChatbotRateLimitMiddleware(MiddlewareMixin):
         request
     ) -> Optional[JsonResponse]:
         """
-        بررسی و اعمال محدودیت نرخ (rate limit) برای یک کلید کش مشخص با استفاده از پنجره زمانی لغزان.
+        بررسی و اعمال محدودیت نرخ (rate limit) برای یک کلید مشخص با موتور مشترک GCRA.
         
         این متد:
-        - تعداد درخواست‌های اخیر مربوط به cache_key را بازیابی می‌کند، فقط رکوردهایی را نگه می‌دارد که داخل پنجره زمانی (window) قرار دارند و بر اساس limit_config تصمیم می‌گیرد آیا درخواست فعلی مجاز است یا خیر.
-        - در صورت رسیدن تعداد درخواست‌های داخل پنجره به حداکثر مجاز (limit_config['requests'])، یک JsonResponse با وضعیت HTTP 429 از طریق _create_rate_limit_response برمی‌گرداند.
-        - در غیر این صورت، زمان حال را به لیست درخواست‌های اخیر اضافه و آن را دوباره در cache با TTL برابر window + 60 ثانیه ذخیره می‌کند (اثر جانبی: به‌روز‌رسانی کش).
+        - با یک عملیات اتمیک روی موتور مشترک محدودیت نرخ (app_standards.rate_limiting) درخواست فعلی را ثبت و بررسی می‌کند؛ برخلاف نگهداری فهرست timestampها، هزینهٔ هر بررسی مستقل از limit_config['requests'] است.
+        - در صورت رسیدن به حداکثر مجاز (limit_config['requests'] در limit_config['window'] ثانیه)، یک JsonResponse با وضعیت HTTP 429 از طریق _create_rate_limit_response برمی‌گرداند.
         
         پارامترها:
-        - cache_key (str): کلید استفاده‌شده در کش برای نگهداری فهرست timestampهای درخواست‌ها.
+        - cache_key (str): کلید یکتای محدودیت (کاربر/IP و نوع endpoint).
         - limit_config (Dict): پیکربندی محدودیت که باید حداقل حاوی کلیدهای 'requests' (حداکثر تعداد مجاز) و 'window' (طول پنجره به ثانیه) و 'description' (متن توصیفی) باشد.
-        - request: شیء درخواست Django (برای زمینه و احتمالا گزارش‌گیری) — محتوای خود درخواست در تصمیم‌گیری مستقیم استفاده نمی‌شود اما برای تولید پاسخ و لاگ می‌تواند مفید باشد.
+        - request: شیء درخواست Django (برای زمینه و احتمالا گزارش‌گیری) — محتوای خود درخواست در تصمیم‌گیری مستقیم استفاده نمی‌شود.
         
         مقدار بازگشتی:
         - Optional[JsonResponse]: در صورتی که محدودیت عبور شده باشد یک JsonResponse با کد 429 بازمی‌گردد، در غیر این صورت None برگشت می‌دهد (اجازه ادامه پردازش).
         """
-        current_time = int(time.time())
-        window_start = current_time - limit_config['window']
-        
-        # دریافت درخواست‌های فعلی از cache
-        requests_data = cache.get(cache_key, [])
-        
-        # فیلتر کردن درخواست‌های قدیمی
-        recent_requests = [
-            req_time for req_time in requests_data 
-            if req_time > window_start
-        ]
+        result = get_rate_limiter().check(
+            f"chatbot:{cache_key}", limit_config['requests'], limit_config['window']
+        )
         
-        # بررسی تعداد درخواست‌ها
-        if len(recent_requests) >= limit_config['requests']:
+        if not result.allowed:
             logger.warning(
                 f"Rate limit exceeded for {cache_key}. "
-                f"Requests: {len(recent_requests)}/{limit_config['requests']}"
+                f"Limit: {limit_config['requests']}/{limit_config['window']}s"
             )
             
-            return self._create_rate_limit_response(limit_config, recent_requests)
-        
-        # اضافه کردن درخواست فعلی
-        recent_requests.append(current_time)
-        
-        # ذخیره در cache
-        cache.set(cache_key, recent_requests, limit_config['window'] + 60)
+            return self._create_rate_limit_response(limit_config, result)
         
         return None
     
     def _create_rate_limit_response(
         self, 
         limit_config: Dict, 
-        recent_requests: list
+        result: RateLimitResult
     ) -> JsonResponse:
         """
         یک پاسخ JSON با کد وضعیت 429 (Too Many Requests) ساخته و بازمی‌گرداند که نشان‌دهندهٔ عبور از محدودیت نرخ است.
         
-        این متد زمان باقیمانده تا پایان پنجرهٔ نرخ را با استفاده از قدیمی‌ترین تایم‌استمپ موجود در recent_requests محاسبه می‌کند و یک پاسخ شامل پیام خطا و جزئیات محدودیت (تعداد مجاز، طول پنجره، ثانیه‌ها و دقیقه‌های قابل‌انتظار برای تلاش مجدد) تولید می‌کند. مقدار بازگردانده‌شده برای فیلدهای retry_after_seconds و retry_after_minutes هرگز منفی نیست.
+        زمان باقیمانده تا مجاز شدن درخواست بعدی از نتیجهٔ موتور محدودیت نرخ (retry_after) خوانده می‌شود و پاسخ شامل پیام خطا و جزئیات محدودیت (تعداد مجاز، طول پنجره، ثانیه‌ها و دقیقه‌های قابل‌انتظار برای تلاش مجدد) است. مقدار بازگردانده‌شده برای فیلدهای retry_after_seconds و retry_after_minutes هرگز منفی نیست.
         
         Parameters:
             limit_config (Dict): پیکربندی محدودیت شامل کلیدهای 'requests' (حداکثر درخواست‌ها)، 'window' (اندازه پنجره به ثانیه) و 'description' (شرح نوع درخواست).
-            recent_requests (list): لیستی از timestampهای یونیکس (به ثانیه) که نشان‌دهندهٔ زمان‌های درخواست‌های اخیر در پنجرهٔ لغزان است؛ باید حداقل یک مقدار داشته باشد.
+            result (RateLimitResult): نتیجهٔ بررسی رد شده از موتور محدودیت نرخ.
         
         Returns:
             JsonResponse: پاسخ JSON با ساختار:
@@ -245,8 +229,7 @@ class ChatbotRateLimitMiddleware(MiddlewareMixin):
             و کد وضعیت HTTP برابر 429.
         """
         # محاسبه زمان باقی‌مانده
-        oldest_request = min(recent_requests)
-        time_remaining = limit_config['window'] - (int(time.time()) - oldest_request)
+        time_remaining = result.retry_after_seconds
         
         return JsonResponse({
             'error': 'محدودیت تعداد درخواست',
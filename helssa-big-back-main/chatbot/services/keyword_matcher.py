@@ -0,0 +1,244 @@
+"""
+تطبیق‌دهنده کلیدواژه‌ها با ماشین Aho-Corasick
+Keyword Matcher (Aho-Corasick automaton)
+"""
+
+import logging
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db.models import Q
+
+from app_standards.cache_versions import bump_version, get_versions
+
+from ..models import ChatbotResponse
+
+logger = logging.getLogger(__name__)
+
+# کاراکترهایی که یک کلیدواژه را الگوی regex می‌کنند
+REGEX_CHARS = frozenset(r'.*+?[]{}()|^$\\')
+
+VERSION_KEY = 'chatbot:responses:version'
+
+
+class AhoCorasick:
+    """
+    ماشین Aho-Corasick برای یافتن همه رخدادهای مجموعه‌ای از رشته‌ها در یک گذر
+
+    هزینه جستجو متناسب با طول متن به اضافه تعداد رخدادهاست و به تعداد
+    کلیدواژه‌ها بستگی ندارد.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Any]] = [[]]
+        self._built = False
+
+    def add(self, word: str, payload: Any):
+        """افزودن یک کلیدواژه با داده همراه آن (پیش از build)"""
+        if self._built:
+            raise RuntimeError('ماشین پس از build قابل تغییر نیست')
+
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(payload)
+
+    def build(self) -> 'AhoCorasick':
+        """محاسبه پیوندهای شکست (BFS)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                # خروجی‌های حالت شکست نیز در این حالت رخ داده‌اند
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Any]:
+        """داده همراه همه کلیدواژه‌های موجود در متن (با تکرار)"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                yield from outputs[state]
+
+
+class CompiledResponseMatcher:
+    """
+    تطبیق‌دهنده کامپایل‌شده یک مجموعه پاسخ
+
+    کلیدواژه‌های ساده در یک ماشین Aho-Corasick و کلیدواژه‌های regex در یک الگوی
+    یکپارچه (alternation) پیش‌کامپایل می‌شوند. رتبه هر پاسخ جایگاه آن در ترتیب
+    اولویت است و پاسخ با کمترین رتبه در میان تطبیق‌ها برگردانده می‌شود.
+    """
+
+    def __init__(self, responses: Iterable[Any]):
+        """
+        Args:
+            responses: پاسخ‌ها به ترتیب اولویت (بالاترین اولویت اول)
+        """
+        self.responses = list(responses)
+        self.literals = AhoCorasick()
+        self.always_rank: Optional[int] = None
+        self.regex: Optional['re.Pattern'] = None
+        self.regex_patterns: List[Tuple[int, 're.Pattern']] = []
+        self.fallback_patterns: List[Tuple[int, 're.Pattern']] = []
+
+        alternatives = []
+        for rank, response in enumerate(self.responses):
+            for keyword in response.trigger_keywords or ():
+                keyword = str(keyword).lower().strip()
+                if not keyword:
+                    # رشته خالی زیررشته هر پیامی است
+                    if self.always_rank is None:
+                        self.always_rank = rank
+                    continue
+
+                # متن کلیدواژه همیشه به صورت زیررشته بررسی می‌شود
+                self.literals.add(keyword, rank)
+                if REGEX_CHARS.isdisjoint(keyword):
+                    continue
+
+                try:
+                    compiled = re.compile(keyword)
+                except re.error:
+                    logger.warning(f"کلیدواژه regex نامعتبر در پاسخ {response.pk}: {keyword}")
+                    continue
+                if compiled.groupindex or re.search(r'\\\d|\(\?P=', keyword):
+                    # گروه‌های نام‌دار و ارجاع‌ها در الگوی یکپارچه معتبر نمی‌مانند
+                    self.fallback_patterns.append((rank, compiled))
+                else:
+                    alternatives.append((rank, keyword, compiled))
+
+        self.literals.build()
+        self._compile_regex(alternatives)
+
+    def _compile_regex(self, alternatives: List[Tuple[int, str, 're.Pattern']]):
+        if not alternatives:
+            return
+
+        try:
+            # گروه‌های بدون نام پیش‌فیلتر نویسه اول موتور regex را حفظ می‌کنند
+            self.regex = re.compile('|'.join(f'(?:{keyword})' for _, keyword, _ in alternatives))
+            self.regex_patterns = [(rank, compiled) for rank, _, compiled in alternatives]
+        except re.error:
+            # مثلاً پرچم‌های inline که فقط در ابتدای الگو مجازند
+            self.fallback_patterns.extend((rank, compiled) for rank, _, compiled in alternatives)
+            self.fallback_patterns.sort(key=lambda item: item[0])
+
+    def match(self, message: str) -> Optional[Any]:
+        """
+        پاسخ با بالاترین اولویت منطبق با پیام (پیام باید lowercase و trim شده باشد)
+        """
+        best = self.always_rank if self.always_rank is not None else len(self.responses)
+        if best == 0:
+            return self.responses[0] if self.responses else None
+
+        for rank in self.literals.iter_matches(message):
+            if rank < best:
+                best = rank
+                if best == 0:
+                    break
+
+        # الگوی یکپارچه فقط وجود تطبیق را تعیین می‌کند؛ در آن صورت الگوهای با
+        # رتبه بهتر به ترتیب رتبه بررسی می‌شوند و اولین تطبیق بهترین است
+        if self.regex_patterns and self.regex_patterns[0][0] < best and self.regex.search(message):
+            for rank, pattern in self.regex_patterns:
+                if rank >= best:
+                    break
+                if pattern.search(message):
+                    best = rank
+                    break
+
+        for rank, pattern in self.fallback_patterns:
+            if rank >= best:
+                break
+            if pattern.search(message):
+                best = rank
+                break
+
+        return self.responses[best] if best < len(self.responses) else None
+
+
+class KeywordCounter:
+    """
+    شمارش کلیدواژه‌های متمایز هر گروه (مثلاً نیت) در یک گذر روی متن
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = {name: tuple(keywords) for name, keywords in groups.items()}
+        self.automaton = AhoCorasick()
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                self.automaton.add(keyword, (name, keyword))
+        self.automaton.build()
+
+    def count(self, text: str) -> Dict[str, int]:
+        """تعداد کلیدواژه‌های متمایز یافت‌شده از هر گروه"""
+        found = set(self.automaton.iter_matches(text))
+        counts: Dict[str, int] = {}
+        for name, _ in found:
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+_matchers: Dict[Tuple[str, Optional[str]], Tuple[int, CompiledResponseMatcher]] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_response_set_version() -> int:
+    """نسخه فعلی مجموعه پاسخ‌ها (با هر ذخیره یا حذف ChatbotResponse افزایش می‌یابد)"""
+    return get_versions([VERSION_KEY])[VERSION_KEY]
+
+
+def invalidate_response_matchers():
+    """باطل کردن تطبیق‌دهنده‌های کامپایل‌شده همه پردازه‌ها"""
+    bump_version(VERSION_KEY)
+    with _matchers_lock:
+        _matchers.clear()
+
+
+def get_response_matcher(target_user: str, category: Optional[str] = None) -> CompiledResponseMatcher:
+    """
+    تطبیق‌دهنده کامپایل‌شده پاسخ‌های فعال یک نوع کاربر (و دسته‌بندی)
+
+    تا تغییر نسخه مجموعه پاسخ‌ها از حافظه پردازه برگردانده می‌شود.
+    """
+    key = (target_user, category)
+    version = get_response_set_version()
+    cached = _matchers.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    queryset = ChatbotResponse.objects.filter(
+        is_active=True
+    ).filter(
+        Q(target_user=target_user) | Q(target_user='both')
+    )
+    if category:
+        queryset = queryset.filter(category=category)
+
+    matcher = CompiledResponseMatcher(queryset.order_by('-priority', '-created_at'))
+    with _matchers_lock:
+        _matchers[key] = (version, matcher)
+    return matcher
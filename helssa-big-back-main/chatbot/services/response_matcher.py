@@ -7,6 +7,19 @@ import re
 from typing import List, Optional, Dict, Any
 from django.db.models import Q
 from ..models import ChatbotResponse
+from .keyword_matcher import KeywordCounter, get_response_matcher
+
+# کلمات کلیدی برای دسته‌بندی‌های مختلف نیت پیام
+INTENT_KEYWORDS = {
+    'greeting': ['سلام', 'درود', 'صبح بخیر', 'عصر بخیر', 'hello', 'hi'],
+    'symptom_inquiry': ['علائم', 'درد', 'تب', 'سردرد', 'مشکل', 'بیماری'],
+    'medication_info': ['دارو', 'قرص', 'کپسول', 'شربت', 'مصرف', 'دوز'],
+    'appointment': ['نوبت', 'وقت', 'رزرو', 'appointment'],
+    'emergency': ['اورژانس', 'فوری', 'emergency', 'urgent'],
+    'farewell': ['خداحافظ', 'خدانگهدار', 'bye', 'goodbye']
+}
+
+_intent_counter = KeywordCounter(INTENT_KEYWORDS)
 
 
 class ResponseMatcherService:
@@ -30,7 +43,7 @@ class ResponseMatcherService:
         """
         پاسخ اولین ردیف ChatbotResponse که با پیام ورودی منطبق است را برمی‌گرداند.
         
-        این متد مجموعه‌ای از پاسخ‌های فعال (is_active=True) را می‌گیرد و آن‌ها را بر اساس محدوده هدف (target_user برابر با مقدار سرویس یا 'both') فیلتر می‌کند. در صورت ارسال پارامتر category، مجموعه نتایج به آن دسته محدود می‌شود. نتایج بر اساس اولویت (نزولی) و سپس زمان ایجاد (جدیدترین اول) مرتب می‌شوند. پیام ورودی پیش از بررسی نرمال‌سازی شده (تبدیل به حروف کوچک و حذف فاصله‌های اضافی) و سپس برای هر پاسخ، کلیدواژه‌های تریگر با پیام با استفاده از _matches_keywords (که شامل تطبیق ساده متن و بررسی الگوهای منطبق با regex است) مقایسه می‌شوند. اولین پاسخ مطابق بازگردانده می‌شود؛ در غیر این صورت None بازگردانده می‌شود.
+        این متد پاسخ‌های فعال (is_active=True) با محدوده هدف (target_user برابر با مقدار سرویس یا 'both') و در صورت ارسال category محدود به آن دسته را بر اساس اولویت (نزولی) و سپس زمان ایجاد (جدیدترین اول) در نظر می‌گیرد. کلیدواژه‌های همه پاسخ‌ها یک‌بار در یک ماشین Aho-Corasick (تطبیق زیررشته) و یک الگوی regex یکپارچه کامپایل می‌شوند (keyword_matcher) و تا ذخیره یا حذف یک ChatbotResponse معتبر می‌مانند. پیام نرمال‌سازی‌شده (حروف کوچک و trim) در یک گذر بررسی و پاسخ منطبق با بالاترین اولویت بازگردانده می‌شود؛ در غیر این صورت None بازگردانده می‌شود. معنای تطبیق با _matches_keywords یکسان است.
         
         Parameters:
             message (str): متن پیام کاربر؛ این مقدار پیش از تطبیق به‌صورت lowercase و با trim شده استفاده می‌شود.
@@ -39,28 +52,10 @@ class ResponseMatcherService:
         Returns:
             Optional[ChatbotResponse]: اولین شیء ChatbotResponse که با پیام مطابقت دارد یا None اگر مطابقتی یافت نشود.
         """
-        # فیلتر کردن پاسخ‌های فعال
-        queryset = ChatbotResponse.objects.filter(
-            is_active=True
-        ).filter(
-            Q(target_user=self.target_user) | Q(target_user='both')
-        )
-        
-        # فیلتر بر اساس دسته‌بندی
-        if category:
-            queryset = queryset.filter(category=category)
-        
-        # مرتب‌سازی بر اساس اولویت
-        responses = queryset.order_by('-priority', '-created_at')
-        
-        message_lower = message.lower().strip()
-        
-        # جستجو برای تطبیق کلمات کلیدی
-        for response in responses:
-            if self._matches_keywords(message_lower, response.trigger_keywords):
-                return response
-        
-        return None
+        # تطبیق‌دهنده کامپایل‌شده تا تغییر مجموعه پاسخ‌ها در حافظه می‌ماند؛
+        # همه کلیدواژه‌ها در یک گذر روی پیام بررسی می‌شوند
+        matcher = get_response_matcher(self.target_user, category)
+        return matcher.match(message.lower().strip())
     
     def get_responses_by_category(self, category: str) -> List[ChatbotResponse]:
         """
@@ -202,27 +197,20 @@ class ResponseMatcherService:
                 - word_count (int): تعداد واژه‌ها براساس جداشدن با فاصلهٔ سفید.
         
         نکات پیاده‌سازی (مختصر و مهم):
-            - تشخیص بر پایهٔ مقایسهٔ سادهٔ زیررشته‌ای است و از تطابق‌های پیچیدهٔ رگِکس یا پردازش زبان طبیعی استفاده نمی‌کند.
+            - تشخیص بر پایهٔ مقایسهٔ سادهٔ زیررشته‌ای است (با یک ماشین Aho-Corasick از پیش ساخته‌شده برای همه نیت‌ها) و از تطابق‌های پیچیدهٔ رگِکس یا پردازش زبان طبیعی استفاده نمی‌کند.
             - امتیازها نسبی به تعداد کلمات کلیدی هر نیت هستند؛ نیتی با کلیدواژهٔ بیشتر ممکن است امتیاز کلی متفاوتی نسبت به نیتی با کلیدواژهٔ کمتر کسب کند.
             - تابع هیچ استثنایی را به‌طور صریح پرتاب نمی‌کند و هیچ اثر جانبی (مانند تغییر پایگاه‌داده یا لاگ‌نویسی) ندارد.
         """
         message_lower = message.lower().strip()
         
-        # کلمات کلیدی برای دسته‌بندی‌های مختلف
-        intent_keywords = {
-            'greeting': ['سلام', 'درود', 'صبح بخیر', 'عصر بخیر', 'hello', 'hi'],
-            'symptom_inquiry': ['علائم', 'درد', 'تب', 'سردرد', 'مشکل', 'بیماری'],
-            'medication_info': ['دارو', 'قرص', 'کپسول', 'شربت', 'مصرف', 'دوز'],
-            'appointment': ['نوبت', 'وقت', 'رزرو', 'appointment'],
-            'emergency': ['اورژانس', 'فوری', 'emergency', 'urgent'],
-            'farewell': ['خداحافظ', 'خدانگهدار', 'bye', 'goodbye']
-        }
+        # شمارش کلمات کلیدی همه نیت‌ها در یک گذر روی پیام
+        matches_by_intent = _intent_counter.count(message_lower)
         
         detected_intents = []
         confidence_scores = {}
         
-        for intent, keywords in intent_keywords.items():
-            matches = sum(1 for keyword in keywords if keyword in message_lower)
+        for intent, keywords in INTENT_KEYWORDS.items():
+            matches = matches_by_intent.get(intent, 0)
             if matches > 0:
                 detected_intents.append(intent)
                 confidence_scores[intent] = matches / len(keywords)
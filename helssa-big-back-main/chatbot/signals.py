@@ -0,0 +1,21 @@
+"""
+سیگنال‌های اپ چت‌بات
+Chatbot Signals
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ChatbotResponse
+from .services.keyword_matcher import invalidate_response_matchers
+
+
+@receiver([post_save, post_delete], sender=ChatbotResponse)
+def invalidate_compiled_responses(sender, **kwargs):
+    """
+    باطل کردن تطبیق‌دهنده‌های کامپایل‌شده پس از تغییر پاسخ‌های از پیش تعریف شده
+
+    پس از commit اجرا می‌شود تا پردازه دیگری مجموعه پیش از commit را با نسخه
+    جدید کامپایل نکند.
+    """
+    transaction.on_commit(invalidate_response_matchers)
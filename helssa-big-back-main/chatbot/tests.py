@@ -3,6 +3,7 @@
 Chatbot Tests
 """
 
+from django.core.cache import cache
 from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -12,6 +13,8 @@ from rest_framework import status
 from unittest.mock import patch, MagicMock
 from datetime import timedelta
 
+from app_standards.rate_limiting import RateLimitResult
+
 from .models import ChatbotSession, Conversation, Message, ChatbotResponse
 from .services import PatientChatbotService, DoctorChatbotService, AIIntegrationService
 from .serializers import (
@@ -170,13 +173,14 @@ class ChatbotServicesTest(TestCase):
         )
         
         # ایجاد پاسخ‌های نمونه
-        ChatbotResponse.objects.create(
-            category='greeting',
-            target_user='both',
-            trigger_keywords=['سلام', 'hello'],
-            response_text='سلام! خوش آمدید.',
-            priority=1
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ChatbotResponse.objects.create(
+                category='greeting',
+                target_user='both',
+                trigger_keywords=['سلام', 'hello'],
+                response_text='سلام! خوش آمدید.',
+                priority=1
+            )
     
     def test_patient_chatbot_service(self):
         """
@@ -468,14 +472,15 @@ class ChatbotMiddlewareTest(TestCase):
         )
         self.client = APIClient()
     
-    @patch('django.core.cache.cache.get')
-    @patch('django.core.cache.cache.set')
-    def test_rate_limiting_middleware(self, mock_cache_set, mock_cache_get):
+    @patch('chatbot.middleware.rate_limiting.get_rate_limiter')
+    def test_rate_limiting_middleware(self, mock_get_rate_limiter):
         """
         تست middleware محدودسازی نرخ
         """
-        # شبیه‌سازی درخواست‌های زیاد
-        mock_cache_get.return_value = [int(timezone.now().timestamp())] * 35
+        # شبیه‌سازی سهمیهٔ تمام‌شده در موتور محدودیت نرخ
+        mock_get_rate_limiter.return_value.check.return_value = RateLimitResult(
+            allowed=False, limit=30, remaining=0, retry_after=90.5, reset_after=120.0
+        )
         
         self.client.force_authenticate(user=self.user)
         
@@ -486,6 +491,7 @@ class ChatbotMiddlewareTest(TestCase):
         
         # باید محدودیت اعمال شود
         self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.json()['details']['retry_after_seconds'], 91)
     
     def test_security_middleware_sensitive_content(self):
         """
@@ -515,4 +521,69 @@ class ChatbotMiddlewareTest(TestCase):
         
         # باید خطای امنیتی بازگرداند
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('محتوای حساس', response.data['message'])
\ No newline at end of file
+        self.assertIn('محتوای حساس', response.data['message'])
+
+class ResponseMatcherTest(TestCase):
+    """
+    تست‌های تطبیق‌دهنده کامپایل‌شده کلیدواژه‌ها
+    """
+
+    def setUp(self):
+        """شروع با نسخه تازه مجموعه پاسخ‌ها"""
+        cache.clear()
+
+    def test_highest_priority_match(self):
+        """
+        تست انتخاب پاسخ با بالاترین اولویت میان کلیدواژه‌های ساده و regex
+        """
+        from .services.response_matcher import ResponseMatcherService
+
+        ChatbotResponse.objects.create(
+            category='general', target_user='both',
+            trigger_keywords=['سر درد'], response_text='کم‌اولویت', priority=1
+        )
+        regex_response = ChatbotResponse.objects.create(
+            category='symptom', target_user='patient',
+            trigger_keywords=[r'درد.*شدید'], response_text='regex', priority=5
+        )
+        ChatbotResponse.objects.create(
+            category='symptom', target_user='doctor',
+            trigger_keywords=['درد'], response_text='پزشک', priority=10
+        )
+
+        service = ResponseMatcherService('patient')
+        self.assertEqual(service.find_matching_response('سر درد خیلی شدید دارم'), regex_response)
+        self.assertEqual(service.find_matching_response('سر درد دارم').response_text, 'کم‌اولویت')
+        self.assertIsNone(service.find_matching_response('سلام'))
+        self.assertIsNone(service.find_matching_response('سر درد', category='greeting'))
+
+    def test_matcher_invalidated_on_change(self):
+        """
+        تست بازسازی تطبیق‌دهنده پس از افزودن یا غیرفعال کردن پاسخ
+        """
+        from .services.response_matcher import ResponseMatcherService
+
+        service = ResponseMatcherService('patient')
+        self.assertIsNone(service.find_matching_response('نوبت می‌خواهم'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = ChatbotResponse.objects.create(
+                category='appointment', target_user='patient',
+                trigger_keywords=['نوبت'], response_text='نوبت‌دهی', priority=1
+            )
+        self.assertEqual(service.find_matching_response('نوبت می‌خواهم'), response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response.is_active = False
+            response.save()
+        self.assertIsNone(service.find_matching_response('نوبت می‌خواهم'))
+
+    def test_intent_counts(self):
+        """
+        تست شمارش کلیدواژه‌های متمایز هر نیت
+        """
+        from .services.keyword_matcher import KeywordCounter
+
+        counter = KeywordCounter({'symptom': ['درد', 'تب'], 'greeting': ['سلام']})
+        self.assertEqual(counter.count('سلام، درد و تب و باز هم درد'), {'symptom': 2, 'greeting': 1})
+        self.assertEqual(counter.count('ممنون'), {})
@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 
 from .models import (
-    Encounter, AudioChunk, Transcript,
+    Encounter, AudioChunk, Transcript, LiveTranscript,
     SOAPReport, Prescription, EncounterFile
 )
 
@@ -176,6 +176,27 @@ class TranscriptAdmin(admin.ModelAdmin):
     )
 
 
+
+@admin.register(LiveTranscript)
+class LiveTranscriptAdmin(admin.ModelAdmin):
+    """ادمین رونویسی‌های زنده"""
+    
+    list_display = [
+        'encounter', 'word_count', 'processed_chunks', 'received_chunks',
+        'failed_chunks', 'visit_ended_at', 'completed_at'
+    ]
+    list_filter = ['visit_ended_at', 'completed_at']
+    search_fields = ['encounter__id']
+    readonly_fields = [
+        'id', 'encounter', 'word_count', 'last_chunk_index', 'received_chunks',
+        'processed_chunks', 'failed_chunks', 'progress', 'visit_ended_at',
+        'completed_at', 'created_at', 'updated_at'
+    ]
+    
+    def has_add_permission(self, request):
+        """رونویسی زنده فقط توسط خط لوله رونویسی ساخته می‌شود"""
+        return False
+
 @admin.register(SOAPReport)
 class SOAPReportAdmin(admin.ModelAdmin):
     """ادمین گزارش‌های SOAP"""
@@ -17,6 +17,7 @@ from .report_views import (
     GenerateSOAPView,
     ShareReportView
 )
+from .health_views import ServiceHealthView
 
 __all__ = [
     'EncounterViewSet',
@@ -31,4 +32,5 @@ __all__ = [
     'PrescriptionViewSet',
     'GenerateSOAPView',
     'ShareReportView',
+    'ServiceHealthView',
 ]
\ No newline at end of file
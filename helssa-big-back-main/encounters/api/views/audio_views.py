@@ -6,7 +6,7 @@ from rest_framework.parsers import MultiPartParser
 from django.db.models import Q
 
 from ...models import AudioChunk, Transcript, Encounter
-from ...services import AudioProcessingService
+from ...services import AudioProcessingService, LiveTranscriptionService
 from ..serializers import (
     AudioChunkSerializer,
     TranscriptSerializer
@@ -95,22 +95,19 @@ class AudioChunkViewSet(viewsets.ModelViewSet):
                 'error': 'ملاقات یافت نشد'
             }, status=status.HTTP_404_NOT_FOUND)
             
-        # محاسبه وضعیت
-        total_chunks = AudioChunk.objects.filter(
-            encounter_id=encounter_id
-        ).count()
-        
-        processed_chunks = AudioChunk.objects.filter(
-            encounter_id=encounter_id,
-            is_processed=True
-        ).count()
+        # وضعیت از شمارنده‌های رونویسی زنده (بدون شمارش قطعات)
+        progress = LiveTranscriptionService().get_progress(encounter_id)
+        total_chunks = progress.get('received_chunks', 0)
+        processed_chunks = progress.get('processed_chunks', 0)
         
         return Response({
             'encounter_id': encounter_id,
             'total_chunks': total_chunks,
             'processed_chunks': processed_chunks,
-            'progress_percent': (processed_chunks / total_chunks * 100) if total_chunks > 0 else 0,
-            'is_complete': total_chunks > 0 and processed_chunks == total_chunks
+            'failed_chunks': progress.get('failed_chunks', 0),
+            'progress_percent': progress.get('progress', 0),
+            'is_complete': total_chunks > 0 and processed_chunks >= total_chunks,
+            'transcription_complete': progress.get('is_complete', False)
         })
 
 
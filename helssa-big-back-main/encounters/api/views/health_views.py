@@ -0,0 +1,28 @@
+from django.utils import timezone
+from rest_framework import views, status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+
+from ...services.cpu_executor import get_cpu_executor
+
+
+class ServiceHealthView(views.APIView):
+    """وضعیت سرویس‌های ملاقات برای پایش (pool کارهای پردازشی)"""
+    
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get(self, request):
+        """
+        وضعیت pool کارهای پردازشی
+        
+        وقتی درخواستی منتظر جا در pool است (waiting_for_slot)، سرویس اشباع‌شده
+        گزارش می‌شود.
+        """
+        cpu_stats = get_cpu_executor().stats()
+        saturated = cpu_stats['waiting_for_slot'] > 0
+        
+        return Response({
+            'status': 'degraded' if saturated else 'healthy',
+            'timestamp': timezone.now(),
+            'cpu_executor': cpu_stats
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,129 @@
+"""
+دستور مدیریت برای مهاجرت فایل‌ها و قطعات صوتی رمزشده قدیمی به قالب جریانی
+Management command to re-encrypt legacy (Fernet) encounter blobs as AEAD streams
+"""
+
+from urllib.parse import urlparse
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from encounters.models import AudioChunk, EncounterFile
+from encounters.services.audio_processor import AudioProcessingService
+from encounters.services.file_manager import EncounterFileManager
+from encounters.utils.encryption import (
+    DEFAULT_SEGMENT_SIZE, DecryptionError, get_key_schedule, reencrypt_legacy_blob
+)
+
+STREAM_FORMAT = 'stream-v2'
+
+
+class Command(BaseCommand):
+    """
+    رمزنگاری دوباره داده‌های قالب قدیمی (توکن Fernet) با reencrypt_legacy_blob
+
+    رکوردهایی که در قالب جریانی ثبت شده‌اند رد می‌شوند؛ اجرای دوباره دستور امن است.
+    """
+    help = 'مهاجرت فایل‌ها و قطعات صوتی رمزشده قدیمی ملاقات‌ها به قالب جریانی AES-GCM'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='تعداد رکوردهای خوانده‌شده از دیتابیس در هر دسته',
+        )
+        parser.add_argument(
+            '--encounter',
+            help='محدود کردن به یک ملاقات',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='فقط شمارش داده‌های قالب قدیمی بدون نوشتن',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.audio_service = AudioProcessingService()
+        self.file_manager = EncounterFileManager()
+
+        chunks = AudioChunk.objects.filter(is_encrypted=True).exclude(
+            encryption_metadata__format=STREAM_FORMAT
+        ).select_related('encounter')
+        files = EncounterFile.objects.filter(is_encrypted=True).exclude(
+            metadata__encryption_format=STREAM_FORMAT
+        ).select_related('encounter')
+        if options['encounter']:
+            chunks = chunks.filter(encounter_id=options['encounter'])
+            files = files.filter(encounter_id=options['encounter'])
+
+        converted, failed = self._migrate(chunks, self._reencrypt_chunk)
+        self._report('قطعه صوتی', converted, failed)
+        converted, failed = self._migrate(files, self._reencrypt_file)
+        self._report('فایل', converted, failed)
+
+    def _migrate(self, queryset, reencrypt):
+        converted = failed = 0
+        for record in queryset.order_by('pk').iterator(chunk_size=self.batch_size):
+            try:
+                if async_to_sync(reencrypt)(record):
+                    converted += 1
+            except DecryptionError as e:
+                failed += 1
+                self.stderr.write(f'{record._meta.model_name} {record.pk}: {e}')
+        return converted, failed
+
+    async def _reencrypt_chunk(self, chunk: AudioChunk) -> bool:
+        key = chunk.encounter.encryption_key
+        blob = await self.audio_service._download_from_storage(chunk.file_url)
+        upgraded = reencrypt_legacy_blob(blob, key)
+        if self.dry_run:
+            return upgraded is not None
+        if upgraded is not None:
+            await self.audio_service._upload_to_storage(
+                _storage_path(chunk.file_url), upgraded, content_type=f'audio/{chunk.format}'
+            )
+            chunk.file_size = len(upgraded)
+
+        chunk.encryption_metadata = {
+            'algorithm': 'AES-256-GCM',
+            'format': STREAM_FORMAT,
+            'segment_size': DEFAULT_SEGMENT_SIZE,
+            'key_id': get_key_schedule(key).key_id,
+        }
+        await chunk.asave(update_fields=['file_size', 'encryption_metadata'])
+        return upgraded is not None
+
+    async def _reencrypt_file(self, file: EncounterFile) -> bool:
+        blob = b''.join([
+            data async for data in self.file_manager._download_stream_from_storage(file.file_url)
+        ])
+        upgraded = reencrypt_legacy_blob(blob, file.encounter.encryption_key)
+        if self.dry_run:
+            return upgraded is not None
+        if upgraded is not None:
+            await self.file_manager._upload_stream_to_storage(
+                _storage_path(file.file_url), _single(upgraded),
+                length=len(upgraded), content_type=file.mime_type
+            )
+
+        file.metadata = {**file.metadata, 'encryption_format': STREAM_FORMAT}
+        await file.asave(update_fields=['metadata'])
+        return upgraded is not None
+
+    def _report(self, label: str, converted: int, failed: int):
+        action = 'قابل تبدیل' if self.dry_run else 'تبدیل شد'
+        self.stdout.write(self.style.SUCCESS(f'{label}: {converted} مورد {action}'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{label}: {failed} مورد قابل رمزگشایی نبود'))
+
+
+def _storage_path(url: str) -> str:
+    """مسیر شیء در storage از روی URL ذخیره‌شده"""
+    return urlparse(url).path.lstrip('/')
+
+
+async def _single(data: bytes):
+    yield data
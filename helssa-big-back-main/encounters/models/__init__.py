@@ -2,6 +2,7 @@
 from .encounter import Encounter
 from .audio_chunk import AudioChunk
 from .transcript import Transcript
+from .live_transcript import LiveTranscript
 from .soap_report import SOAPReport
 from .prescription import Prescription
 from .encounter_file import EncounterFile
@@ -10,6 +11,7 @@ __all__ = [
     'Encounter',
     'AudioChunk',
     'Transcript',
+    'LiveTranscript',
     'SOAPReport',
     'Prescription',
     'EncounterFile',
@@ -0,0 +1,99 @@
+from django.db import models
+import uuid
+
+
+class LiveTranscript(models.Model):
+    """
+    رونویسی تجمعی ملاقات در حال انجام
+
+    هر قطعه‌ای که رونویسی‌اش تمام شود بلافاصله به انتهای متن اضافه و
+    موجودیت‌های پزشکی آن استخراج می‌شود؛ شمارنده‌ها پیشرفت ملاقات را بدون
+    شمارش دوباره قطعات و رونویسی‌ها نگه می‌دارند.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    encounter = models.OneToOneField(
+        'Encounter',
+        on_delete=models.CASCADE,
+        related_name='live_transcript',
+        verbose_name='ملاقات'
+    )
+
+    # متن و موجودیت‌های تجمعی
+    text = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='متن ادغام شده'
+    )
+    word_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد کلمات'
+    )
+    medical_entities = models.JSONField(
+        default=list,
+        verbose_name='موجودیت‌های پزشکی',
+        help_text="موجودیت‌ها با آفست در متن ادغام شده"
+    )
+
+    # پیشرفت
+    last_chunk_index = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name='آخرین قطعه ادغام شده'
+    )
+    received_chunks = models.PositiveIntegerField(
+        default=0,
+        verbose_name='قطعات دریافت شده'
+    )
+    processed_chunks = models.PositiveIntegerField(
+        default=0,
+        verbose_name='قطعات پردازش شده',
+        help_text="قطعات ادغام شده یا رد شده به دلیل خطای رونویسی"
+    )
+    failed_chunks = models.PositiveIntegerField(
+        default=0,
+        verbose_name='قطعات ناموفق'
+    )
+
+    visit_ended_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='زمان پایان ویزیت'
+    )
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='زمان تکمیل رونویسی'
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاریخ ایجاد'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='تاریخ به‌روزرسانی'
+    )
+
+    class Meta:
+        db_table = 'live_transcripts'
+        verbose_name = 'رونویسی زنده'
+        verbose_name_plural = 'رونویسی‌های زنده'
+
+    def __str__(self):
+        return f"رونویسی زنده ملاقات {self.encounter_id}"
+
+    @property
+    def is_ready(self) -> bool:
+        """آیا ویزیت تمام شده و همه قطعات دریافتی پردازش شده‌اند"""
+        return (
+            self.visit_ended_at is not None and
+            self.processed_chunks >= self.received_chunks
+        )
+
+    @property
+    def progress(self) -> float:
+        """درصد پیشرفت رونویسی قطعات دریافتی"""
+        if not self.received_chunks:
+            return 0.0
+        return round(min(self.processed_chunks / self.received_chunks, 1.0) * 100, 1)
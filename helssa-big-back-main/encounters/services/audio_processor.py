@@ -1,11 +1,22 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import io
+import uuid
 import asyncio
+import itertools
+from collections import deque
+from contextlib import aclosing
 from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, FloatField, Sum, Value, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
+from pydub import AudioSegment
 
 from ..models import Encounter, AudioChunk
-from ..utils.encryption import encrypt_data, decrypt_data
+from ..utils.encryption import (
+    encrypt_bytes, decrypt_bytes, get_key_schedule, StreamEncryptor, DEFAULT_SEGMENT_SIZE
+)
+from .cpu_executor import run_cpu_bound
 
 
 class AudioProcessingService:
@@ -14,6 +25,11 @@ class AudioProcessingService:
     def __init__(self):
         self.chunk_size_mb = 10  # حجم هر قطعه
         self.overlap_seconds = 2  # همپوشانی بین قطعات
+        self.merge_format = 'mp3'  # فرمت فایل ادغام‌شده
+        # تعداد قطعاتی که هم‌زمان دانلود و رمزگشایی می‌شوند
+        self.merge_prefetch = max(1, getattr(settings, 'AUDIO_MERGE_PREFETCH', 4))
+        # حجم هر بخش آپلود چندبخشی (حداقل ۵ مگابایت در S3/MinIO)
+        self.upload_part_size = getattr(settings, 'AUDIO_UPLOAD_PART_SIZE_MB', 8) * 1024 * 1024
         
     async def process_visit_audio(
         self,
@@ -25,8 +41,9 @@ class AudioProcessingService:
         
         encounter = await sync_to_async(Encounter.objects.get)(id=encounter_id)
         
-        # رمزنگاری صوت
-        encrypted_audio = await encrypt_data(
+        # رمزنگاری صوت (AEAD جریانی روی بایت‌های خام، خارج از event loop)
+        encrypted_audio = await run_cpu_bound(
+            encrypt_bytes,
             audio_stream,
             encounter.encryption_key
         )
@@ -55,7 +72,9 @@ class AudioProcessingService:
             is_encrypted=True,
             encryption_metadata={
                 'algorithm': 'AES-256-GCM',
-                'key_id': encounter.encryption_key[:8]
+                'format': 'stream-v2',
+                'segment_size': DEFAULT_SEGMENT_SIZE,
+                'key_id': get_key_schedule(encounter.encryption_key).key_id
             }
         )
         
@@ -70,54 +89,39 @@ class AudioProcessingService:
         self,
         encounter_id: str
     ) -> str:
-        """ادغام قطعات صوتی"""
+        """
+        ادغام قطعات صوتی
+
+        قطعات با پنجره محدود هم‌زمان دانلود و رمزگشایی می‌شوند، به ترتیب
+        chunk_index به هم متصل و به صورت جریانی رمز می‌شوند و خروجی بخش به بخش
+        آپلود می‌شود؛ حافظه مصرفی به تعداد قطعات وابسته نیست.
+        """
         
         # بازیابی همه قطعات
         chunks = await sync_to_async(list)(
             AudioChunk.objects.filter(
                 encounter_id=encounter_id
+            ).only(
+                'id', 'chunk_index', 'file_url', 'duration_seconds', 'format'
             ).order_by('chunk_index')
         )
         
         if not chunks:
             raise ValueError("هیچ قطعه صوتی یافت نشد")
             
-        # دانلود و رمزگشایی
-        audio_segments = []
-        for chunk in chunks:
-            encrypted_data = await self._download_from_storage(
-                chunk.file_url
-            )
-            
-            decrypted_data = await decrypt_data(
-                encrypted_data,
-                chunk.encounter.encryption_key
+        encryption_key = await self._get_encryption_key(encounter_id)
+        
+        # دانلود و رمزگشایی، ادغام با حذف همپوشانی‌ها، کدگذاری، رمزنگاری و آپلود فایل نهایی
+        segments = self._iter_decrypted_chunks(chunks, encryption_key)
+        merged = self._encode_stream(self._splice_overlaps(segments, self.overlap_seconds))
+        encrypted = self._encrypt_stream(merged, encryption_key)
+        
+        async with aclosing(segments):
+            final_url = await self._upload_stream_to_storage(
+                f"encounters/{encounter_id}/full_recording.{self.merge_format}",
+                encrypted,
+                content_type=f'audio/{self.merge_format}'
             )
-            
-            audio_segments.append({
-                'data': decrypted_data,
-                'index': chunk.chunk_index,
-                'duration': chunk.duration_seconds
-            })
-            
-        # ادغام با حذف همپوشانی‌ها
-        merged_audio = await self._merge_with_overlap_removal(
-            audio_segments,
-            self.overlap_seconds
-        )
-        
-        # رمزنگاری و آپلود فایل نهایی
-        encounter = await sync_to_async(Encounter.objects.get)(id=encounter_id)
-        encrypted_final = await encrypt_data(
-            merged_audio,
-            encounter.encryption_key
-        )
-        
-        final_url = await self._upload_to_storage(
-            f"encounters/{encounter_id}/full_recording.mp3",
-            encrypted_final,
-            content_type='audio/mp3'
-        )
         
         return final_url
         
@@ -129,35 +133,239 @@ class AudioProcessingService:
     ) -> bytes:
         """استخراج بخشی از صوت"""
         
-        # پیدا کردن قطعات مربوطه
-        chunks = await sync_to_async(list)(
-            AudioChunk.objects.filter(
-                encounter_id=encounter_id
-            ).order_by('chunk_index')
+        # پیدا کردن قطعات مربوطه با ایندکس آفست زمانی قطعات
+        relevant_chunks = await sync_to_async(list)(
+            self._chunk_offsets(encounter_id).filter(
+                end_offset__gte=start_time,
+                start_offset__lte=end_time
+            )
         )
         
-        # محاسبه قطعات مورد نیاز
-        relevant_chunks = []
-        current_time = 0
-        
-        for chunk in chunks:
-            chunk_start = current_time
-            chunk_end = current_time + chunk.duration_seconds
-            
-            if chunk_end >= start_time and chunk_start <= end_time:
-                relevant_chunks.append(chunk)
-                
-            current_time = chunk_end
+        if not relevant_chunks:
+            return b''
             
         # دانلود و استخراج بخش مورد نظر
         segment_data = await self._extract_segment_from_chunks(
             relevant_chunks,
             start_time,
-            end_time
+            end_time,
+            await self._get_encryption_key(encounter_id)
         )
         
         return segment_data
         
+    def _chunk_offsets(self, encounter_id: str):
+        """
+        قطعات ملاقات به همراه آفست شروع و پایان هر قطعه در کل ضبط
+        
+        آفست‌ها با جمع تجمعی duration_seconds به ترتیب chunk_index در خود
+        پایگاه‌داده محاسبه می‌شوند (روی ایندکس یکتای encounter/chunk_index)،
+        بنابراین فیلتر بازه زمانی فقط ردیف‌های قطعات لازم را برمی‌گرداند.
+        هر قطعه بعد از اولی با overlap_seconds صوت تکراری شروع می‌شود، پس آفست آن
+        به اندازه همپوشانی‌های قبلی عقب‌تر است (همان خط زمانی فایل ادغام‌شده).
+        """
+        
+        order = F('chunk_index').asc()
+        return AudioChunk.objects.filter(
+            encounter_id=encounter_id
+        ).annotate(
+            position=Window(expression=RowNumber(), order_by=order),
+            recorded_seconds=Window(expression=Sum('duration_seconds'), order_by=order)
+        ).annotate(
+            end_offset=ExpressionWrapper(
+                F('recorded_seconds') - (F('position') - 1) * Value(float(self.overlap_seconds)),
+                output_field=FloatField()
+            )
+        ).annotate(
+            start_offset=F('end_offset') - F('duration_seconds')
+        ).only(
+            'id', 'chunk_index', 'file_url', 'duration_seconds', 'format'
+        ).order_by('chunk_index')
+        
+    async def _get_encryption_key(self, encounter_id: str) -> str:
+        """کلید رمزنگاری ملاقات (یک پرس‌وجو برای همه قطعات)"""
+        
+        return await sync_to_async(
+            Encounter.objects.values_list('encryption_key', flat=True).get
+        )(id=encounter_id)
+        
+    async def _fetch_chunk(self, chunk: AudioChunk, encryption_key: str) -> bytes:
+        """دانلود و رمزگشایی یک قطعه"""
+        
+        encrypted_data = await self._download_from_storage(chunk.file_url)
+        return await run_cpu_bound(decrypt_bytes, encrypted_data, encryption_key)
+        
+    async def _iter_decrypted_chunks(
+        self,
+        chunks: List[AudioChunk],
+        encryption_key: str
+    ) -> AsyncIterator[Tuple[AudioChunk, bytes]]:
+        """
+        دانلود و رمزگشایی هم‌زمان قطعات با پنجره merge_prefetch
+        
+        خروجی به ترتیب ورودی است؛ حداکثر merge_prefetch قطعه در حال دریافت یا
+        منتظر مصرف‌اند.
+        """
+        
+        remaining = iter(chunks)
+        pending = deque()
+        
+        def fill():
+            for chunk in itertools.islice(remaining, self.merge_prefetch - len(pending)):
+                pending.append((
+                    chunk,
+                    asyncio.ensure_future(self._fetch_chunk(chunk, encryption_key))
+                ))
+                
+        try:
+            fill()
+            while pending:
+                chunk, task = pending[0]
+                data = await task
+                pending.popleft()
+                fill()
+                yield chunk, data
+        finally:
+            tasks = [task for _, task in pending]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+    async def _splice_overlaps(
+        self,
+        segments: AsyncIterator[Tuple[AudioChunk, bytes]],
+        overlap_seconds: float
+    ) -> AsyncIterator[AudioSegment]:
+        """ادغام تدریجی قطعات با حذف همپوشانی (هر قطعه پس از اتصال رها می‌شود)"""
+        
+        previous = first = None
+        async for chunk, data in segments:
+            audio = await run_cpu_bound(
+                self._splice_segment, previous, chunk, data, overlap_seconds, first
+            )
+            first = first or audio
+            previous = chunk
+            yield audio
+            
+    def _splice_segment(
+        self,
+        previous: Optional[AudioChunk],
+        chunk: AudioChunk,
+        data: bytes,
+        overlap_seconds: float,
+        like: Optional[AudioSegment] = None
+    ) -> AudioSegment:
+        """
+        بخشی از قطعه که پس از قطعه قبلی به خروجی اضافه می‌شود
+        
+        قطعات بعد از اولی با overlap_seconds صوت تکراری از انتهای قطعه قبلی
+        شروع می‌شوند که حذف می‌شود. نمونه‌ها به مشخصات PCM قطعه like (قطعه اول)
+        تبدیل می‌شوند تا همه از یک encoder عبور کنند.
+        """
+        
+        audio = self._decode_audio(data, chunk.format)
+        if previous is not None and overlap_seconds > 0:
+            audio = audio[int(overlap_seconds * 1000):]
+        if like is not None:
+            audio = audio.set_frame_rate(like.frame_rate).set_channels(
+                like.channels
+            ).set_sample_width(like.sample_width)
+        return audio
+        
+    async def _encode_stream(
+        self,
+        segments: AsyncIterator[AudioSegment]
+    ) -> AsyncIterator[bytes]:
+        """
+        کدگذاری پیوسته قطعات با یک فرایند ffmpeg (merge_format)
+        
+        PCM همه قطعات به ترتیب به stdin یک encoder داده و خروجی آن از stdout
+        خوانده می‌شود؛ فایل نهایی یک هدر و یک تأخیر encoder (در ابتدای فایل)
+        دارد و فریم‌های مستقل هر قطعه یا هدرهای ID3/Xing وسط جریان نمی‌آیند.
+        """
+        
+        first = await anext(segments, None)
+        if first is None:
+            return
+            
+        process = await asyncio.create_subprocess_exec(
+            *self._encoder_command(first),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
+        async def feed():
+            try:
+                audio = first
+                while audio is not None:
+                    process.stdin.write(audio.raw_data)
+                    await process.stdin.drain()
+                    audio = await anext(segments, None)
+            finally:
+                process.stdin.close()
+                
+        writer = asyncio.ensure_future(feed())
+        try:
+            while True:
+                data = await process.stdout.read(self.upload_part_size)
+                if not data:
+                    break
+                yield data
+            await writer
+            errors = await process.stderr.read()
+            if await process.wait():
+                raise RuntimeError(
+                    f"Audio encoder failed: {errors.decode('utf-8', errors='ignore')[-500:]}"
+                )
+        finally:
+            if not writer.done():
+                writer.cancel()
+                await asyncio.gather(writer, return_exceptions=True)
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+                
+    def _encoder_command(self, like: AudioSegment) -> List[str]:
+        """فرمان ffmpeg برای کدگذاری PCM خام با مشخصات like به merge_format"""
+        
+        sample_format = {1: 'u8', 2: 's16le', 4: 's32le'}[like.sample_width]
+        command = [
+            AudioSegment.converter, '-nostdin', '-hide_banner', '-loglevel', 'error',
+            '-f', sample_format, '-ar', str(like.frame_rate), '-ac', str(like.channels),
+            '-i', 'pipe:0', '-f', self.merge_format
+        ]
+        if self.merge_format == 'mp3':
+            # خروجی pipe قابل seek نیست و فریم Xing در پایان به‌روز نمی‌شود
+            command += ['-write_xing', '0']
+        return command + ['pipe:1']
+        
+    def _decode_audio(self, data: bytes, audio_format: str) -> AudioSegment:
+        """رمزگشایی صوت (فرمت قطعه) به نمونه‌های PCM"""
+        
+        return AudioSegment.from_file(io.BytesIO(data), format=audio_format)
+        
+    def _export_audio(self, audio: AudioSegment, audio_format: str) -> bytes:
+        """کدگذاری صوت با فرمت داده‌شده"""
+        
+        output = io.BytesIO()
+        audio.export(output, format=audio_format)
+        return output.getvalue()
+        
+    async def _encrypt_stream(
+        self,
+        pieces: AsyncIterator[bytes],
+        encryption_key: str
+    ) -> AsyncIterator[bytes]:
+        """رمزنگاری جریانی خروجی ادغام (خارج از event loop)"""
+        
+        encryptor = StreamEncryptor(encryption_key)
+        yield encryptor.header
+        async for piece in pieces:
+            for segment in await run_cpu_bound(encryptor.update_segments, piece):
+                yield segment
+        yield await run_cpu_bound(encryptor.finalize)
+        
     async def _analyze_audio(self, audio_data: bytes) -> Dict:
         """تحلیل مشخصات صوت"""
         
@@ -171,31 +379,53 @@ class AudioProcessingService:
             'format': 'webm'
         }
         
-    async def _merge_with_overlap_removal(
+    async def _extract_segment_from_chunks(
         self,
-        segments: List[Dict],
-        overlap_seconds: float
+        chunks: List[AudioChunk],
+        start_time: float,
+        end_time: float,
+        encryption_key: str
     ) -> bytes:
-        """ادغام با حذف همپوشانی"""
-        
-        # TODO: پیاده‌سازی الگوریتم ادغام با pydub
-        # فعلاً فقط قطعات را به هم می‌چسبانیم
-        merged = b''
-        for segment in segments:
-            merged += segment['data']
-            
-        return merged
+        """
+        استخراج بخش صوتی از قطعات
+        
+        از هر قطعه فقط بازه [start_time, end_time] نسبت به آفست شروع آن
+        (chunk.start_offset و chunk.position از _chunk_offsets) نگه داشته و
+        خروجی با فرمت قطعه اول کدگذاری می‌شود.
+        """
+        
+        segments = []
+        async with aclosing(self._iter_decrypted_chunks(chunks, encryption_key)) as decrypted:
+            async for chunk, data in decrypted:
+                segments.append(await run_cpu_bound(
+                    self._cut_segment, chunk, data, start_time, end_time
+                ))
+                
+        return await run_cpu_bound(self._join_audio, segments, chunks[0].format)
         
-    async def _extract_segment_from_chunks(
+    def _cut_segment(
         self,
-        chunks: List[AudioChunk],
+        chunk: AudioChunk,
+        data: bytes,
         start_time: float,
         end_time: float
-    ) -> bytes:
-        """استخراج بخش صوتی از قطعات"""
+    ) -> AudioSegment:
+        """
+        بخشی از قطعه که در بازه زمانی درخواستی قرار دارد
         
-        # TODO: پیاده‌سازی با pydub
-        return b''
+        ابتدای قطعات بعد از اولی (overlap_seconds) تکرار انتهای قطعه قبلی است و
+        از آن قطعه برداشته می‌شود، پس اینجا کنار گذاشته می‌شود.
+        """
+        
+        skip_ms = int(self.overlap_seconds * 1000) if chunk.position > 1 else 0
+        start_ms = max(skip_ms, int((start_time - chunk.start_offset) * 1000))
+        end_ms = max(start_ms, int((end_time - chunk.start_offset) * 1000))
+        return self._decode_audio(data, chunk.format)[start_ms:end_ms]
+        
+    def _join_audio(self, segments: List[AudioSegment], audio_format: str) -> bytes:
+        """اتصال بخش‌های صوتی و کدگذاری خروجی"""
+        
+        return self._export_audio(sum(segments, AudioSegment.empty()), audio_format)
         
     async def _upload_to_storage(
         self,
@@ -209,6 +439,98 @@ class AudioProcessingService:
         # فعلاً URL ساختگی
         return f"https://storage.helssa.ir/{file_path}"
         
+    async def _upload_stream_to_storage(
+        self,
+        file_path: str,
+        stream: AsyncIterator[bytes],
+        content_type: str
+    ) -> str:
+        """
+        آپلود چندبخشی جریانی به MinIO
+        
+        داده در بخش‌های upload_part_size جمع و ارسال می‌شود و ساخت بخش بعدی با
+        آپلود بخش قبلی هم‌پوشانی دارد؛ حداکثر دو بخش در حافظه است.
+        """
+        
+        upload_id = await self._create_multipart_upload(file_path, content_type)
+        parts = []
+        in_flight = None
+        buffer = bytearray()
+        
+        async def send(part: bytearray):
+            parts.append(
+                await self._upload_part(file_path, upload_id, len(parts) + 1, part)
+            )
+            
+        try:
+            async for data in stream:
+                buffer += data
+                if len(buffer) >= self.upload_part_size:
+                    if in_flight is not None:
+                        await in_flight
+                    in_flight = asyncio.ensure_future(send(buffer))
+                    buffer = bytearray()
+                    
+            if in_flight is not None:
+                await in_flight
+                in_flight = None
+            if buffer or not parts:
+                await send(buffer)
+                
+            return await self._complete_multipart_upload(file_path, upload_id, parts)
+            
+        except BaseException:
+            if in_flight is not None:
+                in_flight.cancel()
+                await asyncio.gather(in_flight, return_exceptions=True)
+            await self._abort_multipart_upload(file_path, upload_id)
+            raise
+            
+    async def _create_multipart_upload(
+        self,
+        file_path: str,
+        content_type: str
+    ) -> str:
+        """شروع آپلود چندبخشی در MinIO"""
+        
+        # TODO: اتصال به MinIO service
+        # فعلاً شناسه ساختگی
+        return uuid.uuid4().hex
+        
+    async def _upload_part(
+        self,
+        file_path: str,
+        upload_id: str,
+        part_number: int,
+        data: bytearray
+    ) -> Dict:
+        """آپلود یک بخش از آپلود چندبخشی"""
+        
+        # TODO: اتصال به MinIO service
+        return {'part_number': part_number, 'etag': None, 'size': len(data)}
+        
+    async def _complete_multipart_upload(
+        self,
+        file_path: str,
+        upload_id: str,
+        parts: List[Dict]
+    ) -> str:
+        """تکمیل آپلود چندبخشی"""
+        
+        # TODO: اتصال به MinIO service
+        # فعلاً URL ساختگی
+        return f"https://storage.helssa.ir/{file_path}"
+        
+    async def _abort_multipart_upload(
+        self,
+        file_path: str,
+        upload_id: str
+    ):
+        """لغو آپلود چندبخشی ناتمام"""
+        
+        # TODO: اتصال به MinIO service
+        pass
+        
     async def _download_from_storage(
         self,
         file_url: str
@@ -0,0 +1,194 @@
+"""
+اجرای کارهای پردازشی سنگین سرویس‌های ملاقات خارج از event loop
+CPU-bound work executor for async encounter services
+
+رمزنگاری، hash، اسکن امنیتی و ادغام صوت روی یک pool محدود thread اجرا
+می‌شوند تا آپلود یک فایل بزرگ سایر coroutineهای همان worker را متوقف نکند.
+این کارها در کتابخانه‌های C (OpenSSL، hashlib، libmagic، کپی حافظه) انجام
+می‌شوند و GIL را آزاد می‌کنند؛ از pool پردازه استفاده نشده تا داده‌های چند
+مگابایتی برای ارسال به پردازه دیگر کپی و pickle نشوند.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CPUExecutor:
+    """
+    pool محدود thread با صف محدود و متریک عمق صف
+
+    حداکثر max_pending کار (در حال اجرا یا در صف) پذیرفته می‌شود؛ درخواست‌های
+    بیشتر بدون مسدود کردن event loop منتظر آزاد شدن جا می‌مانند.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, name: str = 'encounters-cpu'):
+        """
+        Args:
+            max_workers: تعداد threadهای کارگر
+            max_pending: حداکثر کارهای در حال اجرا و در صف
+            name: پیشوند نام threadها
+        """
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self.name = name
+        self._reset()
+
+        if hasattr(os, 'register_at_fork'):
+            # threadهای pool والد در پردازه فرزند وجود ندارند
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # سمافور جا به ازای هر event loop
+        self._slots: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = (
+            weakref.WeakKeyDictionary()
+        )
+        self._waiting = 0
+        self._queued = 0
+        self._running = 0
+        self._max_queued = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._queue_seconds = 0.0
+        self._run_seconds = 0.0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        اجرای func در pool و انتظار برای نتیجه بدون مسدود کردن event loop
+
+        Returns:
+            نتیجه func (استثناهای func به فراخواننده منتقل می‌شوند)
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots(loop)
+
+        with self._lock:
+            self._waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        with self._lock:
+            self._queued += 1
+            self._submitted += 1
+            self._max_queued = max(self._max_queued, self._queued)
+        try:
+            future = self._get_executor().submit(self._call, time.monotonic(), func, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            slots.release()
+            raise
+
+        # جا پس از پایان واقعی کار آزاد می‌شود، حتی اگر فراخواننده لغو شده باشد
+        future.add_done_callback(lambda done: self._on_done(done, loop, slots))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def stats(self) -> Dict[str, Any]:
+        """وضعیت pool و عمق صف برای پایش"""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'running': self._running,
+                'queued': self._queued,
+                'waiting_for_slot': self._waiting,
+                'max_queued': self._max_queued,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_queue_ms': round(self._queue_seconds / finished * 1000, 3) if finished else 0.0,
+                'avg_run_ms': round(self._run_seconds / finished * 1000, 3) if finished else 0.0,
+            }
+
+    def _on_done(self, future, loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+        if future.cancelled():
+            # کار پیش از شروع لغو شد (لغو coroutine فراخواننده)
+            with self._lock:
+                self._queued -= 1
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            # event loop بسته شده است
+            pass
+
+    def _call(self, enqueued_at: float, func: Callable, args, kwargs):
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._queue_seconds += started_at - enqueued_at
+
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_seconds += time.monotonic() - started_at
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+
+    def _get_slots(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        slots = self._slots.get(loop)
+        if slots is None:
+            with self._lock:
+                slots = self._slots.get(loop)
+                if slots is None:
+                    slots = asyncio.Semaphore(self.max_pending)
+                    self._slots[loop] = slots
+        return slots
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                executor = self._executor
+                if executor is None:
+                    executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self.name,
+                    )
+                    self._executor = executor
+        return executor
+
+
+_cpu_executor: Optional[CPUExecutor] = None
+_cpu_executor_lock = threading.Lock()
+
+
+def get_cpu_executor() -> CPUExecutor:
+    """pool مشترک کارهای پردازشی سرویس‌های ملاقات در این پردازه"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _cpu_executor_lock:
+            if _cpu_executor is None:
+                _cpu_executor = CPUExecutor(
+                    max_workers=getattr(settings, 'ENCOUNTER_CPU_WORKERS', min(4, os.cpu_count() or 1)),
+                    max_pending=getattr(settings, 'ENCOUNTER_CPU_MAX_PENDING', 32),
+                )
+    return _cpu_executor
+
+
+async def run_cpu_bound(func: Callable, *args, **kwargs) -> Any:
+    """میان‌بر اجرای یک کار پردازشی روی pool مشترک"""
+    return await get_cpu_executor().run(func, *args, **kwargs)
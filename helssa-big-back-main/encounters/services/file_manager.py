@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
 import hashlib
 import magic
 import jwt
@@ -8,7 +8,15 @@ from django.utils import timezone
 from asgiref.sync import sync_to_async
 
 from ..models import Encounter, EncounterFile
-from ..utils.encryption import encrypt_data, decrypt_data
+from ..utils.encryption import (
+    DEFAULT_SEGMENT_SIZE, STREAM_MAGIC, StreamDecryptor, StreamEncryptor,
+    decrypt_bytes, encrypted_size, is_stream_encrypted
+)
+from .cpu_executor import run_cpu_bound
+
+
+def _sha256_hexdigest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
 
 
 class InvalidFileTypeError(Exception):
@@ -48,8 +56,8 @@ class EncounterFileManager:
         
         encounter = await sync_to_async(Encounter.objects.get)(id=encounter_id)
         
-        # بررسی نوع فایل
-        mime_type = magic.from_buffer(file_data, mime=True)
+        # بررسی نوع فایل (خارج از event loop)
+        mime_type = await run_cpu_bound(magic.from_buffer, file_data, mime=True)
         if not self._is_allowed_file_type(mime_type, file_type):
             raise InvalidFileTypeError(
                 f"نوع فایل {mime_type} برای {file_type} مجاز نیست"
@@ -59,16 +67,10 @@ class EncounterFileManager:
         if not await self._scan_file_security(file_data):
             raise SecurityError("فایل از نظر امنیتی مشکل دارد")
             
-        # رمزنگاری
-        encrypted_data = await encrypt_data(
-            file_data,
-            encounter.encryption_key
-        )
-        
         # تولید hash برای تشخیص تکراری
-        file_hash = hashlib.sha256(file_data).hexdigest()
+        file_hash = await run_cpu_bound(_sha256_hexdigest, file_data)
         
-        # بررسی تکراری بودن
+        # بررسی تکراری بودن (پیش از رمزنگاری تا فایل تکراری رمز نشود)
         existing = await sync_to_async(
             EncounterFile.objects.filter(
                 encounter=encounter,
@@ -79,11 +81,12 @@ class EncounterFileManager:
         if existing:
             return existing
             
-        # آپلود به storage
+        # رمزنگاری جریانی و آپلود قطعه‌به‌قطعه؛ نسخه رمزشده کامل در حافظه ساخته نمی‌شود
         storage_path = f"encounters/{encounter_id}/files/{file_type}/{file_name}"
-        file_url = await self._upload_to_storage(
+        file_url = await self._upload_stream_to_storage(
             storage_path,
-            encrypted_data,
+            self._encrypt_stream(file_data, encounter.encryption_key),
+            length=encrypted_size(len(file_data)),
             content_type=mime_type
         )
         
@@ -101,7 +104,8 @@ class EncounterFileManager:
             description=description,
             metadata={
                 'original_name': file_name,
-                'upload_timestamp': timezone.now().isoformat()
+                'upload_timestamp': timezone.now().isoformat(),
+                'encryption_format': 'stream-v2'
             }
         )
         
@@ -163,7 +167,13 @@ class EncounterFileManager:
         file_id: str,
         user_id: str
     ) -> Dict:
-        """دانلود فایل"""
+        """
+        دانلود فایل
+        
+        Returns:
+            اطلاعات فایل و 'stream': تکرارگر async بایت‌های رمزگشایی‌شده که هم‌زمان
+            با دریافت از storage قطعه‌به‌قطعه رمزگشایی می‌شود
+        """
         
         file = await sync_to_async(
             EncounterFile.objects.select_related('encounter').get
@@ -176,17 +186,14 @@ class EncounterFileManager:
         if not has_access:
             raise PermissionError("شما دسترسی به این فایل ندارید")
             
-        # دانلود از storage
-        encrypted_data = await self._download_from_storage(file.file_url)
-        
-        # رمزگشایی
-        decrypted_data = await decrypt_data(
-            encrypted_data,
+        # دریافت و رمزگشایی جریانی از storage
+        stream = self._decrypt_stream(
+            self._download_stream_from_storage(file.file_url),
             file.encounter.encryption_key
         )
         
         return {
-            'data': decrypted_data,
+            'stream': stream,
             'filename': file.file_name,
             'mime_type': file.mime_type,
             'size': file.file_size
@@ -263,6 +270,12 @@ class EncounterFileManager:
         
         # TODO: اتصال به آنتی‌ویروس یا سرویس اسکن
         
+        return await run_cpu_bound(self._scan_file_security_sync, file_data)
+        
+    @staticmethod
+    def _scan_file_security_sync(file_data: bytes) -> bool:
+        """بررسی‌های پایه اسکن امنیتی (روی pool پردازشی اجرا می‌شود)"""
+        
         # بررسی‌های پایه
         # حداکثر حجم: 100MB
         if len(file_data) > 100 * 1024 * 1024:
@@ -324,22 +337,68 @@ class EncounterFileManager:
         # TODO: دریافت از UnifiedUser
         return "کاربر سیستم"
         
-    async def _upload_to_storage(
+    async def _encrypt_stream(self, data: bytes, key: str) -> AsyncIterator[bytes]:
+        """رمزنگاری جریانی فایل (هر بار چند قطعه، خارج از event loop)"""
+        
+        encryptor = StreamEncryptor(key)
+        yield encryptor.header
+        view = memoryview(data)
+        step = DEFAULT_SEGMENT_SIZE * 16
+        for offset in range(0, len(view), step):
+            for segment in await run_cpu_bound(encryptor.update_segments, view[offset:offset + step]):
+                yield segment
+        yield await run_cpu_bound(encryptor.finalize)
+        
+    async def _decrypt_stream(self, chunks: AsyncIterator[bytes], key: str) -> AsyncIterator[bytes]:
+        """
+        رمزگشایی جریانی فایل دریافتی
+        
+        فایل‌های قالب قدیمی (توکن Fernet) قابل رمزگشایی جریانی نیستند و یکجا
+        رمزگشایی می‌شوند؛ دستور reencrypt_legacy_blobs آن‌ها را به قالب جریانی می‌برد.
+        """
+        
+        decryptor = StreamDecryptor(key)
+        prefix = bytearray()
+        legacy = False
+        async for chunk in chunks:
+            if legacy or len(prefix) < len(STREAM_MAGIC):
+                prefix += chunk
+                if legacy or len(prefix) < len(STREAM_MAGIC):
+                    continue
+                legacy = not is_stream_encrypted(bytes(prefix))
+                if legacy:
+                    continue
+                chunk = bytes(prefix)
+            plaintext = await run_cpu_bound(decryptor.update, chunk)
+            if plaintext:
+                yield plaintext
+                
+        if legacy or len(prefix) < len(STREAM_MAGIC):
+            yield await run_cpu_bound(decrypt_bytes, bytes(prefix), key)
+            return
+        plaintext = await run_cpu_bound(decryptor.finalize)
+        if plaintext:
+            yield plaintext
+        
+    async def _upload_stream_to_storage(
         self,
         path: str,
-        data: bytes,
+        stream: AsyncIterator[bytes],
+        length: int,
         content_type: str
     ) -> str:
-        """آپلود به MinIO"""
+        """آپلود جریانی به MinIO (put_object با طول معلوم، بدون بافر کردن کل فایل)"""
         
         # TODO: اتصال به MinIO service
+        async for _ in stream:
+            pass
         return f"https://storage.helssa.ir/{path}"
         
-    async def _download_from_storage(self, url: str) -> bytes:
-        """دانلود از MinIO"""
+    async def _download_stream_from_storage(self, url: str) -> AsyncIterator[bytes]:
+        """دریافت جریانی از MinIO (بدنه get_object قطعه‌به‌قطعه)"""
         
         # TODO: اتصال به MinIO service
-        return b''
+        yield b''
         
     async def _delete_from_storage(self, url: str) -> bool:
         """حذف از MinIO"""
@@ -0,0 +1,251 @@
+"""
+خط لوله رونویسی تدریجی ملاقات‌ها
+Incremental encounter transcription pipeline
+
+هر قطعه‌ای که رونویسی‌اش تمام شود، بلافاصله (به ترتیب chunk_index) به متن
+تجمعی LiveTranscript اضافه می‌شود و فقط موجودیت‌های پزشکی همان قطعه استخراج
+می‌شود. قطعاتی که زودتر از قطعه قبلی رونویسی شوند تا رسیدن نوبتشان منتظر
+می‌مانند. شمارنده‌های دریافت و پردازش قطعات در همان ردیف نگه داشته می‌شوند،
+بنابراین پایان رونویسی بدون شمارش دوباره قطعات و رونویسی‌ها تشخیص داده
+می‌شود و گزارش SOAP چند ثانیه پس از پایان ویزیت قابل تولید است.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import AudioChunk, LiveTranscript, Transcript
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_WORDS = getattr(settings, 'ENCOUNTER_TRANSCRIPT_OVERLAP_WORDS', 20)
+
+# همپوشانی کوتاه‌تر از این تعداد کلمه تصادفی فرض می‌شود
+MIN_OVERLAP_WORDS = 2
+
+_WORD_RE = re.compile(r'\S+')
+
+
+class LiveTranscriptionService:
+    """سرویس ادغام تدریجی رونویسی قطعات یک ملاقات"""
+
+    def __init__(self, overlap_words: Optional[int] = None):
+        """
+        Args:
+            overlap_words: حداکثر کلمات تکراری محل اتصال دو قطعه
+        """
+        self.overlap_words = OVERLAP_WORDS if overlap_words is None else overlap_words
+
+    def ensure(self, encounter_id) -> LiveTranscript:
+        """
+        دریافت یا ایجاد رونویسی زنده ملاقات
+
+        هنگام ایجاد، قطعات موجود (ملاقات‌های شروع‌شده پیش از این خط لوله)
+        یک بار شمرده می‌شوند.
+        """
+        live = LiveTranscript.objects.filter(encounter_id=encounter_id).first()
+        if live is not None:
+            return live
+        try:
+            with transaction.atomic():
+                return LiveTranscript.objects.create(
+                    encounter_id=encounter_id,
+                    received_chunks=AudioChunk.objects.filter(encounter_id=encounter_id).count()
+                )
+        except IntegrityError:
+            # ایجاد هم‌زمان توسط درخواست دیگر
+            return LiveTranscript.objects.get(encounter_id=encounter_id)
+
+    def register_chunk(self, encounter_id):
+        """ثبت دریافت یک قطعه صوتی (پس از ذخیره قطعه)"""
+        LiveTranscript.objects.filter(encounter_id=encounter_id).update(
+            received_chunks=F('received_chunks') + 1,
+            updated_at=timezone.now()
+        )
+
+    def extend(self, encounter_id) -> Tuple[LiveTranscript, bool]:
+        """
+        افزودن رونویسی‌های آماده بعد از آخرین قطعه ادغام‌شده
+
+        موجودیت‌های پزشکی پیش از قفل کردن ردیف رونویسی زنده استخراج می‌شوند تا
+        ادغام قطعات و ثبت پایان ویزیت پشت تأخیر سرویس NLP منتظر نمانند.
+
+        Returns:
+            (رونویسی زنده، آیا همین فراخوانی رونویسی ملاقات را کامل کرد)
+        """
+        self._extract_pending(encounter_id)
+
+        with transaction.atomic():
+            live = self._lock(encounter_id)
+
+            chunks = AudioChunk.objects.filter(encounter_id=encounter_id)
+            if live.last_chunk_index is not None:
+                chunks = chunks.filter(chunk_index__gt=live.last_chunk_index)
+
+            merged = 0
+            for chunk in chunks.select_related('transcript').order_by('chunk_index'):
+                transcript = getattr(chunk, 'transcript', None)
+                if transcript is not None:
+                    if 'extracted_at' not in transcript.medical_entities:
+                        # رونویسی پس از استخراج رسیده؛ task همان رونویسی ادامه می‌دهد
+                        break
+                    self._append(live, chunk, transcript)
+                elif chunk.transcription_status == 'failed':
+                    logger.warning(
+                        f"Skipping failed chunk {chunk.chunk_index} of encounter {encounter_id}"
+                    )
+                    live.failed_chunks += 1
+                else:
+                    # منتظر رونویسی این قطعه؛ قطعات بعدی در نوبت می‌مانند
+                    break
+                live.last_chunk_index = chunk.chunk_index
+                live.processed_chunks += 1
+                merged += 1
+
+            if not merged:
+                return live, False
+
+            completed = self._complete_if_ready(live)
+            live.save()
+            return live, completed
+
+    def mark_ended(self, encounter_id) -> Tuple[LiveTranscript, bool, bool]:
+        """
+        ثبت پایان ویزیت
+
+        Returns:
+            (رونویسی زنده، آیا پایان برای اولین بار ثبت شد، آیا رونویسی کامل شد)
+        """
+        with transaction.atomic():
+            live = self._lock(encounter_id)
+            if live.visit_ended_at is not None:
+                return live, False, False
+
+            live.visit_ended_at = timezone.now()
+            completed = self._complete_if_ready(live)
+            live.save()
+            return live, True, completed
+
+    def get_progress(self, encounter_id) -> Dict:
+        """وضعیت پیشرفت رونویسی ملاقات"""
+        live = LiveTranscript.objects.filter(encounter_id=encounter_id).first()
+        if live is None:
+            return {}
+        return {
+            'received_chunks': live.received_chunks,
+            'processed_chunks': live.processed_chunks,
+            'failed_chunks': live.failed_chunks,
+            'progress': live.progress,
+            'word_count': live.word_count,
+            'visit_ended': live.visit_ended_at is not None,
+            'is_complete': live.completed_at is not None,
+        }
+
+    def extract_entities(self, text: str) -> List[Dict]:
+        """استخراج موجودیت‌های پزشکی از متن (آفست‌ها نسبت به همین متن)"""
+
+        # TODO: اتصال به سرویس NLP پزشکی
+        # فعلاً داده ساختگی
+        return [
+            {
+                'type': 'symptom',
+                'text': 'سردرد',
+                'start': 10,
+                'end': 15,
+                'confidence': 0.9
+            },
+            {
+                'type': 'medication',
+                'text': 'استامینوفن',
+                'start': 45,
+                'end': 55,
+                'confidence': 0.85
+            }
+        ]
+
+    def _extract_pending(self, encounter_id):
+        """استخراج موجودیت‌های رونویسی‌های ادغام‌نشده (خارج از تراکنش قفل)"""
+        live = self.ensure(encounter_id)
+
+        transcripts = Transcript.objects.filter(
+            audio_chunk__encounter_id=encounter_id
+        ).exclude(
+            medical_entities__has_key='extracted_at'
+        )
+        if live.last_chunk_index is not None:
+            transcripts = transcripts.filter(audio_chunk__chunk_index__gt=live.last_chunk_index)
+
+        for transcript in transcripts.only('id', 'text'):
+            Transcript.objects.filter(pk=transcript.pk).update(
+                medical_entities={
+                    'entities': self.extract_entities(transcript.text),
+                    'extracted_at': timezone.now().isoformat()
+                }
+            )
+
+    def _lock(self, encounter_id) -> LiveTranscript:
+        self.ensure(encounter_id)
+        return LiveTranscript.objects.select_for_update().get(encounter_id=encounter_id)
+
+    def _complete_if_ready(self, live: LiveTranscript) -> bool:
+        if live.completed_at is None and live.is_ready:
+            live.completed_at = timezone.now()
+            return True
+        return False
+
+    def _append(self, live: LiveTranscript, chunk: AudioChunk, transcript: Transcript):
+        """افزودن متن یک قطعه و موجودیت‌های استخراج‌شده آن به انتهای رونویسی"""
+
+        text = transcript.text
+        entities = transcript.medical_entities.get('entities', [])
+
+        # حذف کلمات تکراری ابتدای قطعه که در انتهای قطعه قبلی آمده‌اند
+        cut = self._overlap_end(live.text, text)
+        addition = text[cut:].strip()
+        if not addition:
+            return
+        cut = text.index(addition, cut)
+
+        separator = ' ' if live.text else ''
+        offset = len(live.text) + len(separator) - cut
+        live.text = f"{live.text}{separator}{addition}"
+        live.word_count += len(addition.split())
+
+        # موجودیت‌های بخش تکراری قبلاً از قطعه قبلی استخراج شده‌اند
+        live.medical_entities.extend(
+            {
+                **entity,
+                'start': entity['start'] + offset,
+                'end': entity['end'] + offset,
+                'chunk_index': chunk.chunk_index
+            }
+            for entity in entities
+            if entity['start'] >= cut
+        )
+
+    def _overlap_end(self, previous: str, text: str) -> int:
+        """
+        موقعیت پایان همپوشانی ابتدای text با انتهای previous
+
+        Returns:
+            اندیس اولین کاراکتر بعد از کلمات تکراری (صفر اگر همپوشانی نباشد)
+        """
+        if not previous or self.overlap_words < MIN_OVERLAP_WORDS:
+            return 0
+
+        tail = previous.rsplit(None, self.overlap_words)[-self.overlap_words:]
+        words = []
+        for match in _WORD_RE.finditer(text):
+            words.append(match)
+            if len(words) >= self.overlap_words:
+                break
+
+        for size in range(min(len(tail), len(words)), MIN_OVERLAP_WORDS - 1, -1):
+            if tail[-size:] == [match.group() for match in words[:size]]:
+                return words[size - 1].end()
+        return 0
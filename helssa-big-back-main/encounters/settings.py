@@ -39,6 +39,7 @@ WHISPER_API_URL = 'http://whisper-api:8000'
 WHISPER_API_KEY = 'your-whisper-key'
 WHISPER_MODEL = 'large-v3'
 WHISPER_LANGUAGE = 'fa'
+ENCOUNTER_TRANSCRIPT_OVERLAP_WORDS = 20  # حداکثر کلمات تکراری حذف‌شده در محل اتصال رونویسی قطعات
 
 # تنظیمات AI (برای تولید SOAP)
 AI_SERVICE_URL = 'http://ai-service:8000'
@@ -52,6 +53,16 @@ AUDIO_CHUNK_SIZE_MB = 10
 AUDIO_OVERLAP_SECONDS = 2
 AUDIO_MAX_FILE_SIZE_MB = 500
 AUDIO_ALLOWED_FORMATS = ['webm', 'mp3', 'wav', 'ogg']
+AUDIO_MERGE_PREFETCH = 4  # قطعات هم‌زمان در حال دانلود/رمزگشایی هنگام ادغام
+AUDIO_UPLOAD_PART_SIZE_MB = 8  # حجم هر بخش آپلود چندبخشی فایل نهایی
+
+# تنظیمات رمزنگاری فایل‌ها و صوت
+ENCOUNTER_ENCRYPTION_SEGMENT_SIZE = 64 * 1024  # حجم هر قطعه AEAD جریانی (بایت)
+ENCOUNTER_ENCRYPTION_KEY_CACHE_SIZE = 1024  # تعداد کلیدهای مشتق‌شده در کش LRU
+
+# pool کارهای پردازشی (رمزنگاری، hash، اسکن، ادغام صوت) خارج از event loop
+ENCOUNTER_CPU_WORKERS = 4
+ENCOUNTER_CPU_MAX_PENDING = 32  # حداکثر کارهای در حال اجرا و در صف
 
 # تنظیمات ویزیت
 VISIT_MIN_DURATION_MINUTES = 5
@@ -4,11 +4,13 @@ from django.utils import timezone
 
 from .models import (
     Encounter, AudioChunk, Transcript,
-    SOAPReport, Prescription
+    SOAPReport, Prescription, EncounterFile
 )
+from .services.live_transcription import LiveTranscriptionService
 from .tasks import (
     process_audio_chunk_stt,
     process_encounter_audio_complete,
+    update_live_transcript,
     notify_doctor_soap_ready,
     notify_patient_summary_ready
 )
@@ -28,17 +30,27 @@ def handle_encounter_post_save(sender, instance, created, **kwargs):
     else:
         # بررسی تغییر وضعیت
         if instance.status == 'completed' and instance.ended_at:
-            # شروع پردازش‌های پس از اتمام ویزیت
-            process_encounter_audio_complete.apply_async(
-                args=[str(instance.id)],
-                countdown=60  # 1 دقیقه تاخیر
-            )
+            # شروع پردازش‌های پس از اتمام ویزیت (بدون انتظار برای رونویسی قطعات)
+            process_encounter_audio_complete.delay(str(instance.id))
+
+
+@receiver(pre_save, sender=AudioChunk)
+def handle_audio_chunk_pre_save(sender, instance, **kwargs):
+    """قبل از ذخیره قطعه صوتی"""
+    
+    if instance._state.adding:
+        # رونویسی زنده پیش از درج قطعه ساخته می‌شود تا شمارش اولیه قطعات
+        # موجود، این قطعه را (که در post_save شمرده می‌شود) شامل نشود
+        LiveTranscriptionService().ensure(instance.encounter_id)
 
 
 @receiver(post_save, sender=AudioChunk)
 def handle_audio_chunk_post_save(sender, instance, created, **kwargs):
     """پس از ذخیره قطعه صوتی"""
     
+    if created:
+        LiveTranscriptionService().register_chunk(instance.encounter_id)
+        
     if created and instance.is_ready_for_transcription:
         # شروع پردازش STT
         process_audio_chunk_stt.delay(str(instance.id))
@@ -49,17 +61,9 @@ def handle_transcript_post_save(sender, instance, created, **kwargs):
     """پس از ذخیره رونویسی"""
     
     if created:
-        # بررسی تکمیل بودن همه رونویسی‌ها
-        encounter = instance.audio_chunk.encounter
-        total_chunks = encounter.audio_chunks.count()
-        transcribed_chunks = Transcript.objects.filter(
-            audio_chunk__encounter=encounter
-        ).count()
-        
-        if total_chunks > 0 and total_chunks == transcribed_chunks:
-            # همه قطعات رونویسی شده‌اند
-            from .tasks import merge_encounter_transcripts
-            merge_encounter_transcripts.delay(str(encounter.id))
+        # افزودن به رونویسی تجمعی ملاقات؛ ادغام نهایی پس از پایان ویزیت و
+        # رونویسی آخرین قطعه از همان‌جا شروع می‌شود
+        update_live_transcript.delay(str(instance.audio_chunk.encounter_id))
 
 
 @receiver(post_save, sender=SOAPReport)
@@ -4,8 +4,8 @@ from django.utils import timezone
 import asyncio
 import logging
 
-from .models import AudioChunk, Transcript, Encounter, SOAPReport
-from .services import AudioProcessingService, SOAPGenerationService
+from .models import AudioChunk, Transcript, Encounter, SOAPReport, LiveTranscript
+from .services import AudioProcessingService, SOAPGenerationService, LiveTranscriptionService
 
 logger = logging.getLogger(__name__)
 
@@ -49,8 +49,8 @@ def process_audio_chunk_stt(chunk_id: str) -> Dict:
         chunk.processed_at = timezone.now()
         chunk.save()
         
-        # شروع استخراج موجودیت‌های پزشکی
-        extract_medical_entities.delay(str(transcript.id))
+        # افزودن به رونویسی تجمعی و استخراج موجودیت‌های پزشکی در signal رونویسی
+        # (update_live_transcript) انجام می‌شود
         
         logger.info(f"STT completed for chunk {chunk_id}")
         
@@ -72,6 +72,9 @@ def process_audio_chunk_stt(chunk_id: str) -> Dict:
             chunk = AudioChunk.objects.get(id=chunk_id)
             chunk.transcription_status = 'failed'
             chunk.save()
+            
+            # قطعه ناموفق نباید ادغام قطعات بعدی را متوقف کند
+            update_live_transcript.delay(str(chunk.encounter_id))
         except:
             pass
             
@@ -79,53 +82,34 @@ def process_audio_chunk_stt(chunk_id: str) -> Dict:
 
 
 @shared_task(queue='nlp')
-def extract_medical_entities(transcript_id: str) -> Dict:
-    """استخراج موجودیت‌های پزشکی از رونویسی
+def update_live_transcript(encounter_id: str) -> Dict:
+    """افزودن رونویسی‌های آماده به رونویسی تجمعی ملاقات
+    
+    پس از رونویسی (یا خطای رونویسی) هر قطعه اجرا می‌شود. اگر ویزیت تمام شده
+    و این آخرین قطعه باشد، ادغام نهایی و تولید گزارش‌ها شروع می‌شود.
     
     Args:
-        transcript_id: شناسه رونویسی
+        encounter_id: شناسه ملاقات
         
     Returns:
-        موجودیت‌های استخراج شده
+        وضعیت پیشرفت رونویسی
     """
     try:
-        transcript = Transcript.objects.get(id=transcript_id)
+        live, completed = LiveTranscriptionService().extend(encounter_id)
         
-        # TODO: اتصال به سرویس NLP پزشکی
-        # فعلاً داده ساختگی
-        entities = {
-            'entities': [
-                {
-                    'type': 'symptom',
-                    'text': 'سردرد',
-                    'start': 10,
-                    'end': 15,
-                    'confidence': 0.9
-                },
-                {
-                    'type': 'medication',
-                    'text': 'استامینوفن',
-                    'start': 45,
-                    'end': 55,
-                    'confidence': 0.85
-                }
-            ],
-            'extracted_at': timezone.now().isoformat()
+        if completed:
+            _start_transcript_reports(encounter_id)
+            
+        return {
+            'encounter_id': encounter_id,
+            'processed_chunks': live.processed_chunks,
+            'received_chunks': live.received_chunks,
+            'word_count': live.word_count,
+            'is_complete': live.completed_at is not None
         }
         
-        # به‌روزرسانی transcript
-        transcript.medical_entities = entities
-        transcript.save()
-        
-        logger.info(f"Medical entities extracted for transcript {transcript_id}")
-        
-        return entities
-        
-    except Transcript.DoesNotExist:
-        logger.error(f"Transcript {transcript_id} not found")
-        raise
     except Exception as e:
-        logger.error(f"Error extracting entities for transcript {transcript_id}: {str(e)}")
+        logger.error(f"Error updating live transcript for encounter {encounter_id}: {str(e)}")
         raise
 
 
@@ -140,22 +124,27 @@ def merge_encounter_transcripts(encounter_id: str) -> str:
         متن کامل رونویسی
     """
     try:
-        # بازیابی تمام رونویسی‌ها
-        transcripts = Transcript.objects.filter(
-            audio_chunk__encounter_id=encounter_id
-        ).order_by('audio_chunk__chunk_index').values_list('text', flat=True)
-        
-        if not transcripts:
+        live = LiveTranscript.objects.filter(
+            encounter_id=encounter_id,
+            completed_at__isnull=False
+        ).first()
+        
+        if live is not None:
+            # رونویسی تجمعی کامل (تکرارهای نقاط اتصال قبلاً حذف شده‌اند)
+            cleaned_text = live.text
+        else:
+            # بازیابی تمام رونویسی‌ها
+            transcripts = Transcript.objects.filter(
+                audio_chunk__encounter_id=encounter_id
+            ).order_by('audio_chunk__chunk_index').values_list('text', flat=True)
+            
+            # ادغام متن‌ها
+            cleaned_text = " ".join(transcripts)
+            
+        if not cleaned_text:
             logger.warning(f"No transcripts found for encounter {encounter_id}")
             return ""
             
-        # ادغام متن‌ها
-        full_text = " ".join(transcripts)
-        
-        # حذف تکرارها در نقاط اتصال
-        # TODO: پیاده‌سازی الگوریتم حذف تکرار
-        cleaned_text = full_text
-        
         # ذخیره متن کامل
         encounter = Encounter.objects.get(id=encounter_id)
         encounter.metadata['full_transcript'] = cleaned_text
@@ -221,35 +210,36 @@ def generate_soap_report_async(encounter_id: str) -> Dict:
 def process_encounter_audio_complete(encounter_id: str):
     """پردازش کامل صوت یک ملاقات
     
-    این task زنجیره‌ای از taskها را اجرا می‌کند:
+    این task با پایان ویزیت اجرا می‌شود:
     1. ادغام قطعات صوتی
     2. ادغام رونویسی‌ها
     3. تولید گزارش SOAP
+    
+    اگر رونویسی قطعات هنوز تمام نشده باشد، مراحل ۲ و ۳ با پردازش آخرین
+    قطعه در update_live_transcript شروع می‌شوند.
     """
     try:
-        encounter = Encounter.objects.get(id=encounter_id)
-        
-        # بررسی تکمیل بودن همه قطعات
-        total_chunks = encounter.audio_chunks.count()
-        processed_chunks = encounter.audio_chunks.filter(is_processed=True).count()
+        live, ended, completed = LiveTranscriptionService().mark_ended(encounter_id)
         
-        if total_chunks == 0:
-            logger.warning(f"No audio chunks for encounter {encounter_id}")
+        if not ended:
+            # پایان این ویزیت قبلاً پردازش شده است
             return
             
-        if processed_chunks < total_chunks:
-            logger.info(f"Not all chunks processed for encounter {encounter_id}: {processed_chunks}/{total_chunks}")
+        if live.received_chunks == 0:
+            logger.warning(f"No audio chunks for encounter {encounter_id}")
             return
             
         # ادغام صوت
         merge_audio_files.delay(encounter_id)
         
-        # ادغام رونویسی‌ها و تولید SOAP
-        chain(
-            merge_encounter_transcripts.s(encounter_id),
-            generate_post_visit_report.s(encounter_id)
-        ).apply_async()
-        
+        if completed:
+            _start_transcript_reports(encounter_id)
+        else:
+            logger.info(
+                f"Waiting for transcription of encounter {encounter_id}: "
+                f"{live.processed_chunks}/{live.received_chunks}"
+            )
+            
         logger.info(f"Post-visit processing started for encounter {encounter_id}")
         
     except Encounter.DoesNotExist:
@@ -258,6 +248,14 @@ def process_encounter_audio_complete(encounter_id: str):
         logger.error(f"Error in post-visit processing for encounter {encounter_id}: {str(e)}")
 
 
+def _start_transcript_reports(encounter_id: str):
+    """ادغام رونویسی‌ها و تولید SOAP و گزارش‌های پس از ویزیت"""
+    chain(
+        merge_encounter_transcripts.s(encounter_id),
+        generate_post_visit_report.s(encounter_id)
+    ).apply_async()
+
+
 @shared_task
 def merge_audio_files(encounter_id: str) -> Optional[str]:
     """ادغام فایل‌های صوتی یک ملاقات
@@ -0,0 +1,307 @@
+"""
+تست‌های ادغام و برش قطعات صوتی و آپلود چندبخشی
+"""
+import asyncio
+import io
+import shutil
+from array import array
+from datetime import timedelta
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from pydub import AudioSegment
+
+from ..models import AudioChunk, Encounter
+from ..services.audio_processor import AudioProcessingService
+
+User = get_user_model()
+
+OVERLAP = 2
+
+# ضبط پیوسته با ۱۰۰۰ نمونه در ثانیه؛ مقدار هر نمونه شماره میلی‌ثانیه آن است
+RECORDING = AudioSegment(
+    data=array('h', range(20000)).tobytes(), sample_width=2, frame_rate=1000, channels=1
+)
+
+
+def make_chunk(index, duration=5.0, start_offset=None):
+    chunk = AudioChunk(
+        chunk_index=index, file_url=f'https://storage/{index}', duration_seconds=duration, format='wav'
+    )
+    chunk.position = index + 1
+    chunk.start_offset = index * (duration - OVERLAP) if start_offset is None else start_offset
+    return chunk
+
+
+def wav(seconds: float) -> bytes:
+    output = io.BytesIO()
+    AudioSegment.silent(duration=int(seconds * 1000)).export(output, format='wav')
+    return output.getvalue()
+
+
+def recorded(chunk) -> bytes:
+    """قطعه‌ای از RECORDING که با همپوشانی OVERLAP از آفست شروع قطعه ضبط شده است"""
+    start = int(chunk.start_offset * 1000)
+    output = io.BytesIO()
+    RECORDING[start:start + int(chunk.duration_seconds * 1000)].export(output, format='wav')
+    return output.getvalue()
+
+
+def samples(audio: AudioSegment) -> list:
+    return list(audio.get_array_of_samples())
+
+
+def duration_ms(data: bytes) -> int:
+    return len(AudioSegment.from_file(io.BytesIO(data), format='wav'))
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+async def _pieces(sizes):
+    for size in sizes:
+        yield b'x' * size
+
+
+class PrefetchTest(SimpleTestCase):
+    """تست دریافت هم‌زمان قطعات در _iter_decrypted_chunks"""
+
+    def setUp(self):
+        self.service = AudioProcessingService()
+        self.service.merge_prefetch = 2
+        self.chunks = [make_chunk(index) for index in range(5)]
+
+    def test_output_keeps_chunk_order(self):
+        """قطعات دیرتر زودتر دریافت می‌شوند ولی خروجی به ترتیب است و پنجره رعایت می‌شود"""
+        active = []
+        peak = []
+
+        async def fetch(chunk, key):
+            active.append(chunk)
+            peak.append(len(active))
+            await asyncio.sleep(0.01 * (5 - chunk.chunk_index))
+            active.remove(chunk)
+            return bytes([chunk.chunk_index])
+
+        self.service._fetch_chunk = fetch
+        results = async_to_sync(_collect)(self.service._iter_decrypted_chunks(self.chunks, 'key'))
+
+        self.assertEqual([chunk.chunk_index for chunk, _ in results], [0, 1, 2, 3, 4])
+        self.assertEqual([data for _, data in results], [bytes([index]) for index in range(5)])
+        self.assertEqual(max(peak), 2)
+
+    def test_error_cancels_pending_fetches(self):
+        """خطای یک قطعه به مصرف‌کننده می‌رسد و دریافت‌های در جریان لغو می‌شوند"""
+        cancelled = []
+
+        async def fetch(chunk, key):
+            if chunk.chunk_index == 0:
+                await asyncio.sleep(0.01)
+                raise IOError('download failed')
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(chunk.chunk_index)
+                raise
+
+        self.service._fetch_chunk = fetch
+
+        with self.assertRaises(IOError):
+            async_to_sync(_collect)(self.service._iter_decrypted_chunks(self.chunks, 'key'))
+        self.assertEqual(cancelled, [1])
+
+
+class SpliceTest(SimpleTestCase):
+    """تست حذف همپوشانی و برش بازه زمانی"""
+
+    def setUp(self):
+        self.service = AudioProcessingService()
+        self.service.merge_format = 'wav'
+
+    def test_overlap_trimmed_after_first_chunk(self):
+        """فقط از قطعات بعد از اولی overlap_seconds ابتدا حذف می‌شود"""
+        first, second = make_chunk(0), make_chunk(1)
+
+        self.assertEqual(len(self.service._splice_segment(None, first, wav(5), 2)), 5000)
+        self.assertEqual(len(self.service._splice_segment(first, second, wav(5), 2)), 3000)
+        self.assertEqual(len(self.service._splice_segment(first, second, wav(1), 2)), 0)
+
+    def test_spliced_chunks_continue_recording(self):
+        """قطعات پس از حذف همپوشانی همان ضبط پیوسته را می‌سازند"""
+        chunks = [make_chunk(index) for index in range(4)]
+        previous, spliced = None, []
+        for chunk in chunks:
+            spliced.append(self.service._splice_segment(previous, chunk, recorded(chunk), OVERLAP))
+            previous = chunk
+
+        merged = sum(spliced, AudioSegment.empty())
+
+        self.assertEqual(samples(merged), samples(RECORDING[:14000]))
+
+    def test_later_chunks_converted_to_first_format(self):
+        """قطعات بعدی به مشخصات PCM قطعه اول تبدیل می‌شوند تا یک encoder کافی باشد"""
+        first = AudioSegment.silent(duration=1000, frame_rate=16000)
+        output = io.BytesIO()
+        AudioSegment.silent(duration=5000, frame_rate=48000).set_channels(2).export(output, format='wav')
+
+        audio = self.service._splice_segment(make_chunk(0), make_chunk(1), output.getvalue(), 2, first)
+
+        self.assertEqual((audio.frame_rate, audio.channels, audio.sample_width), (16000, 1, 2))
+        self.assertEqual(len(audio), 3000)
+
+    def test_extract_cuts_range_with_offsets(self):
+        """بازه درخواستی از قطعات با آفست شروع هر قطعه و بدون صوت تکراری همپوشانی برش می‌خورد"""
+        chunks = [make_chunk(index) for index in range(4)]
+
+        async def fetch(chunk, key):
+            return recorded(chunk)
+
+        self.service._fetch_chunk = fetch
+        segment = async_to_sync(self.service._extract_segment_from_chunks)(chunks[1:], 6.5, 10, 'key')
+
+        self.assertEqual(samples(AudioSegment.from_file(io.BytesIO(segment), format='wav')),
+                         samples(RECORDING[6500:10000]))
+
+    @skipUnless(shutil.which(AudioSegment.converter) and shutil.which('ffprobe'),
+                'ffmpeg و ffprobe برای کدگذاری و خواندن MP3 لازم است')
+    def test_merged_mp3_is_single_stream(self):
+        """خروجی ادغام یک جریان MP3 پیوسته با مدت کل ضبط است"""
+        self.service.merge_format = 'mp3'
+        chunks = [make_chunk(index, duration=10.0) for index in range(3)]
+        recording = AudioSegment(
+            data=array('h', [1000, -1000] * 240000).tobytes(), sample_width=2, frame_rate=16000, channels=1
+        )
+
+        async def decrypted():
+            for chunk in chunks:
+                start = int(chunk.start_offset * 1000)
+                output = io.BytesIO()
+                recording[start:start + 10000].export(output, format='wav')
+                yield chunk, output.getvalue()
+
+        async def merge():
+            pieces = self.service._encode_stream(self.service._splice_overlaps(decrypted(), OVERLAP))
+            return b''.join([piece async for piece in pieces])
+
+        merged = async_to_sync(merge)()
+        decoded = AudioSegment.from_file(io.BytesIO(merged), format='mp3')
+
+        # مدت کل منهای همپوشانی‌ها (تأخیر encoder فقط یک بار)
+        self.assertAlmostEqual(len(decoded), 26000, delta=200)
+        self.assertNotIn(b'Xing', merged)
+        self.assertNotIn(b'Info', merged)
+        self.assertLessEqual(merged.count(b'ID3'), 1)
+
+
+class ChunkOffsetsTest(TestCase):
+    """تست محاسبه آفست قطعات در پایگاه‌داده"""
+
+    def setUp(self):
+        self.service = AudioProcessingService()
+        self.encounter = Encounter.objects.create(
+            patient=User.objects.create_user('09120000001', 'علی', 'محمدی'),
+            doctor=User.objects.create_user('09120000002', 'سارا', 'احمدی'),
+            type='video',
+            chief_complaint='سردرد',
+            scheduled_at=timezone.now() + timedelta(hours=1),
+            fee_amount=0,
+        )
+        # ترتیب ایجاد با ترتیب chunk_index یکی نیست
+        for index, duration in ((2, 20.0), (0, 30.0), (1, 30.0), (3, 10.0)):
+            AudioChunk.objects.create(
+                encounter=self.encounter,
+                chunk_index=index,
+                file_url=f'https://storage.helssa.ir/chunks/{index}.webm',
+                file_size=1024,
+                duration_seconds=duration,
+            )
+
+    def test_offsets_exclude_overlaps(self):
+        """آفست هر قطعه بعد از اولی به اندازه همپوشانی‌های قبلی کم می‌شود"""
+        chunks = list(self.service._chunk_offsets(self.encounter.id))
+
+        self.assertEqual([chunk.chunk_index for chunk in chunks], [0, 1, 2, 3])
+        self.assertEqual([chunk.position for chunk in chunks], [1, 2, 3, 4])
+        self.assertEqual([chunk.start_offset for chunk in chunks], [0, 28, 56, 74])
+        self.assertEqual([chunk.end_offset for chunk in chunks], [30, 58, 76, 84])
+
+    def test_range_filter_uses_offsets(self):
+        """فیلتر بازه زمانی فقط قطعات هم‌پوشان با بازه را برمی‌گرداند"""
+        chunks = self.service._chunk_offsets(self.encounter.id).filter(
+            end_offset__gte=57, start_offset__lte=60
+        )
+
+        self.assertEqual([chunk.chunk_index for chunk in chunks], [1, 2])
+
+
+class MultipartUploadTest(SimpleTestCase):
+    """تست آپلود چندبخشی جریانی"""
+
+    def setUp(self):
+        self.service = AudioProcessingService()
+        self.service.upload_part_size = 10
+        self.parts = []
+        self.aborted = []
+        self.completed = []
+
+        async def upload_part(path, upload_id, number, data):
+            self.parts.append((number, len(data)))
+            return {'part_number': number, 'size': len(data)}
+
+        async def complete(path, upload_id, parts):
+            self.completed.append(parts)
+            return f'https://storage/{path}'
+
+        async def abort(path, upload_id):
+            self.aborted.append(upload_id)
+
+        self.service._upload_part = upload_part
+        self.service._complete_multipart_upload = complete
+        self.service._abort_multipart_upload = abort
+
+    def _upload(self, stream):
+        return async_to_sync(self.service._upload_stream_to_storage)('merged.mp3', stream, 'audio/mp3')
+
+    def test_parts_sized_and_numbered(self):
+        """همه بخش‌ها جز آخری حداقل upload_part_size هستند و به ترتیب شماره می‌خورند"""
+        url = self._upload(_pieces([4, 4, 4, 7, 3, 12, 1]))
+
+        self.assertEqual(url, 'https://storage/merged.mp3')
+        self.assertEqual([number for number, _ in self.parts], [1, 2, 3, 4])
+        self.assertTrue(all(size >= 10 for _, size in self.parts[:-1]))
+        self.assertEqual(sum(size for _, size in self.parts), 35)
+        self.assertEqual(len(self.completed[0]), 4)
+        self.assertEqual(self.aborted, [])
+
+    def test_empty_stream_uploads_single_part(self):
+        """جریان خالی یک بخش خالی آپلود می‌کند تا آپلود قابل تکمیل باشد"""
+        self._upload(_pieces([]))
+
+        self.assertEqual(self.parts, [(1, 0)])
+
+    def test_stream_failure_aborts_upload(self):
+        """خطای جریان ورودی آپلود ناتمام را لغو می‌کند"""
+        async def failing():
+            yield b'x' * 20
+            raise IOError('merge failed')
+
+        with self.assertRaises(IOError):
+            self._upload(failing())
+        self.assertEqual(len(self.aborted), 1)
+        self.assertEqual(self.completed, [])
+
+    def test_part_failure_aborts_upload(self):
+        """خطای آپلود یک بخش آپلود را لغو می‌کند"""
+        async def upload_part(path, upload_id, number, data):
+            raise IOError('part rejected')
+
+        self.service._upload_part = upload_part
+
+        with self.assertRaises(IOError):
+            self._upload(_pieces([30, 30, 30]))
+        self.assertEqual(len(self.aborted), 1)
+        self.assertEqual(self.completed, [])
@@ -0,0 +1,146 @@
+"""
+تست‌های pool کارهای پردازشی سرویس‌های ملاقات
+"""
+import asyncio
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..api.views.health_views import ServiceHealthView
+from ..services import cpu_executor
+from ..services.cpu_executor import CPUExecutor
+
+
+async def wait_until(condition, timeout=2.0):
+    """انتظار برای برقراری شرط بدون مسدود کردن event loop"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError('condition not met')
+        await asyncio.sleep(0.005)
+
+
+class CPUExecutorTest(SimpleTestCase):
+    """تست صف محدود، آزادسازی جا و شمارنده‌های CPUExecutor"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        # threadهای مسدودشده حتی با شکست تست آزاد می‌شوند
+        self.addCleanup(self.release.set)
+
+    def blocking(self, value=None):
+        self.release.wait(timeout=5)
+        return value
+
+    def test_max_pending_bounds_submitted_work(self):
+        """بیش از max_pending کار به pool سپرده نمی‌شود و بقیه منتظر جا می‌مانند"""
+        executor = CPUExecutor(max_workers=1, max_pending=2)
+
+        async def scenario():
+            tasks = [asyncio.ensure_future(executor.run(self.blocking, index)) for index in range(5)]
+            await wait_until(lambda: executor.stats()['running'] == 1)
+            await asyncio.sleep(0.02)
+            stats = executor.stats()
+            self.release.set()
+            return stats, await asyncio.gather(*tasks)
+
+        stats, results = asyncio.run(scenario())
+
+        self.assertEqual(stats['running'], 1)
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['waiting_for_slot'], 3)
+        self.assertEqual(stats['submitted'], 2)
+        self.assertEqual(results, [0, 1, 2, 3, 4])
+        self.assertLessEqual(executor.stats()['max_queued'], 2)
+
+    def test_cancelled_caller_releases_slot_after_work_finishes(self):
+        """لغو فراخواننده جا را تا پایان واقعی کار در حال اجرا نگه می‌دارد و سپس آزاد می‌کند"""
+        executor = CPUExecutor(max_workers=1, max_pending=1)
+
+        async def scenario():
+            running = asyncio.ensure_future(executor.run(self.blocking))
+            await wait_until(lambda: executor.stats()['running'] == 1)
+            running.cancel()
+            follower = asyncio.ensure_future(executor.run(lambda: 'next'))
+            await asyncio.sleep(0.02)
+            # کار لغوشده هنوز در thread اجرا می‌شود
+            self.assertEqual(executor.stats()['waiting_for_slot'], 1)
+            self.release.set()
+            return await asyncio.wait_for(follower, timeout=2)
+
+        self.assertEqual(asyncio.run(scenario()), 'next')
+        self.assertEqual(executor.stats()['completed'], 2)
+
+    def test_cancelled_queued_work_releases_slot(self):
+        """لغو کاری که هنوز شروع نشده آن را از صف خارج و جایش را آزاد می‌کند"""
+        executor = CPUExecutor(max_workers=1, max_pending=2)
+        started = []
+
+        async def scenario():
+            running = asyncio.ensure_future(executor.run(self.blocking))
+            queued = asyncio.ensure_future(executor.run(started.append, 'queued'))
+            await wait_until(lambda: executor.stats()['queued'] == 1)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            await wait_until(lambda: executor.stats()['queued'] == 0)
+            follower = asyncio.ensure_future(executor.run(started.append, 'follower'))
+            await asyncio.sleep(0.02)
+            waiting = executor.stats()['waiting_for_slot']
+            self.release.set()
+            await asyncio.gather(running, follower)
+            return waiting
+
+        self.assertEqual(asyncio.run(scenario()), 0)
+        self.assertEqual(started, ['follower'])
+
+    def test_stats_counters(self):
+        """شمارنده‌های کارهای موفق و ناموفق و میانگین زمان‌ها"""
+        executor = CPUExecutor(max_workers=2, max_pending=4)
+
+        def fail():
+            raise ValueError('bad input')
+
+        async def scenario():
+            await executor.run(sum, [1, 2, 3])
+            await executor.run(self.release.wait, 0.01)
+            with self.assertRaises(ValueError):
+                await executor.run(fail)
+
+        asyncio.run(scenario())
+        stats = executor.stats()
+
+        self.assertEqual(stats['submitted'], 3)
+        self.assertEqual(stats['completed'], 2)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual((stats['running'], stats['queued'], stats['waiting_for_slot']), (0, 0, 0))
+        self.assertGreater(stats['avg_run_ms'], 0)
+        self.assertGreaterEqual(stats['avg_queue_ms'], 0)
+        self.assertEqual((stats['max_workers'], stats['max_pending']), (2, 4))
+
+
+class ServiceHealthViewTest(SimpleTestCase):
+    """تست گزارش وضعیت pool در ویوی سلامت"""
+
+    def _get(self, user):
+        request = APIRequestFactory().get('/health/')
+        force_authenticate(request, user=user)
+        return ServiceHealthView.as_view()(request)
+
+    def test_reports_cpu_executor_stats(self):
+        """آمار pool برای ادمین برگردانده می‌شود"""
+        executor = CPUExecutor(max_workers=1, max_pending=1)
+        with mock.patch.object(cpu_executor, '_cpu_executor', executor):
+            response = self._get(mock.Mock(is_authenticated=True, is_staff=True))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'healthy')
+        self.assertEqual(response.data['cpu_executor'], executor.stats())
+
+    def test_requires_admin(self):
+        """کاربر غیر ادمین به آمار دسترسی ندارد"""
+        self.assertEqual(self._get(mock.Mock(is_authenticated=True, is_staff=False)).status_code, 403)
+        self.assertIn(self._get(AnonymousUser()).status_code, (401, 403))
@@ -0,0 +1,138 @@
+"""
+تست‌های رمزنگاری جریانی داده‌های ملاقات
+"""
+import base64
+import os
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from django.test import SimpleTestCase
+
+from ..utils.encryption import (
+    HEADER_SIZE, TAG_SIZE, DecryptionError, decrypt_bytes, decrypt_stream, encrypt_bytes,
+    encrypted_size, generate_encryption_key, get_key_schedule, is_stream_encrypted,
+    reencrypt_legacy_blob
+)
+
+SEGMENT = 16
+
+
+def legacy_token(data: bytes, key: str) -> bytes:
+    """توکن قالب قدیمی: Fernet با کلید PBKDF2 که دوباره base64 شده است"""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=b'helssa_salt_2024', iterations=100000)
+    fernet = Fernet(base64.urlsafe_b64encode(kdf.derive(base64.urlsafe_b64decode(key))))
+    return base64.urlsafe_b64encode(fernet.encrypt(data))
+
+
+class StreamEncryptionTest(SimpleTestCase):
+    """تست قالب جریانی AES-GCM"""
+
+    def setUp(self):
+        self.key = generate_encryption_key()
+
+    def _segments(self, blob):
+        body = blob[HEADER_SIZE:]
+        size = SEGMENT + TAG_SIZE
+        return blob[:HEADER_SIZE], [body[i:i + size] for i in range(0, len(body), size)]
+
+    def test_round_trip_across_segment_boundaries(self):
+        """رمزگشایی یکجا و جریانی با هر اندازه ورودی و تکه‌های دلخواه"""
+        for size in (0, 1, SEGMENT - 1, SEGMENT, SEGMENT + 1, 3 * SEGMENT, 100):
+            with self.subTest(size=size):
+                data = os.urandom(size)
+                blob = encrypt_bytes(data, self.key, SEGMENT)
+
+                self.assertTrue(is_stream_encrypted(blob))
+                self.assertEqual(len(blob), encrypted_size(size, SEGMENT))
+                self.assertEqual(decrypt_bytes(blob, self.key), data)
+                pieces = (blob[i:i + 7] for i in range(0, len(blob), 7))
+                self.assertEqual(b''.join(decrypt_stream(pieces, self.key)), data)
+
+    def test_truncation_rejected(self):
+        """حذف قطعه پایانی یا کوتاه کردن آن تشخیص داده می‌شود"""
+        header, segments = self._segments(encrypt_bytes(os.urandom(3 * SEGMENT + 5), self.key, SEGMENT))
+
+        for blob in (header + b''.join(segments[:-1]), header + b''.join(segments)[:-1], header):
+            with self.subTest(length=len(blob)):
+                with self.assertRaises(DecryptionError):
+                    decrypt_bytes(blob, self.key)
+
+    def test_reorder_rejected(self):
+        """جابه‌جایی قطعات تشخیص داده می‌شود"""
+        header, segments = self._segments(encrypt_bytes(os.urandom(3 * SEGMENT + 5), self.key, SEGMENT))
+        segments[0], segments[1] = segments[1], segments[0]
+
+        with self.assertRaises(DecryptionError):
+            decrypt_bytes(header + b''.join(segments), self.key)
+
+    def test_tamper_rejected(self):
+        """تغییر یک بایت، header، داده اضافه یا کلید نادرست رد می‌شود"""
+        blob = encrypt_bytes(os.urandom(2 * SEGMENT), self.key, SEGMENT)
+        flipped = bytearray(blob)
+        flipped[HEADER_SIZE + 3] ^= 1
+        header = bytearray(blob)
+        header[HEADER_SIZE - 1] ^= 1
+
+        for bad, key in (
+            (bytes(flipped), self.key),
+            (bytes(header), self.key),
+            (blob + b'extra', self.key),
+            (blob, generate_encryption_key()),
+        ):
+            with self.assertRaises(DecryptionError):
+                decrypt_bytes(bad, key)
+
+
+class LegacyFormatTest(SimpleTestCase):
+    """تست سازگاری با داده‌های قالب قدیمی"""
+
+    def setUp(self):
+        # کلیدهای قدیمی دوبار base64 شده بودند و طول آن‌ها 32 بایت نیست
+        self.key = base64.urlsafe_b64encode(Fernet.generate_key()).decode()
+
+    def test_legacy_token_decrypts(self):
+        """توکن Fernet قدیمی (با یا بدون base64 دوم) رمزگشایی می‌شود"""
+        token = legacy_token(b'old audio', self.key)
+
+        self.assertFalse(is_stream_encrypted(token))
+        self.assertEqual(decrypt_bytes(token, self.key), b'old audio')
+        self.assertEqual(decrypt_bytes(base64.urlsafe_b64decode(token), self.key), b'old audio')
+        with self.assertRaises(DecryptionError):
+            decrypt_bytes(b'not a token', self.key)
+
+    def test_reencrypt_legacy_blob(self):
+        """داده قدیمی به قالب جریانی تبدیل و داده جدید دست‌نخورده می‌ماند"""
+        upgraded = reencrypt_legacy_blob(legacy_token(b'old audio', self.key), self.key)
+
+        self.assertTrue(is_stream_encrypted(upgraded))
+        self.assertEqual(decrypt_bytes(upgraded, self.key), b'old audio')
+        self.assertIsNone(reencrypt_legacy_blob(upgraded, self.key))
+
+
+class KeyScheduleCacheTest(SimpleTestCase):
+    """تست کش LRU کلیدهای مشتق‌شده"""
+
+    def setUp(self):
+        get_key_schedule.cache_clear()
+        self.addCleanup(get_key_schedule.cache_clear)
+
+    def test_schedule_derived_once_per_key(self):
+        """PBKDF2 و HKDF برای هر کلید فقط یک‌بار اجرا می‌شوند"""
+        legacy_key = base64.urlsafe_b64encode(Fernet.generate_key()).decode()
+
+        first = get_key_schedule(legacy_key)
+        self.assertIs(get_key_schedule(legacy_key), first)
+        self.assertIsNot(get_key_schedule(generate_encryption_key()), first)
+
+        info = get_key_schedule.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 2))
+
+    def test_cache_is_bounded(self):
+        """کش اندازه محدود دارد و کلیدهای قدیمی کنار گذاشته می‌شوند"""
+        maxsize = get_key_schedule.cache_info().maxsize
+        self.assertIsNotNone(maxsize)
+
+        for _ in range(maxsize + 5):
+            get_key_schedule(generate_encryption_key())
+        self.assertEqual(get_key_schedule.cache_info().currsize, maxsize)
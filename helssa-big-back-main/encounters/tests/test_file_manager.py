@@ -0,0 +1,59 @@
+"""
+تست‌های رمزنگاری جریانی آپلود و دانلود فایل‌های ملاقات
+"""
+import base64
+import os
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from ..services.file_manager import EncounterFileManager
+from ..utils.encryption import (
+    DEFAULT_SEGMENT_SIZE, decrypt_bytes, encrypted_size, generate_encryption_key, get_key_schedule
+)
+
+
+async def _collect(stream):
+    return [piece async for piece in stream]
+
+
+async def _pieces(blob: bytes, size: int):
+    for offset in range(0, len(blob), size):
+        yield blob[offset:offset + size]
+
+
+class FileStreamTest(SimpleTestCase):
+    """تست رمزنگاری و رمزگشایی جریانی در EncounterFileManager"""
+
+    def setUp(self):
+        self.manager = EncounterFileManager()
+        self.key = generate_encryption_key()
+        self.data = os.urandom(40 * DEFAULT_SEGMENT_SIZE + 123)
+
+    def test_upload_stream_is_segmented(self):
+        """فایل به صورت قطعات رمز می‌شود و حجم آن از پیش معلوم است"""
+        pieces = async_to_sync(_collect)(self.manager._encrypt_stream(self.data, self.key))
+        blob = b''.join(pieces)
+
+        self.assertGreater(len(pieces), 2)
+        self.assertLess(max(len(piece) for piece in pieces), len(self.data))
+        self.assertEqual(len(blob), encrypted_size(len(self.data)))
+        self.assertEqual(decrypt_bytes(blob, self.key), self.data)
+
+    def test_download_stream_decrypts_incrementally(self):
+        """داده دریافتی قطعه‌به‌قطعه رمزگشایی می‌شود"""
+        blob = b''.join(async_to_sync(_collect)(self.manager._encrypt_stream(self.data, self.key)))
+
+        pieces = async_to_sync(_collect)(self.manager._decrypt_stream(_pieces(blob, 1000), self.key))
+
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(b''.join(pieces), self.data)
+
+    def test_download_stream_accepts_legacy_blob(self):
+        """فایل قالب قدیمی (توکن Fernet) یکجا رمزگشایی می‌شود"""
+        fernet = get_key_schedule(self.key).fernet
+        token = base64.urlsafe_b64encode(fernet.encrypt(b'legacy file'))
+
+        pieces = async_to_sync(_collect)(self.manager._decrypt_stream(_pieces(token, 2), self.key))
+
+        self.assertEqual(b''.join(pieces), b'legacy file')
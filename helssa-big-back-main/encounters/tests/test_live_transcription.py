@@ -0,0 +1,191 @@
+"""
+تست‌های رونویسی تدریجی ملاقات و شروع گزارش‌های پس از ویزیت
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import signals, tasks
+from ..models import AudioChunk, Encounter, LiveTranscript, Transcript
+from ..services.live_transcription import LiveTranscriptionService
+
+User = get_user_model()
+
+
+def edge_words(self, text):
+    """موجودیت ساختگی: اولین و آخرین کلمه متن"""
+    words = text.split()
+    return [
+        {'type': 'word', 'text': words[0], 'start': 0, 'end': len(words[0])},
+        {'type': 'word', 'text': words[-1], 'start': len(text) - len(words[-1]), 'end': len(text)},
+    ]
+
+
+class LiveTranscriptTestMixin:
+    """ساخت ملاقات و قطعات بدون اجرای task های Celery سیگنال‌ها"""
+
+    def setUp(self):
+        for name in ('process_audio_chunk_stt', 'update_live_transcript', 'process_encounter_audio_complete'):
+            patcher = mock.patch.object(signals, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(LiveTranscriptionService, 'extract_entities', edge_words)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.service = LiveTranscriptionService(overlap_words=5)
+        self.encounter = Encounter.objects.create(
+            patient=User.objects.create_user('09120000001', 'علی', 'محمدی'),
+            doctor=User.objects.create_user('09120000002', 'سارا', 'احمدی'),
+            type='video',
+            chief_complaint='سردرد',
+            scheduled_at=timezone.now() + timedelta(hours=1),
+            fee_amount=0,
+        )
+
+    def add_chunk(self, index):
+        return AudioChunk.objects.create(
+            encounter=self.encounter,
+            chunk_index=index,
+            file_url=f'https://storage.helssa.ir/chunks/{index}.webm',
+            file_size=1024,
+            duration_seconds=30,
+        )
+
+    def transcribe(self, chunk, text):
+        return Transcript.objects.create(audio_chunk=chunk, text=text)
+
+    def fail(self, chunk):
+        AudioChunk.objects.filter(pk=chunk.pk).update(transcription_status='failed')
+
+
+class LiveTranscriptionServiceTest(LiveTranscriptTestMixin, TestCase):
+    """تست ادغام تدریجی رونویسی قطعات"""
+
+    def test_out_of_order_completion_waits_for_turn(self):
+        """قطعه‌ای که زودتر از قطعه قبلی رونویسی شود تا نوبتش منتظر می‌ماند"""
+        first, second = self.add_chunk(0), self.add_chunk(1)
+
+        self.transcribe(second, 'فشار خون طبیعی است')
+        live, completed = self.service.extend(self.encounter.id)
+        self.assertEqual((live.text, live.processed_chunks, completed), ('', 0, False))
+
+        self.transcribe(first, 'بیمار تب ندارد')
+        live, completed = self.service.extend(self.encounter.id)
+
+        self.assertEqual(live.text, 'بیمار تب ندارد فشار خون طبیعی است')
+        self.assertEqual((live.processed_chunks, live.last_chunk_index), (2, 1))
+        self.assertFalse(completed)
+
+    def test_failed_chunk_skipped(self):
+        """قطعه ناموفق رد می‌شود و ادغام قطعات بعدی را متوقف نمی‌کند"""
+        first, second, third = self.add_chunk(0), self.add_chunk(1), self.add_chunk(2)
+        self.transcribe(first, 'بیمار تب ندارد')
+        self.fail(second)
+        self.transcribe(third, 'فشار خون طبیعی است')
+
+        live, _ = self.service.extend(self.encounter.id)
+
+        self.assertEqual(live.text, 'بیمار تب ندارد فشار خون طبیعی است')
+        self.assertEqual((live.processed_chunks, live.failed_chunks), (3, 1))
+
+    def test_overlap_trimmed_with_entity_offsets(self):
+        """کلمات تکراری محل اتصال حذف و آفست موجودیت‌ها به متن تجمعی منتقل می‌شوند"""
+        first, second = self.add_chunk(0), self.add_chunk(1)
+        self.transcribe(first, 'بیمار از سردرد شدید شکایت دارد')
+        self.transcribe(second, 'سردرد شدید شکایت دارد و استامینوفن مصرف کرده')
+
+        live, _ = self.service.extend(self.encounter.id)
+
+        self.assertEqual(live.text, 'بیمار از سردرد شدید شکایت دارد و استامینوفن مصرف کرده')
+        self.assertEqual(live.word_count, 10)
+        # موجودیت ابتدای قطعه دوم در بخش تکراری است و دوباره ثبت نمی‌شود
+        self.assertEqual(
+            [(entity['text'], entity['chunk_index']) for entity in live.medical_entities],
+            [('بیمار', 0), ('دارد', 0), ('کرده', 1)]
+        )
+        for entity in live.medical_entities:
+            self.assertEqual(live.text[entity['start']:entity['end']], entity['text'])
+        self.assertTrue(Transcript.objects.get(audio_chunk=second).medical_entities['entities'])
+
+    def test_entities_extracted_once(self):
+        """موجودیت‌های هر رونویسی فقط یک‌بار و پیش از ادغام استخراج می‌شوند"""
+        first, second = self.add_chunk(0), self.add_chunk(1)
+        self.transcribe(second, 'فشار خون طبیعی است')
+
+        with mock.patch.object(
+            LiveTranscriptionService, 'extract_entities', autospec=True, side_effect=edge_words
+        ) as extract:
+            self.service.extend(self.encounter.id)
+            self.transcribe(first, 'بیمار تب ندارد')
+            live, _ = self.service.extend(self.encounter.id)
+            self.service.extend(self.encounter.id)
+
+        self.assertEqual(
+            [call.args[1] for call in extract.call_args_list],
+            ['فشار خون طبیعی است', 'بیمار تب ندارد']
+        )
+        self.assertEqual(live.processed_chunks, 2)
+
+    def test_progress(self):
+        """وضعیت پیشرفت از شمارنده‌های رونویسی زنده خوانده می‌شود"""
+        self.assertEqual(self.service.get_progress(self.encounter.id), {})
+
+        first, _ = self.add_chunk(0), self.add_chunk(1)
+        self.transcribe(first, 'بیمار تب ندارد')
+        self.service.extend(self.encounter.id)
+        progress = self.service.get_progress(self.encounter.id)
+
+        self.assertEqual((progress['received_chunks'], progress['processed_chunks']), (2, 1))
+        self.assertEqual(progress['word_count'], 3)
+        self.assertFalse(progress['visit_ended'])
+        self.assertFalse(progress['is_complete'])
+
+
+class TranscriptCompletionTest(LiveTranscriptTestMixin, TestCase):
+    """تست شروع یک‌باره ادغام نهایی و گزارش‌ها"""
+
+    def setUp(self):
+        super().setUp()
+        for name in ('_start_transcript_reports', 'merge_audio_files'):
+            patcher = mock.patch.object(tasks, name)
+            setattr(self, name.strip('_'), patcher.start())
+            self.addCleanup(patcher.stop)
+        self.encounter_id = str(self.encounter.id)
+
+    def test_visit_ends_before_last_transcript(self):
+        """پایان ویزیت پیش از رونویسی آخرین قطعه؛ گزارش‌ها با آخرین قطعه شروع می‌شوند"""
+        first, second = self.add_chunk(0), self.add_chunk(1)
+        self.transcribe(first, 'بیمار تب ندارد')
+        tasks.update_live_transcript(self.encounter_id)
+
+        tasks.process_encounter_audio_complete(self.encounter_id)
+        self.merge_audio_files.delay.assert_called_once_with(self.encounter_id)
+        self.start_transcript_reports.assert_not_called()
+
+        self.transcribe(second, 'فشار خون طبیعی است')
+        result = tasks.update_live_transcript(self.encounter_id)
+        tasks.update_live_transcript(self.encounter_id)
+        tasks.process_encounter_audio_complete(self.encounter_id)
+
+        self.assertTrue(result['is_complete'])
+        self.start_transcript_reports.assert_called_once_with(self.encounter_id)
+        self.merge_audio_files.delay.assert_called_once()
+
+    def test_visit_ends_after_last_transcript(self):
+        """رونویسی همه قطعات پیش از پایان ویزیت؛ گزارش‌ها با پایان ویزیت شروع می‌شوند"""
+        first, second = self.add_chunk(0), self.add_chunk(1)
+        self.transcribe(first, 'بیمار تب ندارد')
+        self.fail(second)
+        tasks.update_live_transcript(self.encounter_id)
+        self.start_transcript_reports.assert_not_called()
+
+        tasks.process_encounter_audio_complete(self.encounter_id)
+        tasks.process_encounter_audio_complete(self.encounter_id)
+        tasks.update_live_transcript(self.encounter_id)
+
+        self.start_transcript_reports.assert_called_once_with(self.encounter_id)
+        self.assertIsNotNone(LiveTranscript.objects.get(encounter=self.encounter).completed_at)
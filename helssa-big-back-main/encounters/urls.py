@@ -13,7 +13,8 @@ from .api.views import (
     SOAPReportViewSet,
     PrescriptionViewSet,
     GenerateSOAPView,
-    ShareReportView
+    ShareReportView,
+    ServiceHealthView
 )
 
 # ایجاد router
@@ -42,6 +43,9 @@ urlpatterns = [
     # Report generation URLs
     path('encounters/<uuid:encounter_id>/generate-soap/', GenerateSOAPView.as_view(), name='generate-soap'),
     path('soap-reports/<uuid:report_id>/share/', ShareReportView.as_view(), name='share-report'),
+    
+    # Monitoring
+    path('health/', ServiceHealthView.as_view(), name='service-health'),
 ]
 
 # URL patterns برای استفاده در urls اصلی پروژه:
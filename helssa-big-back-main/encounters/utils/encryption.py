@@ -1,61 +1,354 @@
+"""
+رمزنگاری داده‌ها و فایل‌های ملاقات
+
+- کلید هر ملاقات 32 بایت تصادفی با کدگذاری base64 است؛ کلیدهای قدیمی (که دوبار
+  base64 شده بودند) همچنان با PBKDF2 به کلید 32 بایتی تبدیل می‌شوند.
+- کلیدهای مشتق‌شده هر ملاقات در یک LRU محدود کش می‌شوند تا PBKDF2 فقط یک‌بار
+  برای هر کلید اجرا شود.
+- فایل‌ها و صوت به صورت AEAD جریانی (AES-256-GCM قطعه‌به‌قطعه) روی بایت‌های خام
+  رمز می‌شوند؛ هر قطعه مستقل رمز و احراز می‌شود و کل فایل در حافظه نگه داشته
+  نمی‌شود.
+
+قالب جریان:
+    header = MAGIC(4) | version(1) | segment_size(4) | nonce_prefix(7)
+    segment = AES-GCM(plaintext[:segment_size]) + tag(16)
+    nonce = nonce_prefix(7) | counter(4) | last(1)
+
+header به عنوان AAD هر قطعه استفاده می‌شود؛ شمارنده جابه‌جایی و پرچم آخرین
+قطعه کوتاه‌سازی جریان را قابل تشخیص می‌کند.
+"""
+
 import base64
+import hashlib
+import os
 import secrets
-from cryptography.fernet import Fernet
+import struct
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Union
+
+from django.conf import settings
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from typing import Union
+
+
+STREAM_MAGIC = b'HLSE'
+STREAM_VERSION = 2
+HEADER_FORMAT = '>4sBI7s'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+
+DEFAULT_SEGMENT_SIZE = getattr(settings, 'ENCOUNTER_ENCRYPTION_SEGMENT_SIZE', 64 * 1024)
+KEY_CACHE_SIZE = getattr(settings, 'ENCOUNTER_ENCRYPTION_KEY_CACHE_SIZE', 1024)
+
+# حداکثر تعداد قطعات یک جریان (شمارنده 4 بایتی)
+MAX_SEGMENTS = 2 ** 32
+
+
+class DecryptionError(Exception):
+    """خطای رمزگشایی (کلید نادرست یا داده دستکاری‌شده/ناقص)"""
+    pass
+
+
+class KeySchedule:
+    """کلیدهای مشتق‌شده یک کلید ملاقات"""
+
+    __slots__ = ('fernet', 'aead', 'key_id')
+
+    def __init__(self, master_key: bytes):
+        self.fernet = Fernet(base64.urlsafe_b64encode(master_key))
+        self.aead = AESGCM(_hkdf(master_key, b'helssa-encounter-stream-v2'))
+        self.key_id = _hkdf(master_key, b'helssa-encounter-key-id')[:8].hex()
+
+
+def _hkdf(key: bytes, info: bytes) -> bytes:
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info).derive(key)
 
 
 def generate_encryption_key() -> str:
     """تولید کلید رمزنگاری جدید"""
-    key = Fernet.generate_key()
-    return base64.urlsafe_b64encode(key).decode()
+    return base64.urlsafe_b64encode(os.urandom(32)).decode()
 
 
-def _get_fernet_instance(key: str) -> Fernet:
-    """ایجاد instance از Fernet با کلید داده شده"""
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def get_key_schedule(key: str) -> KeySchedule:
+    """کلیدهای مشتق‌شده یک کلید ملاقات (کش‌شده در LRU محدود)"""
     try:
         # اگر کلید در فرمت base64 است
         key_bytes = base64.urlsafe_b64decode(key.encode())
-    except:
+    except Exception:
         # اگر کلید raw bytes است
         key_bytes = key.encode()
-        
-    # اطمینان از طول صحیح کلید (32 بایت)
-    if len(key_bytes) == 32:
-        return Fernet(base64.urlsafe_b64encode(key_bytes))
-    else:
-        # تولید کلید 32 بایتی از کلید ورودی
+
+    if len(key_bytes) != 32:
+        # کلیدهای قدیمی: تولید کلید 32 بایتی از کلید ورودی
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
             salt=b'helssa_salt_2024',  # Salt ثابت برای consistency
             iterations=100000,
         )
-        derived_key = kdf.derive(key_bytes)
-        return Fernet(base64.urlsafe_b64encode(derived_key))
+        key_bytes = kdf.derive(key_bytes)
+
+    return KeySchedule(key_bytes)
+
+
+def _get_fernet_instance(key: str) -> Fernet:
+    """ایجاد instance از Fernet با کلید داده شده"""
+    return get_key_schedule(key).fernet
+
+
+class StreamEncryptor:
+    """
+    رمزنگاری جریانی؛ هر بار update فقط قطعات کامل را رمز و برمی‌گرداند
+
+    مثال:
+        encryptor = StreamEncryptor(key)
+        yield encryptor.header
+        for chunk in source:
+            yield encryptor.update(chunk)
+        yield encryptor.finalize()
+    """
+
+    def __init__(self, key: str, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        self._aead = get_key_schedule(key).aead
+        self.segment_size = segment_size
+        self.header = struct.pack(
+            HEADER_FORMAT, STREAM_MAGIC, STREAM_VERSION, segment_size,
+            os.urandom(NONCE_PREFIX_SIZE)
+        )
+        self._nonce_prefix = self.header[-NONCE_PREFIX_SIZE:]
+        self._buffer = bytearray()
+        self._counter = 0
+        self._finalized = False
+
+    def update(self, data: bytes) -> bytes:
+        """افزودن داده و دریافت قطعات رمزشده کامل"""
+        return b''.join(self._update(data))
+
+    def update_segments(self, data: bytes) -> List[bytes]:
+        """مانند update ولی قطعات رمزشده را جدا برمی‌گرداند (بدون کپی برای چسباندن)"""
+        return self._update(data)
+
+    def _update(self, data: bytes) -> List[bytes]:
+        if self._finalized:
+            raise ValueError('جریان رمزنگاری بسته شده است')
+
+        view = memoryview(data)
+        size = self.segment_size
+        out = []
+        # آخرین قطعه کامل برای finalize نگه داشته می‌شود تا پرچم last بگیرد
+        if self._buffer:
+            take = min(size - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if not view:
+                return out
+            out.append(self._seal(bytes(self._buffer), last=False))
+            self._buffer.clear()
+
+        # قطعات کامل بدون کپی مستقیماً از ورودی رمز می‌شوند
+        while len(view) > size:
+            out.append(self._seal(view[:size], last=False))
+            view = view[size:]
+        self._buffer += view
+        return out
+
+    def finalize(self) -> bytes:
+        """رمزنگاری قطعه پایانی"""
+        if self._finalized:
+            raise ValueError('جریان رمزنگاری بسته شده است')
+        self._finalized = True
+        segment = self._seal(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        return segment
+
+    def _seal(self, plaintext: bytes, last: bool) -> bytes:
+        if self._counter >= MAX_SEGMENTS:
+            raise ValueError('تعداد قطعات جریان بیش از حد مجاز است')
+        nonce = self._nonce_prefix + struct.pack('>IB', self._counter, int(last))
+        self._counter += 1
+        return self._aead.encrypt(nonce, plaintext, self.header)
+
+
+class StreamDecryptor:
+    """
+    رمزگشایی جریانی؛ حداکثر یک قطعه رمزشده در حافظه نگه داشته می‌شود
+    """
+
+    def __init__(self, key: str):
+        self._aead = get_key_schedule(key).aead
+        self._buffer = bytearray()
+        self._header: Optional[bytes] = None
+        self._nonce_prefix = b''
+        self._segment_size = 0
+        self._counter = 0
+        self._done = False
+
+    def update(self, data: bytes) -> bytes:
+        """افزودن داده رمزشده و دریافت متن آشکار قطعات کامل"""
+        return b''.join(self._update(data))
+
+    def _update(self, data: bytes) -> List[bytes]:
+        if self._done:
+            if data:
+                raise DecryptionError('داده اضافه پس از قطعه پایانی')
+            return []
+
+        view = memoryview(data)
+        if self._header is None:
+            take = min(HEADER_SIZE - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) < HEADER_SIZE:
+                return []
+            self._read_header()
+
+        sealed_size = self._segment_size + TAG_SIZE
+        out = []
+        # قطعه‌ای که ممکن است آخرین باشد تا رسیدن داده بیشتر یا finalize باز نمی‌شود
+        if self._buffer:
+            take = min(sealed_size - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if not view:
+                return out
+            out.append(self._open(bytes(self._buffer), last=False))
+            self._buffer.clear()
+
+        while len(view) > sealed_size:
+            out.append(self._open(view[:sealed_size], last=False))
+            view = view[sealed_size:]
+        self._buffer += view
+        return out
+
+    def finalize(self) -> bytes:
+        """رمزگشایی قطعه پایانی و بررسی کامل بودن جریان"""
+        if self._done:
+            return b''
+        if self._header is None:
+            if len(self._buffer) < HEADER_SIZE:
+                raise DecryptionError('جریان رمزشده ناقص است')
+            self._read_header()
+        self._done = True
+        plaintext = self._open(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        return plaintext
+
+    def _read_header(self):
+        header = bytes(self._buffer[:HEADER_SIZE])
+        magic, version, segment_size, nonce_prefix = struct.unpack(HEADER_FORMAT, header)
+        if magic != STREAM_MAGIC or version != STREAM_VERSION or segment_size <= 0:
+            raise DecryptionError('قالب جریان رمزشده نامعتبر است')
+        self._header = header
+        self._nonce_prefix = nonce_prefix
+        self._segment_size = segment_size
+        del self._buffer[:HEADER_SIZE]
+
+    def _open(self, sealed: bytes, last: bool) -> bytes:
+        nonce = self._nonce_prefix + struct.pack('>IB', self._counter, int(last))
+        self._counter += 1
+        try:
+            return self._aead.decrypt(nonce, sealed, self._header)
+        except InvalidTag:
+            raise DecryptionError('رمزگشایی ناموفق: کلید نادرست یا داده دستکاری‌شده')
+
+
+def encrypt_stream(
+    chunks: Iterable[bytes],
+    key: str,
+    segment_size: int = DEFAULT_SEGMENT_SIZE
+) -> Iterator[bytes]:
+    """رمزنگاری جریانی یک منبع بایتی"""
+    encryptor = StreamEncryptor(key, segment_size)
+    yield encryptor.header
+    for chunk in chunks:
+        yield from encryptor._update(chunk)
+    yield encryptor.finalize()
+
+
+def decrypt_stream(chunks: Iterable[bytes], key: str) -> Iterator[bytes]:
+    """رمزگشایی جریانی یک منبع بایتی رمزشده"""
+    decryptor = StreamDecryptor(key)
+    for chunk in chunks:
+        yield from decryptor._update(chunk)
+    yield decryptor.finalize()
+
+
+def encrypted_size(plaintext_size: int, segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+    """حجم خروجی رمزشده جریانی (مثلاً برای Content-Length آپلود جریانی)"""
+    segments = max(1, -(-plaintext_size // segment_size))
+    return HEADER_SIZE + plaintext_size + segments * TAG_SIZE
+
+
+def encrypt_bytes(data: bytes, key: str, segment_size: int = DEFAULT_SEGMENT_SIZE) -> bytes:
+    """رمزنگاری بایت‌های خام (فایل، صوت) در قالب جریانی"""
+    return b''.join(encrypt_stream((data,), key, segment_size))
+
+
+def is_stream_encrypted(blob: bytes) -> bool:
+    """آیا داده در قالب جریانی جدید رمز شده است؟"""
+    return blob[:len(STREAM_MAGIC)] == STREAM_MAGIC
+
+
+def decrypt_bytes(blob: bytes, key: str) -> bytes:
+    """
+    رمزگشایی فایل یا صوت رمزشده
+
+    علاوه بر قالب جریانی، داده‌های قدیمی (توکن Fernet که دوباره base64 شده) نیز
+    پذیرفته می‌شوند.
+    """
+    if is_stream_encrypted(blob):
+        return b''.join(decrypt_stream((blob,), key))
+    return _decrypt_legacy(blob, key)
+
+
+def reencrypt_legacy_blob(blob: bytes, key: str) -> Optional[bytes]:
+    """
+    تبدیل داده رمزشده قدیمی به قالب جریانی (مسیر مهاجرت)
+
+    Returns:
+        داده در قالب جدید، یا None اگر داده از قبل در قالب جدید است
+    """
+    if is_stream_encrypted(blob):
+        return None
+    return encrypt_bytes(_decrypt_legacy(blob, key), key)
+
+
+def _decrypt_legacy(blob: Union[str, bytes], key: str) -> bytes:
+    if isinstance(blob, str):
+        blob = blob.encode()
+    fernet = get_key_schedule(key).fernet
+    try:
+        try:
+            return fernet.decrypt(blob)
+        except InvalidToken:
+            # قالب قدیمی: توکن Fernet دوباره base64 شده بود
+            return fernet.decrypt(base64.urlsafe_b64decode(blob))
+    except (InvalidToken, ValueError):
+        raise DecryptionError('رمزگشایی ناموفق: کلید نادرست یا داده نامعتبر')
 
 
 async def encrypt_data(data: Union[str, bytes], key: str) -> str:
-    """رمزنگاری داده با کلید داده شده"""
-    
+    """رمزنگاری داده کوچک (متن) با کلید داده شده؛ خروجی توکن Fernet است"""
+
     if isinstance(data, str):
         data = data.encode()
-        
+
     fernet = _get_fernet_instance(key)
-    encrypted = fernet.encrypt(data)
-    
-    return base64.urlsafe_b64encode(encrypted).decode()
+    return fernet.encrypt(data).decode()
 
 
-async def decrypt_data(encrypted_data: str, key: str) -> bytes:
-    """رمزگشایی داده با کلید داده شده"""
-    
-    encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode())
-    fernet = _get_fernet_instance(key)
-    decrypted = fernet.decrypt(encrypted_bytes)
-    
-    return decrypted
+async def decrypt_data(encrypted_data: Union[str, bytes], key: str) -> bytes:
+    """رمزگشایی داده با کلید داده شده (هر دو قالب قدیم و جدید)"""
+
+    if isinstance(encrypted_data, bytes) and is_stream_encrypted(encrypted_data):
+        return b''.join(decrypt_stream((encrypted_data,), key))
+    return _decrypt_legacy(encrypted_data, key)
 
 
 def generate_secure_token(length: int = 32) -> str:
@@ -65,10 +358,9 @@ def generate_secure_token(length: int = 32) -> str:
 
 def hash_data(data: str) -> str:
     """تولید hash از داده"""
-    import hashlib
     return hashlib.sha256(data.encode()).hexdigest()
 
 
 def verify_hash(data: str, hash_value: str) -> bool:
     """بررسی صحت hash"""
-    return hash_data(data) == hash_value
\ No newline at end of file
+    return hash_data(data) == hash_value
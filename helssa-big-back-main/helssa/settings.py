@@ -369,6 +369,10 @@ CACHES = {
     }
 }
 
+# محدودسازی نرخ مشترک بین همهٔ workerها (app_standards.rate_limiting)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'redis')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+
 # Logging Configuration
 
 LOGGING = {
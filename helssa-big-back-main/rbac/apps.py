@@ -24,7 +24,7 @@ class RbacConfig(AppConfig):
         - از انجام عملیات طولانی‌مدت یا مسدودکننده (I/O سنگین، پردازش طولانی) در اینجا خودداری شود؛ در صورت نیاز از فرایندهای پس‌زمینه/وظایف ناهمزمان استفاده کنید.
         - اگر خطایی در این متد رخ دهد، معمولاً در زمان راه‌اندازی اپلیکیشن رخدادش مشاهده می‌شود؛ لذا ثبت و مدیریت استثناها در صورت لزوم بر عهدهٔ پیاده‌سازی است.
         
-        پیاده‌سازی فعلی هیچ عملیاتی انجام نمی‌دهد و به‌عنوان محل نگهداری ثبت سیگنال‌ها و راه‌اندازی ساده باقی مانده است.
+        سیگنال‌های باطل‌سازی کش مجوزها (rbac.signals) در اینجا ثبت می‌شوند.
         """
-        # ثبت سیگنال‌ها در صورت نیاز
-        ...
\ No newline at end of file
+        # ثبت سیگنال‌ها
+        from . import signals  # noqa: F401
\ No newline at end of file
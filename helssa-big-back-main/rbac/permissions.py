@@ -0,0 +1,64 @@
+"""
+کلاس‌های مجوز DRF مبتنی بر RBAC
+RBAC-based DRF Permission Classes
+"""
+
+from typing import Dict, Iterable, Optional, Union
+
+from rest_framework import permissions
+
+from .resolver import get_permission_resolver
+from .settings import ERROR_MESSAGES
+
+RequiredPermissions = Union[Iterable[str], Dict[str, Iterable[str]]]
+
+
+class HasRBACPermission(permissions.BasePermission):
+    """
+    بررسی مجوزهای RBAC کاربر
+
+    مجوزهای لازم از ویژگی required_permissions کلاس مجوز یا view خوانده می‌شود:
+    - لیستی از «resource:action» یا codename (همه لازم‌اند)
+    - یا دیکشنری بر اساس action ویوست (list، create، ...) یا متد HTTP
+
+    مثال:
+        class PrescriptionViewSet(viewsets.ModelViewSet):
+            permission_classes = [HasRBACPermission]
+            required_permissions = {
+                'list': ['prescription:read'],
+                'create': ['prescription:create'],
+            }
+
+        permission_classes = [HasRBACPermission.require('report:read')]
+    """
+
+    message = ERROR_MESSAGES['PERMISSION_DENIED']
+    required_permissions: Optional[RequiredPermissions] = None
+
+    @classmethod
+    def require(cls, *required: str) -> type:
+        """ساخت کلاس مجوزی که مجوزهای داده‌شده را لازم دارد"""
+        return type(cls.__name__, (cls,), {'required_permissions': tuple(required)})
+
+    def get_required_permissions(self, request, view) -> Iterable[str]:
+        required = self.required_permissions
+        if required is None:
+            required = getattr(view, 'required_permissions', None)
+        if required is None:
+            return ()
+
+        if isinstance(required, dict):
+            action = getattr(view, 'action', None)
+            if action in required:
+                return required[action]
+            return required.get(request.method, ())
+        return required
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+
+        required = self.get_required_permissions(request, view)
+        resolver = get_permission_resolver()
+        return all(resolver.has_permission(user, permission) for permission in required)
@@ -0,0 +1,217 @@
+"""
+موتور حل مجوزهای RBAC
+RBAC Permission Resolver
+
+نقش‌های فعال و منقضی‌نشده هر کاربر یک‌بار به یک مجموعه ثابت (frozenset) از
+مجوزها کامپایل و کش می‌شوند؛ بررسی دسترسی یک عضویت O(1) در این مجموعه است.
+اعتبار کش با شماره نسخه (version stamp) کنترل می‌شود: تغییر UserRole نسخه همان
+کاربر و تغییر Role/Permission نسخه سراسری را افزایش می‌دهد.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from app_standards.cache_versions import bump_version, get_versions
+
+from .settings import RBAC_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_VERSION_KEY = 'rbac:version:global'
+USER_VERSION_KEY = 'rbac:version:user:{user_id}'
+COMPILED_KEY = 'rbac:perms:{user_id}:{global_version}:{user_version}'
+
+# عملیات «all» روی یک منبع همه عملیات آن منبع را پوشش می‌دهد
+WILDCARD_ACTION = 'all'
+
+
+def permission_key(resource: str, action: str) -> str:
+    """کلید یک مجوز به صورت «resource:action»"""
+    return f"{resource}:{action}"
+
+
+class CompiledPermissions:
+    """
+    مجموعه کامپایل‌شده مجوزهای یک کاربر
+
+    شامل کلیدهای «resource:action» و codename همه مجوزهای فعال نقش‌های معتبر کاربر
+    است؛ valid_until زودترین زمان انقضای نقش‌های کاربر است و پس از آن مجموعه
+    دوباره کامپایل می‌شود.
+    """
+
+    __slots__ = ('permissions', 'roles', 'valid_until')
+
+    def __init__(self, permissions: Iterable[str], roles: Iterable[str],
+                 valid_until: Optional[datetime] = None):
+        self.permissions = frozenset(permissions)
+        self.roles = frozenset(roles)
+        self.valid_until = valid_until
+
+    def is_valid(self, now: Optional[datetime] = None) -> bool:
+        return self.valid_until is None or (now or timezone.now()) < self.valid_until
+
+    def has(self, resource: str, action: Optional[str] = None) -> bool:
+        """
+        بررسی وجود مجوز
+
+        Args:
+            resource: نام منبع، کلید «resource:action» یا codename
+            action: عملیات (در صورت جدا دادن از منبع)
+        """
+        if action is None:
+            if resource in self.permissions:
+                return True
+            resource, _, action = resource.partition(':')
+            if not action:
+                return False
+
+        permissions = self.permissions
+        return (
+            permission_key(resource, action) in permissions
+            or permission_key(resource, WILDCARD_ACTION) in permissions
+        )
+
+    def __getstate__(self):
+        return self.permissions, self.roles, self.valid_until
+
+    def __setstate__(self, state):
+        self.permissions, self.roles, self.valid_until = state
+
+
+class PermissionResolver:
+    """
+    حل و کش مجوزهای کاربران
+
+    مسیر گرم: خواندن دو شماره نسخه از کش Django و یک جستجو در حافظه پردازه، بدون
+    هیچ پرس‌وجوی دیتابیس. با تغییر نسخه یا انقضای نقش، مجموعه از کش مشترک یا در
+    صورت نبود با سه پرس‌وجو از دیتابیس دوباره ساخته می‌شود.
+    """
+
+    def __init__(self, cache_ttl: Optional[int] = None, local_cache_size: int = 1024):
+        """
+        Args:
+            cache_ttl: مدت نگهداری مجموعه کامپایل‌شده در کش مشترک (ثانیه)
+            local_cache_size: حداکثر تعداد کاربران در کش حافظه پردازه
+        """
+        self.cache_ttl = RBAC_SETTINGS['PERMISSION_CACHE_TTL'] if cache_ttl is None else cache_ttl
+        self.local_cache_size = local_cache_size
+        self._local: 'OrderedDict[Tuple, CompiledPermissions]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_permissions(self, user) -> CompiledPermissions:
+        """
+        مجموعه کامپایل‌شده مجوزهای کاربر
+
+        Args:
+            user: کاربر (شیء UnifiedUser)
+
+        Returns:
+            CompiledPermissions: مجموعه مجوزهای معتبر کاربر
+        """
+        if user is None or not getattr(user, 'is_authenticated', False):
+            return CompiledPermissions((), ())
+
+        global_version, user_version = self._get_versions(user.pk)
+        local_key = (user.pk, global_version, user_version)
+        now = timezone.now()
+
+        with self._lock:
+            compiled = self._local.get(local_key)
+            if compiled is not None:
+                self._local.move_to_end(local_key)
+        if compiled is not None and compiled.is_valid(now):
+            return compiled
+
+        shared_key = COMPILED_KEY.format(
+            user_id=user.pk, global_version=global_version, user_version=user_version
+        )
+        compiled = cache.get(shared_key)
+        if compiled is None or not compiled.is_valid(now):
+            compiled = self.compile(user.pk, now)
+            cache.set(shared_key, compiled, self.cache_ttl)
+
+        with self._lock:
+            self._local[local_key] = compiled
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.local_cache_size:
+                self._local.popitem(last=False)
+        return compiled
+
+    def has_permission(self, user, resource: str, action: Optional[str] = None) -> bool:
+        """
+        بررسی دسترسی کاربر به یک مجوز
+
+        کاربران غیرفعال هیچ دسترسی و superuser ها همه دسترسی‌ها را دارند.
+        """
+        if user is None or not getattr(user, 'is_authenticated', False):
+            return False
+        if not user.is_active:
+            return False
+        if user.is_superuser:
+            return True
+        return self.get_permissions(user).has(resource, action)
+
+    def compile(self, user_id, now: Optional[datetime] = None) -> CompiledPermissions:
+        """کامپایل مجوزهای نقش‌های فعال و منقضی‌نشده کاربر از دیتابیس"""
+        from .models import Permission, UserRole
+
+        now = now or timezone.now()
+        assignments = UserRole.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+            user_id=user_id,
+            is_active=True,
+            role__is_active=True,
+        )
+
+        summary = assignments.aggregate(valid_until=Min('expires_at'))
+        role_names = set(assignments.values_list('role__name', flat=True))
+
+        permissions = set()
+        rows = Permission.objects.filter(
+            is_active=True,
+            roles__in=assignments.values('role_id'),
+        ).values_list('resource', 'action', 'codename').distinct()
+        for resource, action, codename in rows:
+            permissions.add(permission_key(resource, action))
+            permissions.add(codename)
+
+        return CompiledPermissions(permissions, role_names, summary['valid_until'])
+
+    def invalidate_user(self, user_id):
+        """باطل کردن مجموعه کامپایل‌شده یک کاربر (پس از تغییر نقش‌های او)"""
+        bump_version(USER_VERSION_KEY.format(user_id=user_id))
+
+    def invalidate_all(self):
+        """باطل کردن مجموعه همه کاربران (پس از تغییر نقش‌ها یا مجوزها)"""
+        bump_version(GLOBAL_VERSION_KEY)
+
+    def _get_versions(self, user_id) -> Tuple[int, int]:
+        user_key = USER_VERSION_KEY.format(user_id=user_id)
+        versions = get_versions([GLOBAL_VERSION_KEY, user_key])
+        return versions[GLOBAL_VERSION_KEY], versions[user_key]
+
+
+_resolver: Optional[PermissionResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_permission_resolver() -> PermissionResolver:
+    """موتور مشترک حل مجوزها در این پردازه"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = PermissionResolver()
+    return _resolver
+
+
+def has_permission(user, resource: str, action: Optional[str] = None) -> bool:
+    """میان‌بر بررسی دسترسی کاربر با موتور مشترک"""
+    return get_permission_resolver().has_permission(user, resource, action)
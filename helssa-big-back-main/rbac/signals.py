@@ -0,0 +1,35 @@
+"""
+سیگنال‌های RBAC برای باطل کردن کش مجوزها
+RBAC signals for permission cache invalidation
+
+نسخه‌ها پس از commit افزایش می‌یابند؛ افزایش پیش از commit اجازه می‌دهد
+درخواست هم‌زمان مجموعه قدیمی را با نسخه جدید کامپایل و در کش نگه دارد.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Permission, Role, UserRole
+from .resolver import get_permission_resolver
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """تغییر نقش‌های یک کاربر فقط کش همان کاربر را باطل می‌کند"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: get_permission_resolver().invalidate_user(user_id))
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Permission)
+def invalidate_all_permissions(sender, **kwargs):
+    """تغییر نقش یا مجوز روی همه کاربران دارای آن اثر دارد"""
+    transaction.on_commit(lambda: get_permission_resolver().invalidate_all())
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def invalidate_role_permissions(sender, action, **kwargs):
+    """تغییر مجوزهای یک نقش"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: get_permission_resolver().invalidate_all())
@@ -7,10 +7,14 @@ from django.db import IntegrityError
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
+from django.core.cache import cache
+from rest_framework.test import APIRequestFactory
 from .models import (
     PatientProfile, DoctorProfile, Role, Permission,
     UserRole, UserSession, AuthAuditLog
 )
+from .permissions import HasRBACPermission
+from .resolver import PermissionResolver
 
 User = get_user_model()
 
@@ -352,6 +356,86 @@ class RolePermissionTest(TestCase):
             )
 
 
+class PermissionResolverTest(TestCase):
+    """تست‌های موتور حل مجوزها"""
+    
+    def setUp(self):
+        """ایجاد کاربر، نقش با دو مجوز و موتور حل مجوز با کش خالی"""
+        cache.clear()
+        self.resolver = PermissionResolver()
+        self.user = User.objects.create_user(
+            phone_number='09123456789',
+            first_name='تست',
+            last_name='کاربر'
+        )
+        self.role = Role.objects.create(name='doctor_basic', display_name='پزشک عمومی')
+        self.role.permissions.add(
+            Permission.objects.create(
+                name='خواندن پرونده', codename='view_patient_record',
+                resource='patient_record', action='read'
+            ),
+            Permission.objects.create(
+                name='مدیریت گزارش', codename='manage_reports',
+                resource='report', action='all'
+            ),
+        )
+        self.user_role = UserRole.objects.create(user=self.user, role=self.role)
+    
+    def test_warm_path_runs_no_queries(self):
+        """تست کامپایل یک‌باره و بررسی بدون پرس‌وجو در مسیر گرم"""
+        self.assertTrue(self.resolver.has_permission(self.user, 'patient_record', 'read'))
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(self.resolver.has_permission(self.user, 'patient_record:read'))
+            self.assertTrue(self.resolver.has_permission(self.user, 'view_patient_record'))
+            self.assertTrue(self.resolver.has_permission(self.user, 'report', 'delete'))
+            self.assertFalse(self.resolver.has_permission(self.user, 'patient_record', 'write'))
+    
+    def test_role_changes_invalidate_cache(self):
+        """تست باطل شدن کش با تغییر نقش کاربر یا مجوزهای نقش"""
+        self.assertTrue(self.resolver.has_permission(self.user, 'patient_record', 'read'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.permissions.add(Permission.objects.create(
+                name='نوشتن نسخه', codename='write_prescription',
+                resource='prescription', action='write'
+            ))
+        self.assertTrue(self.resolver.has_permission(self.user, 'prescription', 'write'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_role.is_active = False
+            self.user_role.save()
+        self.assertFalse(self.resolver.has_permission(self.user, 'patient_record', 'read'))
+    
+    def test_expired_role_is_ignored(self):
+        """تست نادیده گرفتن نقش منقضی و انقضای مجموعه کامپایل‌شده"""
+        self.user_role.expires_at = timezone.now() + timedelta(seconds=1)
+        self.user_role.save()
+        
+        compiled = self.resolver.get_permissions(self.user)
+        self.assertTrue(compiled.has('patient_record', 'read'))
+        self.assertEqual(compiled.valid_until, self.user_role.expires_at)
+        self.assertFalse(compiled.is_valid(self.user_role.expires_at))
+        
+        UserRole.objects.filter(pk=self.user_role.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(self.resolver.compile(self.user.pk).has('patient_record', 'read'))
+    
+    def test_drf_permission_class(self):
+        """تست کلاس مجوز DRF با مجوزهای لازم بر اساس action"""
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        
+        class View:
+            action = 'list'
+            required_permissions = {'list': ['patient_record:read'], 'destroy': ['patient_record:delete']}
+        
+        view = View()
+        self.assertTrue(HasRBACPermission().has_permission(request, view))
+        view.action = 'destroy'
+        self.assertFalse(HasRBACPermission().has_permission(request, view))
+        self.assertTrue(HasRBACPermission.require('report:read')().has_permission(request, view))
+
+
 class UserSessionTest(TestCase):
     """تست‌های نشست کاربر"""
     
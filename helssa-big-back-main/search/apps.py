@@ -15,6 +15,6 @@ class SearchConfig(AppConfig):
         """
         آماده‌سازی اپلیکیشن جستجو
         """
-        # فعلاً عملیاتی نیاز نیست
-        pass
+        # ثبت سیگنال‌های ایندکس
+        from . import signals  # noqa
 
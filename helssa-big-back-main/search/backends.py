@@ -0,0 +1,245 @@
+"""
+بک‌اندهای تولید کاندیدا برای جستجوی کلیدواژه‌ای
+Pluggable keyword candidate-generation backends (MySQL FULLTEXT / inverted index + BM25)
+"""
+
+from __future__ import annotations
+
+import math
+import logging
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import SearchableContent, SearchPosting
+from .settings import KEYWORD_BACKEND_SETTINGS
+from .tokenizer import normalize_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+MAX_TERM_LENGTH = 64
+# content عمداً حذف شده؛ متن کامل فقط برای نتایج نهایی (snippet) خوانده می‌شود
+CANDIDATE_FIELDS = ("id", "encounter_id", "content_type", "content_id", "title", "metadata")
+
+
+def indexable_text(searchable) -> str:
+    """متن قابل ایندکس یک SearchableContent"""
+    return " ".join(part for part in (searchable.title, searchable.content, searchable.metadata_text) if part)
+
+
+def term_counts(text: str) -> Counter:
+    """فراوانی توکن‌ها (بریده‌شده به طول ستون term)"""
+    return Counter(token[:MAX_TERM_LENGTH] for token in tokenize(text))
+
+
+class BaseKeywordBackend:
+    """رابط بک‌اند کاندیدا؛ خروجی candidates ردیف‌های CANDIDATE_FIELDS به‌همراه relevance است"""
+
+    name = "base"
+
+    def candidates(self, query_text: str, qs, limit: int, boolean_mode: bool) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def index_content(self, searchable) -> None:
+        """به‌روزرسانی ایندکس برای یک محتوا (پیش‌فرض: نیازی نیست)"""
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """بازسازی کامل ایندکس؛ تعداد اسناد ایندکس‌شده را برمی‌گرداند"""
+        return 0
+
+
+class MySQLFullTextBackend(BaseKeywordBackend):
+    """MATCH ... AGAINST روی ستون generated با نام fulltext_all"""
+
+    name = "mysql_fulltext"
+
+    def candidates(self, query_text: str, qs, limit: int, boolean_mode: bool) -> List[Dict[str, Any]]:
+        mode_sql = "IN BOOLEAN MODE" if boolean_mode else "IN NATURAL LANGUAGE MODE"
+        raw = RawSQL(f"MATCH(fulltext_all) AGAINST (%s {mode_sql})", (query_text,))
+        return list(
+            qs.annotate(relevance=raw)
+              .filter(relevance__gt=0)
+              .order_by("-relevance", "-created_at")[:limit]
+              .values(*CANDIDATE_FIELDS, "relevance")
+        )
+
+
+class InvertedIndexBackend(BaseKeywordBackend):
+    """
+    ایندکس معکوس توکنی روی جدول SearchPosting با امتیازدهی BM25.
+
+    هزینهٔ هر کوئری متناسب با طول posting list توکن‌های کوئری است، نه اندازهٔ کل جدول.
+    در boolean_mode پیشوند + (الزامی) و - (حذف) مانند MySQL پشتیبانی می‌شود.
+    """
+
+    name = "inverted_index"
+    STATS_CACHE_KEY = "search:inverted_index:stats"
+
+    def __init__(self):
+        self.k1 = KEYWORD_BACKEND_SETTINGS['BM25_K1']
+        self.b = KEYWORD_BACKEND_SETTINGS['BM25_B']
+        self.filter_chunk_size = KEYWORD_BACKEND_SETTINGS['FILTER_CHUNK_SIZE']
+
+    # ---------- Query ----------
+    def candidates(self, query_text: str, qs, limit: int, boolean_mode: bool) -> List[Dict[str, Any]]:
+        optional, required, excluded = self._parse_query(query_text, boolean_mode)
+        terms = optional | required
+        if not terms:
+            return []
+
+        scores = self._bm25_scores(terms, required, excluded)
+        if not scores:
+            return []
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        rows: List[Dict[str, Any]] = []
+        # اعمال فیلترهای queryset به ترتیب امتیاز، به‌صورت تکه‌ای تا رسیدن به limit
+        for start in range(0, len(ranked), self.filter_chunk_size):
+            chunk = ranked[start:start + self.filter_chunk_size]
+            found = {r["id"]: r for r in qs.filter(id__in=[cid for cid, _ in chunk]).values(*CANDIDATE_FIELDS)}
+            for cid, score in chunk:
+                r = found.get(cid)
+                if r is None:
+                    continue
+                r["relevance"] = score
+                rows.append(r)
+                if len(rows) >= limit:
+                    return rows
+        return rows
+
+    def _parse_query(self, query_text: str, boolean_mode: bool) -> Tuple[Set[str], Set[str], Set[str]]:
+        optional: Set[str] = set()
+        required: Set[str] = set()
+        excluded: Set[str] = set()
+        for raw in normalize_text(query_text).split():
+            op = raw[0] if boolean_mode and raw[0] in "+-" else ""
+            tokens = [t[:MAX_TERM_LENGTH] for t in tokenize(raw[1:] if op else raw)]
+            if op == "+":
+                required.update(tokens)
+            elif op == "-":
+                excluded.update(tokens)
+            else:
+                optional.update(tokens)
+        return optional, required, excluded
+
+    def _bm25_scores(self, terms: Set[str], required: Set[str], excluded: Set[str]) -> Dict[int, float]:
+        n_docs, avg_len = self._corpus_stats()
+        if not n_docs:
+            return {}
+
+        postings = SearchPosting.objects.filter(term__in=terms | excluded).values_list(
+            "term", "searchable_id", "term_frequency", "doc_length"
+        )
+        by_term: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+        for term, cid, tf, dl in postings.iterator(chunk_size=5000):
+            by_term[term].append((cid, tf, dl))
+
+        excluded_ids: Set[int] = set()
+        for term in excluded:
+            excluded_ids.update(cid for cid, _, _ in by_term.get(term, ()))
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched_required: Dict[int, int] = defaultdict(int)
+        k1, b = self.k1, self.b
+        for term in terms:
+            plist = by_term.get(term)
+            if not plist:
+                continue
+            df = len(plist)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            is_required = term in required
+            for cid, tf, dl in plist:
+                if cid in excluded_ids:
+                    continue
+                norm = k1 * (1.0 - b + b * dl / avg_len)
+                scores[cid] += idf * tf * (k1 + 1.0) / (tf + norm)
+                if is_required:
+                    matched_required[cid] += 1
+
+        if required:
+            return {cid: s for cid, s in scores.items() if matched_required[cid] == len(required)}
+        return scores
+
+    def _corpus_stats(self) -> Tuple[int, float]:
+        stats = cache.get(self.STATS_CACHE_KEY)
+        if stats is None:
+            agg = SearchableContent.objects.aggregate(n=Count("id"), avg=Avg("token_count"))
+            stats = (int(agg["n"] or 0), float(agg["avg"] or 0.0) or 1.0)
+            cache.set(self.STATS_CACHE_KEY, stats, KEYWORD_BACKEND_SETTINGS['STATS_CACHE_TIMEOUT'])
+        return stats
+
+    # ---------- Maintenance ----------
+    def index_content(self, searchable) -> None:
+        """جایگزینی posting های یک محتوا (افزایشی، پس از هر save)"""
+        counts = term_counts(indexable_text(searchable))
+        doc_length = sum(counts.values())
+        with transaction.atomic():
+            SearchPosting.objects.filter(searchable_id=searchable.id).delete()
+            SearchPosting.objects.bulk_create(self._postings(searchable.id, counts, doc_length))
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """
+        بازسازی کامل ایندکس؛ posting های هر دسته در همان تراکنش درج، حذف و
+        جایگزین می‌شوند تا جستجو در حین بازسازی نتایج کامل (قدیمی یا جدید) ببیند
+        """
+        indexed = 0
+        qs = SearchableContent.objects.only("id", "title", "content", "metadata_text").order_by("id")
+        batch: List[SearchPosting] = []
+        lengths: List[Tuple[int, int]] = []
+        for searchable in qs.iterator(chunk_size=batch_size):
+            counts = term_counts(indexable_text(searchable))
+            doc_length = sum(counts.values())
+            batch.extend(self._postings(searchable.id, counts, doc_length))
+            lengths.append((searchable.id, doc_length))
+            indexed += 1
+            if len(lengths) >= batch_size:
+                self._flush(batch, lengths, batch_size)
+                batch, lengths = [], []
+        self._flush(batch, lengths, batch_size)
+        cache.delete(self.STATS_CACHE_KEY)
+        return indexed
+
+    def _flush(self, batch: List[SearchPosting], lengths: List[Tuple[int, int]], batch_size: int) -> None:
+        with transaction.atomic():
+            SearchPosting.objects.filter(searchable_id__in=[cid for cid, _ in lengths]).delete()
+            SearchPosting.objects.bulk_create(batch, batch_size=batch_size * 10)
+            by_length: Dict[int, List[int]] = defaultdict(list)
+            for cid, doc_length in lengths:
+                by_length[doc_length].append(cid)
+            for doc_length, ids in by_length.items():
+                SearchableContent.objects.filter(id__in=ids).update(token_count=doc_length)
+
+    @staticmethod
+    def _postings(content_id: int, counts: Counter, doc_length: int) -> Iterable[SearchPosting]:
+        return [
+            SearchPosting(searchable_id=content_id, term=term, term_frequency=tf, doc_length=doc_length)
+            for term, tf in counts.items()
+        ]
+
+
+_backend: Optional[BaseKeywordBackend] = None
+
+
+def get_keyword_backend() -> BaseKeywordBackend:
+    """
+    بک‌اند پیکربندی‌شده (SEARCH_KEYWORD_BACKEND)؛ در حالت auto روی MySQL از FULLTEXT
+    و روی سایر دیتابیس‌ها از ایندکس معکوس استفاده می‌شود.
+    """
+    global _backend
+    if _backend is None:
+        path = KEYWORD_BACKEND_SETTINGS['BACKEND']
+        if path == "auto":
+            engine = settings.DATABASES.get('default', {}).get('ENGINE', '')
+            if 'mysql' in engine or 'mariadb' in engine:
+                _backend = MySQLFullTextBackend()
+            else:
+                _backend = InvertedIndexBackend()
+        else:
+            _backend = import_string(path)()
+    return _backend
@@ -0,0 +1,87 @@
+"""
+امبدینگ متن برای جستجوی معنایی
+Text embedders used by the vector index
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+import logging
+from typing import List, Optional
+
+import numpy as np
+from django.utils.module_loading import import_string
+
+from .settings import EMBEDDING_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """
+    امبدر محلی بر پایهٔ feature hashing روی n-gram های کاراکتری.
+
+    بدون وابستگی خارجی و قطعی (deterministic) بین پروسس‌ها است؛ واژه‌های
+    هم‌ریشه و املاهای نزدیک n-gram مشترک دارند و شباهت کسینوسی بالاتری می‌گیرند.
+    """
+
+    model_name = "hashing-char-ngram"
+
+    def __init__(self, dimension: Optional[int] = None, ngram_size: Optional[int] = None):
+        self.dimension = int(dimension or EMBEDDING_SETTINGS['DIMENSION'])
+        self.ngram_size = int(ngram_size or EMBEDDING_SETTINGS['NGRAM_SIZE'])
+        self.max_text_length = int(EMBEDDING_SETTINGS['MAX_TEXT_LENGTH'])
+
+    def embed(self, text: str) -> np.ndarray:
+        """برگرداندن بردار float32 نرمال‌شده (L2)"""
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """امبدینگ دسته‌ای؛ خروجی ماتریس (len(texts), dimension)"""
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, signs = self._hashed_features(text or "")
+            if buckets.size:
+                np.add.at(out[row], buckets, signs)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        out /= norms
+        return out
+
+    def _hashed_features(self, text: str):
+        n = self.ngram_size
+        features: List[int] = []
+        for word in _WORD_RE.findall(text[: self.max_text_length].lower()):
+            padded = f"<{word}>"
+            if len(padded) <= n:
+                features.append(zlib.crc32(padded.encode("utf-8")))
+                continue
+            for i in range(len(padded) - n + 1):
+                features.append(zlib.crc32(padded[i:i + n].encode("utf-8")))
+        if not features:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        hashes = np.asarray(features, dtype=np.uint32)
+        buckets = (hashes % self.dimension).astype(np.int64)
+        # بیت بالا برای علامت تا برخوردهای hash یکدیگر را خنثی کنند
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        return buckets, signs
+
+
+_embedder = None
+
+
+def get_embedder():
+    """امبدر پیکربندی‌شده (یک نمونه برای هر پروسس)"""
+    global _embedder
+    if _embedder is None:
+        embedder_cls = import_string(EMBEDDING_SETTINGS['EMBEDDER'])
+        _embedder = embedder_cls()
+    return _embedder
+
+
+def content_text(title: str, content: str, metadata_text: str = "") -> str:
+    """متن ترکیبی یک SearchableContent برای امبدینگ"""
+    return " ".join(part for part in (title, content, metadata_text) if part)
@@ -0,0 +1,45 @@
+"""
+دستور مدیریت برای بازسازی کامل ایندکس‌های جستجو
+Management command to rebuild the keyword (inverted) index and content embeddings
+"""
+
+from django.core.management.base import BaseCommand
+
+from search.backends import get_keyword_backend
+from search.models import SearchableContent
+from search.vector_index import index_content
+
+
+class Command(BaseCommand):
+    """
+    بازسازی ایندکس معکوس (posting ها و token_count) و در صورت درخواست امبدینگ‌ها
+    """
+    help = 'بازسازی کامل ایندکس کلیدواژه‌ای جستجو به‌صورت دسته‌ای'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='تعداد اسناد در هر دسته',
+        )
+        parser.add_argument(
+            '--embeddings',
+            action='store_true',
+            help='بازسازی امبدینگ‌های برداری همراه با ایندکس کلیدواژه‌ای',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_keyword_backend()
+
+        self.stdout.write(f'بازسازی ایندکس با بک‌اند {backend.name}...')
+        indexed = backend.rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'{indexed} سند در ایندکس کلیدواژه‌ای ثبت شد'))
+
+        if options['embeddings']:
+            embedded = 0
+            for searchable in SearchableContent.objects.order_by('id').iterator(chunk_size=batch_size):
+                index_content(searchable)
+                embedded += 1
+            self.stdout.write(self.style.SUCCESS(f'{embedded} امبدینگ بازسازی شد'))
@@ -6,6 +6,7 @@ Search app models (compatible with MySQL FULLTEXT and sqlite fallback)
 from __future__ import annotations
 
 import json
+import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -46,6 +47,12 @@ class SearchableContent(models.Model):
     metadata = models.JSONField(default=dict)
     metadata_text = models.TextField(blank=True, default="")
 
+    # طول سند (تعداد توکن) برای BM25 در ایندکس معکوس
+    token_count = models.PositiveIntegerField(default=0)
+
+    # ایندکس موقعیت توکن‌های content (توکن → [[start, end], ...]) برای snippet و هایلایت
+    token_positions = models.JSONField(default=dict, blank=True)
+
     # ستون fulltext_all در مهاجرت 0002 برای MySQL ساخته می‌شود (Generated column)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -71,20 +78,85 @@ class SearchableContent(models.Model):
 
     def save(self, *args, **kwargs) -> None:
         """
-        تولید metadata_text از فیلد JSON برای استفاده در fulltext_all
+        تولید metadata_text از فیلد JSON برای استفاده در fulltext_all و محاسبهٔ token_count/token_positions
         """
         try:
             self.metadata_text = json.dumps(self.metadata, ensure_ascii=False, separators=(", ", ": "))
         except Exception:
             self.metadata_text = ""
+        # طول سند برای BM25؛ posting ها پس از commit توسط سیگنال به‌روز می‌شوند
+        from .snippets import build_position_index
+        from .tokenizer import tokenize
+        self.token_count = len(tokenize(" ".join(p for p in (self.title, self.content, self.metadata_text) if p)))
+        self.token_positions = build_position_index(self.content)
         super().save(*args, **kwargs)
 
 
+class ContentEmbedding(models.Model):
+    """
+    بردار امبدینگ ذخیره‌شده برای هر SearchableContent (float32 خام)
+    """
+
+    searchable = models.OneToOneField(
+        SearchableContent,
+        on_delete=models.CASCADE,
+        related_name="embedding",
+    )
+    model_name = models.CharField(max_length=100)
+    dimension = models.PositiveIntegerField()
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["model_name"]),
+        ]
+        verbose_name = "امبدینگ محتوا"
+        verbose_name_plural = "امبدینگ‌های محتوا"
+
+    def __str__(self) -> str:
+        return f"Embedding({self.model_name}) for {self.searchable_id}"
+
+
+class SearchPosting(models.Model):
+    """
+    ایندکس معکوس: یک ردیف برای هر (توکن، محتوا) با فراوانی توکن در سند
+    """
+
+    term = models.CharField(max_length=64)
+    searchable = models.ForeignKey(
+        SearchableContent,
+        on_delete=models.CASCADE,
+        related_name="postings",
+    )
+    term_frequency = models.PositiveIntegerField()
+    # طول سند به‌صورت denormalized تا امتیازدهی BM25 بدون join انجام شود
+    doc_length = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["term", "searchable"], name="uniq_search_posting_term_content"
+            ),
+        ]
+        verbose_name = "پستینگ ایندکس جستجو"
+        verbose_name_plural = "پستینگ‌های ایندکس جستجو"
+
+    def __str__(self) -> str:
+        return f"{self.term} -> {self.searchable_id} ({self.term_frequency})"
+
+
 class SearchQuery(models.Model):
     """
     نگهداری کوئری‌های جستجو برای آنالیتیکس و کش نتایج
     """
 
+    # شناسهٔ عمومی که پیش از ذخیرهٔ ناهمگام به کلاینت برگردانده می‌شود
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     query_text = models.TextField()
     filters = models.JSONField(default=dict)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
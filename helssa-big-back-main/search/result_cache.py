@@ -0,0 +1,68 @@
+"""
+کش نتایج جستجو بر اساس fingerprint کوئری
+Query-fingerprint result cache (normalized query + filters + options)
+"""
+
+from __future__ import annotations
+
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+
+from app_standards.cache_versions import bump_version, get_versions
+
+from .settings import RESULT_CACHE_SETTINGS
+from .tokenizer import normalize_text
+
+GENERATION_CACHE_KEY = "search:results:generation"
+
+
+def query_fingerprint(query_text: str, filters: Dict[str, Any], **options) -> str:
+    """
+    fingerprint پایدار برای کوئری: متن نرمال‌شده (فاصله‌ها یکسان)، فیلترها و گزینه‌ها
+    """
+    normalized = " ".join(normalize_text(query_text).split())
+    payload = json.dumps(
+        {"q": normalized, "f": filters, "o": options},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_key(fingerprint: str, generation: int) -> str:
+    return f"search:results:{generation}:{fingerprint}"
+
+
+def get_result_generation() -> int:
+    """
+    نسل فعلی ایندکس؛ پیش از اجرای جستجو خوانده و به get/set داده می‌شود تا
+    نتیجهٔ محاسبه‌شده پیش از یک باطل‌سازی زیر نسل جدید ذخیره نشود
+    """
+    if not RESULT_CACHE_SETTINGS['ENABLED']:
+        return 0
+    return get_versions([GENERATION_CACHE_KEY])[GENERATION_CACHE_KEY]
+
+
+def get_cached_results(fingerprint: str, generation: int) -> Optional[Dict[str, Any]]:
+    """نتیجهٔ کش‌شده برای نسل داده‌شدهٔ ایندکس"""
+    if not RESULT_CACHE_SETTINGS['ENABLED']:
+        return None
+    return cache.get(_cache_key(fingerprint, generation))
+
+
+def set_cached_results(fingerprint: str, payload: Dict[str, Any], generation: int) -> None:
+    """ذخیرهٔ نتیجه زیر نسلی که پیش از اجرای جستجو خوانده شده است"""
+    if not RESULT_CACHE_SETTINGS['ENABLED']:
+        return
+    cache.set(_cache_key(fingerprint, generation), payload, RESULT_CACHE_SETTINGS['TIMEOUT'])
+
+
+def invalidate_results() -> None:
+    """
+    باطل‌سازی همهٔ نتایج کش‌شده با افزایش شمارهٔ نسل (کلیدهای قدیمی با TTL منقضی می‌شوند)
+    """
+    bump_version(GENERATION_CACHE_KEY)
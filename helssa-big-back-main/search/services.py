@@ -1,23 +1,33 @@
 """
-سرویس‌های جستجو (Hybrid: FULLTEXT + semantic rerank)
+سرویس‌های جستجو (Hybrid: FULLTEXT + semantic rerank، یا ANN-only)
 مطابق نمونهٔ مستندات در sample_codes/search/services.py با تطبیق به محیط فعلی
 """
 
 from __future__ import annotations
 
+import json
 import time
-import math
+import uuid
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 from functools import reduce
 from operator import or_ as OR
 
-from django.db.models.expressions import RawSQL
-from django.db.models import Q
 from django.contrib.auth import get_user_model
-from django.conf import settings
 
-from .models import SearchableContent, SearchQuery as SearchQueryModel, SearchResult
+import numpy as np
+
+from .models import SearchableContent
+from .backends import CANDIDATE_FIELDS, get_keyword_backend
+from .embeddings import get_embedder
+from .result_cache import (
+    get_cached_results, get_result_generation, query_fingerprint, set_cached_results
+)
+from .settings import SEMANTIC_SETTINGS
+from .snippets import generate_snippet
+from .tokenizer import tokenize
+from .vector_index import get_vector_index
+from .writer import get_search_log_writer
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -36,6 +46,10 @@ class SearchService:
 class HybridSearchService:
     """Hybrid search service combining FULLTEXT (MySQL) and semantic rerank."""
 
+    MODE_HYBRID = "hybrid"
+    MODE_SEMANTIC = "semantic"
+    MODES = (MODE_HYBRID, MODE_SEMANTIC)
+
     def __init__(self):
         # وزن‌دهی نهایی
         self.fts_weight = 0.6
@@ -50,67 +64,122 @@ class HybridSearchService:
         limit: int = 20,
         boolean_mode: bool = True,
         candidate_limit: int = 300,
+        mode: str = MODE_HYBRID,
+        include_content: bool = False,
+        page: int = 1,
+        page_size: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
-        1) FULLTEXT روی SearchableContent (کاندیدا)
+        0) کش نتایج رتبه‌بندی‌شده بر اساس fingerprint کوئری نرمال‌شده + فیلترها (بدون FULLTEXT)
+        1) FULLTEXT روی SearchableContent (کاندیدا) یا در حالت semantic، ANN روی ایندکس برداری
         2) ریرنک کاندیدا با امبدینگ‌ها (cosine)
-        3) ترکیب امتیازها
+        3) ترکیب امتیازها؛ snippet مبتنی بر کوئری فقط برای صفحهٔ برگشتی (content فقط با include_content)
+        4) ثبت کوئری و نتایج به‌صورت دسته‌ای خارج از مسیر درخواست
+
+        بدون page_size همهٔ نتایج (حداکثر limit) در یک صفحه برمی‌گردند.
         """
         start_time = time.time()
         if not query_text or not query_text.strip():
             return {"results": [], "total_count": 0, "execution_time_ms": 0, "query": query_text}
 
         filters = filters or {}
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid search mode: {mode}")
 
-        # 1) FULLTEXT candidates یا fallback روی sqlite
-        fts_candidates = self._full_text_candidates(query_text, filters, candidate_limit, boolean_mode)
-
-        # اگر هیچ کاندیدایی نیست، خالی برگرد
-        if not fts_candidates:
-            exec_ms = int((time.time() - start_time) * 1000)
-            sq = SearchQueryModel.objects.create(
-                query_text=query_text, filters=filters, user=user, results_count=0, execution_time_ms=exec_ms
+        fingerprint = query_fingerprint(
+            query_text, filters, limit=limit, boolean_mode=boolean_mode,
+            candidate_limit=candidate_limit, mode=mode,
+        )
+        generation = get_result_generation()
+        cached_results = get_cached_results(fingerprint, generation)
+        if cached_results is not None:
+            combined_results = cached_results
+        else:
+            combined_results = self._run_search(
+                query_text, filters, limit, boolean_mode, candidate_limit, mode
             )
-            return {
-                "results": [],
-                "total_count": 0,
-                "execution_time_ms": exec_ms,
-                "query": query_text,
-                "filters": filters,
-                "search_id": sq.id,
-            }
+            set_cached_results(fingerprint, combined_results, generation)
 
-        # 2) semantic rerank روی همین کاندیداها (فعلاً بدون وابستگی به embeddings)
-        semantic_scored = self._semantic_rerank(query_text, fts_candidates)
-
-        # 3) ترکیب امتیازها
-        combined_results = self._combine_results(fts_candidates, semantic_scored, limit)
+        # 3) snippet/هایلایت فقط برای نتایج صفحهٔ درخواستی (کپی، تا نتایج کش‌شده تغییر نکنند)
+        total_count = len(combined_results)
+        page_size = page_size or max(total_count, 1)
+        total_pages = max((total_count + page_size - 1) // page_size, 1)
+        page = min(max(page, 1), total_pages)
+        start = (page - 1) * page_size
+        page_results = [dict(r) for r in combined_results[start:start + page_size]]
+        self._attach_snippets(page_results, query_text, include_content)
 
         # زمان اجرا
         execution_time_ms = int((time.time() - start_time) * 1000)
 
-        # ذخیرهٔ کوئری برای آنالیتیکس
-        search_query_obj = SearchQueryModel.objects.create(
-            query_text=query_text,
-            filters=filters,
-            user=user,
-            results_count=len(combined_results),
-            execution_time_ms=execution_time_ms,
+        # ذخیرهٔ کوئری و کش نتایج برای آنالیتیکس (ناهمگام و دسته‌ای)
+        search_id = uuid.uuid4()
+        self._log_search(
+            search_id, query_text, filters, user, combined_results, page_results, execution_time_ms
         )
 
-        # کش نتایج
-        self._cache_search_results(search_query_obj, combined_results)
-
         return {
-            "results": combined_results,
-            "total_count": len(combined_results),
+            "results": page_results,
+            "total_count": total_count,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
             "execution_time_ms": execution_time_ms,
             "query": query_text,
             "filters": filters,
-            "search_id": search_query_obj.id,
+            "search_id": str(search_id),
+            "cached": cached_results is not None,
         }
 
-    # ---------- Internal: FULLTEXT or fallback ----------
+    def _run_search(
+        self,
+        query_text: str,
+        filters: Dict[str, Any],
+        limit: int,
+        boolean_mode: bool,
+        candidate_limit: int,
+        mode: str,
+    ) -> List[Dict[str, Any]]:
+        # 1) FULLTEXT (MySQL) یا ایندکس معکوس BM25؛ در حالت semantic فقط ANN
+        if mode == self.MODE_SEMANTIC:
+            fts_candidates = self._semantic_candidates(query_text, filters, candidate_limit)
+        else:
+            fts_candidates = self._full_text_candidates(query_text, filters, candidate_limit, boolean_mode)
+
+        # اگر هیچ کاندیدایی نیست، خالی برگرد
+        if not fts_candidates:
+            return []
+
+        # 2) semantic rerank روی همین کاندیداها (یک ضرب ماتریسی روی ایندکس برداری)
+        semantic_scored = self._semantic_rerank(query_text, fts_candidates)
+
+        # 3) ترکیب امتیازها
+        if mode == self.MODE_SEMANTIC:
+            results = self._combine_results(
+                fts_candidates, semantic_scored, limit, fts_weight=0.0, semantic_weight=1.0
+            )
+        else:
+            results = self._combine_results(fts_candidates, semantic_scored, limit)
+
+        return results
+
+    # ---------- Internal: filters ----------
+    def _apply_filters(self, qs, filters: Dict[str, Any]):
+        """اعمال فیلترهای encounter/content_type/تاریخ روی queryset"""
+        if filters.get("encounter_id"):
+            qs = qs.filter(encounter_id=filters["encounter_id"])
+        if filters.get("content_type"):
+            cts = filters["content_type"]
+            if isinstance(cts, str):
+                cts = [cts]
+            qs = qs.filter(content_type__in=cts)
+        if filters.get("date_from"):
+            qs = qs.filter(created_at__gte=filters["date_from"])
+        if filters.get("date_to"):
+            qs = qs.filter(created_at__lte=filters["date_to"])
+        return qs
+
+    # ---------- Internal: keyword candidates (FULLTEXT or inverted index) ----------
     def _full_text_candidates(
         self,
         query_text: str,
@@ -118,48 +187,11 @@ class HybridSearchService:
         candidate_limit: int,
         boolean_mode: bool,
     ) -> List[Dict[str, Any]]:
-        """FULLTEXT با MATCH ... AGAINST اگر MySQL؛ در غیر این صورت fallback contains/icontains."""
+        """FULLTEXT با MATCH ... AGAINST اگر MySQL؛ در غیر این صورت ایندکس معکوس با BM25 (بک‌اند قابل تنظیم)."""
         try:
-            qs = SearchableContent.objects.all()
-
-            # فیلترها
-            if filters.get("encounter_id"):
-                qs = qs.filter(encounter_id=filters["encounter_id"])
-            if filters.get("content_type"):
-                cts = filters["content_type"]
-                if isinstance(cts, str):
-                    cts = [cts]
-                qs = qs.filter(content_type__in=cts)
-            if filters.get("date_from"):
-                qs = qs.filter(created_at__gte=filters["date_from"])
-            if filters.get("date_to"):
-                qs = qs.filter(created_at__lte=filters["date_to"])
-
-            engine = settings.DATABASES.get('default', {}).get('ENGINE', '')
-            is_mysql = 'mysql' in engine or 'mariadb' in engine
-
-            if is_mysql:
-                mode_sql = "IN BOOLEAN MODE" if boolean_mode else "IN NATURAL LANGUAGE MODE"
-                raw = RawSQL(f"MATCH(fulltext_all) AGAINST (%s {mode_sql})", (query_text,))
-                results = (
-                    qs.annotate(relevance=raw)
-                      .filter(relevance__gt=0)
-                      .only("id", "encounter_id", "content_type", "content_id", "title", "content", "metadata")
-                      .order_by("-relevance", "-created_at")[:candidate_limit]
-                      .values("id", "encounter_id", "content_type", "content_id", "title", "content", "metadata", "relevance")
-                )
-            else:
-                # sqlite/postgres fallback: ساده با icontains و وزن‌دهی ابتدایی
-                text_q = Q(title__icontains=query_text) | Q(content__icontains=query_text) | Q(metadata_text__icontains=query_text)
-                results = (
-                    qs.filter(text_q)
-                      .only("id", "encounter_id", "content_type", "content_id", "title", "content", "metadata")
-                      .order_by("-created_at")[:candidate_limit]
-                      .values("id", "encounter_id", "content_type", "content_id", "title", "content", "metadata")
-                )
-                # افزودن relevance ساده (طول matched text به‌عنوان تقریبی)
-                for r in results:
-                    r["relevance"] = float(len(query_text))
+            qs = self._apply_filters(SearchableContent.objects.all(), filters)
+
+            results = get_keyword_backend().candidates(query_text, qs, candidate_limit, boolean_mode)
 
             formatted: List[Dict[str, Any]] = []
             for r in results:
@@ -169,31 +201,81 @@ class HybridSearchService:
                     "content_type": r["content_type"],
                     "content_id": r["content_id"],
                     "title": r["title"],
-                    "content": r["content"],
                     "metadata": r.get("metadata") or {},
                     "keyword_relevance": float(r.get("relevance", 1.0)),
                 })
             return formatted
 
         except Exception as e:
-            logger.error(f"FULLTEXT/fallback search failed: {e}")
+            logger.error(f"Keyword candidate search failed: {e}")
             return []
 
-    # ---------- Internal: Semantic rerank (placeholder) ----------
+    # ---------- Internal: ANN-only candidates ----------
+    def _semantic_candidates(
+        self,
+        query_text: str,
+        filters: Dict[str, Any],
+        candidate_limit: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        بازیابی کاندیدا فقط از ایندکس برداری؛ محتوای بدون هم‌پوشانی کلیدواژه هم پیدا می‌شود.
+        فیلترها پس از ANN روی همین شناسه‌ها در دیتابیس اعمال می‌شوند.
+        """
+        try:
+            query_vec = self._make_query_embedding(query_text)
+            k = max(candidate_limit, SEMANTIC_SETTINGS['ANN_CANDIDATES'])
+            min_similarity = SEMANTIC_SETTINGS['MIN_SIMILARITY']
+            hits = [cid for cid, sim in get_vector_index().search(query_vec, k) if sim >= min_similarity]
+            if not hits:
+                return []
+
+            qs = self._apply_filters(SearchableContent.objects.filter(id__in=hits), filters)
+            rows = {
+                r["id"]: r
+                for r in qs.values(*CANDIDATE_FIELDS)
+            }
+            formatted: List[Dict[str, Any]] = []
+            for cid in hits:
+                r = rows.get(cid)
+                if r is None:
+                    continue
+                formatted.append({
+                    "id": r["id"],
+                    "encounter_id": r.get("encounter_id"),
+                    "content_type": r["content_type"],
+                    "content_id": r["content_id"],
+                    "title": r["title"],
+                    "metadata": r.get("metadata") or {},
+                    "keyword_relevance": 0.0,
+                })
+                if len(formatted) >= candidate_limit:
+                    break
+            return formatted
+
+        except Exception as e:
+            logger.error(f"Semantic (ANN) search failed: {e}")
+            return []
+
+    # ---------- Internal: Semantic rerank ----------
     def _semantic_rerank(self, query_text: str, candidates: List[Dict[str, Any]]) -> Dict[Tuple[int, str, int], float]:
         """
         بر اساس امبدینگ: distance (کوچک‌تر بهتر). اگر سرویس امبدینگ موجود نبود، دیکشنری خالی برگردان.
+        کاندیداهای بدون بردار در ایندکس در خروجی نمی‌آیند (فقط امتیاز FULLTEXT می‌گیرند).
         """
         try:
             query_vec = self._make_query_embedding(query_text)
-        except Exception:
+            similarities = get_vector_index().similarities(query_vec, [c["id"] for c in candidates])
+        except Exception as e:
+            logger.warning(f"Semantic rerank skipped: {e}")
             return {}
 
         distances: Dict[Tuple[int, str, int], float] = {}
-        # بدون دیتابیس امبدینگ، مقداردهی تصادفی ثابت بر اساس hash
         for c in candidates:
+            sim = similarities.get(c["id"])
+            if sim is None:
+                continue
             key = (c.get("encounter_id") or 0, c["content_type"], c["content_id"])
-            distances[key] = 0.5  # مقدار ثابت تا زمان یکپارچه‌سازی embeddings
+            distances[key] = 1.0 - sim
         return distances
 
     # ---------- Internal: Combine ----------
@@ -202,6 +284,8 @@ class HybridSearchService:
         fts_candidates: List[Dict[str, Any]],
         semantic_dist: Dict[Tuple[int, str, int], float],
         limit: int,
+        fts_weight: Optional[float] = None,
+        semantic_weight: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
         ترکیب: similarity_sem = 1 - distance (clamped to [0,1])
@@ -211,6 +295,9 @@ class HybridSearchService:
             max_kw = max(c.get("keyword_relevance", 1.0) for c in fts_candidates) or 1.0
         else:
             max_kw = 1.0
+        fts_weight = self.fts_weight if fts_weight is None else fts_weight
+        semantic_weight = self.semantic_weight if semantic_weight is None else semantic_weight
+        search_type = "semantic" if fts_weight == 0 else "hybrid"
 
         results = []
         for c in fts_candidates:
@@ -219,7 +306,7 @@ class HybridSearchService:
             sem_sim = 0.0 if dist is None else max(0.0, min(1.0, 1.0 - float(dist)))
 
             kw_norm = float(c.get("keyword_relevance", 1.0)) / max_kw
-            combined = kw_norm * self.fts_weight + sem_sim * self.semantic_weight
+            combined = kw_norm * fts_weight + sem_sim * semantic_weight
 
             results.append({
                 "id": c["id"],
@@ -227,12 +314,10 @@ class HybridSearchService:
                 "content_type": c["content_type"],
                 "content_id": c["content_id"],
                 "title": c["title"],
-                "content": c["content"],
-                "snippet": self._generate_snippet(c["content"], ""),
                 "score": float(kw_norm),
                 "semantic_similarity": float(sem_sim),
                 "combined_score": float(combined),
-                "search_type": "hybrid" if dist is not None else "full_text",
+                "search_type": search_type if dist is not None else "full_text",
                 "metadata": c.get("metadata") or {},
                 "created_at": None,
             })
@@ -241,39 +326,61 @@ class HybridSearchService:
         return results[:limit]
 
     # ---------- Helpers ----------
-    def _generate_snippet(self, content: str, query_text: str, max_length: int = 200) -> str:
-        if not content:
-            return ""
-        snippet = content[:max_length]
-        if len(content) > max_length:
-            snippet += "..."
-        return snippet
-
-    def _cache_search_results(self, search_query_obj: SearchQueryModel, results: List[Dict[str, Any]]):
+    def _attach_snippets(
+        self,
+        results: List[Dict[str, Any]],
+        query_text: str,
+        include_content: bool = False,
+    ) -> None:
+        """
+        snippet و هایلایت مبتنی بر کوئری فقط برای نتایج صفحهٔ برگشتی؛ متن کامل و ایندکس موقعیت
+        در یک کوئری خوانده می‌شوند و content فقط در صورت درخواست در خروجی می‌آید.
+        """
+        if not results:
+            return
+        rows = {
+            r["id"]: r
+            for r in SearchableContent.objects.filter(id__in=[res["id"] for res in results])
+                                             .values("id", "content", "token_positions")
+        }
+        query_terms = tokenize(query_text)
+        for res in results:
+            row = rows.get(res["id"]) or {}
+            content = row.get("content") or ""
+            snippet = generate_snippet(content, row.get("token_positions") or None, query_terms)
+            res["snippet"] = snippet["snippet"]
+            res["highlights"] = snippet["highlights"]
+            if include_content:
+                res["content"] = content
+
+    def _log_search(
+        self,
+        search_id: uuid.UUID,
+        query_text: str,
+        filters: Dict[str, Any],
+        user: Optional[User],
+        results: List[Dict[str, Any]],
+        page_results: List[Dict[str, Any]],
+        execution_time_ms: int,
+    ) -> None:
+        # snippet فقط برای نتایج صفحهٔ برگشتی ساخته شده است
+        snippets = {r["id"]: r["snippet"] for r in page_results}
         try:
-            SearchResult.objects.filter(query=search_query_obj).delete()
-            bulk = []
-            for rank, r in enumerate(results, 1):
-                try:
-                    sc = SearchableContent.objects.get(id=r["id"])
-                except SearchableContent.DoesNotExist:
-                    continue
-                bulk.append(SearchResult(
-                    query=search_query_obj,
-                    content=sc,
-                    relevance_score=r["combined_score"],
-                    rank=rank,
-                    snippet=r["snippet"],
-                ))
-            if bulk:
-                SearchResult.objects.bulk_create(bulk)
+            get_search_log_writer().submit({
+                "public_id": search_id,
+                "query_text": query_text,
+                "filters": json.loads(json.dumps(filters, default=str)),
+                "user_id": getattr(user, "pk", None),
+                "results_count": len(results),
+                "execution_time_ms": execution_time_ms,
+                "results": [
+                    {"id": r["id"], "combined_score": r["combined_score"], "snippet": snippets.get(r["id"], "")}
+                    for r in results
+                ],
+            })
         except Exception as e:
-            logger.error(f"Failed to cache search results: {e}")
-
-    def _make_query_embedding(self, text: str) -> List[float]:
-        import random
-        random.seed(hash(text) & 0xFFFFFFFF)
-        vec = [random.random() for _ in range(64)]  # ابعاد موقت تا زمان یکپارچه‌سازی
-        s = math.sqrt(sum(x*x for x in vec)) or 1.0
-        return [x / s for x in vec]
+            logger.error(f"Failed to queue search log: {e}")
+
+    def _make_query_embedding(self, text: str) -> np.ndarray:
+        return get_embedder().embed(text)
 
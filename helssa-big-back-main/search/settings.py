@@ -0,0 +1,61 @@
+"""
+تنظیمات اپ search
+"""
+from django.conf import settings
+
+# تنظیمات امبدینگ و ایندکس برداری
+EMBEDDING_SETTINGS = {
+    # مسیر کلاس امبدر (dotted path)؛ پیش‌فرض امبدر محلی hashing
+    'EMBEDDER': getattr(settings, 'SEARCH_EMBEDDER', 'search.embeddings.HashingEmbedder'),
+
+    # ابعاد بردار برای امبدر پیش‌فرض
+    'DIMENSION': getattr(settings, 'SEARCH_EMBEDDING_DIMENSION', 256),
+
+    # طول n-gram کاراکتری
+    'NGRAM_SIZE': getattr(settings, 'SEARCH_EMBEDDING_NGRAM_SIZE', 3),
+
+    # حداکثر طول متن ورودی برای امبدینگ
+    'MAX_TEXT_LENGTH': getattr(settings, 'SEARCH_EMBEDDING_MAX_TEXT_LENGTH', 20000),
+
+    # حاشیهٔ اطمینان cursor همگام‌سازی افزایشی (ثانیه) برای ردیف‌هایی که دیرتر
+    # commit می‌شوند یا از سروری با ساعت عقب‌تر می‌آیند
+    'SYNC_SAFETY_MARGIN': getattr(settings, 'SEARCH_VECTOR_SYNC_SAFETY_MARGIN', 300),
+}
+
+# تنظیمات جستجوی معنایی
+SEMANTIC_SETTINGS = {
+    # تعداد کاندیدای بازیابی‌شده در حالت ANN-only
+    'ANN_CANDIDATES': getattr(settings, 'SEARCH_ANN_CANDIDATES', 300),
+
+    # حداقل شباهت برای نتایج حالت semantic
+    'MIN_SIMILARITY': getattr(settings, 'SEARCH_SEMANTIC_MIN_SIMILARITY', 0.2),
+}
+
+# تنظیمات بک‌اند کلیدواژه‌ای (تولید کاندیدا)
+KEYWORD_BACKEND_SETTINGS = {
+    # auto: FULLTEXT روی MySQL، ایندکس معکوس روی sqlite/postgres؛ یا dotted path یک بک‌اند
+    'BACKEND': getattr(settings, 'SEARCH_KEYWORD_BACKEND', 'auto'),
+
+    # پارامترهای BM25
+    'BM25_K1': getattr(settings, 'SEARCH_BM25_K1', 1.2),
+    'BM25_B': getattr(settings, 'SEARCH_BM25_B', 0.75),
+
+    # اندازهٔ تکه برای اعمال فیلترها روی شناسه‌های امتیازدار
+    'FILTER_CHUNK_SIZE': getattr(settings, 'SEARCH_FILTER_CHUNK_SIZE', 1000),
+
+    # مدت کش آمار کل corpus (تعداد سند و میانگین طول)
+    'STATS_CACHE_TIMEOUT': getattr(settings, 'SEARCH_STATS_CACHE_TIMEOUT', 60),
+}
+
+# تنظیمات کش نتایج و ثبت لاگ جستجو
+RESULT_CACHE_SETTINGS = {
+    # کش نتایج بر اساس fingerprint کوئری نرمال‌شده + فیلترها
+    'ENABLED': getattr(settings, 'SEARCH_RESULT_CACHE_ENABLED', True),
+    'TIMEOUT': getattr(settings, 'SEARCH_RESULT_CACHE_TIMEOUT', 300),
+
+    # ذخیرهٔ SearchQuery/SearchResult خارج از مسیر درخواست
+    'ASYNC_WRITES': getattr(settings, 'SEARCH_ASYNC_WRITES', True),
+    'WRITER_BATCH_SIZE': getattr(settings, 'SEARCH_WRITER_BATCH_SIZE', 100),
+    'WRITER_FLUSH_INTERVAL': getattr(settings, 'SEARCH_WRITER_FLUSH_INTERVAL', 2.0),
+    'WRITER_MAX_QUEUE_SIZE': getattr(settings, 'SEARCH_WRITER_MAX_QUEUE_SIZE', 10000),
+}
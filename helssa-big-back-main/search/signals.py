@@ -0,0 +1,68 @@
+"""
+سیگنال‌های اپلیکیشن search
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import get_keyword_backend
+from .models import SearchableContent
+from .result_cache import invalidate_results
+from .vector_index import index_content, unindex_content
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=SearchableContent)
+def update_keyword_index(sender, instance, **kwargs):
+    """
+    به‌روزرسانی افزایشی ایندکس کلیدواژه‌ای (posting ها) پس از ذخیرهٔ محتوا
+    """
+    def _index():
+        try:
+            get_keyword_backend().index_content(instance)
+        except Exception as e:
+            logger.error(f"Failed to update keyword index for content {instance.id}: {e}")
+
+    transaction.on_commit(_index)
+
+
+@receiver(post_save, sender=SearchableContent)
+def update_content_embedding(sender, instance, **kwargs):
+    """
+    به‌روزرسانی افزایشی امبدینگ و ایندکس برداری پس از ذخیرهٔ محتوا
+    """
+    def _index():
+        try:
+            index_content(instance)
+        except Exception as e:
+            logger.error(f"Failed to index embedding for content {instance.id}: {e}")
+
+    transaction.on_commit(_index)
+
+
+@receiver(post_delete, sender=SearchableContent)
+def remove_content_embedding(sender, instance, **kwargs):
+    """
+    حذف محتوا از ایندکس برداری و اعلام حذف به سایر workerها (پس از commit)
+    """
+    content_id = instance.id
+
+    def _unindex():
+        try:
+            unindex_content(content_id)
+        except Exception as e:
+            logger.error(f"Failed to unindex embedding for content {content_id}: {e}")
+
+    transaction.on_commit(_unindex)
+
+
+@receiver(post_save, sender=SearchableContent)
+@receiver(post_delete, sender=SearchableContent)
+def invalidate_result_cache(sender, instance, **kwargs):
+    """
+    باطل‌سازی کش نتایج جستجو پس از هر تغییر محتوا (بعد از به‌روزرسانی ایندکس‌ها)
+    """
+    transaction.on_commit(invalidate_results)
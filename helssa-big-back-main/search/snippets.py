@@ -0,0 +1,151 @@
+"""
+تولید snippet و محدوده‌های هایلایت بر اساس کوئری
+Query-aware snippet and highlight generation backed by a token-position index
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .tokenizer import STOPWORDS, normalize_text
+
+# واژه‌ها به‌همراه ZWNJ تا «می‌روم» یک واژه در متن اصلی حساب شود
+_WORD_RE = re.compile(r"[\w\u200c]+", re.UNICODE)
+
+# حداکثر تعداد موقعیت ذخیره‌شده برای هر توکن (محدود کردن حجم ایندکس)
+MAX_POSITIONS_PER_TERM = 64
+
+Span = Tuple[int, int]
+
+
+def build_position_index(text: str) -> Dict[str, List[List[int]]]:
+    """
+    ایندکس موقعیت توکن‌ها: توکن نرمال‌شده → لیست [start, end] در متن اصلی (بدون نرمال‌سازی)
+    """
+    positions: Dict[str, List[List[int]]] = {}
+    for match in _WORD_RE.finditer(text or ""):
+        term = normalize_text(match.group())
+        if not term or term in STOPWORDS:
+            continue
+        spans = positions.setdefault(term, [])
+        if len(spans) < MAX_POSITIONS_PER_TERM:
+            spans.append([match.start(), match.end()])
+    return positions
+
+
+def _query_hits(positions: Dict[str, List[List[int]]], query_terms: Iterable[str]) -> List[Tuple[int, int, int]]:
+    """محدوده‌های تطبیق (start, end, شمارهٔ توکن کوئری)؛ تطبیق پیشوندی برای صورت‌های صرفی"""
+    hits: List[Tuple[int, int, int]] = []
+    for term_no, query_term in enumerate(query_terms):
+        for term, spans in positions.items():
+            if term.startswith(query_term):
+                hits.extend((start, end, term_no) for start, end in spans)
+    hits.sort()
+    return hits
+
+
+def _best_window(hits: List[Tuple[int, int, int]], width: int) -> Optional[Tuple[int, int]]:
+    """
+    پنجره‌ای با عرض width که بیشترین توکن متمایز کوئری و سپس بیشترین تطبیق را دارد (two-pointer)
+    """
+    best = None
+    best_key = (0, 0)
+    counts: Dict[int, int] = {}
+    left = 0
+    for right, (start, end, term_no) in enumerate(hits):
+        counts[term_no] = counts.get(term_no, 0) + 1
+        while end - hits[left][0] > width:
+            left_term = hits[left][2]
+            counts[left_term] -= 1
+            if not counts[left_term]:
+                del counts[left_term]
+            left += 1
+        key = (len(counts), right - left + 1)
+        if key > best_key:
+            best_key = key
+            best = (left, right)
+    return best
+
+
+def _expand(content: str, start: int, end: int, width: int) -> Span:
+    """گسترش محدودهٔ تطبیق به پنجرهٔ width حول آن و چسباندن به مرز واژه"""
+    pad = max(0, width - (end - start)) // 2
+    frag_start = max(0, start - pad)
+    frag_end = min(len(content), frag_start + width)
+    frag_start = max(0, min(frag_start, frag_end - width))
+    if frag_start > 0:
+        space = content.find(" ", frag_start, start)
+        if space != -1:
+            frag_start = space + 1
+    if frag_end < len(content):
+        space = content.rfind(" ", end, frag_end)
+        if space != -1:
+            frag_end = space
+    return frag_start, frag_end
+
+
+def generate_snippet(
+    content: str,
+    positions: Optional[Dict[str, List[List[int]]]],
+    query_terms: List[str],
+    max_length: int = 200,
+    max_fragments: int = 2,
+    separator: str = " ... ",
+) -> Dict[str, object]:
+    """
+    snippet شامل بهترین پنجره(های) تطبیق با کوئری و محدوده‌های هایلایت نسبت به متن snippet
+
+    Returns:
+        {"snippet": str, "highlights": [[start, end], ...]}
+    """
+    if not content:
+        return {"snippet": "", "highlights": []}
+    if positions is None:
+        positions = build_position_index(content)
+
+    hits = _query_hits(positions, query_terms) if query_terms else []
+    if not hits:
+        snippet = content[:max_length]
+        if len(content) > max_length:
+            snippet += "..."
+        return {"snippet": snippet, "highlights": []}
+
+    width = max(20, max_length // max_fragments)
+    fragments: List[Span] = []
+    remaining = hits
+    while remaining and len(fragments) < max_fragments:
+        window = _best_window(remaining, width)
+        if window is None:
+            break
+        left, right = window
+        fragments.append(_expand(content, remaining[left][0], remaining[right][1], width))
+        frag_start, frag_end = fragments[-1]
+        remaining = [h for h in remaining if h[1] <= frag_start or h[0] >= frag_end]
+    fragments.sort()
+    merged: List[Span] = [fragments[0]]
+    for frag_start, frag_end in fragments[1:]:
+        if frag_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], frag_end))
+        else:
+            merged.append((frag_start, frag_end))
+    fragments = merged
+
+    parts: List[str] = []
+    highlights: List[List[int]] = []
+    offset = 0
+    if fragments[0][0] > 0:
+        parts.append("...")
+        offset += 3
+    for i, (frag_start, frag_end) in enumerate(fragments):
+        if i:
+            parts.append(separator)
+            offset += len(separator)
+        for start, end in sorted({(h[0], h[1]) for h in hits if h[0] >= frag_start and h[1] <= frag_end}):
+            highlights.append([offset + start - frag_start, offset + end - frag_start])
+        parts.append(content[frag_start:frag_end])
+        offset += frag_end - frag_start
+    if fragments[-1][1] < len(content):
+        parts.append("...")
+
+    return {"snippet": "".join(parts), "highlights": highlights}
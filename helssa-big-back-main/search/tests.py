@@ -1,9 +1,24 @@
-from django.test import TestCase
+import numpy as np
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
 from django.urls import reverse, resolve
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 
-from .models import SearchableContent
+from .backends import InvertedIndexBackend
+from .models import SearchableContent, SearchPosting, SearchQuery, SearchResult
+from .result_cache import invalidate_results
+from .services import HybridSearchService
+from .snippets import build_position_index, generate_snippet
+from .writer import SearchLogWriter, get_search_log_writer
+from .tokenizer import normalize_text, tokenize
+from .embeddings import HashingEmbedder
+from .vector_index import FlatVectorIndex, VectorIndexManager, index_content
 
 
 class SearchAPITest(TestCase):
@@ -33,3 +48,267 @@ class SearchAPITest(TestCase):
         res = self.client.get(url)
         self.assertIn(res.status_code, [200, 400])
 
+
+
+class FlatVectorIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.embedder = HashingEmbedder(dimension=128)
+        self.index = FlatVectorIndex(dimension=128, initial_capacity=2)
+        texts = {1: 'سردرد میگرنی شدید', 2: 'درد قفسه سینه', 3: 'سرفه خشک و تب'}
+        for cid, text in texts.items():
+            self.index.upsert(cid, self.embedder.embed(text))
+
+    def test_search_ranks_closest_first(self):
+        hits = self.index.search(self.embedder.embed('سردرد میگرن'), k=2)
+        self.assertEqual(hits[0][0], 1)
+        self.assertEqual(len(hits), 2)
+
+    def test_similarities_for_candidates(self):
+        sims = self.index.similarities(self.embedder.embed('سرفه'), [3, 2, 99])
+        self.assertEqual(set(sims), {2, 3})
+        self.assertGreater(sims[3], sims[2])
+
+    def test_remove_keeps_positions_consistent(self):
+        self.index.remove(1)
+        self.assertNotIn(1, self.index)
+        self.assertEqual(len(self.index), 2)
+        hits = dict(self.index.search(self.embedder.embed('سرفه خشک و تب'), k=3))
+        self.assertAlmostEqual(hits[3], 1.0, places=5)
+
+    def test_embedding_is_deterministic_and_normalized(self):
+        a = self.embedder.embed('نمونه متن')
+        b = HashingEmbedder(dimension=128).embed('نمونه متن')
+        np.testing.assert_array_equal(a, b)
+        self.assertAlmostEqual(float(np.linalg.norm(a)), 1.0, places=5)
+
+
+
+class VectorIndexSyncTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _create(self, content_id, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SearchableContent.objects.create(
+                content_type='notes', content_id=content_id, title=text, content=text, metadata={}
+            )
+
+    def test_delete_is_pruned_in_other_workers(self):
+        first = self._create(1, 'سردرد میگرنی')
+        second = self._create(2, 'درد قفسه سینه')
+
+        other_worker = VectorIndexManager()
+        self.assertEqual(set(other_worker.get_index().ids()), {first.id, second.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+
+        self.assertEqual(other_worker.get_index().ids(), [second.id])
+
+    def test_save_is_synced_in_other_workers(self):
+        other_worker = VectorIndexManager()
+        self.assertEqual(len(other_worker.get_index()), 0)
+        item = self._create(3, 'سرفه خشک')
+        self.assertIn(item.id, other_worker.get_index())
+
+    def test_late_commit_is_synced(self):
+        # ردیفی که updated_at آن پیش از همگام‌سازی قبلی است (commit دیرهنگام یا ساعت عقب‌تر)
+        self._create(4, 'سرگیجه')
+        other_worker = VectorIndexManager()
+        other_worker.get_index()
+
+        with mock.patch('search.signals.index_content'):
+            late = self._create(5, 'تنگی نفس')
+        with mock.patch.object(timezone, 'now', return_value=timezone.now() - timedelta(seconds=60)):
+            index_content(late)
+
+        self.assertIn(late.id, other_worker.get_index())
+
+class PersianTokenizerTest(SimpleTestCase):
+    def test_arabic_characters_are_folded(self):
+        self.assertEqual(normalize_text('دكتر علي'), 'دکتر علی')
+
+    def test_zwnj_and_spaced_prefix_produce_same_token(self):
+        self.assertEqual(tokenize('می‌روم'), tokenize('می روم'))
+        self.assertEqual(tokenize('میروم'), tokenize('می‌روم'))
+
+    def test_stopwords_removed(self):
+        self.assertEqual(tokenize('درد در قفسه سینه'), ['درد', 'قفسه', 'سینه'])
+
+    def test_spaced_suffix_joined_after_stem(self):
+        self.assertEqual(tokenize('کتاب ها'), tokenize('کتاب‌ها'))
+        self.assertEqual(tokenize('بیماری های مزمن'), tokenize('بیماری‌های مزمن'))
+        self.assertEqual(tokenize('بزرگ ترین'), tokenize('بزرگ‌ترین'))
+
+    def test_standalone_words_not_joined(self):
+        # «تر» به معنی خیس
+        self.assertEqual(tokenize('لباس تر'), ['لباس', 'تر'])
+        self.assertEqual(tokenize('بزرگ‌تر'), ['بزرگتر'])
+        # «ها» پس از عدد، کلمهٔ لاتین یا حرف ربط
+        self.assertEqual(tokenize('۲ ها', keep_stopwords=True), ['2', 'ها'])
+        self.assertEqual(tokenize('file ها', keep_stopwords=True), ['file', 'ها'])
+        self.assertEqual(tokenize('و ها', keep_stopwords=True), ['و', 'ها'])
+
+
+class InvertedIndexBackendTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a = SearchableContent.objects.create(
+                content_type='notes', content_id=1, title='سردرد', content='بیمار از سردرد شدید و تهوع شاکی است', metadata={}
+            )
+            self.b = SearchableContent.objects.create(
+                content_type='soap', content_id=2, title='سرفه', content='سرفه خشک بدون تب', metadata={}
+            )
+        self.backend = InvertedIndexBackend()
+
+    def test_postings_maintained_on_save(self):
+        self.assertTrue(SearchPosting.objects.filter(searchable=self.a, term='سردرد').exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a.content = 'تهوع'
+            self.a.title = 'گزارش'
+            self.a.save()
+        self.assertFalse(SearchPosting.objects.filter(searchable=self.a, term='سردرد').exists())
+
+    def test_bm25_ranks_and_filters(self):
+        rows = self.backend.candidates('سردرد', SearchableContent.objects.all(), 10, True)
+        self.assertEqual([r['id'] for r in rows], [self.a.id])
+        rows = self.backend.candidates('سرفه', SearchableContent.objects.filter(content_type='notes'), 10, True)
+        self.assertEqual(rows, [])
+
+    def test_boolean_operators(self):
+        rows = self.backend.candidates('تب -سرفه', SearchableContent.objects.all(), 10, True)
+        self.assertEqual(rows, [])
+        rows = self.backend.candidates('+سردرد سرفه', SearchableContent.objects.all(), 10, True)
+        self.assertEqual([r['id'] for r in rows], [self.a.id])
+
+    def test_rebuild(self):
+        SearchPosting.objects.all().delete()
+        self.assertEqual(self.backend.rebuild(batch_size=1), 2)
+        self.assertTrue(SearchPosting.objects.filter(searchable=self.b, term='سرفه').exists())
+
+    def test_rebuild_keeps_documents_searchable(self):
+        # posting های هر سند تا دستهٔ خودش باقی می‌مانند و پس از آن تکرار نمی‌شوند
+        seen = []
+        flush = self.backend._flush
+
+        def observe(batch, lengths, batch_size):
+            seen.append(SearchPosting.objects.filter(searchable=self.b, term='سرفه').count())
+            flush(batch, lengths, batch_size)
+
+        with mock.patch.object(self.backend, '_flush', side_effect=observe):
+            self.assertEqual(self.backend.rebuild(batch_size=1), 2)
+
+        self.assertEqual(seen[0], 1)
+        self.assertEqual(SearchPosting.objects.filter(searchable=self.b, term='سرفه').count(), 1)
+
+
+class SearchResultPersistenceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(get_search_log_writer(), 'asynchronous', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.content = SearchableContent.objects.create(
+                content_type='notes', content_id=1, title='فشار خون', content='فشار خون بالا', metadata={}
+            )
+
+    def test_writer_builds_results_from_ids(self):
+        writer = SearchLogWriter(asynchronous=False)
+        public_id = uuid.uuid4()
+        with self.assertNumQueries(5):
+            writer.submit({
+                'public_id': public_id,
+                'query_text': 'فشار',
+                'filters': {},
+                'user_id': None,
+                'results_count': 2,
+                'execution_time_ms': 3,
+                'results': [
+                    {'id': self.content.id, 'combined_score': 0.9, 'snippet': 'فشار'},
+                    {'id': 987654, 'combined_score': 0.1, 'snippet': 'deleted'},
+                ],
+            })
+        query = SearchQuery.objects.get(public_id=public_id)
+        self.assertEqual(list(SearchResult.objects.filter(query=query).values_list('content_id', flat=True)),
+                         [self.content.id])
+
+    def test_dropped_entries_reported(self):
+        writer = SearchLogWriter(asynchronous=True, max_queue_size=1)
+        entry = {'public_id': uuid.uuid4(), 'query_text': 'فشار', 'filters': {}, 'user_id': None,
+                 'results_count': 0, 'execution_time_ms': 1, 'results': []}
+        with mock.patch.object(writer, '_ensure_worker'):
+            writer.submit(entry)
+            writer.submit({**entry, 'public_id': uuid.uuid4()})
+        with mock.patch.object(writer, '_write', side_effect=Exception('db down')), \
+                self.assertLogs('app_standards.batch_writer', 'WARNING') as logs:
+            self.assertEqual(writer.flush(), 0)
+            writer.close()
+        self.assertEqual(writer.dropped, 2)
+        self.assertEqual(logs.records[0].dropped_total, 2)
+
+    def test_results_carry_snippet_without_full_content(self):
+        results = HybridSearchService().search('خون')['results']
+        self.assertNotIn('content', results[0])
+        self.assertTrue(results[0]['highlights'])
+        full = HybridSearchService().search('خون', include_content=True)['results']
+        self.assertEqual(full[0]['content'], 'فشار خون بالا')
+
+    def test_snippets_generated_only_for_returned_page(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(2, 6):
+                SearchableContent.objects.create(
+                    content_type='notes', content_id=i, title=f'خون {i}', content=f'آزمایش خون {i}', metadata={}
+                )
+        with mock.patch('search.services.generate_snippet', wraps=generate_snippet) as snippet:
+            response = HybridSearchService().search('خون', page=2, page_size=2)
+        self.assertEqual(response['total_count'], 5)
+        self.assertEqual(response['total_pages'], 3)
+        self.assertEqual(len(response['results']), 2)
+        self.assertEqual(snippet.call_count, 2)
+        self.assertTrue(all('snippet' in r for r in response['results']))
+
+    def test_repeat_search_served_from_fingerprint_cache(self):
+        service = HybridSearchService()
+        first = service.search('فشار  خون')
+        second = service.search('فشار خون')
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(first['results'], second['results'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.content.save()
+        self.assertFalse(service.search('فشار خون')['cached'])
+
+    def test_result_computed_before_invalidation_not_cached(self):
+        # نتیجهٔ جستجویی که هم‌زمان با باطل‌سازی اجرا شده زیر نسل جدید ذخیره نمی‌شود
+        service = HybridSearchService()
+        run_search = service._run_search
+
+        def invalidated_during_search(*args):
+            results = run_search(*args)
+            invalidate_results()
+            return results
+
+        with mock.patch.object(service, '_run_search', side_effect=invalidated_during_search):
+            service.search('فشار خون')
+        self.assertFalse(service.search('فشار خون')['cached'])
+        self.assertTrue(service.search('فشار خون')['cached'])
+
+
+class SnippetTest(SimpleTestCase):
+    def setUp(self):
+        self.content = ('شرح حال: ' + 'بیمار حال عمومی خوبی دارد. ' * 20
+                        + 'تشخیص میگرن مزمن مطرح است. ' + 'پیگیری یک ماه بعد. ' * 10)
+
+    def test_window_centered_on_query_terms(self):
+        result = generate_snippet(self.content, build_position_index(self.content), tokenize('میگرن'), max_length=80)
+        self.assertIn('میگرن', result['snippet'])
+        self.assertTrue(result['snippet'].startswith('...'))
+        start, end = result['highlights'][0]
+        self.assertEqual(result['snippet'][start:end], 'میگرن')
+
+    def test_no_match_falls_back_to_prefix(self):
+        result = generate_snippet(self.content, None, tokenize('آسم'), max_length=50)
+        self.assertEqual(result['snippet'], self.content[:50] + '...')
+        self.assertEqual(result['highlights'], [])
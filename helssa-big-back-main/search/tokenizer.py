@@ -0,0 +1,78 @@
+"""
+نرمال‌سازی و توکن‌سازی متن فارسی برای ایندکس معکوس
+Persian-aware normalization and tokenization
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+# یکسان‌سازی حروف عربی به فارسی و ارقام عربی/فارسی به لاتین
+_CHAR_MAP = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4",
+    "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+})
+
+ZWNJ = "\u200c"
+
+# اعراب، تنوین و کشیده (tatweel)
+_DIACRITICS_RE = re.compile(r"[\u064B-\u065F\u0670\u0640]")
+# نویسه‌های جهت‌دهی و joinerهای نامرئی به‌جز ZWNJ
+_INVISIBLE_RE = re.compile(r"[\u200D\u200E\u200F\u202A-\u202E\uFEFF]")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# پیشوند «می/نمی» و پسوند «ها/های» که با فاصله جدا نوشته شده‌اند
+_SPACED_PREFIX_RE = re.compile(r"(?<!\w)(ن?می)\s+(?=\w)")
+# پسوند جدانوشته فقط پس از ستاک واقعی (کلمهٔ فارسی دوحرفی یا بلندتر که حرف اضافه/ربط نیست)
+# چسبانده می‌شود؛ «تر» جدانوشته هم با صفت «تر» (خیس) یکی است و فقط شکل ZWNJ آن یکی می‌شود
+_SPACED_SUFFIX_RE = re.compile(r"(\w+)\s+(ها|های|هایی|ترین)(?!\w)")
+_PERSIAN_STEM_RE = re.compile(r"[\u0622-\u064A\u067E\u0686\u0698\u06A9\u06AF\u06CC]{2,}")
+
+STOPWORDS = frozenset({
+    "و", "در", "به", "از", "که", "این", "آن", "با", "را", "برای", "تا", "یا",
+    "هم", "اما", "است", "بود", "شد", "می", "های", "ها", "یک", "هر", "بر",
+    "the", "and", "of", "to", "in", "a", "is", "for", "on", "with",
+})
+
+
+def normalize_text(text: str) -> str:
+    """
+    یکسان‌سازی متن: حروف عربی → فارسی، حذف اعراب و کشیده، حذف ZWNJ و فاصلهٔ
+    پیشوند/پسوندهای جدانوشته (تا «می‌روم»، «می روم» و «مي‌روم» یک توکن شوند) و حروف کوچک.
+    """
+    if not text:
+        return ""
+    text = text.translate(_CHAR_MAP)
+    text = _DIACRITICS_RE.sub("", text)
+    text = _INVISIBLE_RE.sub("", text)
+    text = text.replace(ZWNJ, "")
+    text = _SPACED_PREFIX_RE.sub(r"\1", text)
+    text = _SPACED_SUFFIX_RE.sub(_join_spaced_suffix, text)
+    return text.lower()
+
+
+def _join_spaced_suffix(match: re.Match) -> str:
+    stem, suffix = match.groups()
+    if stem in STOPWORDS or not _PERSIAN_STEM_RE.fullmatch(stem):
+        return match.group(0)
+    return stem + suffix
+
+
+def tokenize(text: str, keep_stopwords: bool = False) -> List[str]:
+    """توکن‌های نرمال‌شدهٔ متن به ترتیب وقوع"""
+    tokens = _TOKEN_RE.findall(normalize_text(text))
+    if keep_stopwords:
+        return tokens
+    return [t for t in tokens if t not in STOPWORDS]
@@ -6,7 +6,6 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.core.paginator import Paginator
 from django.utils.dateparse import parse_date
 
 from .services import HybridSearchService
@@ -26,6 +25,8 @@ def search_content(request):
     - content_type: یکی از (transcript, soap, checklist, notes)
     - date_from: YYYY-MM-DD
     - date_to: YYYY-MM-DD
+    - mode: hybrid (پیش‌فرض) یا semantic (فقط ANN، بدون نیاز به هم‌پوشانی کلیدواژه)
+    - include_content: true برای دریافت متن کامل هر نتیجه (پیش‌فرض فقط snippet و highlights)
     - page: شماره صفحه
     - page_size: تعداد هر صفحه (پیش‌فرض 20، حداکثر 100)
     """
@@ -80,6 +81,18 @@ def search_content(request):
             )
         filters['date_to'] = date_to
 
+    mode = request.GET.get('mode', HybridSearchService.MODE_HYBRID)
+    if mode not in HybridSearchService.MODES:
+        return Response(
+            {
+                'error': f'Invalid mode: {mode}',
+                'valid_modes': list(HybridSearchService.MODES)
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    include_content = request.GET.get('include_content', '').lower() in ('1', 'true', 'yes')
+
     page = int(request.GET.get('page', 1))
     page_size = min(int(request.GET.get('page_size', 20)), 100)
 
@@ -88,23 +101,25 @@ def search_content(request):
         query_text=query_text,
         user=request.user,
         filters=filters,
-        limit=page_size * 5
+        limit=page_size * 5,
+        mode=mode,
+        include_content=include_content,
+        page=page,
+        page_size=page_size
     )
 
-    paginator = Paginator(search_results['results'], page_size)
-    page_obj = paginator.get_page(page)
-
     return Response({
         'query': query_text,
         'filters': filters,
-        'results': list(page_obj),
+        'mode': mode,
+        'results': search_results['results'],
         'pagination': {
-            'page': page,
+            'page': search_results['page'],
             'page_size': page_size,
-            'total_pages': paginator.num_pages,
-            'total_results': paginator.count,
-            'has_next': page_obj.has_next(),
-            'has_previous': page_obj.has_previous()
+            'total_pages': search_results['total_pages'],
+            'total_results': search_results['total_count'],
+            'has_next': search_results['page'] < search_results['total_pages'],
+            'has_previous': search_results['page'] > 1
         },
         'execution_time_ms': search_results['execution_time_ms'],
         'search_id': search_results['search_id']
@@ -0,0 +1,140 @@
+"""
+ثبت دسته‌ای و ناهمگام کوئری‌ها و نتایج جستجو
+Batched, off-request-path persistence of SearchQuery / SearchResult rows
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from django.db import connection, transaction
+
+from app_standards.batch_writer import BackgroundBatchWriter, ProcessWriter
+
+from .settings import RESULT_CACHE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class SearchLogWriter(BackgroundBatchWriter):
+    """
+    صف درون‌پروسسی که کوئری‌ها و نتایج کش‌شده را در دسته‌ها با bulk_create ذخیره می‌کند.
+
+    ردیف‌های SearchResult مستقیماً از شناسهٔ محتوا ساخته می‌شوند (بدون fetch هر ردیف)؛
+    هر دسته حداکثر چهار کوئری دیتابیس دارد. در صورت پر شدن صف، قدیمی‌ترین
+    ورودی‌ها کنار گذاشته و همراه ورودی‌های دسته‌های ناموفق شمرده و گزارش می‌شوند.
+    """
+
+    thread_name = "search-log-writer"
+    drop_message = "Search log writer dropped entries"
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue_size: Optional[int] = None,
+        asynchronous: Optional[bool] = None,
+    ):
+        self.asynchronous = RESULT_CACHE_SETTINGS['ASYNC_WRITES'] if asynchronous is None else asynchronous
+        super().__init__(
+            capacity=max_queue_size or RESULT_CACHE_SETTINGS['WRITER_MAX_QUEUE_SIZE'],
+            batch_size=batch_size or RESULT_CACHE_SETTINGS['WRITER_BATCH_SIZE'],
+            flush_interval=flush_interval or RESULT_CACHE_SETTINGS['WRITER_FLUSH_INTERVAL'],
+        )
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._queue: Deque[Dict[str, Any]] = deque()
+
+    def submit(self, entry: Dict[str, Any]) -> None:
+        """
+        ثبت یک جستجو برای ذخیره
+
+        entry: public_id, query_text, filters, user_id, results_count,
+               execution_time_ms, results (id, combined_score, snippet)
+        """
+        if not self.asynchronous:
+            self._write([entry])
+            return
+
+        with self._lock:
+            pending = self._append(self._queue, entry)
+        self._submitted(pending)
+
+    def flush(self) -> int:
+        """نوشتن همهٔ ورودی‌های در صف؛ تعداد ذخیره‌شده را برمی‌گرداند"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    break
+                try:
+                    self._write(batch)
+                    written += len(batch)
+                except Exception as e:
+                    logger.error(f"Failed to persist {len(batch)} search log entries: {e}")
+                    self._count_dropped(len(batch))
+            self._written += written
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار نویسنده برای health check"""
+        with self._lock:
+            pending = len(self._queue)
+        return {**super().stats(), "pending": pending}
+
+    # ---------- Internal ----------
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        from .models import SearchableContent, SearchQuery, SearchResult
+
+        queries = [
+            SearchQuery(
+                public_id=e["public_id"],
+                query_text=e["query_text"],
+                filters=e["filters"],
+                user_id=e.get("user_id"),
+                results_count=e["results_count"],
+                execution_time_ms=e["execution_time_ms"],
+            )
+            for e in batch
+        ]
+        with transaction.atomic():
+            SearchQuery.objects.bulk_create(queries)
+            if connection.features.can_return_rows_from_bulk_insert:
+                query_ids = {q.public_id: q.id for q in queries}
+            else:
+                query_ids = dict(
+                    SearchQuery.objects.filter(public_id__in=[q.public_id for q in queries])
+                    .values_list("public_id", "id")
+                )
+
+            content_ids = {r["id"] for e in batch for r in e.get("results", ())}
+            if not content_ids:
+                return
+            # محتواهای حذف‌شده در فاصلهٔ جستجو تا ذخیره کنار گذاشته می‌شوند
+            existing = set(SearchableContent.objects.filter(id__in=content_ids).values_list("id", flat=True))
+            rows = [
+                SearchResult(
+                    query_id=query_ids[e["public_id"]],
+                    content_id=r["id"],
+                    relevance_score=r["combined_score"],
+                    rank=rank,
+                    snippet=r["snippet"],
+                )
+                for e in batch
+                for rank, r in enumerate(e.get("results", ()), 1)
+                if r["id"] in existing
+            ]
+            SearchResult.objects.bulk_create(rows, batch_size=1000)
+
+
+_writer = ProcessWriter(SearchLogWriter)
+
+
+def get_search_log_writer() -> SearchLogWriter:
+    """نویسندهٔ لاگ جستجوی این پروسس"""
+    return _writer.get()
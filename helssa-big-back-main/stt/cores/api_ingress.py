@@ -5,10 +5,17 @@ import logging
 from typing import Dict, Tuple, Optional
 from django.core.files.base import ContentFile
 from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from rest_framework import status
 import hashlib
 import os
 
+from app_standards.rate_limiting import RateLimitResult, get_rate_limiter
+
+from ..models import STTTranscriptCache
+from ..settings import CACHE_SETTINGS, RATE_LIMIT_SETTINGS
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,11 +32,8 @@ class APIIngressCore:
     
     def __init__(self):
         self.logger = logger
-        self.rate_limit_window = 3600  # 1 ساعت
-        self.rate_limit_max_requests = {
-            'patient': 20,  # بیمار: 20 درخواست در ساعت
-            'doctor': 50,   # دکتر: 50 درخواست در ساعت
-        }
+        self.rate_limit_window = RATE_LIMIT_SETTINGS['WINDOW']
+        self.rate_limit_max_requests = RATE_LIMIT_SETTINGS['MAX_REQUESTS']
     
     def validate_request(self, request_data: dict, user) -> Tuple[bool, Optional[dict]]:
         """
@@ -48,10 +52,11 @@ class APIIngressCore:
                 return False, {'error': 'فایل صوتی الزامی است'}
             
             # بررسی محدودیت نرخ
-            if not self._check_rate_limit(user):
+            rate_limit = self._check_rate_limit(user)
+            if not rate_limit.allowed:
                 return False, {
                     'error': 'تعداد درخواست‌های شما بیش از حد مجاز است',
-                    'retry_after': self._get_rate_limit_reset_time(user)
+                    'retry_after': rate_limit.retry_after_seconds
                 }
             
             # بررسی اندازه فایل
@@ -65,28 +70,15 @@ class APIIngressCore:
             self.logger.error(f"Error in validate_request: {str(e)}")
             return False, {'error': 'خطا در اعتبارسنجی درخواست'}
     
-    def _check_rate_limit(self, user) -> bool:
-        """بررسی محدودیت نرخ درخواست"""
-        cache_key = f'stt_rate_limit_{user.id}'
-        current_count = cache.get(cache_key, 0)
-        
+    def _check_rate_limit(self, user) -> RateLimitResult:
+        """بررسی محدودیت نرخ درخواست (یک عملیات اتمیک روی موتور مشترک)"""
         limit = self.rate_limit_max_requests.get(
             user.user_type, 
             self.rate_limit_max_requests['patient']
         )
-        
-        if current_count >= limit:
-            return False
-        
-        # افزایش شمارنده
-        cache.set(cache_key, current_count + 1, self.rate_limit_window)
-        return True
-    
-    def _get_rate_limit_reset_time(self, user) -> int:
-        """زمان باقیمانده تا ریست شدن محدودیت"""
-        cache_key = f'stt_rate_limit_{user.id}'
-        ttl = cache.ttl(cache_key)
-        return ttl if ttl else 0
+        return get_rate_limiter().check(
+            f'stt:{user.id}', limit, self.rate_limit_window
+        )
     
     def prepare_response(self, task, include_quality_control: bool = False) -> dict:
         """
@@ -145,6 +137,9 @@ class APIIngressCore:
         """
         بررسی وجود نتیجه در کش
         
+        ابتدا کش Django و سپس مخزن پایدار STTTranscriptCache بررسی می‌شود؛
+        نتیجهٔ یافت‌شده در مخزن دوباره در کش قرار می‌گیرد.
+        
         Args:
             audio_hash: هش فایل صوتی
             language: زبان
@@ -153,36 +148,91 @@ class APIIngressCore:
         Returns:
             Optional[dict]: نتیجه کش شده یا None
         """
-        cache_key = f'stt_result_{audio_hash}_{language}_{model}'
-        return cache.get(cache_key)
+        if not CACHE_SETTINGS['ENABLED'] or not audio_hash:
+            return None
+        
+        cache_key = self._result_cache_key(audio_hash, language, model)
+        result = cache.get(cache_key)
+        lookup = STTTranscriptCache.objects.filter(
+            content_hash=audio_hash, language=language, model_used=model
+        )
+        
+        if result is None:
+            entry = lookup.first()
+            if entry is None:
+                return None
+            result = entry.as_result()
+            cache.set(cache_key, result, CACHE_SETTINGS['TIMEOUT'])
+        
+        lookup.update(hit_count=F('hit_count') + 1)
+        return result
     
     def cache_result(self, audio_hash: str, language: str, model: str, 
-                    result: dict, timeout: int = 86400):
+                    result: dict, timeout: Optional[int] = None):
         """
-        ذخیره نتیجه در کش
+        ذخیره نتیجه در مخزن پایدار و کش
         
         Args:
             audio_hash: هش فایل صوتی
             language: زبان
             model: مدل استفاده شده
             result: نتیجه تبدیل
-            timeout: مدت زمان نگهداری در کش (پیش‌فرض 24 ساعت)
+            timeout: مدت زمان نگهداری در کش (پیش‌فرض STT_CACHE_TIMEOUT)
         """
-        cache_key = f'stt_result_{audio_hash}_{language}_{model}'
-        cache.set(cache_key, result, timeout)
+        if not CACHE_SETTINGS['ENABLED'] or not audio_hash:
+            return
+        
+        defaults = {
+            'transcription': result.get('transcription', ''),
+            'confidence_score': result.get('confidence_score'),
+            'duration': result.get('duration'),
+            'quality_control': result.get('quality_control', {}),
+        }
+        try:
+            with transaction.atomic():
+                STTTranscriptCache.objects.update_or_create(
+                    content_hash=audio_hash, language=language, model_used=model,
+                    defaults=defaults,
+                )
+        except IntegrityError:
+            # ثبت هم‌زمان همان محتوا توسط worker دیگر
+            self.logger.info(f"Transcript for {audio_hash[:12]} already stored")
+        
+        cache.set(
+            self._result_cache_key(audio_hash, language, model),
+            result,
+            timeout or CACHE_SETTINGS['TIMEOUT'],
+        )
+    
+    def _result_cache_key(self, audio_hash: str, language: str, model: str) -> str:
+        return f"{CACHE_SETTINGS['KEY_PREFIX']}{audio_hash}_{language}_{model}"
     
     def calculate_audio_hash(self, audio_file) -> str:
-        """محاسبه هش فایل صوتی برای کش"""
+        """
+        محاسبه هش فایل صوتی برای کش
+        
+        اگر فایل با هندلرهای آپلود stt.upload_handlers دریافت شده باشد، هش در حین
+        آپلود محاسبه شده و فایل دوباره خوانده نمی‌شود.
+        """
+        content_hash = getattr(audio_file, 'content_hash', None)
+        if content_hash:
+            return content_hash
+        
         hasher = hashlib.sha256()
         
         # خواندن فایل به صورت chunk
-        for chunk in audio_file.chunks(8192):
+        for chunk in audio_file.chunks(65536):
             hasher.update(chunk)
         
         # برگشت به ابتدای فایل
         audio_file.seek(0)
         
-        return hasher.hexdigest()
+        content_hash = hasher.hexdigest()
+        try:
+            audio_file.content_hash = content_hash
+        except AttributeError:
+            pass
+        return content_hash
     
     def validate_user_permissions(self, user, task=None) -> Tuple[bool, Optional[dict]]:
         """
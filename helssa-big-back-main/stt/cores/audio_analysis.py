@@ -0,0 +1,174 @@
+"""
+تحلیل برداری و جریانی کیفیت صوت
+Vectorized, bounded-memory audio quality analysis
+"""
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class AudioQualityAccumulator:
+    """
+    محاسبهٔ تجمعی معیارهای کیفیت صوت روی تکه‌های متوالی
+
+    - انرژی فریم‌ها با view فریم‌بندی‌شده (بدون کپی) و einsum محاسبه می‌شود
+    - کف نویز از هیستوگرام لگاریتمی انرژی فریم‌ها تخمین زده می‌شود، پس حافظه
+      مستقل از طول فایل است
+    - نمونه‌های باقی‌مانده از فریم ناقص هر تکه به تکهٔ بعد منتقل می‌شوند
+    """
+
+    # بازهٔ هیستوگرام انرژی فریم (RMS) در مقیاس log10
+    HIST_MIN_LOG = -7.0
+    HIST_MAX_LOG = 0.5
+    HIST_BINS = 600
+
+    def __init__(self, sample_rate: int, frame_ms: int = 20,
+                 silence_threshold: float = 0.01,
+                 clip_threshold: float = 0.999,
+                 noise_percentile: float = 0.1):
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.silence_threshold = silence_threshold
+        self.clip_threshold = clip_threshold
+        self.noise_percentile = noise_percentile
+
+        self.total_samples = 0
+        self.sum_squares = 0.0
+        self.silent_samples = 0
+        self.clipped_samples = 0
+        self.peak = 0.0
+        self.frame_count = 0
+        self.silent_frames = 0
+
+        self._hist_counts = np.zeros(self.HIST_BINS, dtype=np.int64)
+        self._hist_sums = np.zeros(self.HIST_BINS, dtype=np.float64)
+        self._carry = np.empty(0, dtype=np.float32)
+
+    def update(self, chunk: np.ndarray) -> None:
+        """افزودن یک تکه از نمونه‌های float32 (مونو)"""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if chunk.size == 0:
+            return
+
+        # آمار سطح نمونه
+        abs_chunk = np.abs(chunk)
+        self.total_samples += chunk.size
+        self.sum_squares += float(np.dot(chunk, chunk))
+        self.silent_samples += int(np.count_nonzero(abs_chunk < self.silence_threshold))
+        self.clipped_samples += int(np.count_nonzero(abs_chunk >= self.clip_threshold))
+        self.peak = max(self.peak, float(abs_chunk.max()))
+
+        # فریم‌بندی با view؛ نمونه‌های ناقص برای تکهٔ بعد نگه داشته می‌شوند
+        if self._carry.size:
+            chunk = np.concatenate((self._carry, chunk))
+        n_frames = chunk.size // self.frame_length
+        usable = n_frames * self.frame_length
+        self._carry = chunk[usable:].copy()
+        if not n_frames:
+            return
+
+        frames = chunk[:usable].reshape(n_frames, self.frame_length)
+        frame_rms = np.sqrt(np.einsum('ij,ij->i', frames, frames) / self.frame_length)
+        self._add_frame_energies(frame_rms)
+
+    def _add_frame_energies(self, frame_rms: np.ndarray) -> None:
+        self.frame_count += frame_rms.size
+        self.silent_frames += int(np.count_nonzero(frame_rms < self.silence_threshold))
+        log_rms = np.log10(np.maximum(frame_rms, 10 ** self.HIST_MIN_LOG))
+        bins = ((log_rms - self.HIST_MIN_LOG) / (self.HIST_MAX_LOG - self.HIST_MIN_LOG) * self.HIST_BINS)
+        bins = np.clip(bins.astype(np.int64), 0, self.HIST_BINS - 1)
+        self._hist_counts += np.bincount(bins, minlength=self.HIST_BINS)
+        self._hist_sums += np.bincount(bins, weights=frame_rms, minlength=self.HIST_BINS)
+
+    def noise_floor(self) -> float:
+        """میانگین انرژی کم‌انرژی‌ترین فریم‌ها (پیش‌فرض ۱۰٪)"""
+        target = int(self.frame_count * self.noise_percentile)
+        if target <= 0:
+            return 0.0
+        cumulative = np.cumsum(self._hist_counts)
+        last_bin = int(np.searchsorted(cumulative, target))
+        taken_before = int(cumulative[last_bin - 1]) if last_bin else 0
+        total = float(self._hist_sums[:last_bin].sum())
+        remaining = target - taken_before
+        if remaining > 0 and self._hist_counts[last_bin]:
+            total += self._hist_sums[last_bin] / self._hist_counts[last_bin] * remaining
+        return total / target
+
+    def result(self) -> Dict[str, Any]:
+        """معیارهای نهایی کیفیت"""
+        if not self.total_samples:
+            return {
+                'duration': 0.0,
+                'rms_energy': 0.0,
+                'silence_ratio': 1.0,
+                'noise_floor': 0.0,
+                'noise_level': 'low',
+                'clipping_ratio': 0.0,
+                'peak': 0.0,
+            }
+        noise_floor = self.noise_floor()
+        return {
+            'duration': self.total_samples / float(self.sample_rate),
+            'rms_energy': float(np.sqrt(self.sum_squares / self.total_samples)),
+            'silence_ratio': self.silent_samples / self.total_samples,
+            'noise_floor': float(noise_floor),
+            'noise_level': classify_noise_level(noise_floor),
+            'clipping_ratio': self.clipped_samples / self.total_samples,
+            'peak': self.peak,
+        }
+
+
+def classify_noise_level(noise_floor: float) -> str:
+    """طبقه‌بندی سطح نویز (low, medium, high)"""
+    if noise_floor < 0.01:
+        return 'low'
+    elif noise_floor < 0.03:
+        return 'medium'
+    return 'high'
+
+
+def iter_chunks(samples: np.ndarray, chunk_size: int) -> Iterable[np.ndarray]:
+    """view های پشت‌سرهم از یک بافر (بدون کپی)"""
+    for start in range(0, samples.size, chunk_size):
+        yield samples[start:start + chunk_size]
+
+
+def analyze_samples(samples: np.ndarray, sample_rate: int,
+                    chunk_seconds: float = 30.0) -> Dict[str, Any]:
+    """تحلیل یک بافر در تکه‌های محدود (حافظهٔ کاری ثابت)"""
+    accumulator = AudioQualityAccumulator(sample_rate)
+    for chunk in iter_chunks(samples, max(1, int(sample_rate * chunk_seconds))):
+        accumulator.update(chunk)
+    return accumulator.result()
+
+
+def analyze_stream(stream, sample_rate: int, chunk_seconds: float = 30.0,
+                   accumulator: Optional[AudioQualityAccumulator] = None,
+                   channels: int = 1,
+                   on_frames: Optional[Callable[[np.ndarray], None]] = None) -> Dict[str, Any]:
+    """
+    تحلیل جریانی از یک stream باینری PCM float32 (مثلاً stdout فرایند ffmpeg)
+    بدون نگهداری کل فایل در حافظه
+
+    در PCM چندکاناله (interleaved) فقط کانال اول تحلیل می‌شود؛ on_frames هر تکه را
+    به شکل (n, channels) دریافت می‌کند تا فراخواننده کانال موردنیاز خود را نگه دارد.
+    """
+    accumulator = accumulator or AudioQualityAccumulator(sample_rate)
+    frame_bytes = 4 * channels
+    chunk_bytes = max(frame_bytes, int(sample_rate * chunk_seconds) * frame_bytes)
+    leftover = b''
+    while True:
+        data = stream.read(chunk_bytes)
+        if not data:
+            break
+        data = leftover + data
+        usable = len(data) - len(data) % frame_bytes
+        leftover = data[usable:]
+        frames = np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels)
+        accumulator.update(frames[:, 0])
+        if on_frames is not None:
+            on_frames(frames)
+    return accumulator.result()
@@ -5,10 +5,10 @@ import logging
 from typing import Dict, Any, Optional, Tuple
 from django.utils import timezone
 from django.db import transaction
-from celery import shared_task
 import json
 
 from ..models import STTTask, STTQualityControl, STTUsageStats
+from ..streaming import publish_task_event
 from .api_ingress import APIIngressCore
 from .text_processor import TextProcessorCore
 from .speech_processor import SpeechProcessorCore
@@ -52,23 +52,33 @@ class CentralOrchestrator:
             Tuple[bool, Dict]: (موفقیت، نتیجه/خطا)
         """
         try:
-            # ایجاد وظیفه
-            task = self._create_task(
-                user, audio_file, language, model_size, metadata
-            )
-            
-            # بررسی کش
+            # هش محتوا (در حین آپلود محاسبه شده) و بررسی کش پیش از صف‌بندی
             audio_hash = self.api_core.calculate_audio_hash(audio_file)
             cached_result = self.api_core.get_cached_result(
                 audio_hash, language, model_size
             )
             
+            # تلاش مجدد کلاینت برای فایلی که هنوز در حال پردازش است
+            if not cached_result:
+                in_flight = self._find_in_flight_task(user, audio_hash, language, model_size)
+                if in_flight:
+                    self.logger.info(f"Duplicate upload joined in-flight task {in_flight.task_id}")
+                    response = self.api_core.prepare_response(in_flight)
+                    response['deduplicated'] = True
+                    return True, response
+            
+            # ایجاد وظیفه
+            task = self._create_task(
+                user, audio_file, language, model_size, metadata, audio_hash
+            )
+            
             if cached_result:
                 self.logger.info(f"Using cached result for task {task.task_id}")
                 self._update_task_with_result(task, cached_result)
                 return True, self.api_core.prepare_response(task, include_quality_control=True)
             
-            # شروع پردازش async
+            # شروع پردازش async (وظیفهٔ دارای تلاش مجدد در stt.tasks)
+            from ..tasks import process_stt_task
             process_stt_task.delay(task.id, context_type)
             
             # پاسخ اولیه
@@ -90,12 +100,14 @@ class CentralOrchestrator:
             }
     
     def _create_task(self, user, audio_file, language: str,
-                    model_size: str, metadata: Optional[dict]) -> STTTask:
+                    model_size: str, metadata: Optional[dict],
+                    content_hash: str = '') -> STTTask:
         """ایجاد وظیفه جدید"""
         task = STTTask.objects.create(
             user=user,
             user_type=user.user_type,
             audio_file=audio_file,
+            content_hash=content_hash,
             file_size=audio_file.size,
             language=language,
             model_used=model_size,
@@ -106,28 +118,45 @@ class CentralOrchestrator:
         self.logger.info(f"Created STT task {task.task_id} for user {user.id}")
         return task
     
-    def process_task(self, task_id: int, context_type: str = 'general'):
+    def _find_in_flight_task(self, user, content_hash: str, language: str,
+                             model_size: str) -> Optional[STTTask]:
+        """وظیفهٔ در حال پردازش همین کاربر برای همان محتوا، زبان و مدل"""
+        return STTTask.objects.filter(
+            user=user,
+            content_hash=content_hash,
+            language=language,
+            model_used=model_size,
+            status__in=['pending', 'processing'],
+        ).order_by('-created_at').first()
+    
+    def process_task(self, task_id: int, context_type: str = 'general',
+                     final_attempt: bool = True):
         """
         پردازش وظیفه STT
         
         Args:
             task_id: شناسه وظیفه
             context_type: نوع محتوا
+            final_attempt: آیا تلاش دیگری پس از خطا انجام نمی‌شود
         """
         try:
             task = STTTask.objects.get(id=task_id)
             
-            # به‌روزرسانی وضعیت
+            # به‌روزرسانی وضعیت (در تلاش مجدد زمان شروع اولیه حفظ می‌شود)
             task.status = 'processing'
-            task.started_at = timezone.now()
+            task.started_at = task.started_at or timezone.now()
             task.save()
+            publish_task_event(task.task_id, 'status', {'status': task.status})
             
-            # پردازش صوت
+            # پردازش صوت (با ادامه از آخرین بخش تکمیل‌شده در تلاش مجدد)
             self.logger.info(f"Processing audio for task {task.task_id}")
             audio_result = self.speech_core.process_audio_file(
                 task.audio_file.path,
                 task.language,
-                task.model_used
+                task.model_used,
+                checkpoint=task.checkpoint,
+                on_checkpoint=lambda state: self._save_checkpoint(task, state),
+                on_partial=lambda partial: publish_task_event(task.task_id, 'partial', partial),
             )
             
             # ذخیره نتیجه اولیه
@@ -156,10 +185,11 @@ class CentralOrchestrator:
                 
                 task.status = 'completed'
                 task.completed_at = timezone.now()
+                task.checkpoint = {}
                 task.save()
                 
-                # ذخیره در کش
-                audio_hash = self.api_core.calculate_audio_hash(task.audio_file)
+                # ذخیره در مخزن نتایج (هش هنگام آپلود ثبت شده است)
+                audio_hash = task.content_hash or self.api_core.calculate_audio_hash(task.audio_file)
                 cache_data = {
                     'transcription': task.transcription,
                     'confidence_score': task.confidence_score,
@@ -176,11 +206,25 @@ class CentralOrchestrator:
                 # به‌روزرسانی آمار
                 self._update_usage_stats(task)
             
+            # نتیجهٔ نهایی برای کلاینت‌های متصل به جریان (بدون نیاز به پرس‌وجوی وضعیت)
+            publish_task_event(
+                task.task_id, 'completed', self.api_core.prepare_response(task, True)
+            )
             self.logger.info(f"Task {task.task_id} completed successfully")
             
         except Exception as e:
             self.logger.error(f"Error processing task {task_id}: {str(e)}")
-            self._handle_task_failure(task_id, str(e))
+            if final_attempt:
+                self._handle_task_failure(task_id, str(e))
+            else:
+                self._mark_retrying(task_id, str(e))
+            # انتشار خطا برای تلاش مجدد سلری (ادامه از نقطهٔ بازیابی)
+            raise
+    
+    def _save_checkpoint(self, task: STTTask, state: Dict[str, Any]):
+        """ذخیرهٔ نقطهٔ بازیابی پس از تکمیل هر بخش"""
+        task.checkpoint = state
+        STTTask.objects.filter(pk=task.pk).update(checkpoint=state)
     
     def _perform_quality_control(self, task: STTTask, 
                                audio_result: dict,
@@ -293,6 +337,27 @@ class CentralOrchestrator:
                 review_reason='نتیجه از کش'
             )
     
+    def _mark_retrying(self, task_id: int, error_message: str):
+        """
+        بازگشت وظیفه به صف پیش از تلاش مجدد
+        
+        وضعیت غیرنهایی می‌ماند تا آپلود تکراری به همین وظیفه بپیوندد و
+        کلاینت‌های جریان تا تلاش نهایی منتظر بمانند.
+        """
+        try:
+            task = STTTask.objects.get(id=task_id)
+            task.status = 'pending'
+            task.metadata['retry_count'] = task.metadata.get('retry_count', 0) + 1
+            task.metadata['last_error'] = error_message
+            task.save(update_fields=['status', 'metadata'])
+            publish_task_event(task.task_id, 'status', {
+                'status': task.status,
+                'retrying': True,
+                'retry_count': task.metadata['retry_count'],
+            })
+        except Exception as e:
+            self.logger.error(f"Error marking task for retry: {str(e)}")
+    
     def _handle_task_failure(self, task_id: int, error_message: str):
         """مدیریت خطا در پردازش وظیفه"""
         try:
@@ -301,6 +366,7 @@ class CentralOrchestrator:
             task.error_message = error_message
             task.completed_at = timezone.now()
             task.save()
+            publish_task_event(task.task_id, 'failed', self.api_core.prepare_response(task))
             
             # به‌روزرسانی آمار
             self._update_usage_stats(task, success=False)
@@ -409,6 +475,7 @@ class CentralOrchestrator:
             task.status = 'cancelled'
             task.completed_at = timezone.now()
             task.save()
+            publish_task_event(task.task_id, 'cancelled', {'status': task.status})
             
             self.logger.info(f"Task {task.task_id} cancelled by user {user.id}")
             
@@ -429,15 +496,3 @@ class CentralOrchestrator:
                 'message': 'خطا در لغو وظیفه'
             }
 
-
-@shared_task
-def process_stt_task(task_id: int, context_type: str = 'general'):
-    """
-    Celery task برای پردازش async
-    
-    Args:
-        task_id: شناسه وظیفه
-        context_type: نوع محتوا
-    """
-    orchestrator = CentralOrchestrator()
-    orchestrator.process_task(task_id, context_type)
\ No newline at end of file
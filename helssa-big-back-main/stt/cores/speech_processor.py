@@ -2,19 +2,45 @@
 هسته پردازش صوت برای تبدیل گفتار به متن با استفاده از Whisper
 """
 import logging
-import os
-import tempfile
-from typing import Dict, Tuple, Optional, Any
+import re
+import threading
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Any
 import whisper
 import numpy as np
 import ffmpeg
-import wave
-import json
-from pathlib import Path
-import torch
+
+from .. import transcription_pool
+from ..model_registry import WHISPER_MODEL_NAMES, get_model_registry
+from ..settings import ADVANCED_SETTINGS, SEGMENTATION_SETTINGS
+from .audio_analysis import analyze_samples, analyze_stream
+from .segmentation import plan_segments
 
 logger = logging.getLogger(__name__)
 
+# الگوهای لاگ ffmpeg برای اطلاعات فایل مبدا (جایگزین ffprobe)
+_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?),.*?bitrate: (?:(\d+) kb/s|N/A)')
+_AUDIO_STREAM_RE = re.compile(r'Stream #0:\d+.*?: Audio: [^,]+, (\d+) Hz, ([^,]+)')
+_CHANNEL_LAYOUTS = {'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '5.0': 5, '5.1': 6, '7.1': 8}
+
+
+@dataclass
+class DecodedAudio:
+    """صوت رمزگشایی‌شدهٔ مشترک بین تحلیل کیفیت و Whisper"""
+    
+    samples: np.ndarray  # 16kHz مونو float32 پیش‌پردازش‌شده (ورودی Whisper)
+    sample_rate: int
+    source_info: Dict[str, Any] = field(default_factory=dict)
+    # معیارهای کیفیت صوت خام که حین رمزگشایی جریانی محاسبه شده‌اند
+    quality_metrics: Optional[Dict[str, Any]] = None
+    
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / float(self.sample_rate) if self.sample_rate else 0.0
+
 
 class SpeechProcessorCore:
     """
@@ -29,17 +55,17 @@ class SpeechProcessorCore:
     
     def __init__(self):
         self.logger = logger
-        self.models = {}
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.logger.info(f"Using device: {self.device}")
+        # مدل‌ها در رجیستری مشترک پردازه نگهداری می‌شوند (نه در هر نمونه)
+        self.registry = get_model_registry()
+        self.device = self.registry.device
         
         # پیکربندی Whisper
         self.model_configs = {
-            'tiny': {'name': 'tiny', 'vram': 1, 'relative_speed': 39},
-            'base': {'name': 'base', 'vram': 1, 'relative_speed': 16},
-            'small': {'name': 'small', 'vram': 2, 'relative_speed': 6},
-            'medium': {'name': 'medium', 'vram': 5, 'relative_speed': 2},
-            'large': {'name': 'large-v3', 'vram': 10, 'relative_speed': 1},
+            'tiny': {'name': WHISPER_MODEL_NAMES['tiny'], 'vram': 1, 'relative_speed': 39},
+            'base': {'name': WHISPER_MODEL_NAMES['base'], 'vram': 1, 'relative_speed': 16},
+            'small': {'name': WHISPER_MODEL_NAMES['small'], 'vram': 2, 'relative_speed': 6},
+            'medium': {'name': WHISPER_MODEL_NAMES['medium'], 'vram': 5, 'relative_speed': 2},
+            'large': {'name': WHISPER_MODEL_NAMES['large'], 'vram': 10, 'relative_speed': 1},
         }
         
         # تنظیمات پیش‌فرض
@@ -48,7 +74,7 @@ class SpeechProcessorCore:
         
     def load_model(self, model_size: str = 'base') -> whisper.Whisper:
         """
-        بارگذاری مدل Whisper
+        دریافت مدل Whisper از رجیستری مشترک پردازه
         
         Args:
             model_size: اندازه مدل (tiny, base, small, medium, large)
@@ -56,69 +82,60 @@ class SpeechProcessorCore:
         Returns:
             whisper.Whisper: مدل بارگذاری شده
         """
-        if model_size not in self.models:
-            try:
-                model_name = self.model_configs[model_size]['name']
-                self.logger.info(f"Loading Whisper model: {model_name}")
-                
-                self.models[model_size] = whisper.load_model(
-                    model_name,
-                    device=self.device
-                )
-                
-                self.logger.info(f"Model {model_name} loaded successfully")
-            except Exception as e:
-                self.logger.error(f"Error loading model {model_size}: {str(e)}")
-                # بازگشت به مدل پیش‌فرض
-                if model_size != self.default_model:
-                    return self.load_model(self.default_model)
-                raise
-        
-        return self.models[model_size]
+        try:
+            return self.registry.get(self.model_configs[model_size]['name'])
+        except Exception as e:
+            self.logger.error(f"Error loading model {model_size}: {str(e)}")
+            # بازگشت به مدل پیش‌فرض
+            if model_size != self.default_model:
+                return self.load_model(self.default_model)
+            raise
     
     def process_audio_file(self, audio_file_path: str, language: str = 'fa',
-                          model_size: str = 'base') -> Dict[str, Any]:
+                          model_size: str = 'base',
+                          checkpoint: Optional[Dict[str, Any]] = None,
+                          on_checkpoint: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         پردازش فایل صوتی و تبدیل به متن
         
+        فایل فقط یک بار با ffmpeg به بافر 16kHz float32 رمزگشایی می‌شود و همان بافر
+        برای تحلیل کیفیت، تخمین نویز و model.transcribe استفاده می‌شود (بدون فایل موقت).
+        صوت‌های طولانی در مرزهای سکوت بخش‌بندی و به‌صورت موازی رونویسی می‌شوند.
+        
         Args:
             audio_file_path: مسیر فایل صوتی
             language: زبان گفتار
             model_size: اندازه مدل
+            checkpoint: نقطهٔ بازیابی قبلی (برای ادامهٔ رونویسی بخش‌بندی‌شده)
+            on_checkpoint: فراخوانی پس از تکمیل هر بخش با وضعیت جدید نقطهٔ بازیابی
+            on_partial: فراخوانی با متن و اطمینان هر بخش به محض تکمیل (برای ارسال جریانی)
             
         Returns:
             dict: نتیجه تبدیل شامل متن و اطلاعات اضافی
         """
         try:
-            # تحلیل کیفیت صوت
-            audio_quality = self._analyze_audio_quality(audio_file_path)
+            # رمزگشایی یک‌باره
+            decoded = self.decode_audio(audio_file_path)
             
-            # پیش‌پردازش صوت
-            processed_audio_path = self._preprocess_audio(audio_file_path)
-            
-            # بارگذاری مدل
-            model = self.load_model(model_size)
+            # تحلیل کیفیت صوت
+            audio_quality = self._analyze_audio_quality(decoded)
             
             # تنظیمات تبدیل
-            options = {
-                'language': language if language != 'auto' else None,
-                'task': 'transcribe',
-                'temperature': 0.0,  # برای نتایج قطعی‌تر
-                'compression_ratio_threshold': 2.4,
-                'logprob_threshold': -1.0,
-                'no_speech_threshold': 0.6,
-                'condition_on_previous_text': True,
-                'initial_prompt': self._get_initial_prompt(language),
-                'word_timestamps': True,
-            }
-            
-            # تبدیل گفتار به متن
-            self.logger.info(f"Starting transcription with model {model_size}")
-            result = model.transcribe(processed_audio_path, **options)
+            options = self._get_transcribe_options(language)
             
-            # پاکسازی فایل موقت
-            if processed_audio_path != audio_file_path:
-                os.remove(processed_audio_path)
+            if self._should_segment(decoded):
+                result = self._transcribe_segmented(
+                    decoded, language, model_size, options, checkpoint, on_checkpoint,
+                    on_partial
+                )
+            else:
+                # بارگذاری مدل
+                model = self.load_model(model_size)
+                
+                # تبدیل گفتار به متن (Whisper آرایه 16kHz float32 را مستقیماً می‌پذیرد)
+                self.logger.info(f"Starting transcription with model {model_size}")
+                result = model.transcribe(decoded.samples, **options)
             
             # پردازش نتیجه
             processed_result = self._process_transcription_result(result, audio_quality)
@@ -129,46 +146,335 @@ class SpeechProcessorCore:
             self.logger.error(f"Error in process_audio_file: {str(e)}")
             raise
     
-    def _analyze_audio_quality(self, audio_path: str) -> Dict[str, Any]:
+    def _get_transcribe_options(self, language: str) -> Dict[str, Any]:
+        """تنظیمات model.transcribe"""
+        return {
+            'language': language if language != 'auto' else None,
+            'task': 'transcribe',
+            'temperature': 0.0,  # برای نتایج قطعی‌تر
+            'compression_ratio_threshold': 2.4,
+            'logprob_threshold': -1.0,
+            'no_speech_threshold': 0.6,
+            'condition_on_previous_text': True,
+            'initial_prompt': self._get_initial_prompt(language),
+            'word_timestamps': True,
+        }
+    
+    def _should_segment(self, decoded: DecodedAudio) -> bool:
+        """آیا صوت باید بخش‌بندی شود؟"""
+        return (
+            ADVANCED_SETTINGS['USE_VAD']
+            and decoded.duration >= SEGMENTATION_SETTINGS['MIN_DURATION']
+        )
+    
+    def _transcribe_segmented(self, decoded: DecodedAudio, language: str,
+                              model_size: str, options: Dict[str, Any],
+                              checkpoint: Optional[Dict[str, Any]],
+                              on_checkpoint: Optional[Callable[[Dict[str, Any]], None]],
+                              on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
-        تحلیل کیفیت فایل صوتی
+        رونویسی بخش‌بندی‌شده با ادامه از آخرین نقطهٔ بازیابی
+        
+        برنامهٔ بخش‌ها در نقطهٔ بازیابی ذخیره می‌شود تا تلاش مجدد همان مرزها را
+        استفاده کند؛ فقط بخش‌های تکمیل‌نشده دوباره رونویسی می‌شوند.
+        """
+        state = self._resume_checkpoint(checkpoint, decoded, language, model_size)
+        if state is None:
+            plan = plan_segments(
+                decoded.samples, decoded.sample_rate,
+                target_seconds=SEGMENTATION_SETTINGS['TARGET_SECONDS'],
+                max_seconds=SEGMENTATION_SETTINGS['MAX_SECONDS'],
+                min_silence_ms=SEGMENTATION_SETTINGS['MIN_SILENCE_MS'],
+            )
+            state = {
+                'language': language,
+                'model': model_size,
+                'sample_count': int(decoded.samples.size),
+                'plan': [[int(start), int(end)] for start, end in plan],
+                'completed': {},
+            }
+            if on_checkpoint:
+                on_checkpoint(state)
+        
+        plan = state['plan']
+        completed = state['completed']
+        pending = [i for i in range(len(plan)) if str(i) not in completed]
+        self.logger.info(
+            f"Segmented transcription: {len(plan)} segments, "
+            f"{len(plan) - len(pending)} restored from checkpoint"
+        )
+        
+        for index, raw in self._run_segments(decoded, plan, pending, model_size, options):
+            offset = plan[index][0] / float(decoded.sample_rate)
+            completed[str(index)] = self._compact_segment_result(raw, offset)
+            if on_checkpoint:
+                on_checkpoint(state)
+            if on_partial:
+                on_partial(self._partial_result(index, plan, completed, decoded.sample_rate))
+        
+        return self._stitch_segments(plan, completed)
+    
+    def _resume_checkpoint(self, checkpoint: Optional[Dict[str, Any]], decoded: DecodedAudio,
+                           language: str, model_size: str) -> Optional[Dict[str, Any]]:
+        """نقطهٔ بازیابی فقط برای همان صوت، زبان و مدل معتبر است"""
+        if not checkpoint or not checkpoint.get('plan'):
+            return None
+        if (
+            checkpoint.get('sample_count') != int(decoded.samples.size)
+            or checkpoint.get('language') != language
+            or checkpoint.get('model') != model_size
+        ):
+            self.logger.info("Discarding stale transcription checkpoint")
+            return None
+        checkpoint.setdefault('completed', {})
+        return checkpoint
+    
+    def _run_segments(self, decoded: DecodedAudio, plan: List[List[int]], pending: List[int],
+                      model_size: str, options: Dict[str, Any]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        رونویسی بخش‌های باقی‌مانده؛ به ترتیب تکمیل برمی‌گرداند
+        
+        کارگرهای prefork سلری daemon هستند و نمی‌توانند پردازهٔ فرزند بسازند؛ در این
+        حالت بخش‌ها روی استخر thread و با نسخه‌های قرض‌گرفته از رجیستری مشترک
+        (در سقف MAX_LOADED_MODELS) رونویسی می‌شوند.
+        با WORKERS=1 بخش‌ها در همین پردازه و به ترتیب رونویسی می‌شوند.
+        """
+        workers = min(SEGMENTATION_SETTINGS['WORKERS'], len(pending))
+        if workers <= 1:
+            model = self.load_model(model_size)
+            for index in pending:
+                start, end = plan[index]
+                yield index, model.transcribe(decoded.samples[start:end], **options)
+            return
+        
+        model_name = self.model_configs[model_size]['name']
+        pool_args = (
+            model_name, self.device, SEGMENTATION_SETTINGS['WORKERS'], self.registry.download_root
+        )
+        if transcription_pool.can_fork_workers():
+            pool = transcription_pool.get_pool(
+                *pool_args, start_method=SEGMENTATION_SETTINGS['START_METHOD']
+            )
+            transcribe = transcription_pool.transcribe_segment
+        else:
+            self.logger.warning(
+                f"Daemon worker cannot start transcription processes; "
+                f"transcribing {len(pending)} segments on a thread pool"
+            )
+            pool = transcription_pool.get_thread_pool(SEGMENTATION_SETTINGS['WORKERS'])
+            transcribe = partial(transcription_pool.transcribe_leased, self.registry, model_name)
+        futures = [
+            pool.submit(transcribe, index, decoded.samples[plan[index][0]:plan[index][1]], options)
+            for index in pending
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BrokenProcessPool:
+            transcription_pool.discard_pool(*pool_args)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def _compact_segment_result(self, result: Dict[str, Any], offset: float) -> Dict[str, Any]:
+        """نتیجهٔ یک بخش با زمان‌های مطلق و بدون فیلدهای حجیم (مثل tokens) برای ذخیره"""
+        segments = []
+        for segment in result.get('segments', []):
+            segments.append({
+                'start': round(float(segment['start']) + offset, 3),
+                'end': round(float(segment['end']) + offset, 3),
+                'text': segment['text'],
+                'avg_logprob': float(segment.get('avg_logprob', 0.0)),
+                'no_speech_prob': float(segment.get('no_speech_prob', 0.0)),
+                'words': [
+                    {
+                        'word': word['word'],
+                        'start': round(float(word['start']) + offset, 3),
+                        'end': round(float(word['end']) + offset, 3),
+                        'probability': float(word.get('probability', 1.0)),
+                    }
+                    for word in segment.get('words', [])
+                ],
+            })
+        return {
+            'text': result.get('text', '').strip(),
+            'language': result.get('language'),
+            'segments': segments,
+        }
+    
+    def _partial_result(self, index: int, plan: List[List[int]],
+                        completed: Dict[str, Any], sample_rate: int) -> Dict[str, Any]:
+        """نتیجهٔ جزئی یک بخش تکمیل‌شده (بخش‌ها به ترتیب تکمیل می‌رسند، نه ترتیب زمانی)"""
+        part = completed[str(index)]
+        segments = part['segments']
+        confidence = (
+            sum(max(0, min(1, segment['avg_logprob'] + 1)) for segment in segments) / len(segments)
+            if segments else 0.0
+        )
+        return {
+            'index': index,
+            'total': len(plan),
+            'completed': len(completed),
+            'start': round(plan[index][0] / float(sample_rate), 3),
+            'end': round(plan[index][1] / float(sample_rate), 3),
+            'text': part['text'],
+            'confidence': round(confidence, 3),
+            'segments': [
+                {
+                    'start': segment['start'],
+                    'end': segment['end'],
+                    'text': segment['text'],
+                    'confidence': round(max(0, min(1, segment['avg_logprob'] + 1)), 3),
+                }
+                for segment in segments
+            ],
+        }
+    
+    def _stitch_segments(self, plan: List[List[int]], completed: Dict[str, Any]) -> Dict[str, Any]:
+        """اتصال نتایج بخش‌ها به ترتیب زمانی در قالب خروجی Whisper"""
+        texts, segments, words = [], [], []
+        language = None
+        for index in range(len(plan)):
+            part = completed[str(index)]
+            if part['text']:
+                texts.append(part['text'])
+            language = language or part.get('language')
+            for segment in part['segments']:
+                segments.append(dict(segment, id=len(segments)))
+                words.extend(segment['words'])
+        return {
+            'text': ' '.join(texts),
+            'language': language or 'unknown',
+            'segments': segments,
+            'words': words,
+        }
+    
+    def decode_audio(self, audio_path: str) -> DecodedAudio:
+        """
+        رمزگشایی فایل با یک فرایند ffmpeg به PCM float32 مونو 16kHz
+        
+        خروجی ffmpeg به‌صورت جریانی خوانده می‌شود: معیارهای کیفیت روی صوت خام با
+        analyze_stream تکه‌به‌تکه محاسبه می‌شوند و فقط نمونه‌های ورودی Whisper نگه
+        داشته می‌شوند. با فعال بودن DENOISE_AUDIO، گراف فیلتر خروجی دو کاناله می‌سازد:
+        کانال اول صوت خام (برای تحلیل کیفیت) و کانال دوم صوت فیلترشده (برای Whisper).
+        اطلاعات فایل مبدا از stderr همان فرایند خوانده می‌شود و ffprobe جداگانه لازم نیست.
         
         Args:
             audio_path: مسیر فایل صوتی
             
         Returns:
-            dict: اطلاعات کیفیت صوت
+            DecodedAudio: نمونه‌های Whisper، معیارهای کیفیت و اطلاعات فایل مبدا
         """
+        denoise = ADVANCED_SETTINGS['DENOISE_AUDIO']
+        audio = (
+            ffmpeg.input(audio_path).audio
+            .filter('aresample', self.sample_rate)
+            .filter('aformat', sample_fmts='flt', channel_layouts='mono')
+        )
+        if denoise:
+            split = audio.filter_multi_output('asplit', 2)
+            clean = (
+                split[1]
+                .filter('highpass', f=100)
+                .filter('lowpass', f=8000)
+                .filter('afftdn', nf=-20)  # حذف نویز پایه
+            )
+            audio = ffmpeg.filter([split[0], clean], 'amerge', inputs=2)
+        
+        process = (
+            ffmpeg.output(audio, 'pipe:', format='f32le', acodec='pcm_f32le', ar=self.sample_rate)
+            .global_args('-nostdin', '-hide_banner', '-nostats')
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        # stderr در نخ جدا خوانده می‌شود تا پر شدن pipe آن ffmpeg را متوقف نکند
+        log: List[bytes] = []
+        reader = threading.Thread(target=lambda: log.append(process.stderr.read()), daemon=True)
+        reader.start()
+        
+        # کانال آخر ورودی Whisper است (در حالت بدون نویزگیری همان کانال خام)
+        samples = bytearray()
         try:
-            # اطلاعات پایه با ffprobe
-            probe = ffmpeg.probe(audio_path)
-            audio_stream = next(
-                (stream for stream in probe['streams'] if stream['codec_type'] == 'audio'),
-                None
+            quality_metrics = analyze_stream(
+                process.stdout, self.sample_rate,
+                chunk_seconds=ADVANCED_SETTINGS['ANALYSIS_CHUNK_SECONDS'],
+                channels=2 if denoise else 1,
+                on_frames=lambda frames: samples.extend(frames[:, -1].tobytes()),
             )
+        finally:
+            process.stdout.close()
+            process.wait()
+            reader.join()
+        
+        stderr = log[0] if log else b''
+        if process.returncode:
+            self.logger.error(f"Error decoding audio: {stderr.decode('utf-8', errors='ignore')[-500:]}")
+            raise ffmpeg.Error('ffmpeg', b'', stderr)
+        
+        return DecodedAudio(
+            samples=np.frombuffer(samples, dtype=np.float32),
+            sample_rate=self.sample_rate,
+            source_info=self._parse_source_info(stderr.decode('utf-8', errors='ignore')),
+            quality_metrics=quality_metrics,
+        )
+    
+    def _parse_source_info(self, ffmpeg_log: str) -> Dict[str, Any]:
+        """استخراج مدت، bitrate، نرخ نمونه‌برداری و کانال‌های فایل مبدا از لاگ ffmpeg"""
+        info: Dict[str, Any] = {}
+        
+        duration_match = _DURATION_RE.search(ffmpeg_log)
+        if duration_match:
+            hours, minutes, seconds = duration_match.group(1, 2, 3)
+            info['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            if duration_match.group(4):
+                info['bitrate'] = int(duration_match.group(4)) * 1000
+        
+        stream_match = _AUDIO_STREAM_RE.search(ffmpeg_log)
+        if stream_match:
+            info['sample_rate'] = int(stream_match.group(1))
+            layout = stream_match.group(2)
+            channels_match = re.match(r'(\d+) channels', layout)
+            if channels_match:
+                info['channels'] = int(channels_match.group(1))
+            else:
+                info['channels'] = _CHANNEL_LAYOUTS.get(layout, 1)
+        
+        return info
+    
+    def _analyze_audio_quality(self, decoded: DecodedAudio) -> Dict[str, Any]:
+        """
+        تحلیل کیفیت فایل صوتی
+        
+        معیارهای محاسبه‌شده حین رمزگشایی استفاده می‌شوند؛ در نبود آن‌ها، بافر Whisper
+        در تکه‌های محدود تحلیل می‌شود.
+        
+        Args:
+            decoded: صوت رمزگشایی‌شده
             
-            if not audio_stream:
+        Returns:
+            dict: اطلاعات کیفیت صوت
+        """
+        try:
+            if decoded.samples.size == 0:
                 raise ValueError("No audio stream found in file")
             
-            # استخراج اطلاعات
-            duration = float(probe['format']['duration'])
-            bitrate = int(probe['format']['bit_rate'])
-            sample_rate = int(audio_stream['sample_rate'])
-            channels = audio_stream['channels']
-            
-            # خواندن داده‌های صوتی برای تحلیل عمیق‌تر
-            audio_data, sr = self._load_audio(audio_path)
-            
-            # محاسبه معیارهای کیفیت
-            rms_energy = np.sqrt(np.mean(audio_data**2))
-            silence_ratio = np.sum(np.abs(audio_data) < 0.01) / len(audio_data)
-            
-            # تخمین سطح نویز (ساده)
-            noise_level = self._estimate_noise_level(audio_data, sr)
+            # اطلاعات پایه از هدر فایل مبدا (در نبود، از خود بافر)
+            source = decoded.source_info
+            duration = float(source.get('duration') or decoded.duration)
+            sample_rate = int(source.get('sample_rate') or decoded.sample_rate)
+            channels = source.get('channels', 1)
+            bitrate = int(source.get('bitrate') or sample_rate * channels * 16)
+            
+            # معیارهای کیفیت به‌صورت برداری و در تکه‌های محدود
+            metrics = decoded.quality_metrics or analyze_samples(
+                decoded.samples, decoded.sample_rate,
+                chunk_seconds=ADVANCED_SETTINGS['ANALYSIS_CHUNK_SECONDS'],
+            )
             
             # امتیاز کیفیت کلی
             quality_score = self._calculate_audio_quality_score(
-                bitrate, sample_rate, silence_ratio, noise_level
+                bitrate, sample_rate, metrics['silence_ratio'], metrics['noise_level'],
+                clipping_ratio=metrics['clipping_ratio'],
             )
             
             return {
@@ -176,119 +482,26 @@ class SpeechProcessorCore:
                 'bitrate': bitrate,
                 'sample_rate': sample_rate,
                 'channels': channels,
-                'rms_energy': float(rms_energy),
-                'silence_ratio': float(silence_ratio),
-                'noise_level': noise_level,
+                'rms_energy': metrics['rms_energy'],
+                'silence_ratio': metrics['silence_ratio'],
+                'noise_floor': metrics['noise_floor'],
+                'noise_level': metrics['noise_level'],
+                'clipping_ratio': metrics['clipping_ratio'],
+                'peak': metrics['peak'],
                 'quality_score': quality_score,
             }
             
         except Exception as e:
             self.logger.error(f"Error analyzing audio quality: {str(e)}")
             return {
-                'duration': 0,
+                'duration': decoded.duration,
                 'quality_score': 0.5,
                 'error': str(e)
             }
     
-    def _preprocess_audio(self, audio_path: str) -> str:
-        """
-        پیش‌پردازش فایل صوتی
-        
-        Args:
-            audio_path: مسیر فایل ورودی
-            
-        Returns:
-            str: مسیر فایل پردازش شده
-        """
-        try:
-            # ایجاد فایل موقت
-            temp_file = tempfile.NamedTemporaryFile(
-                suffix='.wav',
-                delete=False
-            )
-            output_path = temp_file.name
-            temp_file.close()
-            
-            # تبدیل به فرمت مناسب برای Whisper
-            stream = ffmpeg.input(audio_path)
-            stream = ffmpeg.output(
-                stream,
-                output_path,
-                acodec='pcm_s16le',
-                ac=1,  # تبدیل به مونو
-                ar=self.sample_rate,  # 16kHz
-                loglevel='error'
-            )
-            
-            # اعمال فیلترهای صوتی
-            stream = stream.global_args(
-                '-af',
-                'highpass=f=100,lowpass=f=8000,afftdn=nf=-20'  # حذف نویز پایه
-            )
-            
-            ffmpeg.run(stream, overwrite_output=True)
-            
-            return output_path
-            
-        except Exception as e:
-            self.logger.error(f"Error preprocessing audio: {str(e)}")
-            # در صورت خطا، فایل اصلی را برگردان
-            return audio_path
-    
-    def _load_audio(self, audio_path: str) -> Tuple[np.ndarray, int]:
-        """بارگذاری داده‌های صوتی"""
-        try:
-            # استفاده از ffmpeg برای خواندن صوت
-            out, _ = (
-                ffmpeg.input(audio_path)
-                .output('-', format='s16le', acodec='pcm_s16le', ac=1, ar=self.sample_rate)
-                .run(capture_stdout=True, capture_stderr=True)
-            )
-            
-            # تبدیل به numpy array
-            audio_data = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
-            
-            return audio_data, self.sample_rate
-            
-        except Exception as e:
-            self.logger.error(f"Error loading audio: {str(e)}")
-            raise
-    
-    def _estimate_noise_level(self, audio_data: np.ndarray, sample_rate: int) -> str:
-        """
-        تخمین سطح نویز پس‌زمینه
-        
-        Args:
-            audio_data: داده‌های صوتی
-            sample_rate: نرخ نمونه‌برداری
-            
-        Returns:
-            str: سطح نویز (low, medium, high)
-        """
-        # محاسبه انرژی در بخش‌های کوتاه
-        frame_length = int(0.02 * sample_rate)  # 20ms frames
-        frames = [
-            audio_data[i:i+frame_length]
-            for i in range(0, len(audio_data)-frame_length, frame_length)
-        ]
-        
-        # انرژی هر فریم
-        frame_energies = [np.sqrt(np.mean(frame**2)) for frame in frames]
-        
-        # تخمین نویز از کم‌انرژی‌ترین فریم‌ها
-        sorted_energies = sorted(frame_energies)
-        noise_floor = np.mean(sorted_energies[:len(sorted_energies)//10])
-        
-        # طبقه‌بندی سطح نویز
-        if noise_floor < 0.01:
-            return 'low'
-        elif noise_floor < 0.03:
-            return 'medium'
-        else:
-            return 'high'
-    
     def _calculate_audio_quality_score(self, bitrate: int, sample_rate: int,
-                                     silence_ratio: float, noise_level: str) -> float:
+                                     silence_ratio: float, noise_level: str,
+                                     clipping_ratio: float = 0.0) -> float:
         """محاسبه امتیاز کیفیت صوت"""
         score = 0.0
         
@@ -318,7 +531,11 @@ class SpeechProcessorCore:
         noise_scores = {'low': 0.3, 'medium': 0.2, 'high': 0.1}
         score += noise_scores.get(noise_level, 0.1)
         
-        return min(score, 1.0)
+        # جریمهٔ اعوجاج ناشی از clipping
+        if clipping_ratio > ADVANCED_SETTINGS['CLIPPING_RATIO_THRESHOLD']:
+            score -= 0.1
+        
+        return max(min(score, 1.0), 0.0)
     
     def _get_initial_prompt(self, language: str) -> str:
         """
@@ -449,7 +666,7 @@ class SpeechProcessorCore:
         estimated_time = (duration / relative_speed) * hardware_factor
         
         # اضافه کردن زمان بارگذاری مدل اگر لود نشده
-        if model_size not in self.models:
+        if not self.registry.is_loaded(model_size):
             estimated_time += 5  # 5 ثانیه برای بارگذاری
         
         return estimated_time
\ No newline at end of file
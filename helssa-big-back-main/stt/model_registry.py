@@ -0,0 +1,232 @@
+"""
+رجیستری سطح پردازهٔ مدل‌های Whisper
+Process-level Whisper model registry with LRU eviction
+
+مدل‌ها یک بار در هر پردازه بارگذاری و بین همهٔ نمونه‌های SpeechProcessorCore به
+اشتراک گذاشته می‌شوند. با بارگذاری پیش از fork (سیگنال worker_init سلری)، وزن‌های
+فقط‌خواندنی به‌صورت copy-on-write بین کارگرها مشترک می‌مانند.
+این ماژول به Django وابسته نیست تا پردازه‌های کارگر رونویسی نیز از آن استفاده کنند.
+"""
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# نام مدل Whisper برای هر اندازه
+WHISPER_MODEL_NAMES = {
+    'tiny': 'tiny',
+    'base': 'base',
+    'small': 'small',
+    'medium': 'medium',
+    'large': 'large-v3',
+}
+
+
+def resolve_device(device: str = 'auto') -> str:
+    """تعیین دستگاه (auto: cuda در صورت دسترسی)"""
+    if device and device != 'auto':
+        return device
+    import torch
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+class WhisperModelRegistry:
+    """
+    نگهداری مدل‌های بارگذاری‌شده با سقف تعداد (LRU)
+
+    - هر مدل فقط یک بار بارگذاری می‌شود، حتی با درخواست هم‌زمان چند thread
+    - با رسیدن به max_models، کم‌استفاده‌ترین مدل غیرپیش‌بارگذاری‌شده کنار گذاشته می‌شود
+    - زمان بارگذاری هر مدل برای پایش ثبت می‌شود
+    - نسخه‌های اضافهٔ lease (برای رونویسی هم‌زمان) نیز در همین سقف شمرده می‌شوند
+    """
+
+    def __init__(self, max_models: int = 2, device: str = 'auto',
+                 download_root: Optional[str] = None):
+        self.max_models = max(1, max_models)
+        self.device = resolve_device(device)
+        self.download_root = download_root
+        self._models: 'OrderedDict[str, Any]' = OrderedDict()
+        self._pinned = set()
+        self._load_times: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # نسخه‌های اضافهٔ هر مدل، شناسهٔ نسخه‌های قرض‌داده‌شده و جاهای رزروشده برای بارگذاری
+        self._copies: Dict[str, List[Any]] = {}
+        self._leased = set()
+        self._reserved = 0
+        self._returned = threading.Condition(self._lock)
+
+    def get(self, model_size: str):
+        """مدل بارگذاری‌شده (در صورت نیاز بارگذاری)"""
+        name = WHISPER_MODEL_NAMES.get(model_size, model_size)
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._models.move_to_end(name)
+                return model
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._models.get(name)
+                if model is not None:
+                    self._models.move_to_end(name)
+                    return model
+            model = self._load(name)
+            with self._lock:
+                self._models[name] = model
+                self._evict()
+            return model
+
+    @contextmanager
+    def lease(self, model_size: str) -> Iterator[Any]:
+        """
+        قرض انحصاری یک نسخهٔ مدل برای رونویسی هم‌زمان در چند thread
+
+        hookهای kv-cache ویسپر روی خود مدل نصب می‌شوند، پس دو رونویسی هم‌زمان نباید
+        یک نسخه را به کار ببرند. ابتدا نسخهٔ اصلی (همان get) قرض داده می‌شود؛ نسخهٔ
+        اضافه فقط وقتی بارگذاری می‌شود که تعداد کل مدل‌های پردازه از max_models کمتر
+        باشد و در غیر این صورت درخواست تا بازگشت یک نسخه منتظر می‌ماند.
+        """
+        name = WHISPER_MODEL_NAMES.get(model_size, model_size)
+        model = self._checkout(name)
+        try:
+            yield model
+        finally:
+            with self._returned:
+                self._leased.discard(id(model))
+                self._returned.notify()
+
+    def preload(self, model_sizes: Iterable[str], freeze: bool = False) -> List[str]:
+        """
+        بارگذاری و سنجاق کردن مدل‌ها (بدون خروج از LRU)
+
+        Args:
+            model_sizes: اندازه‌های مدل
+            freeze: انتقال اشیای فعلی به نسل دائمی gc تا پیمایش gc در پردازه‌های
+                fork شده صفحات حافظهٔ مشترک را کپی نکند
+        """
+        loaded = []
+        for model_size in model_sizes:
+            name = WHISPER_MODEL_NAMES.get(model_size, model_size)
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error preloading Whisper model {name}: {str(e)}")
+                continue
+            with self._lock:
+                self._pinned.add(name)
+            loaded.append(name)
+        if freeze and loaded:
+            gc.collect()
+            gc.freeze()
+        return loaded
+
+    def is_loaded(self, model_size: str) -> bool:
+        """آیا مدل در این پردازه بارگذاری شده است؟"""
+        with self._lock:
+            return WHISPER_MODEL_NAMES.get(model_size, model_size) in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        """وضعیت رجیستری"""
+        with self._lock:
+            return {
+                'device': self.device,
+                'loaded': list(self._models),
+                'pinned': sorted(self._pinned),
+                'max_models': self.max_models,
+                'copies': {name: len(copies) for name, copies in self._copies.items() if copies},
+                'load_times': dict(self._load_times),
+            }
+
+    def clear(self) -> None:
+        """تخلیهٔ همهٔ مدل‌ها"""
+        with self._lock:
+            self._models.clear()
+            self._pinned.clear()
+            self._copies.clear()
+
+    # ---------- Internal ----------
+    def _load(self, name: str):
+        import whisper
+
+        logger.info(f"Loading Whisper model: {name} on {self.device}")
+        started = time.perf_counter()
+        model = whisper.load_model(name, device=self.device, download_root=self.download_root)
+        model.eval()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._load_times[name] = elapsed
+        logger.info(f"Model {name} loaded in {elapsed:.2f}s")
+        return model
+
+    def _checkout(self, name: str):
+        """نسخهٔ آزاد مدل، یا بارگذاری نسخهٔ اضافه در صورت وجود جا در سقف"""
+        primary = self.get(name)
+        with self._returned:
+            while True:
+                for model in (primary, *self._copies.get(name, ())):
+                    if id(model) not in self._leased:
+                        self._leased.add(id(model))
+                        return model
+                if self._resident() < self.max_models:
+                    self._reserved += 1
+                    break
+                self._returned.wait()
+
+        try:
+            model = self._load(name)
+        finally:
+            with self._lock:
+                self._reserved -= 1
+        with self._lock:
+            self._copies.setdefault(name, []).append(model)
+            self._leased.add(id(model))
+        return model
+
+    def _resident(self) -> int:
+        """تعداد مدل‌های موجود در حافظهٔ پردازه (با قفل فراخوانده می‌شود)"""
+        copies = sum(len(models) for models in self._copies.values())
+        return len(self._models) + copies + self._reserved
+
+    def _evict(self) -> None:
+        """
+        کنار گذاشتن نسخه‌های اضافهٔ آزاد و سپس کم‌استفاده‌ترین مدل‌های سنجاق‌نشده
+        (با قفل فراخوانده می‌شود)
+        """
+        for name, copies in self._copies.items():
+            for model in [model for model in copies if id(model) not in self._leased]:
+                if self._resident() <= self.max_models:
+                    return
+                copies.remove(model)
+                logger.info(f"Released extra copy of Whisper model {name}")
+        evictable = [name for name in self._models if name not in self._pinned]
+        while self._resident() > self.max_models and evictable:
+            name = evictable.pop(0)
+            del self._models[name]
+            logger.info(f"Evicted Whisper model {name} from registry")
+
+
+_registry: Optional[WhisperModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> WhisperModelRegistry:
+    """رجیستری این پردازه بر اساس WHISPER_SETTINGS"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from .settings import WHISPER_SETTINGS
+
+                _registry = WhisperModelRegistry(
+                    max_models=WHISPER_SETTINGS['MAX_LOADED_MODELS'],
+                    device=WHISPER_SETTINGS['DEVICE'],
+                    download_root=WHISPER_SETTINGS['MODEL_CACHE_DIR'],
+                )
+    return _registry
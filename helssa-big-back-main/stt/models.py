@@ -49,6 +49,14 @@ class STTTask(BaseModel):
         verbose_name='فایل صوتی'
     )
     
+    # هش محتوای فایل (sha256) برای حذف پردازش تکراری
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name='هش محتوای فایل'
+    )
+    
     # اطلاعات فایل
     file_size = models.PositiveIntegerField(
         verbose_name='حجم فایل (بایت)',
@@ -145,6 +153,13 @@ class STTTask(BaseModel):
         verbose_name='اطلاعات اضافی'
     )
     
+    # نقطهٔ بازیابی رونویسی بخش‌بندی‌شده (برنامهٔ بخش‌ها و نتایج تکمیل‌شده)
+    checkpoint = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='نقطه بازیابی رونویسی'
+    )
+    
     class Meta:
         verbose_name = 'وظیفه تبدیل گفتار به متن'
         verbose_name_plural = 'وظایف تبدیل گفتار به متن'
@@ -153,6 +168,7 @@ class STTTask(BaseModel):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['task_id']),
             models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'content_hash', 'status']),
         ]
     
     def __str__(self):
@@ -333,4 +349,81 @@ class STTUsageStats(BaseModel):
         ]
     
     def __str__(self):
-        return f"STT Stats - {self.user} - {self.date}"
\ No newline at end of file
+        return f"STT Stats - {self.user} - {self.date}"
+
+
+class STTTranscriptCache(BaseModel):
+    """
+    مخزن پایدار نتایج بر اساس محتوا
+    
+    نتیجهٔ رونویسی با کلید (هش محتوا، زبان، مدل) ذخیره می‌شود تا آپلودهای تکراری
+    بدون اجرای Whisper پاسخ داده شوند؛ بین workerها مشترک است و با ری‌استارت از بین نمی‌رود.
+    """
+    
+    content_hash = models.CharField(
+        max_length=64,
+        verbose_name='هش محتوای فایل'
+    )
+    
+    language = models.CharField(
+        max_length=10,
+        verbose_name='زبان'
+    )
+    
+    model_used = models.CharField(
+        max_length=50,
+        verbose_name='مدل Whisper'
+    )
+    
+    # نتیجه
+    transcription = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='متن تبدیل شده'
+    )
+    
+    confidence_score = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='امتیاز اطمینان'
+    )
+    
+    duration = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='مدت زمان (ثانیه)'
+    )
+    
+    quality_control = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='خلاصه کنترل کیفیت'
+    )
+    
+    # آمار استفاده
+    hit_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد استفاده مجدد'
+    )
+    
+    class Meta:
+        verbose_name = 'نتیجه ذخیره‌شده STT'
+        verbose_name_plural = 'نتایج ذخیره‌شده STT'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash', 'language', 'model_used'],
+                name='stt_transcript_cache_key'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"STT Transcript {self.content_hash[:12]} - {self.language} - {self.model_used}"
+    
+    def as_result(self) -> dict:
+        """قالب نتیجهٔ کش‌شده برای APIIngressCore"""
+        return {
+            'transcription': self.transcription,
+            'confidence_score': self.confidence_score,
+            'duration': self.duration,
+            'quality_control': self.quality_control,
+        }
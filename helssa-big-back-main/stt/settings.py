@@ -18,6 +18,17 @@ WHISPER_SETTINGS = {
     
     # Device (cuda/cpu)
     'DEVICE': getattr(settings, 'STT_DEVICE', 'auto'),  # auto will check CUDA availability
+    
+    # مدل‌هایی که هنگام شروع worker پیش‌بارگذاری می‌شوند
+    'PRELOAD_MODELS': getattr(settings, 'STT_PRELOAD_MODELS', [
+        getattr(settings, 'STT_DEFAULT_MODEL', 'base')
+    ]),
+    
+    # حداکثر مدل‌های هم‌زمان در حافظهٔ هر پردازه (LRU)
+    'MAX_LOADED_MODELS': getattr(settings, 'STT_MAX_LOADED_MODELS', 2),
+    
+    # پیش‌بارگذاری هنگام شروع worker سلری (برای workerهایی که صف STT ندارند غیرفعال شود)
+    'PRELOAD_ON_WORKER_START': getattr(settings, 'STT_PRELOAD_ON_WORKER_START', True),
 }
 
 # تنظیمات فایل صوتی
@@ -193,6 +204,53 @@ ADVANCED_SETTINGS = {
     
     # Batch processing
     'BATCH_SIZE': getattr(settings, 'STT_BATCH_SIZE', 1),
+    
+    # طول تکه‌ها در تحلیل جریانی کیفیت صوت (ثانیه)
+    'ANALYSIS_CHUNK_SECONDS': getattr(settings, 'STT_ANALYSIS_CHUNK_SECONDS', 30),
+    
+    # آستانهٔ نسبت نمونه‌های clip شده برای کاهش امتیاز کیفیت
+    'CLIPPING_RATIO_THRESHOLD': getattr(settings, 'STT_CLIPPING_RATIO_THRESHOLD', 0.001),
+}
+
+# تنظیمات بخش‌بندی و رونویسی موازی صوت‌های طولانی
+SEGMENTATION_SETTINGS = {
+    # صوت‌های کوتاه‌تر از این مقدار (ثانیه) یکجا رونویسی می‌شوند
+    'MIN_DURATION': getattr(settings, 'STT_SEGMENTATION_MIN_DURATION', 120),
+    
+    # طول هدف و حداکثر طول هر بخش (ثانیه)
+    'TARGET_SECONDS': getattr(settings, 'STT_SEGMENT_TARGET_SECONDS', 30),
+    'MAX_SECONDS': getattr(settings, 'STT_SEGMENT_MAX_SECONDS', 45),
+    
+    # حداقل طول سکوت برای برش (میلی‌ثانیه)
+    'MIN_SILENCE_MS': getattr(settings, 'STT_SEGMENT_MIN_SILENCE_MS', 300),
+    
+    # تعداد پردازه‌های رونویسی (1 = ترتیبی در همین پردازه)
+    'WORKERS': getattr(settings, 'STT_TRANSCRIBE_WORKERS', 2),
+    
+    # روش ساخت پردازه‌ها (spawn برای سازگاری با CUDA)
+    'START_METHOD': getattr(settings, 'STT_TRANSCRIBE_START_METHOD', 'spawn'),
+}
+
+# تنظیمات ارسال جریانی نتایج جزئی (SSE)
+STREAMING_SETTINGS = {
+    'ENABLED': getattr(settings, 'STT_STREAMING_ENABLED', True),
+
+    # آدرس Redis برای Redis Streams؛ در نبود آن از کش Django استفاده می‌شود
+    'REDIS_URL': getattr(
+        settings, 'STT_STREAM_REDIS_URL',
+        getattr(settings, 'CELERY_BROKER_URL', '')
+    ),
+
+    # مدت نگهداری رویدادهای هر وظیفه (ثانیه) و حداکثر تعداد آن‌ها
+    'EVENT_TTL': getattr(settings, 'STT_STREAM_EVENT_TTL', 3600),
+    'MAX_EVENTS': getattr(settings, 'STT_STREAM_MAX_EVENTS', 1000),
+
+    # فاصلهٔ ارسال keep-alive و بررسی کش در حالت بدون Redis (ثانیه)
+    'HEARTBEAT_INTERVAL': getattr(settings, 'STT_STREAM_HEARTBEAT_INTERVAL', 15),
+    'POLL_INTERVAL': getattr(settings, 'STT_STREAM_POLL_INTERVAL', 0.5),
+
+    # حداکثر عمر یک اتصال SSE (ثانیه)
+    'MAX_CONNECTION_SECONDS': getattr(settings, 'STT_STREAM_MAX_CONNECTION_SECONDS', 1800),
 }
 
 # تنظیمات مانیتورینگ
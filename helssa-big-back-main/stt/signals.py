@@ -0,0 +1,42 @@
+"""
+سیگنال‌های اپ STT
+
+پیش‌بارگذاری مدل‌های Whisper هنگام شروع worker سلری تا زمان بارگذاری مدل از
+تأخیر هر وظیفه حذف شود.
+"""
+import logging
+
+from celery.signals import worker_init, worker_process_init
+
+from .model_registry import get_model_registry
+from .settings import WHISPER_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+@worker_init.connect
+def preload_whisper_models(**kwargs):
+    """
+    بارگذاری در پردازهٔ اصلی worker پیش از fork کارگرهای prefork
+
+    وزن‌ها پس از fork به‌صورت copy-on-write بین کارگرها مشترک می‌مانند. روی CUDA
+    این کار انجام نمی‌شود، چون context کودا از fork عبور نمی‌کند.
+    """
+    if not WHISPER_SETTINGS['PRELOAD_ON_WORKER_START']:
+        return
+    registry = get_model_registry()
+    if registry.device != 'cpu':
+        return
+    loaded = registry.preload(WHISPER_SETTINGS['PRELOAD_MODELS'], freeze=True)
+    logger.info(f"Preloaded Whisper models before fork: {loaded}")
+
+
+@worker_process_init.connect
+def preload_whisper_models_in_child(**kwargs):
+    """
+    سنجاق کردن مدل‌ها در هر کارگر؛ مدل‌های به‌ارث‌رسیده از fork دوباره بارگذاری
+    نمی‌شوند و روی GPU هر کارگر مدل خود را بارگذاری می‌کند
+    """
+    if not WHISPER_SETTINGS['PRELOAD_ON_WORKER_START']:
+        return
+    get_model_registry().preload(WHISPER_SETTINGS['PRELOAD_MODELS'])
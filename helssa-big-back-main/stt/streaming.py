@@ -0,0 +1,214 @@
+"""
+کانال رویداد نتایج جزئی وظایف STT
+Incremental transcript event bus (Redis Streams, with a cache-backed fallback)
+
+worker سلری رویدادها را منتشر می‌کند و ویوی SSE (روی ASGI) آن‌ها را بدون
+پرس‌وجوی دیتابیس به کلاینت می‌رساند. شناسهٔ هر رویداد به‌عنوان Last-Event-ID
+قابل استفاده است تا اتصال مجدد از همان نقطه ادامه یابد.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from django.core.cache import cache
+
+from .settings import STREAMING_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# رویدادهایی که پایان جریان یک وظیفه را اعلام می‌کنند
+TERMINAL_EVENTS = ('completed', 'failed', 'cancelled')
+
+Event = Tuple[str, str, Dict[str, Any]]
+
+
+class BaseTranscriptEventBus:
+    """رابط کانال رویداد"""
+
+    def publish(self, task_id: str, event: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def listen(self, task_id: str, last_event_id: Optional[str] = None) -> AsyncIterator[Optional[Event]]:
+        """
+        رویدادهای (id, event, data) پس از last_event_id؛ در نبود رویداد تازه
+        None برمی‌گرداند تا فرستنده heartbeat بفرستد
+        """
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    def _key(self, task_id: str) -> str:
+        return f"stt:events:{task_id}"
+
+
+class RedisStreamEventBus(BaseTranscriptEventBus):
+    """کانال رویداد روی Redis Streams (مشترک بین worker ها و سرورهای ASGI)"""
+
+    def __init__(self, url: str, maxlen: int, ttl: int, block_ms: int):
+        import redis
+
+        self.url = url
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self.block_ms = block_ms
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, task_id, event, data):
+        key = self._key(task_id)
+        pipe = self._client.pipeline(transaction=False)
+        pipe.xadd(
+            key,
+            {'event': event, 'data': json.dumps(data, ensure_ascii=False)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    async def listen(self, task_id, last_event_id=None):
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        key = self._key(task_id)
+        cursor = last_event_id or '0-0'
+        try:
+            while True:
+                response = await client.xread({key: cursor}, block=self.block_ms, count=100)
+                if not response:
+                    yield None
+                    continue
+                for entry_id, fields in response[0][1]:
+                    cursor = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                    yield (
+                        cursor,
+                        fields[b'event'].decode(),
+                        json.loads(fields[b'data']),
+                    )
+        finally:
+            await client.aclose()
+
+
+class CacheEventBus(BaseTranscriptEventBus):
+    """
+    کانال رویداد روی کش Django (برای توسعه یا نصب تک‌سروری)
+
+    فقط وقتی بین پردازه‌ها کار می‌کند که کش مشترک باشد؛ هر رویداد کلید
+    جداگانه دارد و شماره‌اش با cache.incr (اتمیک در Redis/Memcached) گرفته
+    می‌شود تا انتشار هم‌زمان چند worker رویدادی را از بین نبرد. شنونده کش را
+    با فاصلهٔ POLL_INTERVAL بررسی می‌کند.
+    """
+
+    def __init__(self, ttl: int, maxlen: int, poll_interval: float, heartbeat: float):
+        self.ttl = ttl
+        self.maxlen = maxlen
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+
+    def publish(self, task_id, event, data):
+        key = self._key(task_id)
+        seq = self._next_seq(key)
+        cache.set(f"{key}:{seq}", (event, data), self.ttl)
+        if seq > self.maxlen:
+            cache.delete(f"{key}:{seq - self.maxlen}")
+
+    def _next_seq(self, key: str) -> int:
+        """شمارهٔ رویداد بعدی؛ add فقط اگر شمارنده وجود نداشته باشد آن را می‌سازد"""
+        seq_key = f"{key}:seq"
+        for _ in range(3):
+            cache.add(seq_key, 0, self.ttl)
+            try:
+                seq = cache.incr(seq_key)
+            except ValueError:
+                # شمارنده بین add و incr منقضی شد
+                continue
+            cache.touch(seq_key, self.ttl)
+            return seq
+        raise RuntimeError(f"Could not allocate event id for {key}")
+
+    async def listen(self, task_id, last_event_id=None):
+        from asgiref.sync import sync_to_async
+
+        key = self._key(task_id)
+        cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        idle = 0.0
+        # شناسه‌ای که گرفته شده ولی هنوز نوشته نشده، حداکثر به اندازهٔ heartbeat منتظر می‌ماند
+        gap_waited = 0.0
+        while True:
+            last = await sync_to_async(cache.get)(f"{key}:seq") or 0
+            fresh = []
+            if last > cursor:
+                # رویدادهای قدیمی‌تر از maxlen حذف شده‌اند
+                cursor = max(cursor, last - self.maxlen)
+                ids = range(cursor + 1, last + 1)
+                found = await sync_to_async(cache.get_many)([f"{key}:{i}" for i in ids])
+                for event_id in ids:
+                    item = found.get(f"{key}:{event_id}")
+                    if item is None:
+                        if gap_waited < self.heartbeat:
+                            break
+                        logger.warning(f"Skipping missing event {event_id} for {key}")
+                    else:
+                        fresh.append((str(event_id), item[0], item[1]))
+                    gap_waited = 0.0
+                    cursor = event_id
+            for event in fresh:
+                yield event
+            if fresh:
+                idle = 0.0
+                continue
+            await asyncio.sleep(self.poll_interval)
+            idle += self.poll_interval
+            if last > cursor:
+                gap_waited += self.poll_interval
+            if idle >= self.heartbeat:
+                idle = 0.0
+                yield None
+
+
+_bus: Optional[BaseTranscriptEventBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> BaseTranscriptEventBus:
+    """کانال رویداد این پردازه (Redis در صورت تنظیم، در غیر این صورت کش)"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                url = STREAMING_SETTINGS['REDIS_URL']
+                if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+                    _bus = RedisStreamEventBus(
+                        url,
+                        maxlen=STREAMING_SETTINGS['MAX_EVENTS'],
+                        ttl=STREAMING_SETTINGS['EVENT_TTL'],
+                        block_ms=int(STREAMING_SETTINGS['HEARTBEAT_INTERVAL'] * 1000),
+                    )
+                else:
+                    _bus = CacheEventBus(
+                        ttl=STREAMING_SETTINGS['EVENT_TTL'],
+                        maxlen=STREAMING_SETTINGS['MAX_EVENTS'],
+                        poll_interval=STREAMING_SETTINGS['POLL_INTERVAL'],
+                        heartbeat=STREAMING_SETTINGS['HEARTBEAT_INTERVAL'],
+                    )
+    return _bus
+
+
+def publish_task_event(task_id: str, event: str, data: Dict[str, Any]) -> None:
+    """انتشار رویداد؛ خطای کانال هرگز پردازش وظیفه را متوقف نمی‌کند"""
+    if not STREAMING_SETTINGS['ENABLED']:
+        return
+    try:
+        get_event_bus().publish(str(task_id), event, data)
+    except Exception as e:
+        logger.warning(f"Failed to publish {event} event for task {task_id}: {e}")
+
+
+def format_sse(event_id: Optional[str], event: str, data: Dict[str, Any]) -> str:
+    """قالب یک پیام Server-Sent Events"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
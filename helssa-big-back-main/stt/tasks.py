@@ -22,38 +22,28 @@ def process_stt_task(self, task_id: int, context_type: str = 'general'):
         task_id: شناسه وظیفه
         context_type: نوع محتوا
     """
+    # شکست فقط در تلاش آخر ثبت و اعلام می‌شود
+    final_attempt = self.request.retries >= self.max_retries
     try:
         logger.info(f"Starting processing task {task_id}")
         
         orchestrator = CentralOrchestrator()
-        orchestrator.process_task(task_id, context_type)
+        orchestrator.process_task(task_id, context_type, final_attempt=final_attempt)
         
         logger.info(f"Task {task_id} processed successfully")
         
+    except STTTask.DoesNotExist:
+        logger.error(f"Task {task_id} not found")
+        
     except Exception as e:
         logger.error(f"Error processing task {task_id}: {str(e)}")
         
-        # Retry logic
-        try:
-            task = STTTask.objects.get(id=task_id)
-            retry_count = task.metadata.get('retry_count', 0)
-            
-            if retry_count < self.max_retries:
-                # به‌روزرسانی تعداد تلاش
-                task.metadata['retry_count'] = retry_count + 1
-                task.save()
-                
-                # تلاش مجدد با تأخیر
-                raise self.retry(countdown=60 * (retry_count + 1))
-            else:
-                # شکست نهایی
-                task.status = 'failed'
-                task.error_message = f'خطا پس از {self.max_retries} تلاش: {str(e)}'
-                task.completed_at = timezone.now()
-                task.save()
-                
-        except STTTask.DoesNotExist:
-            logger.error(f"Task {task_id} not found")
+        if final_attempt:
+            logger.error(f"Task {task_id} failed after {self.max_retries} retries")
+            return
+        
+        # تلاش مجدد با تأخیر (ادامه از نقطهٔ بازیابی)
+        raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
 
 
 @shared_task
@@ -193,18 +183,16 @@ def warm_up_models():
     بارگذاری مدل‌های Whisper برای آماده‌سازی
     """
     try:
-        from .cores.speech_processor import SpeechProcessorCore
+        from .model_registry import get_model_registry
         from .settings import WHISPER_SETTINGS
         
-        processor = SpeechProcessorCore()
-        
-        # بارگذاری مدل پیش‌فرض
-        default_model = WHISPER_SETTINGS['DEFAULT_MODEL']
-        logger.info(f"Warming up default model: {default_model}")
+        # بارگذاری مدل‌های پیکربندی‌شده در رجیستری مشترک این پردازه
+        models = WHISPER_SETTINGS['PRELOAD_MODELS']
+        logger.info(f"Warming up models: {models}")
         
-        processor.load_model(default_model)
+        loaded = get_model_registry().preload(models)
         
-        logger.info("Model warm-up completed")
+        logger.info(f"Model warm-up completed: {loaded}")
         
     except Exception as e:
         logger.error(f"Error in warm_up_models: {str(e)}")
@@ -0,0 +1,113 @@
+"""
+تست‌های تحلیل برداری و جریانی کیفیت صوت
+"""
+import io
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..cores.audio_analysis import AudioQualityAccumulator, analyze_samples, analyze_stream
+
+
+def legacy_noise_floor(audio_data, sample_rate):
+    """پیاده‌سازی قبلی کف نویز (مرجع مقایسه)"""
+    frame_length = int(0.02 * sample_rate)
+    frames = [
+        audio_data[i:i+frame_length]
+        for i in range(0, len(audio_data)-frame_length, frame_length)
+    ]
+    frame_energies = sorted(np.sqrt(np.mean(frame**2)) for frame in frames)
+    return float(np.mean(frame_energies[:len(frame_energies)//10]))
+
+
+class AudioQualityAccumulatorTest(SimpleTestCase):
+    """تست AudioQualityAccumulator"""
+
+    sample_rate = 16000
+
+    def setUp(self):
+        """صوت آزمایشی: گفتار مصنوعی با مکث و نویز پس‌زمینه"""
+        rng = np.random.default_rng(42)
+        t = np.arange(self.sample_rate * 20) / self.sample_rate
+        envelope = ((t % 5.0) < 3.0)
+        self.audio = (
+            envelope * 0.4 * np.sin(2 * np.pi * 220 * t)
+            + rng.normal(0, 0.004, t.size)
+        ).astype(np.float32)
+
+    def test_matches_full_buffer_metrics(self):
+        """برابری معیارها با محاسبهٔ مستقیم روی کل بافر"""
+        result = analyze_samples(self.audio, self.sample_rate, chunk_seconds=1.7)
+
+        expected_rms = np.sqrt(np.mean(self.audio.astype(np.float64)**2))
+        expected_silence = np.mean(np.abs(self.audio) < 0.01)
+
+        self.assertAlmostEqual(result['rms_energy'], expected_rms, places=5)
+        self.assertAlmostEqual(result['silence_ratio'], expected_silence, places=6)
+        self.assertAlmostEqual(result['duration'], 20.0)
+        self.assertEqual(result['noise_level'], 'low')
+
+    def test_noise_floor_close_to_legacy(self):
+        """تخمین کف نویز از هیستوگرام نزدیک به روش مرتب‌سازی قبلی"""
+        result = analyze_samples(self.audio, self.sample_rate)
+        legacy = legacy_noise_floor(self.audio, self.sample_rate)
+
+        self.assertAlmostEqual(result['noise_floor'], legacy, delta=legacy * 0.05)
+
+    def test_chunk_boundaries_do_not_change_result(self):
+        """تکه‌های ناهمتراز با طول فریم همان نتیجه را می‌دهند"""
+        whole = AudioQualityAccumulator(self.sample_rate)
+        whole.update(self.audio)
+
+        chunked = AudioQualityAccumulator(self.sample_rate)
+        for start in range(0, self.audio.size, 12345):
+            chunked.update(self.audio[start:start + 12345])
+
+        self.assertEqual(whole.frame_count, chunked.frame_count)
+        self.assertAlmostEqual(whole.noise_floor(), chunked.noise_floor(), places=6)
+
+    def test_clipping_detection(self):
+        """تشخیص نمونه‌های clip شده"""
+        audio = self.audio.copy()
+        audio[:1600] = 1.0
+        result = analyze_samples(audio, self.sample_rate)
+
+        self.assertAlmostEqual(result['clipping_ratio'], 1600 / audio.size)
+        self.assertEqual(result['peak'], 1.0)
+
+    def test_high_noise_level(self):
+        """طبقه‌بندی صوت پرنویز"""
+        noise = np.random.default_rng(0).normal(0, 0.1, self.sample_rate * 5).astype(np.float32)
+        result = analyze_samples(noise, self.sample_rate)
+
+        self.assertEqual(result['noise_level'], 'high')
+
+    def test_empty_audio(self):
+        """صوت خالی"""
+        result = analyze_samples(np.empty(0, dtype=np.float32), self.sample_rate)
+
+        self.assertEqual(result['duration'], 0.0)
+        self.assertEqual(result['silence_ratio'], 1.0)
+
+    def test_analyze_stream(self):
+        """تحلیل از stream باینری با خوانش‌های ناهمتراز"""
+        stream = io.BytesIO(self.audio.tobytes())
+        result = analyze_stream(stream, self.sample_rate, chunk_seconds=0.33)
+        expected = analyze_samples(self.audio, self.sample_rate)
+
+        self.assertAlmostEqual(result['rms_energy'], expected['rms_energy'], places=6)
+        self.assertAlmostEqual(result['noise_floor'], expected['noise_floor'], places=6)
+        self.assertEqual(result['duration'], expected['duration'])
+
+    def test_analyze_stream_interleaved_channels(self):
+        """در PCM دو کاناله کانال اول تحلیل و همهٔ فریم‌ها به on_frames داده می‌شوند"""
+        other = (self.audio * 0.25).astype(np.float32)
+        stream = io.BytesIO(np.stack([self.audio, other], axis=1).tobytes())
+        kept = []
+
+        result = analyze_stream(stream, self.sample_rate, chunk_seconds=0.33, channels=2,
+                                on_frames=lambda frames: kept.append(frames[:, 1].copy()))
+        expected = analyze_samples(self.audio, self.sample_rate)
+
+        self.assertAlmostEqual(result['rms_energy'], expected['rms_energy'], places=6)
+        np.testing.assert_array_equal(np.concatenate(kept), other)
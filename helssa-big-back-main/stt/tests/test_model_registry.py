@@ -0,0 +1,131 @@
+"""
+تست‌های رجیستری مشترک مدل‌های Whisper
+"""
+import sys
+import threading
+import types
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..model_registry import WhisperModelRegistry
+
+
+class FakeModel:
+    """مدل ساختگی به جای Whisper"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def eval(self):
+        return self
+
+
+class WhisperModelRegistryTest(SimpleTestCase):
+    """تست WhisperModelRegistry"""
+
+    def setUp(self):
+        self.loads = []
+
+        def load_model(name, device=None, download_root=None):
+            self.loads.append(name)
+            return FakeModel(name)
+
+        fake_whisper = types.SimpleNamespace(load_model=load_model)
+        patcher = mock.patch.dict(sys.modules, {'whisper': fake_whisper})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_model_loaded_once(self):
+        """مدل فقط یک بار بارگذاری و بین درخواست‌ها مشترک می‌شود"""
+        registry = WhisperModelRegistry(device='cpu')
+
+        first = registry.get('base')
+        second = registry.get('base')
+
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, ['base'])
+        self.assertIn('base', registry.stats()['load_times'])
+
+    def test_size_resolves_to_model_name(self):
+        """اندازهٔ large به نام مدل Whisper نگاشت می‌شود"""
+        registry = WhisperModelRegistry(device='cpu')
+
+        registry.get('large')
+
+        self.assertEqual(self.loads, ['large-v3'])
+        self.assertTrue(registry.is_loaded('large'))
+
+    def test_lru_eviction(self):
+        """با رسیدن به سقف، کم‌استفاده‌ترین مدل کنار گذاشته می‌شود"""
+        registry = WhisperModelRegistry(max_models=2, device='cpu')
+
+        registry.get('tiny')
+        registry.get('base')
+        registry.get('tiny')
+        registry.get('small')
+
+        self.assertTrue(registry.is_loaded('tiny'))
+        self.assertFalse(registry.is_loaded('base'))
+        self.assertTrue(registry.is_loaded('small'))
+
+    def test_preloaded_models_are_pinned(self):
+        """مدل‌های پیش‌بارگذاری‌شده از LRU خارج نمی‌شوند"""
+        registry = WhisperModelRegistry(max_models=1, device='cpu')
+
+        self.assertEqual(registry.preload(['base']), ['base'])
+        registry.get('tiny')
+        registry.get('small')
+
+        self.assertTrue(registry.is_loaded('base'))
+        self.assertEqual(registry.stats()['pinned'], ['base'])
+
+    def test_concurrent_get_loads_once(self):
+        """درخواست‌های هم‌زمان یک مدل فقط یک بارگذاری انجام می‌دهند"""
+        registry = WhisperModelRegistry(device='cpu')
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get('base')))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.loads, ['base'])
+        self.assertEqual(len({id(model) for model in results}), 1)
+
+    def test_lease_is_exclusive_within_limit(self):
+        """قرض هم‌زمان نسخهٔ جداگانه می‌دهد و تعداد نسخه‌ها از سقف بیشتر نمی‌شود"""
+        registry = WhisperModelRegistry(max_models=2, device='cpu')
+        acquired = threading.Event()
+
+        def lease_third():
+            with registry.lease('base'):
+                acquired.set()
+
+        with registry.lease('base') as first, registry.lease('base') as second:
+            self.assertIsNot(first, second)
+            self.assertIs(first, registry.get('base'))
+            waiting = threading.Thread(target=lease_third)
+            waiting.start()
+            # سومین قرض تا بازگشت یک نسخه منتظر می‌ماند
+            self.assertFalse(acquired.wait(timeout=0.05))
+
+        self.assertTrue(acquired.wait(timeout=1))
+        waiting.join()
+        self.assertEqual(self.loads, ['base', 'base'])
+
+    def test_idle_copy_released_for_other_model(self):
+        """نسخهٔ اضافهٔ آزاد پیش از مدل‌های دیگر کنار گذاشته می‌شود"""
+        registry = WhisperModelRegistry(max_models=2, device='cpu')
+        with registry.lease('base'), registry.lease('base'):
+            pass
+
+        registry.get('tiny')
+
+        self.assertTrue(registry.is_loaded('base'))
+        self.assertTrue(registry.is_loaded('tiny'))
+        self.assertEqual(registry.stats()['copies'], {})
@@ -0,0 +1,90 @@
+"""
+تست‌های هش جریانی آپلود و مخزن پایدار نتایج STT
+"""
+import hashlib
+import os
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from rest_framework.parsers import FormParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..cores.api_ingress import APIIngressCore
+from ..models import STTTranscriptCache
+from ..upload_handlers import ContentHashMultiPartParser
+
+
+class ContentHashUploadTest(SimpleTestCase):
+    """تست محاسبهٔ هش در حین آپلود"""
+
+    def _upload(self, content):
+        request = APIRequestFactory().post(
+            '/stt/transcribe/',
+            {'audio_file': SimpleUploadedFile('voice.mp3', content), 'language': 'fa'},
+            format='multipart'
+        )
+        return Request(request, parsers=[ContentHashMultiPartParser(), FormParser()])
+
+    def test_small_file_hashed_in_memory(self):
+        """فایل کوچک (هندلر حافظه)"""
+        content = os.urandom(1024)
+        audio_file = self._upload(content).data['audio_file']
+
+        self.assertEqual(audio_file.content_hash, hashlib.sha256(content).hexdigest())
+
+    def test_large_file_hashed_on_disk(self):
+        """فایل بزرگ (هندلر فایل موقت)"""
+        content = os.urandom(3 * 1024 * 1024)
+        audio_file = self._upload(content).data['audio_file']
+
+        self.assertEqual(audio_file.content_hash, hashlib.sha256(content).hexdigest())
+
+    def test_calculate_audio_hash_uses_upload_hash(self):
+        """هش محاسبه‌شده در آپلود بدون خواندن دوباره استفاده می‌شود"""
+        audio_file = SimpleUploadedFile('voice.mp3', b'audio')
+        audio_file.content_hash = 'precomputed'
+
+        self.assertEqual(APIIngressCore().calculate_audio_hash(audio_file), 'precomputed')
+
+
+class TranscriptStoreTest(TestCase):
+    """تست مخزن پایدار نتایج"""
+
+    def setUp(self):
+        self.core = APIIngressCore()
+        self.audio_hash = hashlib.sha256(b'audio').hexdigest()
+        self.result = {
+            'transcription': 'سردرد دارم',
+            'confidence_score': 0.9,
+            'duration': 12.5,
+            'quality_control': {'audio_quality_score': 0.8, 'needs_human_review': False},
+        }
+        cache.clear()
+
+    def test_result_survives_cache_loss(self):
+        """نتیجه پس از پاک شدن کش از مخزن پایدار بازیابی می‌شود"""
+        self.core.cache_result(self.audio_hash, 'fa', 'base', self.result)
+        cache.clear()
+
+        cached = self.core.get_cached_result(self.audio_hash, 'fa', 'base')
+
+        self.assertEqual(cached['transcription'], 'سردرد دارم')
+        self.assertEqual(cached['quality_control']['audio_quality_score'], 0.8)
+
+    def test_key_includes_language_and_model(self):
+        """کلید مخزن شامل زبان و مدل است"""
+        self.core.cache_result(self.audio_hash, 'fa', 'base', self.result)
+
+        self.assertIsNone(self.core.get_cached_result(self.audio_hash, 'fa', 'small'))
+        self.assertIsNone(self.core.get_cached_result(self.audio_hash, 'en', 'base'))
+
+    def test_store_is_idempotent_and_counts_hits(self):
+        """ذخیرهٔ تکراری یک رکورد می‌سازد و استفادهٔ مجدد شمرده می‌شود"""
+        self.core.cache_result(self.audio_hash, 'fa', 'base', self.result)
+        self.core.cache_result(self.audio_hash, 'fa', 'base', self.result)
+        self.core.get_cached_result(self.audio_hash, 'fa', 'base')
+
+        entry = STTTranscriptCache.objects.get(content_hash=self.audio_hash)
+        self.assertEqual(entry.hit_count, 1)
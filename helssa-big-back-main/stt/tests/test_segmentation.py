@@ -0,0 +1,136 @@
+"""
+تست‌های بخش‌بندی صوت بر اساس فعالیت صوتی
+"""
+import sys
+import threading
+import time
+import types
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..cores.segmentation import detect_voice_activity, plan_segments
+from ..cores.speech_processor import DecodedAudio, SpeechProcessorCore
+from ..model_registry import WhisperModelRegistry
+from ..settings import SEGMENTATION_SETTINGS
+
+
+class PlanSegmentsTest(SimpleTestCase):
+    """تست plan_segments"""
+
+    sample_rate = 16000
+
+    def _speech(self, pattern):
+        """صوت مصنوعی از لیست (ثانیه، گفتار؟)"""
+        rng = np.random.default_rng(7)
+        parts = []
+        for seconds, voiced in pattern:
+            n = int(seconds * self.sample_rate)
+            t = np.arange(n) / self.sample_rate
+            part = rng.normal(0, 0.002, n)
+            if voiced:
+                part += 0.3 * np.sin(2 * np.pi * 200 * t)
+            parts.append(part)
+        return np.concatenate(parts).astype(np.float32)
+
+    def test_cuts_inside_silences(self):
+        """برش‌ها در میانهٔ سکوت‌ها قرار می‌گیرند"""
+        audio = self._speech([(20, True), (1, False), (20, True), (1, False), (20, True)])
+        segments = plan_segments(audio, self.sample_rate, target_seconds=30, max_seconds=45)
+
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(segments[0][0], 0)
+        self.assertEqual(segments[-1][1], audio.size)
+        cut = segments[0][1] / self.sample_rate
+        self.assertTrue(20 <= cut <= 21 or 41 <= cut <= 42)
+        self.assertEqual(segments[0][1], segments[1][0])
+
+    def test_hard_cut_without_silence(self):
+        """بدون سکوت مناسب، در حداکثر طول بریده می‌شود"""
+        audio = self._speech([(100, True)])
+        segments = plan_segments(audio, self.sample_rate, target_seconds=30, max_seconds=40)
+
+        self.assertTrue(all(end - start <= 40 * self.sample_rate for start, end in segments))
+        self.assertEqual(segments[-1][1], audio.size)
+
+    def test_silent_segments_dropped(self):
+        """بخش‌های بدون گفتار رونویسی نمی‌شوند"""
+        audio = self._speech([(20, True), (60, False), (20, True)])
+        segments = plan_segments(audio, self.sample_rate, target_seconds=20, max_seconds=30)
+
+        for start, end in segments:
+            voiced = detect_voice_activity(audio[start:end], self.sample_rate)
+            self.assertTrue(voiced.any())
+        self.assertLess(sum(end - start for start, end in segments), audio.size)
+
+    def test_silent_audio(self):
+        """صوت کاملاً بی‌صدا"""
+        audio = np.zeros(self.sample_rate * 10, dtype=np.float32)
+
+        self.assertEqual(plan_segments(audio, self.sample_rate), [])
+
+
+class RunSegmentsTest(SimpleTestCase):
+    """تست رونویسی موازی بخش‌ها در کارگرهای daemon"""
+
+    def setUp(self):
+        from .. import transcription_pool
+
+        self.threads = set()
+        self.loads = []
+        threads = self.threads
+        active = {'now': 0, 'models': set()}
+        lock = threading.Lock()
+
+        class FakeModel:
+            def eval(self):
+                return self
+
+            def transcribe(self, samples, **options):
+                # یک نسخه هرگز هم‌زمان در دو thread استفاده نمی‌شود
+                with lock:
+                    assert id(self) not in active['models']
+                    active['models'].add(id(self))
+                threads.add(threading.current_thread().name)
+                time.sleep(0.01)
+                with lock:
+                    active['models'].discard(id(self))
+                return {'text': str(samples.size), 'segments': []}
+
+        def load_model(name, device=None, download_root=None):
+            self.loads.append(name)
+            return FakeModel()
+
+        self.patchers = [
+            mock.patch.dict(sys.modules, {'whisper': types.SimpleNamespace(load_model=load_model)}),
+            mock.patch.object(transcription_pool, 'can_fork_workers', return_value=False),
+            mock.patch.dict(SEGMENTATION_SETTINGS, {'WORKERS': 4}),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(transcription_pool.shutdown_pools)
+
+        core = SpeechProcessorCore.__new__(SpeechProcessorCore)
+        core.logger = mock.Mock()
+        core.device = 'cpu'
+        core.model_configs = {'base': {'name': 'base'}}
+        core.registry = WhisperModelRegistry(max_models=2, device='cpu')
+        self.core = core
+
+    def test_daemon_worker_uses_thread_pool(self):
+        """بدون امکان fork، بخش‌ها روی استخر thread با مدل‌های رجیستری مشترک رونویسی می‌شوند"""
+        decoded = DecodedAudio(samples=np.zeros(100, dtype=np.float32), sample_rate=16000)
+        plan = [[0, 10], [10, 30], [30, 60], [60, 100]]
+
+        results = dict(self.core._run_segments(decoded, plan, [0, 1, 2, 3], 'base', {}))
+
+        self.assertEqual({index: r['text'] for index, r in results.items()},
+                         {0: '10', 1: '20', 2: '30', 3: '40'})
+        self.assertTrue(all(name.startswith('stt-transcribe') for name in self.threads))
+        self.assertIn('thread pool', self.core.logger.warning.call_args[0][0])
+        # با سقف دو مدل، حداکثر یک نسخهٔ اضافه کنار نسخهٔ اصلی ساخته می‌شود
+        self.assertEqual(self.loads, ['base', 'base'])
+        self.assertTrue(self.core.registry.is_loaded('base'))
+        self.assertEqual(self.core.registry.stats()['copies'], {'base': 1})
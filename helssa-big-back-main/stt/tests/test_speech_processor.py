@@ -0,0 +1,142 @@
+"""
+تست‌های رمزگشایی یک‌بارهٔ صوت در SpeechProcessorCore
+"""
+import io
+from unittest import mock
+
+import ffmpeg
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..cores.speech_processor import DecodedAudio, SpeechProcessorCore
+from ..settings import ADVANCED_SETTINGS
+
+FFMPEG_LOG = (
+    "Input #0, mp3, from 'visit.mp3':\n"
+    "  Duration: 00:01:05.50, start: 0.000000, bitrate: 128 kb/s\n"
+    "  Stream #0:0: Audio: mp3, 44100 Hz, stereo, fltp, 128 kb/s\n"
+)
+
+
+class FakeModel:
+    """مدل ساختگی Whisper که ورودی transcribe را نگه می‌دارد"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def transcribe(self, audio, **options):
+        self.inputs.append(audio)
+        return {
+            'text': ' سلام دکتر ',
+            'language': 'fa',
+            'segments': [{'start': 0.0, 'end': 1.0, 'text': 'سلام دکتر', 'avg_logprob': -0.2}],
+        }
+
+
+class DecodeOnceTest(SimpleTestCase):
+    """تست رمزگشایی با یک فرایند ffmpeg و استفادهٔ مشترک از بافر"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.raw = rng.uniform(-0.5, 0.5, 16000).astype(np.float32)
+        self.clean = (self.raw * 0.5).astype(np.float32)
+        self.commands = []
+
+        core = SpeechProcessorCore.__new__(SpeechProcessorCore)
+        core.logger = mock.Mock()
+        core.sample_rate = 16000
+        core.default_model = 'base'
+        core.model_configs = {'base': {'name': 'base'}}
+        core.model = FakeModel()
+        core.registry = mock.Mock(get=mock.Mock(return_value=core.model))
+        self.core = core
+
+    def _run_async(self, stream, **kwargs):
+        """جایگزین OutputStream.run_async: فرایندی با خروجی PCM و لاگ ffmpeg"""
+        self.commands.append(stream.compile())
+        if 'amerge' in ' '.join(self.commands[-1]):
+            pcm = np.stack([self.raw, self.clean], axis=1).reshape(-1)
+        else:
+            pcm = self.raw
+        return mock.Mock(
+            stdout=io.BytesIO(pcm.tobytes()),
+            stderr=io.BytesIO(FFMPEG_LOG.encode('utf-8')),
+            returncode=0,
+        )
+
+    def _patch_run(self):
+        return mock.patch.object(
+            ffmpeg.nodes.OutputStream, 'run_async', autospec=True, side_effect=self._run_async
+        )
+
+    def test_denoise_channels_split_from_single_process(self):
+        """کانال خام برای تحلیل و کانال فیلترشده برای Whisper از یک فرایند"""
+        with self._patch_run(), mock.patch.dict(ADVANCED_SETTINGS, {'DENOISE_AUDIO': True}):
+            decoded = self.core.decode_audio('visit.mp3')
+
+        self.assertEqual(len(self.commands), 1)
+        command = self.commands[0]
+        self.assertIn('pipe:', command)
+        self.assertIn('f32le', command)
+        np.testing.assert_array_equal(decoded.samples, self.clean)
+        self.assertAlmostEqual(
+            decoded.quality_metrics['peak'], float(np.max(np.abs(self.raw))), places=5
+        )
+        self.assertTrue(decoded.samples.flags['C_CONTIGUOUS'])
+        self.assertAlmostEqual(decoded.duration, 1.0)
+
+    def test_source_info_parsed_from_same_process(self):
+        """اطلاعات فایل مبدا بدون ffprobe از stderr همان فرایند"""
+        with self._patch_run(), mock.patch.dict(ADVANCED_SETTINGS, {'DENOISE_AUDIO': False}):
+            decoded = self.core.decode_audio('visit.mp3')
+
+        self.assertEqual(decoded.source_info, {
+            'duration': 65.5,
+            'bitrate': 128000,
+            'sample_rate': 44100,
+            'channels': 2,
+        })
+        np.testing.assert_array_equal(decoded.samples, self.raw)
+
+    def test_transcribe_receives_decoded_buffer(self):
+        """Whisper آرایهٔ رمزگشایی‌شده را مستقیماً و بدون فایل موقت می‌گیرد"""
+        with self._patch_run(), \
+                mock.patch.dict(ADVANCED_SETTINGS, {'DENOISE_AUDIO': True, 'USE_VAD': False}), \
+                mock.patch('tempfile.NamedTemporaryFile') as temp_file:
+            result = self.core.process_audio_file('visit.mp3', model_size='base')
+
+        self.assertEqual(len(self.commands), 1)
+        temp_file.assert_not_called()
+        self.assertEqual(len(self.core.model.inputs), 1)
+        np.testing.assert_array_equal(self.core.model.inputs[0], self.clean)
+        self.assertEqual(result['transcription'], 'سلام دکتر')
+        self.assertEqual(result['audio_quality']['duration'], 65.5)
+        self.assertEqual(result['audio_quality']['sample_rate'], 44100)
+
+    def test_quality_analysis_uses_raw_channel(self):
+        """تحلیل کیفیت روی کانال خام (پیش از نویزگیری) انجام می‌شود"""
+        with self._patch_run(), \
+                mock.patch.dict(ADVANCED_SETTINGS, {'DENOISE_AUDIO': True, 'ANALYSIS_CHUNK_SECONDS': 0.1}):
+            decoded = self.core.decode_audio('visit.mp3')
+        quality = self.core._analyze_audio_quality(decoded)
+
+        self.assertAlmostEqual(quality['peak'], float(np.max(np.abs(self.raw))), places=5)
+        self.assertAlmostEqual(quality['rms_energy'], float(np.sqrt(np.mean(self.raw ** 2))), places=5)
+
+    def test_quality_analysis_without_stream_metrics(self):
+        """بافر ساخته‌شده بدون رمزگشایی جریانی، روی نمونه‌های خود تحلیل می‌شود"""
+        decoded = DecodedAudio(samples=self.raw, sample_rate=16000)
+        quality = self.core._analyze_audio_quality(decoded)
+        self.assertAlmostEqual(quality['peak'], float(np.max(np.abs(self.raw))), places=5)
+
+    def test_decode_error_is_raised(self):
+        """خطای ffmpeg با لاگ آن گزارش و دوباره raise می‌شود"""
+        process = mock.Mock(
+            stdout=io.BytesIO(b''),
+            stderr=io.BytesIO(b'Invalid data found when processing input'),
+            returncode=1,
+        )
+        with mock.patch.object(ffmpeg.nodes.OutputStream, 'run_async', return_value=process):
+            with self.assertRaises(ffmpeg.Error):
+                self.core.decode_audio('broken.mp3')
+        self.assertIn('Invalid data', self.core.logger.error.call_args[0][0])
@@ -0,0 +1,222 @@
+"""
+تست‌های کانال رویداد و ارسال جریانی نتایج جزئی
+"""
+import asyncio
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import AsyncClient, SimpleTestCase, override_settings
+
+from ..streaming import CacheEventBus, format_sse
+
+
+class CacheEventBusTest(SimpleTestCase):
+    """تست کانال رویداد مبتنی بر کش"""
+
+    def setUp(self):
+        cache.clear()
+        self.bus = CacheEventBus(ttl=60, maxlen=100, poll_interval=0.01, heartbeat=0.05)
+
+    def _collect(self, task_id, last_event_id=None, limit=10):
+        async def collect():
+            events = []
+            async for item in self.bus.listen(task_id, last_event_id):
+                events.append(item)
+                if item is None or len(events) >= limit or item[1] == 'completed':
+                    break
+            return events
+        return asyncio.run(collect())
+
+    def test_events_replayed_in_order(self):
+        """رویدادهای منتشرشده به ترتیب به شنونده می‌رسند"""
+        self.bus.publish('task-1', 'partial', {'index': 0, 'text': 'سلام'})
+        self.bus.publish('task-1', 'completed', {'status': 'completed'})
+
+        events = self._collect('task-1')
+
+        self.assertEqual([event[1] for event in events], ['partial', 'completed'])
+        self.assertEqual(events[0][2]['text'], 'سلام')
+
+    def test_resume_after_last_event_id(self):
+        """اتصال مجدد با Last-Event-ID فقط رویدادهای بعدی را دریافت می‌کند"""
+        self.bus.publish('task-1', 'partial', {'index': 0})
+        self.bus.publish('task-1', 'partial', {'index': 1})
+        first_id = self._collect('task-1', limit=1)[0][0]
+
+        events = self._collect('task-1', last_event_id=first_id, limit=1)
+
+        self.assertEqual(events[0][2], {'index': 1})
+
+    def test_concurrent_publishers_keep_all_events(self):
+        """انتشار هم‌زمان چند worker هیچ رویدادی را از بین نمی‌برد"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        # هر نمونه نقش worker جداگانه را دارد؛ کندی خواندن کش فاصلهٔ رقابت را باز می‌کند
+        from .. import streaming
+
+        class SlowCache:
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def get(self, *args, **kwargs):
+                value = cache.get(*args, **kwargs)
+                time.sleep(0.002)
+                return value
+
+        other = CacheEventBus(ttl=60, maxlen=100, poll_interval=0.01, heartbeat=0.05)
+        with mock.patch.object(streaming, 'cache', SlowCache()), ThreadPoolExecutor(max_workers=8) as pool:
+            for index in range(40):
+                bus = self.bus if index % 2 else other
+                pool.submit(bus.publish, 'task-1', 'partial', {'index': index})
+
+        events = self._collect('task-1', limit=40)
+
+        self.assertEqual([event[0] for event in events], [str(i) for i in range(1, 41)])
+        self.assertEqual(sorted(event[2]['index'] for event in events), list(range(40)))
+
+    def test_waits_for_reserved_event(self):
+        """رویدادی که شماره گرفته ولی هنوز نوشته نشده، جا نمی‌افتد"""
+        key = self.bus._key('task-1')
+        first = self.bus._next_seq(key)
+        self.bus.publish('task-1', 'partial', {'index': 1})
+
+        async def collect():
+            listener = self.bus.listen('task-1')
+            pending = asyncio.ensure_future(listener.__anext__())
+            await asyncio.sleep(0.02)
+            cache.set(f"{key}:{first}", ('partial', {'index': 0}), 60)
+            events = [await pending, await listener.__anext__()]
+            await listener.aclose()
+            return events
+
+        events = asyncio.run(collect())
+
+        self.assertEqual([event[2]['index'] for event in events], [0, 1])
+
+    def test_old_events_trimmed(self):
+        """فقط maxlen رویداد آخر نگه داشته می‌شود"""
+        self.bus.maxlen = 3
+        for index in range(5):
+            self.bus.publish('task-1', 'partial', {'index': index})
+
+        events = self._collect('task-1', limit=5)
+
+        self.assertEqual([event[2]['index'] for event in events[:3]], [2, 3, 4])
+        self.assertIsNone(cache.get(f"{self.bus._key('task-1')}:1"))
+
+    def test_heartbeat_when_idle(self):
+        """در نبود رویداد، None برای ارسال keep-alive برگردانده می‌شود"""
+        self.assertEqual(self._collect('task-empty'), [None])
+
+    def test_format_sse(self):
+        """قالب پیام SSE"""
+        message = format_sse('3', 'partial', {'text': 'درد'})
+
+        self.assertEqual(message, 'id: 3\nevent: partial\ndata: {"text": "درد"}\n\n')
+
+
+@override_settings(ROOT_URLCONF='stt.urls')
+class StreamTaskEventsViewTest(SimpleTestCase):
+    """تست ویوی SSE"""
+
+    def test_requires_authentication(self):
+        """اتصال بدون احراز هویت رد می‌شود"""
+        response = asyncio.run(AsyncClient().get('/task/abc/stream/'))
+
+        self.assertEqual(response.status_code, 401)
+
+
+class FakeTask:
+    """وظیفهٔ ساختگی برای تست orchestrator بدون پایگاه داده"""
+
+    def __init__(self):
+        self.id = 1
+        self.task_id = 'task-retry'
+        self.status = 'pending'
+        self.started_at = None
+        self.checkpoint = {}
+        self.metadata = {}
+        self.language = 'fa'
+        self.model_used = 'base'
+        self.content_hash = 'hash'
+        self.audio_file = mock.Mock(path='/tmp/visit.mp3')
+
+    def save(self, **kwargs):
+        pass
+
+
+class RetryStreamTest(SimpleTestCase):
+    """تست رویدادهای جریان هنگام تلاش مجدد وظیفه"""
+
+    # به‌روزرسانی نهایی در transaction.atomic انجام می‌شود
+    databases = {'default'}
+
+    def setUp(self):
+        from .. import streaming
+        from ..cores import orchestrator
+
+        cache.clear()
+        self.bus = CacheEventBus(ttl=60, maxlen=100, poll_interval=0.01, heartbeat=0.05)
+        self.task = FakeTask()
+        task_model = mock.Mock(DoesNotExist=Exception)
+        task_model.objects.get.return_value = self.task
+
+        for patcher in (
+            mock.patch.object(streaming, '_bus', self.bus),
+            mock.patch.object(orchestrator, 'STTTask', task_model),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        core = orchestrator.CentralOrchestrator.__new__(orchestrator.CentralOrchestrator)
+        core.logger = mock.Mock()
+        core.api_core = mock.Mock(prepare_response=lambda task, *args: {'status': task.status})
+        core.text_core = mock.Mock()
+        core.speech_core = mock.Mock()
+        core._perform_quality_control = mock.Mock(return_value=mock.Mock(corrected_transcription=''))
+        core._update_usage_stats = mock.Mock()
+        self.core = core
+
+    def _events(self):
+        async def collect():
+            events = []
+            async for item in self.bus.listen(self.task.task_id):
+                if item is None or item[1] in ('completed', 'failed'):
+                    events.append(item)
+                    break
+                events.append(item)
+            return events
+        return [(event[1], event[2]) for event in asyncio.run(collect()) if event]
+
+    def test_retry_then_success(self):
+        """خطای تلاش غیرنهایی رویداد failed منتشر نمی‌کند و جریان به completed می‌رسد"""
+        self.core.speech_core.process_audio_file.side_effect = [
+            RuntimeError('CUDA out of memory'),
+            {'transcription': 'سلام', 'confidence_score': 0.9, 'duration': 3.0},
+        ]
+
+        with self.assertRaises(RuntimeError):
+            self.core.process_task(self.task.id, final_attempt=False)
+        self.assertEqual(self.task.status, 'pending')
+        self.assertEqual(self.task.metadata['retry_count'], 1)
+
+        self.core.process_task(self.task.id, final_attempt=True)
+
+        events = self._events()
+        self.assertEqual([event for event, _ in events], ['status', 'status', 'status', 'completed'])
+        self.assertEqual(events[1][1], {'status': 'pending', 'retrying': True, 'retry_count': 1})
+        self.assertEqual(events[-1][1], {'status': 'completed'})
+        self.core._update_usage_stats.assert_called_once_with(self.task)
+
+    def test_failed_only_on_final_attempt(self):
+        """شکست تلاش آخر وظیفه را ناموفق کرده و failed منتشر می‌کند"""
+        self.core.speech_core.process_audio_file.side_effect = RuntimeError('corrupt audio')
+
+        with self.assertRaises(RuntimeError):
+            self.core.process_task(self.task.id, final_attempt=True)
+
+        events = self._events()
+        self.assertEqual([event for event, _ in events], ['status', 'failed'])
+        self.assertEqual(self.task.status, 'failed')
+        self.core._update_usage_stats.assert_called_once_with(self.task, success=False)
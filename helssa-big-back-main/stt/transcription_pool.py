@@ -0,0 +1,113 @@
+"""
+استخر پردازه برای رونویسی موازی بخش‌های صوت
+Process pool for transcribing audio segments in parallel
+
+این ماژول عمداً به Django وابسته نیست تا پردازه‌های spawn شده بتوانند آن را
+بدون راه‌اندازی تنظیمات پروژه import کنند.
+
+کارگرهای daemon (prefork سلری) اجازهٔ ساخت پردازهٔ فرزند ندارند؛ برای آن‌ها
+استخر thread ساخته می‌شود. Whisper/torch هنگام محاسبه GIL را آزاد می‌کنند، اما
+hookهای kv-cache روی خود مدل نصب می‌شوند، پس هر thread نسخه‌ای انحصاری از
+رجیستری مشترک پردازه قرض می‌گیرد (WhisperModelRegistry.lease) و تعداد نسخه‌ها
+در سقف MAX_LOADED_MODELS می‌ماند.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+
+from .model_registry import WhisperModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# مدل بارگذاری‌شده در هر پردازهٔ کارگر
+_worker_model = None
+
+_pools: Dict[Tuple[str, str, int, Optional[str]], ProcessPoolExecutor] = {}
+_thread_pools: Dict[int, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _init_worker(model_name: str, device: str, threads: int,
+                 download_root: Optional[str] = None) -> None:
+    """بارگذاری یک‌بارهٔ مدل Whisper در هر پردازهٔ کارگر"""
+    global _worker_model
+    import torch
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+    registry = WhisperModelRegistry(max_models=1, device=device, download_root=download_root)
+    _worker_model = registry.get(model_name)
+    logger.info(f"Transcription worker {os.getpid()} loaded {model_name}")
+
+
+def transcribe_segment(index: int, samples, options: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """
+    رونویسی یک بخش در پردازهٔ کارگر
+
+    Returns:
+        Tuple[int, dict]: (شمارهٔ بخش، نتیجهٔ خام Whisper)
+    """
+    return index, _worker_model.transcribe(samples, **options)
+
+
+def transcribe_leased(registry: WhisperModelRegistry, model_name: str, index: int, samples,
+                      options: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """رونویسی یک بخش در thread با نسخهٔ قرض‌گرفته از رجیستری مشترک پردازه"""
+    with registry.lease(model_name) as model:
+        return index, model.transcribe(samples, **options)
+
+
+def can_fork_workers() -> bool:
+    """پردازه‌های daemon (مثل کارگرهای prefork سلری) اجازهٔ ساخت پردازهٔ فرزند ندارند"""
+    return not multiprocessing.current_process().daemon
+
+
+def get_pool(model_name: str, device: str, workers: int,
+             download_root: Optional[str] = None,
+             start_method: str = 'spawn') -> ProcessPoolExecutor:
+    """استخر مشترک این پردازه برای (مدل، دستگاه، تعداد کارگر)"""
+    key = (model_name, device, workers, download_root)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=_init_worker,
+                initargs=(model_name, device, threads, download_root),
+            )
+            _pools[key] = pool
+        return pool
+
+
+def get_thread_pool(workers: int) -> ThreadPoolExecutor:
+    """استخر thread مشترک این پردازه برای کارگرهایی که نمی‌توانند fork کنند"""
+    with _pools_lock:
+        pool = _thread_pools.get(workers)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stt-transcribe')
+            _thread_pools[workers] = pool
+        return pool
+
+
+def discard_pool(model_name: str, device: str, workers: int,
+                 download_root: Optional[str] = None) -> None:
+    """کنار گذاشتن استخر خراب‌شده (مثلاً پس از BrokenProcessPool)"""
+    with _pools_lock:
+        pool = _pools.pop((model_name, device, workers, download_root), None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pools() -> None:
+    """بستن همهٔ استخرها"""
+    with _pools_lock:
+        pools: List[Executor] = [*_pools.values(), *_thread_pools.values()]
+        _pools.clear()
+        _thread_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,61 @@
+"""
+هندلرهای آپلود با محاسبهٔ هش جریانی
+Upload handlers that hash file content while it streams in
+"""
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from rest_framework.parsers import MultiPartParser
+
+
+class ContentHashMixin:
+    """
+    محاسبهٔ sha256 هر فایل هم‌زمان با دریافت تکه‌ها
+
+    هش روی فایل نهایی در ویژگی content_hash قرار می‌گیرد، پس برای کش نتایج
+    نیازی به خواندن دوبارهٔ فایل نیست.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self._hasher = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # هندلر حافظه برای فایل‌های بزرگ غیرفعال است و تکه‌ها را فقط عبور می‌دهد
+        if getattr(self, 'activated', True):
+            self._hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.content_hash = self._hasher.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    """هندلر آپلود در حافظه با هش محتوا"""
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    """هندلر آپلود در فایل موقت با هش محتوا"""
+
+
+def content_hash_upload_handlers(request):
+    """جایگزین هندلرهای پیش‌فرض Django برای یک درخواست (پیش از خواندن request.data)"""
+    return [
+        HashingMemoryFileUploadHandler(request),
+        HashingTemporaryFileUploadHandler(request),
+    ]
+
+
+class ContentHashMultiPartParser(MultiPartParser):
+    """MultiPartParser که فایل‌ها را با هندلرهای هش‌کننده دریافت می‌کند"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = content_hash_upload_handlers(request)
+        return super().parse(stream, media_type, parser_context)
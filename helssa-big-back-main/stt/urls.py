@@ -10,6 +10,7 @@ urlpatterns = [
     # API های مشترک
     path('transcribe/', views.create_transcription, name='create_transcription'),
     path('task/<str:task_id>/', views.get_task_status, name='get_task_status'),
+    path('task/<str:task_id>/stream/', views.stream_task_events, name='stream_task_events'),
     path('task/<str:task_id>/cancel/', views.cancel_task, name='cancel_task'),
     path('tasks/', views.get_user_tasks, name='get_user_tasks'),
     path('statistics/', views.get_user_statistics, name='get_user_statistics'),
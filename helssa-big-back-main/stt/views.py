@@ -5,12 +5,21 @@ import logging
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
 from rest_framework.response import Response
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+import asyncio
 import time
 
+from app_standards.views.async_auth import aauthenticate_request, unauthenticated_response
+
 from .services import STTService
+from .upload_handlers import ContentHashMultiPartParser
+from .settings import STREAMING_SETTINGS
+from .streaming import TERMINAL_EVENTS, format_sse, get_event_bus
 from .serializers import (
     AudioFileSerializer,
     STTTaskSerializer,
@@ -26,7 +35,7 @@ stt_service = STTService()
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@parser_classes([MultiPartParser, FormParser])
+@parser_classes([ContentHashMultiPartParser, FormParser])
 def create_transcription(request):
     """
     ایجاد وظیفه تبدیل گفتار به متن
@@ -152,6 +161,87 @@ def get_task_status(request, task_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def _task_event_stream(task_id, snapshot, last_event_id):
+    """تولید پیام‌های SSE: وضعیت فعلی و سپس رویدادهای کانال تا پایان وظیفه"""
+    yield format_sse(None, 'snapshot', snapshot)
+    if snapshot['status'] in TERMINAL_EVENTS:
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAMING_SETTINGS['MAX_CONNECTION_SECONDS']
+    async for item in get_event_bus().listen(task_id, last_event_id):
+        if item is None:
+            yield ': keep-alive\n\n'
+        else:
+            event_id, event, data = item
+            yield format_sse(event_id, event, data)
+            if event in TERMINAL_EVENTS:
+                return
+        if loop.time() >= deadline:
+            # کلاینت با Last-Event-ID دوباره متصل می‌شود
+            return
+
+
+@csrf_exempt
+@require_GET
+async def stream_task_events(request, task_id):
+    """
+    جریان نتایج جزئی وظیفه تبدیل (Server-Sent Events)
+    
+    وضعیت فعلی یک بار از دیتابیس خوانده می‌شود و بقیهٔ رویدادها (status،
+    partial، completed، failed، cancelled) از کانال رویداد می‌رسند؛ نیازی به
+    پرس‌وجوی مکرر task/<task_id>/ نیست.
+    
+    Path Parameters:
+        - task_id: شناسه وظیفه (UUID)
+    
+    Query Parameters:
+        - token: توکن JWT (برای EventSource که هدر Authorization نمی‌فرستد)
+    
+    Headers:
+        - Last-Event-ID: ادامهٔ جریان پس از قطع اتصال
+    
+    Response:
+        200: text/event-stream
+        401: احراز هویت نشده
+        403: عدم دسترسی
+        404: وظیفه یافت نشد
+        500: خطای سرور
+    """
+    if not STREAMING_SETTINGS['ENABLED']:
+        return JsonResponse({
+            'success': False,
+            'error': 'streaming_disabled',
+            'message': 'ارسال جریانی غیرفعال است'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    user = await aauthenticate_request(request, allow_query_token=True)
+    if user is None:
+        return unauthenticated_response()
+
+    success, result = await sync_to_async(stt_service.get_task_status)(task_id, user)
+    if not success:
+        status_code = status.HTTP_403_FORBIDDEN
+        if result.get('error') == 'not_found':
+            status_code = status.HTTP_404_NOT_FOUND
+        elif result.get('error') == 'internal_error':
+            status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        return JsonResponse({
+            'success': False,
+            'error': result.get('error'),
+            'message': result.get('message')
+        }, status=status_code)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    response = StreamingHttpResponse(
+        _task_event_stream(str(task_id), result, last_event_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cancel_task(request, task_id):
@@ -297,7 +387,7 @@ def get_user_statistics(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@parser_classes([MultiPartParser, FormParser])
+@parser_classes([ContentHashMultiPartParser, FormParser])
 def patient_voice_to_text(request):
     """
     API ویژه بیمار برای تبدیل صدای علائم به متن
@@ -379,7 +469,7 @@ def patient_voice_to_text(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@parser_classes([MultiPartParser, FormParser])
+@parser_classes([ContentHashMultiPartParser, FormParser])
 def doctor_dictation(request):
     """
     API ویژه دکتر برای دیکته کردن نسخه و یادداشت‌های پزشکی
@@ -6,7 +6,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from django.core.cache import cache
+from app_standards.rate_limiting import get_rate_limiter
 
 
 @dataclass
@@ -25,7 +25,7 @@ def _make_cache_key(identifier: str, window_seconds: int) -> str:
 
 def allow_request(identifier: str, config: RateLimitConfig) -> bool:
     """
-    بررسی مجوز درخواست با استفاده از cache increment
+    بررسی مجوز درخواست با موتور مشترک محدودیت نرخ (یک عملیات اتمیک)
 
     Args:
         identifier: شناسه یکتا برای کلاینت (مثلا IP یا کلید ارائه‌دهنده)
@@ -35,10 +35,4 @@ def allow_request(identifier: str, config: RateLimitConfig) -> bool:
         bool: آیا مجاز است یا خیر
     """
     cache_key = _make_cache_key(identifier, config.window_seconds)
-    try:
-        current_count = cache.incr(cache_key)
-    except ValueError:
-        cache.add(cache_key, 1, config.window_seconds)
-        current_count = 1
-
-    return current_count <= config.limit
\ No newline at end of file
+    return get_rate_limiter().check(cache_key, config.limit, config.window_seconds).allowed
@@ -1,17 +1,21 @@
-from django.test import TestCase, override_settings
-from django.core.cache import cache
+from unittest import mock
 
+from django.test import TestCase
+
+from app_standards.rate_limiting import RateLimiter
 from webhooks.services.rate_limit import RateLimitConfig, allow_request
 
 
-@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
 class RateLimitTests(TestCase):
     """
     تست‌های محدودسازی نرخ
     """
 
     def setUp(self):
-        cache.clear()
+        # محدودکنندهٔ درون‌حافظه‌ای به‌جای Redis مشترک
+        patcher = mock.patch('app_standards.rate_limiting._limiter', RateLimiter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def test_allow_within_limit(self):
         cfg = RateLimitConfig(limit=3, window_seconds=60)